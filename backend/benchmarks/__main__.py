@@ -0,0 +1,72 @@
+"""
+Run the benchmark suite
+
+    python -m backend.benchmarks --areas 1 100 5000 --granularities 1 2 \
+        --output bench.json --compare baseline.json
+
+Run from the repository root.
+"""
+
+import argparse
+import json
+import sys
+
+from backend.benchmarks.runner import (
+    DEFAULT_AREAS_KM2,
+    DEFAULT_GRANULARITIES_KM,
+    DEFAULT_REPEAT,
+    STAGES,
+    compare,
+    run_benchmarks,
+)
+
+
+def _print_case(case):
+    stages = ', '.join(
+        f"{name} {m['seconds']['median'] * 1000:.1f}ms/{m['peakMemoryBytes'] / 2 ** 20:.1f}MiB"
+        for name, m in case['stages'].items() if m.get('seconds')
+    )
+    print(f"{case['areaKm2']:>7g} km² @ {case['granularityKm']:g} km ({case['cells']} cells): {stages or 'no cells'}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis stages against local fakes")
+    parser.add_argument('--areas', type=float, nargs='+', default=list(DEFAULT_AREAS_KM2), help="Polygon areas in km²")
+    parser.add_argument('--granularities', type=float, nargs='+', default=list(DEFAULT_GRANULARITIES_KM), help="Grid cell sizes in km")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Timed runs per stage")
+    parser.add_argument('--latency', type=float, default=0.0, help="Simulated seconds per fake external request")
+    parser.add_argument('--model', help="Trained risk model (default: the repo's, or a stand-in)")
+    parser.add_argument('--output', default='benchmark_results.json', help="Results file")
+    parser.add_argument('--compare', metavar='BASELINE', help="Earlier results file to compare against")
+    parser.add_argument('--verbose', action='store_true', help="Show the stages' log output")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        areas_km2=args.areas,
+        granularities_km=args.granularities,
+        stages=args.stages,
+        repeat=args.repeat,
+        latency_seconds=args.latency,
+        model_path=args.model,
+        verbose=args.verbose,
+        progress=_print_case,
+    )
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"{'area':>8} {'km':>4} {'stage':<20} {'baseline':>10} {'current':>10} {'time':>7} {'memory':>7}")
+        for row in compare(baseline, results):
+            print(
+                f"{row['areaKm2']:>8g} {row['granularityKm']:>4g} {row['stage']:<20} "
+                f"{row['baselineSeconds'] * 1000:>8.1f}ms {row['seconds'] * 1000:>8.1f}ms "
+                f"{row['timeRatio'] or 0:>6.2f}x {row['memoryRatio'] or 0:>6.2f}x"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+Benchmark Fakes
+Deterministic local stand-ins for Google Earth Engine, Nominatim,
+Perplexity and Gemini. Values are derived from coordinates or from seeded,
+spatially correlated synthetic fields (no network); an optional fixed
+latency per request simulates round trips.
+"""
+
+import math
+import time
+import zlib
+from contextlib import ExitStack, contextmanager
+from typing import Dict, List, Optional
+from unittest import mock
+
+import numpy as np
+
+from backend.data.spatial_field_generator import SpatialFieldGenerator
+from backend.utils.cancellation import CancellationToken
+from backend.utils.gee_satellite import GEESatellite, _round_trip
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+FAKE_IMAGE_COUNT = 5
+
+# Smallest valid PNG (1x1 transparent pixel)
+FAKE_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489'
+    '0000000d49444154789c6360000002000001e221bc330000000049454e44ae426082'
+)
+
+
+def _unit_hash(*values: float) -> float:
+    """Deterministic value in [0, 1) for the given coordinates"""
+    key = ','.join(f'{v:.6f}' for v in values).encode()
+    return zlib.crc32(key) / 2 ** 32
+
+
+def polygon_area_km2(polygon: List[Dict[str, float]]) -> float:
+    """Area of a {lat, lng} ring on a spherical Earth (no Earth Engine round trip)"""
+    lats = np.radians([p['lat'] for p in polygon])
+    lngs = np.radians([p['lng'] for p in polygon])
+    # Spherical excess via the trapezoid formula, summed over the ring's edges
+    total = np.sum((np.roll(lngs, -1) - lngs) * (2 + np.sin(lats) + np.sin(np.roll(lats, -1))))
+    return abs(total) * EARTH_RADIUS_KM ** 2 / 2
+
+
+class FakeGEESatellite(GEESatellite):
+    """
+    GEESatellite without Earth Engine: grid generation runs the real code,
+    area, NDVI sampling and images are computed locally. NDVI comes from a
+    spatially correlated field over the cells' grid, so neighbouring cells
+    have similar values as in real imagery
+    """
+
+    def __init__(self, latency_seconds: float = 0.0, field_seed: int = 42):
+        """
+        Args:
+            latency_seconds: Sleep per simulated GEE request (0: none)
+            field_seed: Seed of the synthetic NDVI field
+        """
+        self.authenticated = True
+        self.latency_seconds = latency_seconds
+        self.fields = SpatialFieldGenerator(seed=field_seed)
+
+    def _request(self, name: str, **attributes):
+        with _round_trip(name, **attributes):
+            if self.latency_seconds:
+                time.sleep(self.latency_seconds)
+
+    def calculate_polygon_area_km2(self, polygon: List[Dict[str, float]]) -> float:
+        self._request('gee.area')
+        return polygon_area_km2(polygon)
+
+    def extract_features_for_cells(
+        self,
+        cells: List[Dict],
+        date_start: str,
+        date_end: str,
+        include_features: Optional[List[str]] = None,
+        cancel_token=None,
+        deadline: Optional[float] = None
+    ) -> List[Dict]:
+        cancel_token = cancel_token or CancellationToken()
+        self._request('gee.image_count')
+        image_urls = [
+            {'url': f'https://earthengine.invalid/thumb/{i}.png', 'id': f'COPERNICUS/S2_SR_HARMONIZED/FAKE_{i}', 'date': 1704067200000 + i * 86400000}
+            for i in range(FAKE_IMAGE_COUNT)
+        ]
+        fields = self.fields.sample_cells(cells)
+        results = []
+        for cell, values in zip(cells, fields):
+            cancel_token.raise_if_cancelled()
+            if self._past_deadline(deadline):
+                results.append({**cell, 'features': self._default_features(FAKE_IMAGE_COUNT, image_urls)})
+                continue
+            self._request('gee.sample_ndvi', cell=cell['id'])
+            results.append({
+                **cell,
+                'features': {'image_count': FAKE_IMAGE_COUNT, 'image_urls': image_urls, 'ndvi': round(values['ndvi'], 3)},
+            })
+        return results
+
+    def get_satellite_image(self, polygon: List[Dict[str, float]], cancel_token=None) -> Optional[bytes]:
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        self._request('gee.download')
+        return FAKE_PNG
+
+
+class FakeNominatim:
+    """Stand-in for geopy.geocoders.Nominatim (reverse geocoding only)"""
+
+    def __init__(self, user_agent: str = 'benchmark', latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+
+    def reverse(self, query: str, language: str = 'en'):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        lat, lng = (float(v) for v in query.split(','))
+        county = ['Nakuru', 'Kiambu', 'Nyeri', 'Meru', 'Machakos'][int(_unit_hash(lat, lng) * 5)]
+        return mock.Mock(address=f'{county}, Kenya', raw={'address': {'county': county, 'country': 'Kenya'}})
+
+
+class FakePerplexitySearch:
+    """Stand-in for PerplexitySearch returning fixed search results, remembered per region"""
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self._recent_results = {}
+
+    def search_agricultural_intelligence(self, crop_type, risk_factors, region='Kenya', max_results=5, cancel_token=None, cache_region=None):
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        search_results = {
+            'query': f'current climatic forecast {region}',
+            'results': [
+                {'title': f'{crop_type} outlook {i}', 'url': f'https://example.invalid/{i}', 'snippet': f'{", ".join(risk_factors)} in {region}', 'date': '', 'last_updated': ''}
+                for i in range(max_results)
+            ],
+            'id': 'benchmark',
+        }
+        self._recent_results[cache_region or region] = search_results
+        return search_results
+
+    def get_cached_results(self, region: str = 'Kenya'):
+        search_results = self._recent_results.get(region)
+        return {**search_results, 'cached': True} if search_results is not None else None
+
+
+class FakeGeminiService:
+    """Stand-in for GeminiService returning a fixed description"""
+
+    latency_seconds = 0.0
+
+    def analyze_image_with_search(self, image_data: bytes, prompt: str, cancel_token=None):
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return {'text': 'Smallholder maize and tea plots on terraced slopes.'}
+
+
+@contextmanager
+def installed_fakes(latency_seconds: float = 0.0):
+    """
+    Route the analysis pipeline (backend.main) to the fakes for the enclosed block
+
+    Yields:
+        The FakeGEESatellite in use
+    """
+    import backend.main as main
+
+    gee = FakeGEESatellite(latency_seconds)
+    perplexity = FakePerplexitySearch(latency_seconds)
+    gemini = type('LatentGeminiService', (FakeGeminiService,), {'latency_seconds': latency_seconds})
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(main, 'get_gee_instance', lambda: gee))
+        stack.enter_context(mock.patch.object(main, 'get_perplexity_instance', lambda: perplexity))
+        stack.enter_context(mock.patch('geopy.geocoders.Nominatim', lambda user_agent: FakeNominatim(user_agent, latency_seconds)))
+        stack.enter_context(mock.patch('backend.services.gemini_service.GeminiService', gemini))
+        yield gee
@@ -0,0 +1,536 @@
+"""
+WebSocket Load Generator
+Replays realistic analysis requests over many concurrent /api/analyze/ws
+sessions against a server running with the benchmark fakes, and reports
+time to first progress, time to complete, errors and the server's
+event-loop lag for each concurrency level
+
+    python -m backend.benchmarks.load --concurrency 10 50 100 200 \
+        --duration 30 --output load.json --compare baseline.json
+
+Run from the repository root. By default a uvicorn worker with the fakes
+is started in a subprocess; --url targets a server that is already running.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import platform
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import websockets
+
+from backend.benchmarks.polygons import synthetic_polygon
+
+
+RESULTS_FORMAT_VERSION = 1
+
+DEFAULT_CONCURRENCY = (10, 50, 100, 200)
+DEFAULT_DURATION_SECONDS = 30.0
+DEFAULT_SESSION_TIMEOUT_SECONDS = 300.0
+# A concurrency level is sustained while at most this share of sessions fail
+DEFAULT_MAX_ERROR_RATE = 0.01
+SERVER_START_TIMEOUT_SECONDS = 60.0
+METRICS_POLL_SECONDS = 1.0
+CLIENT_HEARTBEAT_SECONDS = 0.05
+# Pause before a virtual user's next session after being turned away
+REJECTED_BACKOFF_SECONDS = 1.0
+
+# Request mix, following the frontend's options (sentry/src/lib/constants.ts)
+REGIONS = {
+    'rift_valley': ((-0.5, 35.5), (0.5, 36.0)),  # (lat range, lng range)
+    'central': ((-1.0, -0.3), (36.5, 37.5)),
+}
+CROPS = ('Maize', 'Wheat', 'Coffee', 'Tea', 'Beans', 'Sorghum')
+RISK_FACTORS = ('Drought', 'Flood', 'Pests', 'Market', 'Soil Degradation')
+GRANULARITIES_KM = {1: 0.6, 2: 0.3, 5: 0.1}  # UI default is 1 km
+DATE_RANGE_DAYS_AGO = ((35, 7), (63, 14), (120, 75))  # Date range presets
+AREA_RANGE_KM2 = (1, 500)  # Log-uniform: mostly farm-sized, some regions
+
+LAG_METRIC = 'agrisentry_event_loop_lag_seconds'
+STALLS_METRIC = 'agrisentry_event_loop_stalls_total'
+POOL_QUEUE_METRIC = 'agrisentry_thread_pool_queue_depth'
+
+# Session outcomes
+COMPLETED = 'completed'
+REJECTED = 'rejected'  # Turned away by admission control before a job was created
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+TIMEOUT = 'timeout'
+CONNECTION = 'connection'
+
+
+def synthetic_request(index: int, seed: int = 0) -> Dict[str, Any]:
+    """
+    Analysis request as the frontend would send it
+    Every index gets its own polygon, so sessions do not share cached results
+
+    Args:
+        index: Session number
+        seed: Workload seed (the same seed replays the same requests)
+    """
+    rng = np.random.default_rng([seed, index])
+    (lat_low, lat_high), (lng_low, lng_high) = REGIONS[rng.choice(list(REGIONS))]
+    area_km2 = math.exp(rng.uniform(math.log(AREA_RANGE_KM2[0]), math.log(AREA_RANGE_KM2[1])))
+    center = (rng.uniform(lat_low, lat_high), rng.uniform(lng_low, lng_high))
+    start_days_ago, end_days_ago = DATE_RANGE_DAYS_AGO[rng.integers(len(DATE_RANGE_DAYS_AGO))]
+    risk_factors = [f for f in RISK_FACTORS if rng.random() < 0.4] or ['Drought']
+    granularity = int(rng.choice(list(GRANULARITIES_KM), p=list(GRANULARITIES_KM.values())))
+
+    return {
+        'location': {'type': 'custom', 'polygon': synthetic_polygon(area_km2, center=center, seed=index)},
+        'parameters': {
+            'dateRange': {
+                'start': (date.today() - timedelta(days=start_days_ago)).isoformat(),
+                'end': (date.today() - timedelta(days=end_days_ago)).isoformat(),
+            },
+            'cropType': str(rng.choice(CROPS)),
+            'riskFactors': risk_factors,
+        },
+        'advanced': {'displayThreshold': 40, 'gridGranularity': granularity, 'enabledLayers': ['riskHeatmap'], 'temporalFocus': []},
+    }
+
+
+def load_workload(path: str) -> List[Dict[str, Any]]:
+    """Recorded analysis requests, one JSON request body per line"""
+    with open(path) as f:
+        requests = [json.loads(line) for line in f if line.strip()]
+    if not requests:
+        raise ValueError(f"No requests in {path}")
+    return requests
+
+
+async def run_session(url: str, request: Dict[str, Any], client_id: str, timeout: float) -> Dict[str, Any]:
+    """
+    One analysis over /api/analyze/ws, read until it finishes
+
+    Returns:
+        {'outcome', 'ttfpSeconds', 'ttcSeconds', 'error'}; time to first
+        progress counts from connecting to the first status event of the
+        job (so it includes queueing), time to complete up to the result
+        (and its binary grid frame, if announced)
+    """
+    session = {'outcome': None, 'ttfpSeconds': None, 'ttcSeconds': None, 'error': None}
+    start = time.perf_counter()
+
+    async def read():
+        async with websockets.connect(url, additional_headers={'x-client-id': client_id}, max_size=None) as ws:
+            await ws.send(json.dumps(request))
+            job_started = False
+            expect_frame = False
+            async for message in ws:
+                if isinstance(message, bytes):
+                    if expect_frame:
+                        break
+                    continue
+                event = json.loads(message)
+                kind = event.get('type')
+                if kind == 'job':
+                    job_started = True
+                elif kind in ('status', 'progress') and session['ttfpSeconds'] is None:
+                    session['ttfpSeconds'] = time.perf_counter() - start
+                elif kind == 'complete':
+                    session['outcome'] = COMPLETED
+                    expect_frame = bool(((event.get('data') or {}).get('grid') or {}).get('byteLength'))
+                    if not expect_frame:
+                        break
+                elif kind == 'error':
+                    session['outcome'] = FAILED if job_started else REJECTED
+                    session['error'] = event.get('message')
+                    break
+                elif kind == 'cancelled':
+                    session['outcome'] = CANCELLED
+                    break
+        if session['outcome'] is None:
+            session['outcome'] = CONNECTION
+            session['error'] = 'Socket closed before the analysis finished'
+        elif session['outcome'] == COMPLETED:
+            session['ttcSeconds'] = time.perf_counter() - start
+
+    try:
+        await asyncio.wait_for(read(), timeout)
+    except asyncio.TimeoutError:
+        session['outcome'] = TIMEOUT
+    except (OSError, websockets.WebSocketException) as e:
+        session['outcome'] = CONNECTION
+        session['error'] = f"{type(e).__name__}: {e}"
+    return session
+
+
+def percentiles(values: Sequence[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {'p50': float(p50), 'p90': float(p90), 'p99': float(p99), 'max': float(max(values))}
+
+
+def parse_metrics(text: str) -> Dict[str, Dict[str, float]]:
+    """Prometheus text exposition as {metric name: {label string: value}}"""
+    samples: Dict[str, Dict[str, float]] = {}
+    for line in text.splitlines():
+        match = re.match(r'^([a-zA-Z_:][\w:]*)(\{.*\})?\s+(\S+)$', line)
+        if match:
+            name, labels, value = match.groups()
+            samples.setdefault(name, {})[labels or ''] = float(value)
+    return samples
+
+
+def fetch_metrics(base_url: str) -> Dict[str, Dict[str, float]]:
+    with urllib.request.urlopen(f"{base_url}/metrics", timeout=10) as response:
+        return parse_metrics(response.read().decode())
+
+
+def loop_lag_between(before: Dict[str, Dict[str, float]], after: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+    """
+    Server event-loop lag observed between two /metrics scrapes
+    Percentiles are histogram bucket upper bounds.
+    """
+    def delta(name):
+        old = before.get(name, {})
+        return {labels: value - old.get(labels, 0) for labels, value in after.get(name, {}).items()}
+
+    buckets = sorted(
+        (float(re.search(r'le="([^"]+)"', labels).group(1)), count)
+        for labels, count in delta(f'{LAG_METRIC}_bucket').items()
+    )
+    count = sum(delta(f'{LAG_METRIC}_count').values())
+    total = sum(delta(f'{LAG_METRIC}_sum').values())
+
+    def quantile(q):
+        for bound, cumulative in buckets:
+            if count and cumulative >= q * count:
+                return bound
+        return None
+
+    return {
+        'samples': int(count),
+        'meanSeconds': total / count if count else None,
+        'p50Seconds': quantile(0.5),
+        'p99Seconds': quantile(0.99),
+        'stalls': {
+            re.search(r'cause="([^"]+)"', labels).group(1): int(value)
+            for labels, value in delta(STALLS_METRIC).items() if value
+        },
+    }
+
+
+async def _watch_server(base_url: str, stop: asyncio.Event, peaks: Dict[str, float]):
+    """Track the deepest thread-pool queue seen while the step runs"""
+    while not stop.is_set():
+        try:
+            samples = await asyncio.to_thread(fetch_metrics, base_url)
+            depth = sum(samples.get(POOL_QUEUE_METRIC, {}).values())
+            peaks['threadPoolQueueDepth'] = max(peaks['threadPoolQueueDepth'], depth)
+        except OSError:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), METRICS_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _client_heartbeat(stop: asyncio.Event, peaks: Dict[str, float]):
+    """Lag of the load generator's own loop: if high, it (not the server) is the bottleneck"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + CLIENT_HEARTBEAT_SECONDS
+        await asyncio.sleep(CLIENT_HEARTBEAT_SECONDS)
+        peaks['clientLoopLagSeconds'] = max(peaks['clientLoopLagSeconds'], loop.time() - expected)
+
+
+async def run_step(
+    base_url: str,
+    concurrency: int,
+    duration: float,
+    next_request,
+    timeout: float = DEFAULT_SESSION_TIMEOUT_SECONDS,
+    binary: bool = True
+) -> Dict[str, Any]:
+    """
+    Closed-loop load at one concurrency level
+    Each of `concurrency` virtual users opens a session, waits for it to
+    finish and opens the next until `duration` has elapsed (pausing after
+    a rejection); sessions still running then are awaited.
+
+    Args:
+        base_url: Server root (http://host:port)
+        concurrency: Simultaneous sessions
+        duration: Seconds during which new sessions are started
+        next_request: Returns the next request to replay
+        timeout: Seconds before a session counts as timed out
+        binary: Use ?format=binary, as the frontend does
+    """
+    ws_url = base_url.replace('http', 'ws', 1) + '/api/analyze/ws' + ('?format=binary' if binary else '')
+    sessions: List[Dict[str, Any]] = []
+    peaks = {'threadPoolQueueDepth': 0.0, 'clientLoopLagSeconds': 0.0}
+    stop = asyncio.Event()
+
+    async def user(number: int):
+        while time.perf_counter() < deadline:
+            session = await run_session(ws_url, next_request(), f"loadgen-{number}", timeout)
+            sessions.append(session)
+            if session['outcome'] in (REJECTED, CONNECTION):
+                await asyncio.sleep(REJECTED_BACKOFF_SECONDS)
+
+    before = await asyncio.to_thread(fetch_metrics, base_url)
+    monitors = [asyncio.create_task(_watch_server(base_url, stop, peaks)), asyncio.create_task(_client_heartbeat(stop, peaks))]
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*monitors)
+    after = await asyncio.to_thread(fetch_metrics, base_url)
+
+    outcomes: Dict[str, int] = {}
+    errors: Dict[str, int] = {}
+    for session in sessions:
+        outcomes[session['outcome']] = outcomes.get(session['outcome'], 0) + 1
+        if session['error']:
+            message = session['error'][:120]
+            errors[message] = errors.get(message, 0) + 1
+    completed = outcomes.get(COMPLETED, 0)
+
+    return {
+        'concurrency': concurrency,
+        'sessions': len(sessions),
+        'elapsedSeconds': elapsed,
+        'outcomes': outcomes,
+        'errorRate': 1 - completed / len(sessions) if sessions else None,
+        'errors': dict(sorted(errors.items(), key=lambda item: -item[1])[:10]),
+        'completedPerSecond': completed / elapsed,
+        'ttfpSeconds': percentiles([s['ttfpSeconds'] for s in sessions if s['ttfpSeconds'] is not None]),
+        'ttcSeconds': percentiles([s['ttcSeconds'] for s in sessions if s['ttcSeconds'] is not None]),
+        'serverLoopLag': loop_lag_between(before, after),
+        'maxThreadPoolQueueDepth': int(peaks['threadPoolQueueDepth']),
+        'maxClientLoopLagSeconds': peaks['clientLoopLagSeconds'],
+    }
+
+
+def sustained_concurrency(steps: Sequence[Dict[str, Any]], max_error_rate: float = DEFAULT_MAX_ERROR_RATE, ttc_p99_seconds: Optional[float] = None) -> Optional[int]:
+    """
+    Highest concurrency level whose error rate (and, if given, p99 time to
+    complete) stayed within limits, None if none did
+    """
+    sustained = None
+    for step in sorted(steps, key=lambda s: s['concurrency']):
+        within = step['errorRate'] is not None and step['errorRate'] <= max_error_rate
+        if within and ttc_p99_seconds is not None:
+            within = step['ttcSeconds'] is not None and step['ttcSeconds']['p99'] <= ttc_p99_seconds
+        if not within:
+            break
+        sustained = step['concurrency']
+    return sustained
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(latency_seconds: float = 0.0, log_path: Optional[str] = None):
+    """
+    Start one uvicorn worker with the fakes installed in a subprocess
+
+    Returns:
+        (subprocess.Popen, base URL) once /metrics answers
+    """
+    port = _free_port()
+    log_file = open(log_path, 'w') if log_path else subprocess.DEVNULL
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'backend.benchmarks.load', '--serve', '--port', str(port), '--latency', str(latency_seconds)],
+        cwd=Path(__file__).parent.parent.parent,
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + SERVER_START_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Benchmark server exited with code {process.returncode}")
+        try:
+            fetch_metrics(base_url)
+            return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Benchmark server did not start within {SERVER_START_TIMEOUT_SECONDS:.0f}s")
+
+
+def serve(port: int, latency_seconds: float = 0.0):
+    """Run the API in this process against the fakes, with a throwaway result cache"""
+    import uvicorn
+
+    import backend.main as main
+    import backend.services.analysis_cache as analysis_cache
+    from backend.benchmarks.fakes import installed_fakes
+
+    with tempfile.TemporaryDirectory() as cache_dir, installed_fakes(latency_seconds):
+        analysis_cache._cache_instance = analysis_cache.AnalysisResultCache(db_path=str(Path(cache_dir) / 'analysis_cache.sqlite3'))
+        uvicorn.run(main.app, host='127.0.0.1', port=port, log_level='warning')
+
+
+def run_load(
+    concurrency_levels: Sequence[int] = DEFAULT_CONCURRENCY,
+    duration: float = DEFAULT_DURATION_SECONDS,
+    url: Optional[str] = None,
+    workload: Optional[List[Dict[str, Any]]] = None,
+    seed: int = 0,
+    latency_seconds: float = 0.0,
+    timeout: float = DEFAULT_SESSION_TIMEOUT_SECONDS,
+    max_error_rate: float = DEFAULT_MAX_ERROR_RATE,
+    ttc_p99_seconds: Optional[float] = None,
+    server_log: Optional[str] = None,
+    progress=None
+) -> Dict[str, Any]:
+    """
+    Run each concurrency level in turn
+
+    Args:
+        concurrency_levels: Simultaneous sessions per step
+        duration: Seconds per step during which sessions are started
+        url: Running server to target (default: start one with the fakes)
+        workload: Recorded requests to replay in a cycle (default: synthetic_request)
+        seed: Seed for synthetic requests
+        latency_seconds: Simulated latency per fake external request (started server only)
+        timeout: Seconds before a session counts as timed out
+        max_error_rate: Highest error rate a sustained level may have
+        ttc_p99_seconds: Highest p99 time to complete a sustained level may have
+        server_log: File for the started server's output
+        progress: Called with each finished step
+
+    Returns:
+        JSON-serializable results document
+    """
+    from backend.benchmarks.runner import git_revision
+
+    process = None
+    if url is None:
+        process, url = start_server(latency_seconds, server_log)
+    url = url.rstrip('/')
+
+    counter = iter(range(sys.maxsize))
+
+    def next_request():
+        index = next(counter)
+        return workload[index % len(workload)] if workload else synthetic_request(index, seed)
+
+    steps = []
+    try:
+        for concurrency in concurrency_levels:
+            step = asyncio.run(run_step(url, concurrency, duration, next_request, timeout))
+            steps.append(step)
+            if progress is not None:
+                progress(step)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    return {
+        'formatVersion': RESULTS_FORMAT_VERSION,
+        'createdAt': datetime.now(timezone.utc).isoformat(),
+        'git': git_revision(Path(__file__).parent),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(), 'processor': platform.processor()},
+        'config': {
+            'concurrency': list(concurrency_levels),
+            'durationSeconds': duration,
+            'target': 'external' if process is None else 'fakes',
+            'workload': 'recorded' if workload else f'synthetic (seed {seed})',
+            'latencySeconds': latency_seconds,
+            'sessionTimeoutSeconds': timeout,
+            'maxErrorRate': max_error_rate,
+            'ttcP99Seconds': ttc_p99_seconds,
+        },
+        'steps': steps,
+        'sustainedConcurrency': sustained_concurrency(steps, max_error_rate, ttc_p99_seconds),
+    }
+
+
+def _format_seconds(summary: Optional[Dict[str, float]], key: str) -> str:
+    return f"{summary[key]:.2f}s" if summary else '-'
+
+
+def _print_step(step):
+    lag = step['serverLoopLag']
+    print(
+        f"{step['concurrency']:>5} sessions: {step['sessions']} run, {step['errorRate'] or 0:.1%} errors, "
+        f"{step['completedPerSecond']:.2f}/s, TTFP p50 {_format_seconds(step['ttfpSeconds'], 'p50')} "
+        f"p99 {_format_seconds(step['ttfpSeconds'], 'p99')}, TTC p50 {_format_seconds(step['ttcSeconds'], 'p50')} "
+        f"p99 {_format_seconds(step['ttcSeconds'], 'p99')}, loop lag p99 <= {lag['p99Seconds'] or 0:g}s, "
+        f"stalls {sum(lag['stalls'].values())}",
+        file=sys.stderr
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test /api/analyze/ws with concurrent sessions")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=list(DEFAULT_CONCURRENCY), help="Simultaneous sessions per step")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION_SECONDS, help="Seconds per step")
+    parser.add_argument('--url', help="Running server (default: start one with the fakes)")
+    parser.add_argument('--workload', help="Recorded requests to replay, one JSON body per line")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for synthetic requests")
+    parser.add_argument('--latency', type=float, default=0.0, help="Simulated seconds per fake external request")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_SESSION_TIMEOUT_SECONDS, help="Seconds per session")
+    parser.add_argument('--max-error-rate', type=float, default=DEFAULT_MAX_ERROR_RATE)
+    parser.add_argument('--ttc-p99', type=float, help="p99 time-to-complete limit for a sustained level")
+    parser.add_argument('--server-log', help="File for the started server's output")
+    parser.add_argument('--output', default='load_results.json', help="Results file")
+    parser.add_argument('--compare', metavar='BASELINE', help="Earlier results file to compare against")
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.port, args.latency)
+        return
+
+    results = run_load(
+        concurrency_levels=args.concurrency,
+        duration=args.duration,
+        url=args.url,
+        workload=load_workload(args.workload) if args.workload else None,
+        seed=args.seed,
+        latency_seconds=args.latency,
+        timeout=args.timeout,
+        max_error_rate=args.max_error_rate,
+        ttc_p99_seconds=args.ttc_p99,
+        server_log=args.server_log,
+        progress=_print_step,
+    )
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Sustained concurrency: {results['sustainedConcurrency']}", file=sys.stderr)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Sustained concurrency: {baseline['sustainedConcurrency']} -> {results['sustainedConcurrency']}")
+        before = {step['concurrency']: step for step in baseline['steps']}
+        print(f"{'sessions':>8} {'errors':>15} {'TTC p99':>17} {'completed/s':>15}")
+        for step in results['steps']:
+            old = before.get(step['concurrency'])
+            if old is None:
+                continue
+            print(
+                f"{step['concurrency']:>8} {old['errorRate'] or 0:>6.1%} -> {step['errorRate'] or 0:>6.1%} "
+                f"{_format_seconds(old['ttcSeconds'], 'p99'):>7} -> {_format_seconds(step['ttcSeconds'], 'p99'):>7} "
+                f"{old['completedPerSecond']:>6.2f} -> {step['completedPerSecond']:>6.2f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Per-Stage Memory Profile
+Runs the analysis stages on a large synthetic polygon under tracemalloc and
+reports, for each stage, its peak memory, the memory its output retains
+and the allocation sites responsible for both
+
+    python -m backend.benchmarks.memory --area 5000 --granularity 1 --top 10
+
+Run from the repository root. Only allocations made through Python's
+allocators (including NumPy and pandas buffers) are traced, not LightGBM's
+native ones.
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import sys
+import threading
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.benchmarks.fakes import FakeGEESatellite
+from backend.benchmarks.polygons import synthetic_polygon
+from backend.benchmarks.runner import (
+    DATE_END,
+    DATE_START,
+    BenchmarkFeatureExtractor,
+    git_revision,
+    load_risk_model,
+    scored_cells,
+)
+from backend.services.admission import MAX_AREA_KM2
+from backend.services.grid_encoding import build_geojson, build_risk_grid
+from backend.utils.serialization import dumps
+
+
+STAGES = ('grid', 'feature_dicts', 'predict_batch', 'geojson', 'json_encoding')
+
+DEFAULT_AREA_KM2 = MAX_AREA_KM2
+DEFAULT_GRANULARITY_KM = 1
+DEFAULT_TOP = 10
+DEFAULT_FRAMES = 1
+
+# The peak snapshot is taken once traced memory is within this share of the known peak
+PEAK_CAPTURE_FRACTION = 0.9
+PEAK_POLL_SECONDS = 0.001
+
+# Allocations made in these files, or by the peak watcher thread, are not a stage's
+_IGNORED_FILES = {__file__, '<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>', '<unknown>'}
+_WATCHER_FILES = {tracemalloc.__file__, threading.__file__}
+
+
+def _top_sites(after: tracemalloc.Snapshot, before: tracemalloc.Snapshot, top: int, frames: int) -> List[Dict[str, Any]]:
+    """Allocation sites that grew the most between two snapshots"""
+    group_by = 'traceback' if frames > 1 else 'lineno'
+    sites = []
+    for diff in after.compare_to(before, group_by):  # Largest growth first
+        if len(sites) == top or diff.size_diff <= 0:
+            break
+        frames_seen = {frame.filename for frame in diff.traceback}
+        if diff.traceback[-1].filename in _IGNORED_FILES or frames_seen & _WATCHER_FILES:
+            continue
+        sites.append({
+            'site': [f"{frame.filename}:{frame.lineno}" for frame in diff.traceback],
+            'sizeBytes': diff.size_diff,
+            'blocks': diff.count_diff,
+        })
+    return sites
+
+
+def _run_capturing_peak(fn: Callable[[], Any], threshold: int) -> Tuple[Any, Optional[tracemalloc.Snapshot], int]:
+    """
+    Run fn while a watcher thread snapshots traced memory once it crosses
+    threshold (again whenever it climbs higher)
+
+    Returns:
+        (fn's result, snapshot closest to the peak or None, traced bytes at that snapshot)
+    """
+    done = threading.Event()
+    captured = {'snapshot': None, 'bytes': 0}
+
+    def watch():
+        while not done.is_set():
+            current, _ = tracemalloc.get_traced_memory()
+            if current >= threshold and current > captured['bytes']:
+                captured['snapshot'] = tracemalloc.take_snapshot()
+                captured['bytes'] = current
+            done.wait(PEAK_POLL_SECONDS)
+
+    watcher = threading.Thread(target=watch, name='memory-peak-watcher', daemon=True)
+    watcher.start()
+    try:
+        result = fn()
+    finally:
+        done.set()
+        watcher.join()
+    return result, captured['snapshot'], captured['bytes']
+
+
+def profile_stage(fn: Callable[[], Any], top: int = DEFAULT_TOP, frames: int = DEFAULT_FRAMES, peak_sites: bool = True) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Peak and retained memory of one stage (tracemalloc must be tracing)
+
+    The stage runs once to measure its peak above the memory already in use
+    and what its result still holds afterwards. With peak_sites, it runs
+    again while a watcher thread snapshots memory near that peak, which
+    attributes short-lived allocations (such as intermediate DataFrames)
+    that are freed before the stage returns. peakCapturedBytes shows how
+    close the snapshot came (None if the peak was too brief to catch).
+
+    Returns:
+        (stage result, {'peakBytes', 'retainedBytes', 'topRetained', 'topAtPeak', 'peakCapturedBytes'})
+    """
+    gc.collect()
+    before = tracemalloc.take_snapshot()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+
+    result = fn()
+    current, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    profile = {
+        'peakBytes': peak - baseline,
+        'retainedBytes': current - baseline,
+        'topRetained': _top_sites(after, before, top, frames),
+    }
+    del after
+
+    if peak_sites:
+        del result
+        gc.collect()
+        threshold = baseline + int(PEAK_CAPTURE_FRACTION * (peak - baseline))
+        result, at_peak, captured = _run_capturing_peak(fn, threshold)
+        profile['peakCapturedBytes'] = captured - baseline if at_peak else None
+        profile['topAtPeak'] = _top_sites(at_peak, before, top, frames) if at_peak else []
+
+    return result, profile
+
+
+def profile_memory(
+    area_km2: float = DEFAULT_AREA_KM2,
+    granularity_km: float = DEFAULT_GRANULARITY_KM,
+    top: int = DEFAULT_TOP,
+    frames: int = DEFAULT_FRAMES,
+    peak_sites: bool = True,
+    model_path: Optional[str] = None,
+    verbose: bool = False
+) -> Dict[str, Any]:
+    """
+    Profile each stage in pipeline order; every stage's output stays alive
+    while the later stages run, as it does in the pipeline
+
+    Args:
+        area_km2: Polygon area
+        granularity_km: Grid cell size
+        top: Allocation sites reported per stage
+        frames: Traceback depth per allocation site
+        peak_sites: Also report the allocation sites at each stage's peak
+        model_path: Trained risk model (default: the repo's; stand-in if untrained)
+        verbose: Show the stages' own log output
+
+    Returns:
+        JSON-serializable results document
+    """
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        risk_model, model_source = load_risk_model(model_path)
+        polygon = synthetic_polygon(area_km2)
+        gee = FakeGEESatellite()
+        extractor = BenchmarkFeatureExtractor()
+        spec = gee.grid_spec(polygon, granularity_km)
+
+        stages = {}
+        tracemalloc.start(frames)
+        try:
+            def run(name, fn):
+                result, stages[name] = profile_stage(fn, top, frames, peak_sites)
+                return result
+
+            cells = run('grid', lambda: gee.create_grid_cells(polygon, granularity_km))
+            engineered = run('feature_dicts', lambda: extractor.extract_features_for_cells(
+                gee.extract_features_for_cells(cells, DATE_START, DATE_END), polygon, DATE_START, DATE_END
+            ))
+            predictions = run('predict_batch', lambda: risk_model.predict_batch(engineered))
+            scored = scored_cells(predictions)
+
+            def geojson():
+                grid = build_risk_grid(spec, scored)
+                return grid, build_geojson(grid)
+            grid, feature_collection = run('geojson', geojson)
+            payload = run('json_encoding', lambda: dumps({'geoJSON': feature_collection, 'grid': grid}))
+            total_peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'git': git_revision(Path(__file__).parent),
+        'config': {
+            'areaKm2': area_km2,
+            'granularityKm': granularity_km,
+            'frames': frames,
+            'riskModel': model_source,
+        },
+        'cells': len(cells),
+        'jsonBytes': len(payload),
+        'stages': stages,
+        'tracedPeakBytes': total_peak,
+    }
+
+
+def _mib(size: Optional[int]) -> str:
+    return f"{size / 2 ** 20:8.1f} MiB" if size is not None else '        -'
+
+
+def _print_report(results: Dict[str, Any]):
+    print(f"{results['config']['areaKm2']:g} km² @ {results['config']['granularityKm']:g} km: {results['cells']} cells, {results['jsonBytes'] / 2 ** 20:.1f} MiB JSON")
+    print(f"{'stage':<15} {'peak':>12} {'retained':>12}")
+    for name, stage in results['stages'].items():
+        print(f"{name:<15} {_mib(stage['peakBytes'])} {_mib(stage['retainedBytes'])}")
+    for name, stage in results['stages'].items():
+        for title, key in (('retained', 'topRetained'), ('at peak', 'topAtPeak')):
+            if not stage.get(key):
+                continue
+            print(f"\n{name}: top allocation sites {title}")
+            for site in stage[key]:
+                print(f"  {_mib(site['sizeBytes'])} {site['blocks']:>9} blocks  {site['site'][-1]}")
+                for frame in reversed(site['site'][:-1]):
+                    print(f"  {'':>29}  {frame}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile memory per analysis stage with tracemalloc")
+    parser.add_argument('--area', type=float, default=DEFAULT_AREA_KM2, help="Polygon area in km²")
+    parser.add_argument('--granularity', type=float, default=DEFAULT_GRANULARITY_KM, help="Grid cell size in km")
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help="Allocation sites per stage")
+    parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES, help="Traceback depth per allocation site")
+    parser.add_argument('--no-peak-sites', action='store_true', help="Skip the second run that attributes each stage's peak")
+    parser.add_argument('--model', help="Trained risk model (default: the repo's, or a stand-in)")
+    parser.add_argument('--output', help="Also write the results as JSON")
+    parser.add_argument('--verbose', action='store_true', help="Show the stages' log output")
+    args = parser.parse_args(argv)
+
+    results = profile_memory(
+        area_km2=args.area,
+        granularity_km=args.granularity,
+        top=args.top,
+        frames=args.frames,
+        peak_sites=not args.no_peak_sites,
+        model_path=args.model,
+        verbose=args.verbose,
+    )
+    _print_report(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Synthetic Benchmark Polygons
+Deterministic star-shaped field polygons of a given area around a center
+point in Kenya, so every run and commit measures the same geometry
+"""
+
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from backend.benchmarks.fakes import polygon_area_km2
+
+
+DEFAULT_CENTER = (-0.45, 36.95)  # Nyandarua/Nyeri farmland
+DEFAULT_VERTICES = 12
+DEFAULT_IRREGULARITY = 0.3
+
+KM_PER_DEGREE_LAT = 110.574
+KM_PER_DEGREE_LNG_AT_EQUATOR = 111.320
+
+
+def synthetic_polygon(
+    area_km2: float,
+    center: Tuple[float, float] = DEFAULT_CENTER,
+    vertices: int = DEFAULT_VERTICES,
+    irregularity: float = DEFAULT_IRREGULARITY,
+    seed: int = 0
+) -> List[Dict[str, float]]:
+    """
+    Star-shaped polygon with the given area
+
+    Args:
+        area_km2: Target area (matched to within 0.1%)
+        center: (lat, lng) the polygon is built around
+        vertices: Number of vertices
+        irregularity: Relative radius jitter per vertex (0: regular polygon)
+        seed: Seed for the jitter
+
+    Returns:
+        Open ring of {lat, lng} points, as drawn by the frontend
+    """
+    if area_km2 <= 0:
+        raise ValueError("area_km2 must be positive")
+    if vertices < 3:
+        raise ValueError("A polygon needs at least 3 vertices")
+
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * math.pi, vertices, endpoint=False)
+    radii = 1 + irregularity * rng.uniform(-1, 1, vertices)
+    lat0, lng0 = center
+    km_per_degree_lng = KM_PER_DEGREE_LNG_AT_EQUATOR * math.cos(math.radians(lat0))
+
+    def ring(scale: float) -> List[Dict[str, float]]:
+        return [
+            {'lat': lat0 + scale * r * math.sin(a) / KM_PER_DEGREE_LAT, 'lng': lng0 + scale * r * math.cos(a) / km_per_degree_lng}
+            for a, r in zip(angles, radii)
+        ]
+
+    scale = 1.0
+    for _ in range(3):  # area grows with scale², the projection is nearly exact
+        scale *= math.sqrt(area_km2 / polygon_area_km2(ring(scale)))
+    return ring(scale)
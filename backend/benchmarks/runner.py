@@ -0,0 +1,399 @@
+"""
+Benchmark Runner
+Times each analysis stage (and the whole pipeline against the fakes) for
+synthetic polygons at several grid granularities, measures each stage's
+peak traced memory, and writes the results as JSON for comparison across
+commits
+"""
+
+import asyncio
+import contextlib
+import gc
+import gzip
+import io
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+
+from backend.benchmarks.fakes import FakeGEESatellite, installed_fakes
+from backend.benchmarks.polygons import DEFAULT_CENTER, synthetic_polygon
+from backend.data.spatial_field_generator import SpatialFieldGenerator
+from backend.main import AnalysisRequest, InsuranceContextRequest, analyze_insurance_risk, run_analysis_pipeline
+from backend.models.insurance_model import get_insurance_model
+from backend.models.risk_model import RiskPredictionModel
+from backend.services.feature_engineering import AGRICULTURAL_FEATURES, FeatureTransform
+from backend.services.feature_extractor import FeatureExtractor
+from backend.services.grid_encoding import build_geojson, build_risk_grid, encode_grid
+from backend.services.insurance_trainer import InsuranceModelTrainer
+from backend.services.pdf_service import PDFService
+from backend.services.raster_tiles import render_grid_image
+from backend.utils.serialization import GZIP_COMPRESS_LEVEL, dumps
+
+
+RESULTS_FORMAT_VERSION = 1
+
+DEFAULT_AREAS_KM2 = (1, 10, 100, 1000, 5000)
+DEFAULT_GRANULARITIES_KM = (1, 2, 5)
+DEFAULT_REPEAT = 3
+WARM_UP_AREA_KM2 = 10
+
+STAGES = (
+    'grid',
+    'gee_extraction',
+    'feature_engineering',
+    'predict_batch',
+    'geojson',
+    'serialization',
+    'insurance',
+    'pdf',
+    'pipeline',
+)
+
+DATE_START = '2024-01-01'
+DATE_END = '2024-03-31'
+
+# Features of the stand-in risk model (the agricultural training data's columns)
+STAND_IN_FEATURES = [
+    'ndvi', 'soil_moisture', 'dist_to_water', 'pest_reports_5km', 'days_since_last_report',
+    'humidity', 'temperature', 'elevation', 'slope', 'crop_type_encoded', 'pest_pressure_encoded',
+    'crop_stage_encoded', 'fungal_risk_index', 'water_stress_index', 'pest_habitat_suitability',
+    'crop_health_score', 'pest_pressure_history',
+]
+STAND_IN_TREES = 200
+
+
+def measure(fn: Callable[[], Any], repeat: int = DEFAULT_REPEAT) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Time fn and measure its peak memory
+
+    One traced run (tracemalloc peak, also the warm-up) is followed by
+    `repeat` untraced timed runs.
+
+    Returns:
+        (result of the last run, {'seconds': {min, median, mean, max}, 'peakMemoryBytes'})
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+
+    return result, {
+        'seconds': {
+            'min': min(timings),
+            'median': statistics.median(timings),
+            'mean': statistics.fmean(timings),
+            'max': max(timings),
+        } if timings else None,
+        'peakMemoryBytes': peak,
+    }
+
+
+def stand_in_risk_model():
+    """
+    RiskPredictionModel backed by a LightGBM model trained on seeded random
+    data, for trees without backend/models/trained/risk_model_v1.pkl
+    """
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 1, (5000, len(STAND_IN_FEATURES)))
+    y = 100 * (0.5 * X[:, 0] + 0.3 * X[:, 5] * X[:, 6] + 0.2 * rng.uniform(0, 1, len(X)))
+    booster = lgb.train(
+        {'objective': 'regression', 'num_leaves': 31, 'learning_rate': 0.05, 'seed': 0, 'verbose': -1},
+        lgb.Dataset(X, label=y, feature_name=STAND_IN_FEATURES),
+        num_boost_round=STAND_IN_TREES,
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'risk_model_v1.pkl'
+        joblib.dump({
+            'model': booster,
+            'feature_names': STAND_IN_FEATURES,
+            'label_encoders': {},
+            'feature_transform': FeatureTransform(AGRICULTURAL_FEATURES).to_dict(),
+        }, path)
+        return RiskPredictionModel(str(path))
+
+
+def load_risk_model(model_path: Optional[str] = None):
+    """
+    The trained risk model, or the stand-in if none has been trained
+
+    Returns:
+        (RiskPredictionModel, 'trained' or 'stand-in')
+    """
+    try:
+        return RiskPredictionModel(model_path), 'trained'
+    except FileNotFoundError:
+        return stand_in_risk_model(), 'stand-in'
+
+
+def load_insurance_model():
+    """Insurance model singleton, trained in memory if no saved model exists"""
+    model = get_insurance_model()
+    if not model.is_loaded and not model.load():
+        trainer = InsuranceModelTrainer()
+        trainer.train()
+        model.model = trainer.model
+        model.is_loaded = True
+    return model
+
+
+def scored_cells(predictions: List[Dict]) -> List[Dict]:
+    """Model predictions in the shape the pipeline passes to build_risk_grid"""
+    cells = []
+    for prediction in predictions:
+        score = prediction['risk_score']
+        cells.append({
+            **prediction,
+            'risk_level': 'High' if score > 75 else 'Medium' if score > 50 else 'Low',
+            'risk_factors': [factor['factor'] for factor in prediction['risk_factors']],
+        })
+    return cells
+
+
+class BenchmarkFeatureExtractor(FeatureExtractor):
+    """
+    FeatureExtractor whose Earth Engine stages (NDVI, terrain) use the fake
+    GEE's NDVI and the elevation and slope of the same synthetic fields, so
+    the local feature engineering runs unchanged
+    """
+
+    def __init__(self, field_seed: int = 42):
+        super().__init__()
+        self.fields = SpatialFieldGenerator(seed=field_seed)
+
+    def _extract_satellite_features(self, cells, date_start, date_end, cancel_token=None):
+        results = []
+        for cell in cells:
+            ndvi = cell.get('features', {}).get('ndvi', 0.5)
+            veg_type = 'sparse' if ndvi < 0.2 else 'scrub' if ndvi < 0.4 else 'grassland' if ndvi < 0.6 else 'forest'
+            results.append({**cell, 'features': {
+                'ndvi': ndvi,
+                'vegetation_type': veg_type,
+                'vegetation_type_encoded': ['sparse', 'scrub', 'grassland', 'forest'].index(veg_type),
+            }})
+        return results
+
+    def _extract_topographical_features(self, cells, cancel_token=None):
+        for cell, values in zip(cells, self.fields.sample_cells(cells)):
+            cell['features'].update({
+                'elevation': round(values['elevation'], 1),
+                'slope': round(values['slope'], 1),
+                'terrain_ruggedness': round(self._calculate_ruggedness(values['slope']), 1),
+            })
+        return cells
+
+
+def run_case(
+    area_km2: float,
+    granularity_km: float,
+    risk_model,
+    stages: Sequence[str] = STAGES,
+    repeat: int = DEFAULT_REPEAT,
+    latency_seconds: float = 0.0
+) -> Dict[str, Any]:
+    """
+    Benchmark every stage for one polygon size and grid granularity
+    Each stage consumes the previous stage's output, as in the pipeline.
+
+    Returns:
+        {'areaKm2', 'granularityKm', 'cells', 'stages': {name: measurement}}
+    """
+    polygon = synthetic_polygon(area_km2)
+    gee = FakeGEESatellite(latency_seconds)
+    extractor = BenchmarkFeatureExtractor()
+    spec = gee.grid_spec(polygon, granularity_km)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def run(name, fn, describe=None):
+        """Measure a stage; describe(result) adds stage-specific fields such as output sizes"""
+        if name not in stages:
+            return fn()  # still needed as input to later stages
+        value, measurement = measure(fn, repeat)
+        results[name] = {**measurement, **(describe(value) if describe else {})}
+        return value
+
+    cells = run('grid', lambda: gee.create_grid_cells(polygon, granularity_km))
+    if not cells:
+        return {'areaKm2': area_km2, 'granularityKm': granularity_km, 'cells': 0, 'stages': {}}
+
+    sampled = run('gee_extraction', lambda: gee.extract_features_for_cells(cells, DATE_START, DATE_END))
+    engineered = run('feature_engineering', lambda: extractor.extract_features_for_cells(
+        [{**cell, 'features': dict(cell['features'])} for cell in sampled], polygon, DATE_START, DATE_END
+    ))
+
+    predictions, _ = run(
+        'predict_batch',
+        lambda: risk_model.predict_batch_with_metadata(engineered),
+        lambda value: {'model': {k: value[1][k] for k in ('prepare_features_seconds', 'predict_seconds', 'explain_seconds')}},
+    )
+    scored = scored_cells(predictions)
+
+    def geojson():
+        grid = build_risk_grid(spec, scored)
+        return grid, build_geojson(grid)
+    grid, feature_collection = run('geojson', geojson)
+
+    def serialize():
+        payload = dumps({'geoJSON': feature_collection, 'grid': grid})
+        compressed = gzip.compress(payload, GZIP_COMPRESS_LEVEL)
+        binary = encode_grid(grid)
+        return {'jsonBytes': len(payload), 'gzipBytes': len(compressed), 'binaryGridBytes': len(binary)}
+    run('serialization', serialize, lambda sizes: sizes)
+
+    average_risk = float(np.mean([cell['risk_score'] for cell in scored]))
+    center_lat, center_lng = DEFAULT_CENTER
+    insurance_request = InsuranceContextRequest(agri_risk_score=round(average_risk, 1), lat=center_lat, lon=center_lng)
+    quote = run('insurance', lambda: asyncio.run(analyze_insurance_risk(insurance_request)))
+
+    def pdf():
+        return PDFService().generate_insurance_report({
+            'farmName': 'Benchmark Farm', 'lat': center_lat, 'lon': center_lng, 'areaKm2': area_km2,
+            'cropType': 'Maize', 'polygon': polygon, 'risk_map_png': render_grid_image(grid), **quote,
+        })
+    run('pdf', pdf, lambda report: {'pdfBytes': len(report.getvalue())})
+
+    if 'pipeline' in stages:
+        if float(granularity_km).is_integer():
+            request = AnalysisRequest(**{
+                'location': {'type': 'custom', 'polygon': polygon},
+                'parameters': {'dateRange': {'start': DATE_START, 'end': DATE_END}, 'cropType': 'Maize', 'riskFactors': ['Drought', 'Pests']},
+                # A (generous) latency budget skips the UI pacing pauses
+                'advanced': {'gridGranularity': int(granularity_km), 'latencyBudgetSeconds': 86400},
+            })
+
+            async def emit(event):
+                pass
+
+            with installed_fakes(latency_seconds):
+                run('pipeline', lambda: asyncio.run(run_analysis_pipeline(request, emit)))
+        else:
+            results['pipeline'] = {'skipped': 'the API only accepts whole-kilometre granularities'}
+
+    return {'areaKm2': area_km2, 'granularityKm': granularity_km, 'cells': len(cells), 'stages': results}
+
+
+def git_revision(repo: Path) -> Dict[str, Any]:
+    """Commit and dirty state of the working tree (None outside a git checkout)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=repo, capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repo, capture_output=True, text=True, check=True).stdout
+        return {'commit': commit, 'dirty': bool(status.strip())}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+
+def run_benchmarks(
+    areas_km2: Sequence[float] = DEFAULT_AREAS_KM2,
+    granularities_km: Sequence[float] = DEFAULT_GRANULARITIES_KM,
+    stages: Sequence[str] = STAGES,
+    repeat: int = DEFAULT_REPEAT,
+    latency_seconds: float = 0.0,
+    model_path: Optional[str] = None,
+    verbose: bool = False,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Run every (area, granularity) case
+
+    Args:
+        areas_km2: Polygon areas
+        granularities_km: Grid cell sizes
+        stages: Stages to measure (others still run, untimed, to feed later stages)
+        repeat: Timed runs per stage
+        latency_seconds: Simulated latency per fake external request
+        model_path: Trained risk model (default: the repo's; stand-in if untrained)
+        verbose: Show the stages' own log output
+        progress: Called with each finished case
+
+    Returns:
+        JSON-serializable results document
+    """
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {sorted(unknown)}")
+
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        risk_model, model_source = load_risk_model(model_path)
+        if 'insurance' in stages or 'pdf' in stages:
+            load_insurance_model()
+        # Untimed warm-up, so one-off imports and font/cache loading are not
+        # attributed to the first case
+        run_case(WARM_UP_AREA_KM2, 1, risk_model, stages=(), repeat=0, latency_seconds=0.0)
+
+    cases = []
+    for area_km2 in areas_km2:
+        for granularity_km in granularities_km:
+            sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+            with sink:
+                case = run_case(area_km2, granularity_km, risk_model, stages, repeat, latency_seconds)
+            cases.append(case)
+            if progress is not None:
+                progress(case)
+
+    return {
+        'formatVersion': RESULTS_FORMAT_VERSION,
+        'createdAt': datetime.now(timezone.utc).isoformat(),
+        'git': git_revision(Path(__file__).parent),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(), 'processor': platform.processor()},
+        'config': {
+            'areasKm2': list(areas_km2),
+            'granularitiesKm': list(granularities_km),
+            'stages': list(stages),
+            'repeat': repeat,
+            'latencySeconds': latency_seconds,
+            'riskModel': model_source,
+        },
+        'cases': cases,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Median time and peak memory of each stage relative to a baseline run
+
+    Returns:
+        One row per (area, granularity, stage) present in both, with the
+        ratios current / baseline (below 1: faster / smaller)
+    """
+    def index(results):
+        return {
+            (case['areaKm2'], case['granularityKm'], stage): measurement
+            for case in results['cases']
+            for stage, measurement in case['stages'].items()
+            if measurement.get('seconds')
+        }
+
+    before, after = index(baseline), index(current)
+    rows = []
+    for key in sorted(set(before) & set(after), key=lambda k: (k[0], k[1], STAGES.index(k[2]) if k[2] in STAGES else len(STAGES))):
+        old, new = before[key], after[key]
+        rows.append({
+            'areaKm2': key[0],
+            'granularityKm': key[1],
+            'stage': key[2],
+            'baselineSeconds': old['seconds']['median'],
+            'seconds': new['seconds']['median'],
+            'timeRatio': new['seconds']['median'] / old['seconds']['median'] if old['seconds']['median'] else None,
+            'memoryRatio': new['peakMemoryBytes'] / old['peakMemoryBytes'] if old['peakMemoryBytes'] else None,
+        })
+    return rows
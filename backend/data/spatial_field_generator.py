@@ -0,0 +1,179 @@
+"""
+Spatially Correlated Synthetic Field Generator
+Generates rasters of NDVI, soil moisture, elevation, slope, humidity and
+temperature over a grid_spec() grid, with the spatial autocorrelation real
+imagery has (neighbouring cells look alike), for realistic grid benchmarks
+
+Each layer starts from one or more Gaussian random fields: white noise
+filtered in the frequency domain (FFT) so its covariance falls off as
+exp(-d² / 2ℓ²) with the layer's correlation length ℓ in km. The layers are
+then coupled (wetter soil is greener, higher ground is cooler) and scaled to
+the same ranges as the agricultural training data. Fields are deterministic
+for a seed and grid origin and work at any grid size.
+"""
+
+import math
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+KM_PER_DEGREE = 111.0  # As in GEESatellite.grid_spec
+
+LAYERS = ('ndvi', 'soil_moisture', 'elevation', 'slope', 'humidity', 'temperature')
+
+# Correlation length (km) of each underlying random field
+DEFAULT_CORRELATION_KM = {
+    'ndvi': 3.0,
+    'soil_moisture': 5.0,
+    'elevation': 15.0,
+    'relief': 1.5,  # Small-scale terrain added to elevation, gives slopes their variety
+    'humidity': 25.0,
+    'temperature': 25.0,
+}
+
+LAPSE_RATE_C_PER_M = -0.0065
+
+# Padding past the grid, in correlation lengths, so the FFT's periodic
+# boundary doesn't correlate opposite edges
+_WRAP_PADDING = 3
+
+
+def gaussian_random_field(shape: Tuple[int, int], correlation_cells: float, rng: np.random.Generator) -> np.ndarray:
+    """
+    Standardized (mean 0, std 1) Gaussian random field
+
+    Args:
+        shape: (rows, cols) of the field
+        correlation_cells: Correlation length in cells (0: white noise)
+        rng: Source of the white noise
+
+    Returns:
+        Array of the given shape
+    """
+    rows, cols = shape
+    if rows == 0 or cols == 0:
+        return np.zeros(shape)
+    pad = int(math.ceil(_WRAP_PADDING * correlation_cells))
+    noise = rng.standard_normal((rows + pad, cols + pad))
+    if correlation_cells > 0:
+        # A Gaussian kernel with sigma ℓ/√2 turns white noise into a field
+        # with covariance exp(-d² / 2ℓ²); its transfer function is exp(-π²ℓ²k²)
+        ky = np.fft.fftfreq(noise.shape[0])[:, None]
+        kx = np.fft.rfftfreq(noise.shape[1])[None, :]
+        transfer = np.exp(-(math.pi * correlation_cells) ** 2 * (kx ** 2 + ky ** 2))
+        noise = np.fft.irfft2(np.fft.rfft2(noise) * transfer, s=noise.shape)
+    field = noise[:rows, :cols]
+    std = field.std()
+    return (field - field.mean()) / std if std > 0 else field - field.mean()
+
+
+def spec_from_cells(cells: List[Dict]) -> Dict:
+    """
+    Recover the grid_spec() of cells from GEESatellite.create_grid_cells
+    (only its shape is limited to the rows and columns present)
+    """
+    if not cells:
+        return {'origin': {'lat': 0.0, 'lng': 0.0}, 'step': {'lat': 0.0, 'lng': 0.0}, 'shape': [0, 0]}
+    cell = cells[0]
+    south_west, north_east = cell['bounds']['southWest'], cell['bounds']['northEast']
+    lat_step = north_east['lat'] - south_west['lat']
+    lng_step = north_east['lng'] - south_west['lng']
+    return {
+        'origin': {'lat': south_west['lat'] - cell['row'] * lat_step, 'lng': south_west['lng'] - cell['col'] * lng_step},
+        'step': {'lat': lat_step, 'lng': lng_step},
+        'shape': [max(c['row'] for c in cells) + 1, max(c['col'] for c in cells) + 1],
+    }
+
+
+class SpatialFieldGenerator:
+    """Generate spatially autocorrelated environmental rasters for a grid"""
+
+    def __init__(self, seed: int = 42, correlation_km: Optional[Dict[str, float]] = None):
+        """
+        Initialize generator
+
+        Args:
+            seed: Random seed for reproducibility
+            correlation_km: Overrides of DEFAULT_CORRELATION_KM per field
+        """
+        self.seed = seed
+        self.correlation_km = {**DEFAULT_CORRELATION_KM, **(correlation_km or {})}
+
+    def _rng(self, spec: Dict, field: str) -> np.random.Generator:
+        """Random generator for one field of the grid anchored at spec's origin"""
+        origin = f"{spec['origin']['lat']:.4f},{spec['origin']['lng']:.4f}"
+        key = (zlib.crc32(origin.encode()), list(DEFAULT_CORRELATION_KM).index(field))
+        return np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=key))
+
+    def _field(self, spec: Dict, field: str, cell_km: float) -> np.ndarray:
+        correlation_cells = self.correlation_km[field] / cell_km if cell_km > 0 else 0.0
+        return gaussian_random_field(tuple(spec['shape']), correlation_cells, self._rng(spec, field))
+
+    def generate(self, spec: Dict) -> Dict[str, np.ndarray]:
+        """
+        Rasters for every cell of a grid
+
+        Args:
+            spec: Grid from GEESatellite.grid_spec() (or spec_from_cells())
+
+        Returns:
+            Dictionary of LAYERS name -> (rows, cols) array, row 0 to the south
+        """
+        cell_km = spec['step']['lat'] * KM_PER_DEGREE
+        latitude = spec['origin']['lat'] + (np.arange(spec['shape'][0]) + 0.5)[:, None] * spec['step']['lat']
+
+        soil_moisture = np.clip(0.5 + 0.15 * self._field(spec, 'soil_moisture', cell_km), 0.0, 1.0)
+
+        # Vegetation follows the water available to it, plus its own patchiness
+        greenness = 0.6 * self._field(spec, 'ndvi', cell_km) + 0.8 * (soil_moisture - 0.5) / 0.15
+        ndvi = np.clip(0.6 + 0.1 * greenness, 0.1, 0.9)
+
+        # Highlands rise away from the equator, as in the training data
+        elevation = (
+            1000 + 400 * np.abs(latitude)
+            + 300 * self._field(spec, 'elevation', cell_km)
+            + 100 * self._field(spec, 'relief', cell_km)
+        )
+        elevation = np.clip(elevation, 500, 3000)
+        if min(elevation.shape) > 1:
+            cell_m = cell_km * 1000
+            d_north, d_east = np.gradient(elevation, cell_m)
+            slope = np.clip(np.degrees(np.arctan(np.hypot(d_north, d_east))), 0, 45)
+        else:
+            slope = np.zeros_like(elevation)
+
+        humidity = np.clip(65 + 10 * self._field(spec, 'humidity', cell_km) + 20 * (soil_moisture - 0.5), 20, 100)
+        temperature = np.clip(
+            28 + LAPSE_RATE_C_PER_M * elevation + 2 * self._field(spec, 'temperature', cell_km), 10, 40
+        )
+
+        return {
+            'ndvi': ndvi,
+            'soil_moisture': soil_moisture,
+            'elevation': elevation,
+            'slope': slope,
+            'humidity': humidity,
+            'temperature': temperature,
+        }
+
+    def sample_cells(self, cells: List[Dict], rasters: Optional[Dict[str, np.ndarray]] = None) -> List[Dict[str, float]]:
+        """
+        Values of every layer at each cell
+
+        Args:
+            cells: Grid cells from GEESatellite.create_grid_cells
+            rasters: Output of generate() for the cells' grid (default: generated)
+
+        Returns:
+            One {layer: value} dictionary per cell, in order
+        """
+        if not cells:
+            return []
+        if rasters is None:
+            rasters = self.generate(spec_from_cells(cells))
+        rows = np.fromiter((c['row'] for c in cells), dtype=np.intp, count=len(cells))
+        cols = np.fromiter((c['col'] for c in cells), dtype=np.intp, count=len(cells))
+        values = {name: raster[rows, cols].tolist() for name, raster in rasters.items()}
+        return [dict(zip(values, cell_values)) for cell_values in zip(*values.values())]
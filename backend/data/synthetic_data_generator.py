@@ -1,31 +1,80 @@
 """
 Synthetic Training Data Generator for Agricultural Risk Model
 Generates realistic 10k row CSV dataset with correlated agricultural features
+
+Generation is vectorized with np.random.Generator. Large datasets (tens of
+millions of rows) are written as partitioned files: each chunk has its own
+seed derived from (seed, chunk index), so chunks can be built in any order
+and in parallel processes with identical results.
 """
 
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
 import numpy as np
 import pandas as pd
-from datetime import datetime
-import random
-from pathlib import Path
+
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+MANIFEST_FILENAME = 'manifest.json'
+PARTITION_FORMATS = ('csv', 'csv.gz', 'parquet')
+
+# Share of rows per risk band, and each band's score range
+RISK_BANDS = (
+    (0.15, (80, 100)),  # critical
+    (0.25, (60, 80)),   # high
+    (0.30, (40, 60)),   # medium
+    (0.30, (0, 40)),    # low (remainder)
+)
+
+CROP_TYPES = ('Maize', 'Wheat', 'Coffee', 'Tea', 'Vegetables')
+PEST_PRESSURE_LEVELS = ('High', 'Medium', 'Low')
+CROP_STAGES = ('Vegetative', 'Flowering', 'Fruiting', 'Harvesting')
+
+# Pest pressure weights for risk > 70, 40 < risk <= 70 and risk <= 40
+PEST_PRESSURE_WEIGHTS = np.array([[0.7, 0.2, 0.1], [0.2, 0.5, 0.3], [0.1, 0.2, 0.7]])
+# Crop stage weights for risk > 60 (sensitive stages) and risk <= 60 (uniform)
+CROP_STAGE_WEIGHTS = np.array([[0.1, 0.4, 0.4, 0.1], [0.25, 0.25, 0.25, 0.25]])
+
+CONTINUOUS_FEATURES = ['ndvi', 'soil_moisture', 'dist_to_water', 'humidity', 'temperature', 'elevation', 'slope']
+MISSING_FEATURES = ['ndvi', 'soil_moisture', 'humidity']
+MISSING_RATE = 0.025
+
+
+def _choose(rng: np.random.Generator, weights: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """
+    Draw one category index per row, using the weight row selected by `rows`
+    (inverse-CDF sampling, so every row can have its own distribution)
+    """
+    cumulative = np.cumsum(weights, axis=1)
+    cumulative[:, -1] = 1.0
+    draws = rng.random(len(rows))
+    return (draws[:, None] >= cumulative[rows]).sum(axis=1)
 
 
 class AgriculturalDataGenerator:
     """Generate realistic training data for agricultural pest/disease risk prediction"""
-    
-    def __init__(self, n_samples: int = 10000, seed: int = 42):
+
+    def __init__(self, n_samples: int = 10000, seed: int = 42, chunk_size: int = DEFAULT_CHUNK_SIZE):
         """
         Initialize generator
-        
+
         Args:
             n_samples: Number of training samples to generate
             seed: Random seed for reproducibility
+            chunk_size: Rows per chunk (and per partition file)
         """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
         self.n_samples = n_samples
         self.seed = seed
-        np.random.seed(seed)
-        random.seed(seed)
-        
+        self.chunk_size = chunk_size
+
         # Define Kenyan Agricultural Regions (approximate boundaries)
         self.regions = {
             'Rift Valley': {'lat_range': (0.0, 1.0), 'lng_range': (35.0, 36.0)},
@@ -34,275 +83,269 @@ class AgriculturalDataGenerator:
             'Western': {'lat_range': (0.0, 1.0), 'lng_range': (34.0, 35.0)},
             'Coast': {'lat_range': (-4.0, -3.0), 'lng_range': (39.0, 40.0)}
         }
-    
+
+    @property
+    def n_chunks(self) -> int:
+        return -(-self.n_samples // self.chunk_size)
+
+    def chunk_rng(self, chunk_index: int) -> np.random.Generator:
+        """Independent random stream of one chunk, derived from (seed, chunk index)"""
+        return np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(chunk_index,)))
+
+    def chunk_bounds(self, chunk_index: int) -> Tuple[int, int]:
+        """First row and row count of a chunk"""
+        if not 0 <= chunk_index < self.n_chunks:
+            raise IndexError(f"Chunk {chunk_index} out of range (0-{self.n_chunks - 1})")
+        start = chunk_index * self.chunk_size
+        return start, min(self.chunk_size, self.n_samples - start)
+
     def generate(self) -> pd.DataFrame:
         """
-        Generate complete training dataset
-        
+        Generate complete training dataset in memory
+        The rows equal the concatenated chunks of generate_chunk.
+
         Returns:
             DataFrame with all features and target variable
         """
         print(f"Generating {self.n_samples} synthetic agricultural training samples...")
-        
+
+        df = pd.concat([self.generate_chunk(i) for i in range(self.n_chunks)], ignore_index=True)
+
+        print(f"SUCCESS: Generated {len(df)} samples")
+        print(f"  Critical Risk (80-100): {len(df[df.risk_score >= 80])}")
+        print(f"  High Risk (60-80): {len(df[(df.risk_score >= 60) & (df.risk_score < 80)])}")
+        print(f"  Medium Risk (40-60): {len(df[(df.risk_score >= 40) & (df.risk_score < 60)])}")
+        print(f"  Low Risk (0-40): {len(df[df.risk_score < 40])}")
+
+        return df
+
+    def generate_chunk(self, chunk_index: int) -> pd.DataFrame:
+        """
+        Generate one chunk of rows; the result depends only on the seed,
+        chunk size and chunk index
+
+        Returns:
+            DataFrame with all features and target variable
+        """
+        start, n = self.chunk_bounds(chunk_index)
+        rng = self.chunk_rng(chunk_index)
+
         # Generate risk distribution first (determines other features)
-        risk_scores = self._generate_risk_distribution()
-        
+        risk_scores = self._generate_risk_distribution(rng, n)
+
         # Generate geographic features
-        locations = self._generate_locations()
-        
+        locations = self._generate_locations(rng, n)
+
         # Generate correlated features based on risk scores
         data = {
-            'cell_id': [f'cell-{i:05d}' for i in range(self.n_samples)],
+            'cell_id': np.char.add('cell-', np.char.zfill(np.arange(start, start + n).astype(str), 5)).astype(object),
             'lat': locations[:, 0],
             'lng': locations[:, 1],
             'risk_score': risk_scores
         }
-        
+
         # Add crop features (correlated with risk)
-        crop_data = self._generate_crop_features(risk_scores)
-        data.update(crop_data)
-        
+        data.update(self._generate_crop_features(rng, risk_scores))
+
         # Add environmental features (key risk indicators)
-        env_data = self._generate_environmental_features(risk_scores)
-        data.update(env_data)
-        
+        data.update(self._generate_environmental_features(rng, risk_scores))
+
         # Add historical pest features
-        historical_data = self._generate_historical_features(risk_scores)
-        data.update(historical_data)
-        
+        data.update(self._generate_historical_features(rng, risk_scores))
+
         # Add weather features
-        weather_data = self._generate_weather_features(risk_scores)
-        data.update(weather_data)
-        
+        data.update(self._generate_weather_features(rng, risk_scores))
+
         # Add topographical features
-        topo_data = self._generate_topographical_features(risk_scores, locations)
-        data.update(topo_data)
-        
+        data.update(self._generate_topographical_features(rng, risk_scores, locations))
+
         # Add pest-specific features
-        pest_data = self._generate_pest_features(risk_scores)
-        data.update(pest_data)
-        
+        data.update(self._generate_pest_features(rng, risk_scores))
+
         df = pd.DataFrame(data)
-        
+
         # Add some realistic noise and missing values
-        df = self._add_noise_and_missing(df)
-        
-        print(f"SUCCESS: Generated {len(df)} samples")
-        print(f"  Critical Risk (80-100): {len(df[df.risk_score >= 80])}")
-        print(f"  High Risk (60-80): {len(df[(df.risk_score >= 60) & (df.risk_score < 80)])}")
-        print(f"  Medium Risk (40-60): {len(df[(df.risk_score >= 40) & (df.risk_score < 60)])}")
-        print(f"  Low Risk (0-40): {len(df[df.risk_score < 40])}")
-        
-        return df
-    
-    def _generate_risk_distribution(self) -> np.ndarray:
+        return self._add_noise_and_missing(rng, df)
+
+    def _generate_risk_distribution(self, rng: np.random.Generator, n: int) -> np.ndarray:
         """
         Generate risk scores with realistic distribution
         15% critical, 25% high, 30% medium, 30% low
         """
-        n_critical = int(self.n_samples * 0.15)      # 80-100
-        n_high = int(self.n_samples * 0.25)          # 60-80
-        n_medium = int(self.n_samples * 0.30)        # 40-60
-        n_low = self.n_samples - n_critical - n_high - n_medium  # 0-40
-        
-        critical_risk = np.random.uniform(80, 100, n_critical)
-        high_risk = np.random.uniform(60, 80, n_high)
-        medium_risk = np.random.uniform(40, 60, n_medium)
-        low_risk = np.random.uniform(0, 40, n_low)
-        
-        risk_scores = np.concatenate([critical_risk, high_risk, medium_risk, low_risk])
-        np.random.shuffle(risk_scores)
-        
+        counts = [int(n * share) for share, _ in RISK_BANDS[:-1]]
+        counts.append(n - sum(counts))
+
+        risk_scores = np.concatenate([
+            rng.uniform(low, high, count) for count, (_, (low, high)) in zip(counts, RISK_BANDS)
+        ])
+        rng.shuffle(risk_scores)
+
         return risk_scores
-    
-    def _generate_locations(self) -> np.ndarray:
+
+    def _generate_locations(self, rng: np.random.Generator, n: int) -> np.ndarray:
         """Generate realistic lat/lng coordinates within Kenyan agricultural regions"""
-        locations = []
-        
-        region_names = list(self.regions.keys())
-        
-        for _ in range(self.n_samples):
-            # Randomly select region
-            region = self.regions[random.choice(region_names)]
-            
-            lat = np.random.uniform(region['lat_range'][0], region['lat_range'][1])
-            lng = np.random.uniform(region['lng_range'][0], region['lng_range'][1])
-            
-            locations.append([lat, lng])
-        
-        return np.array(locations)
-    
-    def _generate_crop_features(self, risk_scores: np.ndarray) -> dict:
+        lat_ranges = np.array([region['lat_range'] for region in self.regions.values()])
+        lng_ranges = np.array([region['lng_range'] for region in self.regions.values()])
+
+        # Randomly select region per sample
+        region = rng.integers(len(self.regions), size=n)
+
+        lat = rng.uniform(lat_ranges[region, 0], lat_ranges[region, 1])
+        lng = rng.uniform(lng_ranges[region, 0], lng_ranges[region, 1])
+
+        return np.column_stack([lat, lng])
+
+    def _generate_crop_features(self, rng: np.random.Generator, risk_scores: np.ndarray) -> dict:
         """
         Generate crop features
         Certain crops might be more susceptible to specific pests/diseases
         """
         n = len(risk_scores)
-        
+
         # NDVI: Healthy crops have high NDVI, but stressed crops (high risk) might have lower
         # However, dense monocultures (high NDVI) can also be high risk for rapid spread
         # Let's assume: High Risk -> stressed crops (lower NDVI) OR very dense canopy (high NDVI)
         # Simplified: High risk correlates with slightly lower NDVI (stress)
         base_ndvi = 0.8 - (risk_scores / 100) * 0.3  # Range: 0.5 to 0.8
-        ndvi = base_ndvi + np.random.normal(0, 0.08, n)
+        ndvi = base_ndvi + rng.normal(0, 0.08, n)
         ndvi = np.clip(ndvi, 0.1, 0.9)
-        
+
         # Crop type
-        crop_types = []
-        for _ in range(n):
-            crop_types.append(random.choice(['Maize', 'Wheat', 'Coffee', 'Tea', 'Vegetables']))
-            
+        crop_types = np.array(CROP_TYPES, dtype=object)[rng.integers(len(CROP_TYPES), size=n)]
+
         return {
             'ndvi': np.round(ndvi, 3),
             'crop_type': crop_types
         }
-    
-    def _generate_environmental_features(self, risk_scores: np.ndarray) -> dict:
+
+    def _generate_environmental_features(self, rng: np.random.Generator, risk_scores: np.ndarray) -> dict:
         """
         Generate environmental features strongly correlated with risk
         """
         n = len(risk_scores)
-        
+
         # Soil Moisture: High moisture -> fungal risk (High Risk)
         # Risk 100 -> High moisture, Risk 0 -> Low/Optimal
         base_moisture = (risk_scores / 100) * 0.8
-        soil_moisture = base_moisture + np.random.normal(0, 0.1, n)
+        soil_moisture = base_moisture + rng.normal(0, 0.1, n)
         soil_moisture = np.clip(soil_moisture, 0.0, 1.0)
-        
+
         # Distance to water: Closer to water -> higher humidity/pest risk
         base_water = 5000 - (risk_scores / 100) * 4000
-        dist_to_water = base_water + np.random.exponential(800, n)
+        dist_to_water = base_water + rng.exponential(800, n)
         dist_to_water = np.clip(dist_to_water, 50, 20000)
-        
+
         return {
             'soil_moisture': np.round(soil_moisture, 2),
             'dist_to_water': np.round(dist_to_water, 1)
         }
-    
-    def _generate_historical_features(self, risk_scores: np.ndarray) -> dict:
+
+    def _generate_historical_features(self, rng: np.random.Generator, risk_scores: np.ndarray) -> dict:
         """
         Generate historical pest/disease report features
         """
         n = len(risk_scores)
-        
+
         # Reports in 5km radius: Higher risk -> more reports
         base_reports = (risk_scores / 100) * 15
-        pest_reports = np.random.poisson(base_reports)
+        pest_reports = rng.poisson(base_reports)
         pest_reports = np.clip(pest_reports, 0, 50)
-        
+
         # Days since last report: Higher risk -> more recent
         base_days = 350 - (risk_scores / 100) * 330
-        days_since = base_days + np.random.exponential(30, n)
+        days_since = base_days + rng.exponential(30, n)
         days_since = np.clip(days_since, 1, 365).astype(int)
-        
+
         return {
             'pest_reports_5km': pest_reports.astype(int),
             'days_since_last_report': days_since
         }
-    
-    def _generate_weather_features(self, risk_scores: np.ndarray) -> dict:
+
+    def _generate_weather_features(self, rng: np.random.Generator, risk_scores: np.ndarray) -> dict:
         """
         Generate weather features (Temperature, Humidity)
         """
         n = len(risk_scores)
-        
+
         # Humidity: High humidity -> High risk (fungal/pest)
         base_humidity = 40 + (risk_scores / 100) * 50
-        humidity = base_humidity + np.random.normal(0, 5, n)
+        humidity = base_humidity + rng.normal(0, 5, n)
         humidity = np.clip(humidity, 20, 100)
-        
+
         # Temperature: Optimal range for pests is often 20-30C
         # We'll simulate a mix, but generally warmer = higher metabolic rate for pests
         base_temp = 15 + (risk_scores / 100) * 15
-        temperature = base_temp + np.random.normal(0, 3, n)
+        temperature = base_temp + rng.normal(0, 3, n)
         temperature = np.clip(temperature, 10, 40)
-        
+
         return {
             'humidity': np.round(humidity, 1),
             'temperature': np.round(temperature, 1)
         }
-    
+
     def _generate_topographical_features(
-        self, 
-        risk_scores: np.ndarray, 
+        self,
+        rng: np.random.Generator,
+        risk_scores: np.ndarray,
         locations: np.ndarray
     ) -> dict:
         """
         Generate topographical features
         """
         n = len(risk_scores)
-        
+
         # Elevation: Varies by location
         base_elevation = np.abs(locations[:, 0]) * 400 + 1000
-        elevation = base_elevation + np.random.normal(0, 200, n)
+        elevation = base_elevation + rng.normal(0, 200, n)
         elevation = np.clip(elevation, 500, 3000)
-        
+
         # Slope: Flatter land (low slope) -> water stagnation -> higher disease risk
         base_slope = 20 - (risk_scores / 100) * 15
-        slope = base_slope + np.random.exponential(5, n)
+        slope = base_slope + rng.exponential(5, n)
         slope = np.clip(slope, 0, 45)
-        
+
         return {
             'elevation': np.round(elevation, 1),
             'slope': np.round(slope, 1)
         }
-    
-    def _generate_pest_features(self, risk_scores: np.ndarray) -> dict:
+
+    def _generate_pest_features(self, rng: np.random.Generator, risk_scores: np.ndarray) -> dict:
         """
         Generate pest-specific features
         """
-        n = len(risk_scores)
-        
         # Pest Pressure (Regional load): High risk -> High pressure
-        pest_pressure = []
-        for risk in risk_scores:
-            if risk > 70:
-                pest_pressure.append(random.choices(['High', 'Medium', 'Low'], weights=[0.7, 0.2, 0.1])[0])
-            elif risk > 40:
-                pest_pressure.append(random.choices(['High', 'Medium', 'Low'], weights=[0.2, 0.5, 0.3])[0])
-            else:
-                pest_pressure.append(random.choices(['High', 'Medium', 'Low'], weights=[0.1, 0.2, 0.7])[0])
-        
+        risk_band = np.where(risk_scores > 70, 0, np.where(risk_scores > 40, 1, 2))
+        pest_pressure = _choose(rng, PEST_PRESSURE_WEIGHTS, risk_band)
+
         # Crop Stage: Vulnerable stages (Flowering, Fruiting) -> Higher Risk
-        crop_stage = []
-        stages = ['Vegetative', 'Flowering', 'Fruiting', 'Harvesting']
-        for risk in risk_scores:
-            if risk > 60:
-                # High risk often coincides with sensitive stages
-                crop_stage.append(random.choices(stages, weights=[0.1, 0.4, 0.4, 0.1])[0])
-            else:
-                crop_stage.append(random.choice(stages))
-        
+        # High risk often coincides with sensitive stages
+        crop_stage = _choose(rng, CROP_STAGE_WEIGHTS, np.where(risk_scores > 60, 0, 1))
+
         return {
-            'pest_pressure': pest_pressure,
-            'crop_stage': crop_stage
+            'pest_pressure': np.array(PEST_PRESSURE_LEVELS, dtype=object)[pest_pressure],
+            'crop_stage': np.array(CROP_STAGES, dtype=object)[crop_stage]
         }
-    
-    def _add_noise_and_missing(self, df: pd.DataFrame) -> pd.DataFrame:
+
+    def _add_noise_and_missing(self, rng: np.random.Generator, df: pd.DataFrame) -> pd.DataFrame:
         """
         Add realistic noise and missing values
         """
         # Add small noise to continuous features
-        continuous_features = ['ndvi', 'soil_moisture', 'dist_to_water', 
-                              'humidity', 'temperature', 'elevation', 'slope']
-        
-        for feature in continuous_features:
+        for feature in CONTINUOUS_FEATURES:
             if feature in df.columns:
                 noise_scale = df[feature].std() * 0.02  # 2% noise
-                df[feature] += np.random.normal(0, noise_scale, len(df))
-        
+                df[feature] += rng.normal(0, noise_scale, len(df))
+
         # Add missing values
-        missing_candidates = ['ndvi', 'soil_moisture', 'humidity']
-        
-        for feature in missing_candidates:
+        for feature in MISSING_FEATURES:
             if feature in df.columns:
-                n_missing = int(len(df) * 0.025)  # 2.5% missing
-                missing_idx = np.random.choice(len(df), n_missing, replace=False)
+                n_missing = int(len(df) * MISSING_RATE)
+                missing_idx = rng.choice(len(df), n_missing, replace=False)
                 df.loc[missing_idx, feature] = np.nan
-        
+
         # Ensure target variable has no missing values
         df['risk_score'] = df['risk_score'].fillna(df['risk_score'].mean())
-        
+
         # Clip continuous features to valid ranges
         if 'ndvi' in df.columns:
             df['ndvi'] = df['ndvi'].clip(0.0, 1.0)
@@ -310,13 +353,13 @@ class AgriculturalDataGenerator:
             df['soil_moisture'] = df['soil_moisture'].clip(0.0, 1.0)
         if 'risk_score' in df.columns:
             df['risk_score'] = df['risk_score'].clip(0.0, 100.0)
-        
+
         return df
-    
+
     def save_csv(self, df: pd.DataFrame, filename: str = 'training_data.csv'):
         """
         Save DataFrame to CSV in data folder
-        
+
         Args:
             df: DataFrame to save
             filename: Output filename
@@ -327,34 +370,135 @@ class AgriculturalDataGenerator:
         print(f"  File size: {output_path.stat().st_size / 1024:.1f} KB")
         print(f"  Columns: {len(df.columns)}")
         print(f"  Rows: {len(df)}")
-        
+
         return output_path
 
+    def write_chunk(self, chunk_index: int, output_dir: str, file_format: str = 'csv') -> Dict:
+        """
+        Generate one chunk and write it as a partition file
+
+        Returns:
+            Partition entry for the manifest: {'file', 'chunk', 'firstRow', 'rows', 'bytes'}
+        """
+        start, _ = self.chunk_bounds(chunk_index)
+        df = self.generate_chunk(chunk_index)
+        path = Path(output_dir) / f'part-{chunk_index:05d}.{file_format}'
+        if file_format == 'parquet':
+            df.to_parquet(path, index=False)  # Needs pyarrow or fastparquet
+        else:
+            df.to_csv(path, index=False, float_format='%.3f')
+        return {'file': path.name, 'chunk': chunk_index, 'firstRow': start, 'rows': len(df), 'bytes': path.stat().st_size}
+
+    def write_partitions(self, output_dir: str, file_format: str = 'csv', workers: Optional[int] = None) -> Path:
+        """
+        Generate the dataset chunk by chunk into partition files plus a manifest,
+        never holding more than one chunk per process in memory
+
+        Args:
+            output_dir: Directory for part-NNNNN.<format> files and manifest.json
+            file_format: 'csv', 'csv.gz' or 'parquet'
+            workers: Processes building chunks in parallel (default: CPU count; 1: in this process)
+
+        Returns:
+            Path of the manifest
+        """
+        if file_format not in PARTITION_FORMATS:
+            raise ValueError(f"file_format must be one of {PARTITION_FORMATS}")
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        workers = min(workers or os.cpu_count() or 1, self.n_chunks)
+
+        print(f"Generating {self.n_samples} samples in {self.n_chunks} chunks of {self.chunk_size} ({workers} workers)...")
+        started = time.perf_counter()
+        if workers == 1:
+            partitions = [self.write_chunk(i, str(output_dir), file_format) for i in range(self.n_chunks)]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                partitions = list(pool.map(
+                    self.write_chunk, range(self.n_chunks), [str(output_dir)] * self.n_chunks, [file_format] * self.n_chunks
+                ))
+        elapsed = time.perf_counter() - started
+
+        manifest_path = output_dir / MANIFEST_FILENAME
+        manifest = {
+            'rows': self.n_samples,
+            'seed': self.seed,
+            'chunkSize': self.chunk_size,
+            'format': file_format,
+            'partitions': partitions,
+        }
+        manifest_path.write_text(json.dumps(manifest, indent=2))
+
+        total_bytes = sum(p['bytes'] for p in partitions)
+        print(f"SUCCESS: Wrote {self.n_samples} rows to {output_dir} in {elapsed:.1f}s ({self.n_samples / elapsed:,.0f} rows/s)")
+        print(f"  Partitions: {len(partitions)}, {total_bytes / 2 ** 20:.1f} MiB")
+        return manifest_path
+
+
+def partition_files(directory: str) -> List[Path]:
+    """Partition files of a dataset written by write_partitions, in row order"""
+    directory = Path(directory)
+    manifest = json.loads((directory / MANIFEST_FILENAME).read_text())
+    return [directory / partition['file'] for partition in sorted(manifest['partitions'], key=lambda p: p['chunk'])]
+
 
-def main():
+def read_partitions(directory: str, max_rows: Optional[int] = None) -> pd.DataFrame:
+    """
+    Load a partitioned dataset (or its first max_rows rows) as one DataFrame
+    """
+    frames = []
+    remaining = max_rows
+    for path in partition_files(directory):
+        df = pd.read_parquet(path) if path.suffix == '.parquet' else pd.read_csv(path, nrows=remaining)
+        frames.append(df.iloc[:remaining] if remaining is not None else df)
+        if remaining is not None:
+            remaining -= len(frames[-1])
+            if remaining <= 0:
+                break
+    return pd.concat(frames, ignore_index=True)
+
+
+def main(argv=None):
     """Generate and save training data"""
+    parser = argparse.ArgumentParser(description="Generate synthetic agricultural training data")
+    parser.add_argument('--samples', type=int, default=10000, help="Rows to generate")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output-dir', help="Write partition files and a manifest here instead of data/training_data.csv")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per chunk/partition")
+    parser.add_argument('--format', choices=PARTITION_FORMATS, default='csv', help="Partition file format")
+    parser.add_argument('--workers', type=int, help="Processes building chunks (default: CPU count)")
+    args = parser.parse_args(argv)
+
     print("=" * 60)
     print("Sentry Agricultural Data Generator")
     print("=" * 60)
-    
-    generator = AgriculturalDataGenerator(n_samples=10000, seed=42)
+
+    generator = AgriculturalDataGenerator(n_samples=args.samples, seed=args.seed, chunk_size=args.chunk_size)
+
+    if args.output_dir:
+        manifest_path = generator.write_partitions(args.output_dir, args.format, args.workers)
+        print("\n" + "=" * 60)
+        print(f"Partitioned training data ready: {manifest_path}")
+        print("=" * 60)
+        return
+
     df = generator.generate()
-    
+
     print("\nDataset Statistics:")
     print(df.describe())
-    
+
     print("\nCategorical Feature Distribution:")
     print(f"  Crop Types: {df['crop_type'].value_counts().to_dict()}")
     print(f"  Pest Pressure: {df['pest_pressure'].value_counts().to_dict()}")
     print(f"  Crop Stages: {df['crop_stage'].value_counts().to_dict()}")
-    
+
     print("\nFeature Correlations with Risk Score:")
     numeric_cols = df.select_dtypes(include=[np.number]).columns
     correlations = df[numeric_cols].corr()['risk_score'].sort_values(ascending=False)
     print(correlations[1:11])  # Top 10 correlated features
-    
+
     output_path = generator.save_csv(df)
-    
+
     print("\n" + "=" * 60)
     print(f"Training data ready at: {output_path}")
     print("Next steps:")
@@ -3,24 +3,74 @@ SENTRY - Agri-Climate Risk Intelligence Platform
 FastAPI Backend Server
 """
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
+from contextlib import asynccontextmanager, contextmanager
 from datetime import date
 import json
 import asyncio
+import math
+import os
 import random
-from backend.utils.gee_satellite import get_gee_instance
+import secrets
+import time
+from backend.utils.gee_satellite import get_gee_instance, track_round_trips
 from backend.models.risk_model import get_model_instance
 from backend.models.insurance_model import get_insurance_model
 from backend.services.perplexity_search import get_perplexity_instance
 from backend.services.data_service import get_data_service
+from backend.services.analysis_cache import canonical_request_key, get_analysis_cache
+from backend.services.admission import MAX_AREA_KM2, AdmissionRejected, estimate_analysis_cost
+from backend.services.grid_encoding import GRID_FORMAT, build_geojson, build_risk_grid, encode_grid, result_view
+from backend.services.job_queue import COMPLETED, get_job_manager
+from backend.services.loop_monitor import get_loop_monitor
+from backend.services.metrics import PROMETHEUS_MEDIA_TYPE, count_cache_hit, get_metrics, track_analysis_stats
+from backend.services.profiling import PROFILE_FORMATS, get_profiler, profiled_call, profiled_section
+from backend.services.vector_tiles import MAX_TILE_ZOOM, MVT_MEDIA_TYPE, get_tile_cache, render_tile
+from backend.services.raster_tiles import PNG_MEDIA_TYPE, get_raster_tile_cache, render_grid_image, render_raster_tile
+from backend.services.latency_budget import (
+    CACHED_SEARCH,
+    DEFAULT_NDVI_FALLBACK,
+    GEE_FIXED_SECONDS,
+    GEMINI_SECONDS,
+    MODELING_SECONDS,
+    PERPLEXITY_SECONDS,
+    SKIP_GEMINI,
+    LatencyBudget,
+    estimate_extraction_seconds,
+)
+from backend.utils.cancellation import AnalysisCancelled, CancellationToken
+from backend.utils.tracing import current_request_id, get_tracer, log, span
+from backend.utils.serialization import (
+    COMPRESSION_MINIMUM_BYTES,
+    GZIP_COMPRESS_LEVEL,
+    FastJSONResponse,
+    dumps,
+    send_ws_json,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Monitor event-loop lag and worker-thread saturation while the server runs"""
+    monitor = get_loop_monitor()
+    monitor.start()
+    try:
+        yield
+    finally:
+        await monitor.stop()
+
 
 app = FastAPI(
     title="Agri-Sentry API",
     description="Climate risk and market volatility intelligence for smallholder farmers",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
 )
 
 # CORS configuration for Next.js frontend
@@ -32,6 +82,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON responses for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MINIMUM_BYTES, compresslevel=GZIP_COMPRESS_LEVEL)
+
 
 # Request/Response Models
 class LocationInput(BaseModel):
@@ -54,6 +107,7 @@ class AdvancedOptions(BaseModel):
     gridGranularity: int = 1  # km
     enabledLayers: List[str] = []
     temporalFocus: List[str] = []
+    latencyBudgetSeconds: Optional[float] = None  # Degrade stages to finish within this time
 
 
 class AnalysisRequest(BaseModel):
@@ -64,11 +118,23 @@ class AnalysisRequest(BaseModel):
 
 class AnalysisResponse(BaseModel):
     geoJSON: dict
+    grid: Optional[dict] = None
     temporal: Optional[dict] = None
     priorities: List[dict]
     summary: dict
     factors: Optional[dict] = None
     marketData: Optional[dict] = None
+    metadata: Optional[dict] = None
+
+
+class JobHandle(BaseModel):
+    jobId: str
+    status: str
+    statusUrl: str
+    eventsUrl: str
+    websocketUrl: str
+    estimatedCost: float = 0
+    estimatedWaitSeconds: float = 0
 
 
 class InsuranceContextRequest(BaseModel):
@@ -88,6 +154,13 @@ class InsuranceAnalysisResponse(BaseModel):
     factors: List[dict]
 
 
+class ProfilingRequest(BaseModel):
+    count: Optional[int] = 1  # None: profile matching analyses until disarmed
+    mode: str = 'cprofile'  # or 'sampling'
+    filters: dict = {}  # clientId, cropType, minAreaKm2
+    sampleIntervalMs: float = 5
+
+
 # Routes
 @app.get("/")
 async def root():
@@ -124,13 +197,101 @@ async def health_check():
         }
 
 
+# Cache hit ratios are read from the caches when /metrics is scraped
+get_metrics().track_cache('analysis', lambda: get_analysis_cache().stats())
+get_metrics().track_cache('vector_tiles', lambda: get_tile_cache().stats())
+get_metrics().track_cache('raster_tiles', lambda: get_raster_tile_cache().stats())
+
+
+def _discard_analysis_tiles(analysis_id: str):
+    get_tile_cache().discard(analysis_id)
+    get_raster_tile_cache().discard(analysis_id)
+
+
+# Tiles of a forgotten job are rendered again from the analysis cache if requested
+get_job_manager().on_forget(_discard_analysis_tiles)
+
+
+@app.get("/metrics")
+async def get_prometheus_metrics():
+    """Prometheus metrics: pipeline stage latencies, GEE round trips, cache hit ratios"""
+    return Response(get_metrics().render(), media_type=PROMETHEUS_MEDIA_TYPE)
+
+
+@app.get("/api/debug/trace/{request_id}")
+async def get_request_trace(request_id: str):
+    """
+    Spans recorded for a request (analysis job id), oldest first, with the
+    critical path through them
+    """
+    trace = get_tracer().get_trace(request_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"No trace recorded for request: {request_id}")
+    return trace
+
+
+def _require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints are disabled unless ADMIN_TOKEN is set, and require it as X-Admin-Token"""
+    expected = os.getenv('ADMIN_TOKEN')
+    if not expected or not x_admin_token or not secrets.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@app.get("/api/admin/profiling", dependencies=[Depends(_require_admin)])
+async def get_profiling_status():
+    """Armed profiling settings and stored profiles"""
+    return get_profiler().status()
+
+
+@app.post("/api/admin/profiling", dependencies=[Depends(_require_admin)])
+async def arm_profiling(request: ProfilingRequest):
+    """Profile the next `count` analyses (matching `filters`, if given)"""
+    try:
+        return get_profiler().arm(
+            count=request.count,
+            filters=request.filters,
+            mode=request.mode,
+            sample_interval=request.sampleIntervalMs / 1000
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.delete("/api/admin/profiling", dependencies=[Depends(_require_admin)])
+async def disarm_profiling():
+    """Stop profiling new analyses"""
+    get_profiler().disarm()
+    return get_profiler().status()
+
+
+@app.get("/api/admin/profiles/{request_id}", dependencies=[Depends(_require_admin)])
+async def download_profile(request_id: str):
+    """Profile of an analysis: pstats (cprofile mode) or collapsed stacks for flame graphs (sampling mode)"""
+    profile = get_profiler().get(request_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"No profile recorded for request: {request_id}")
+    if profile.finished_at is None:
+        raise HTTPException(status_code=409, detail="Profiled analysis is still running")
+
+    file_format = PROFILE_FORMATS[profile.mode]
+    if file_format == 'pstats':
+        content, media_type = profile.to_pstats(), 'application/octet-stream'
+    else:
+        content, media_type = profile.to_collapsed(), 'text/plain; charset=utf-8'
+    return Response(
+        content,
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="{request_id}.{file_format}"'}
+    )
+
+
 @app.post("/api/insurance/analyze", response_model=InsuranceAnalysisResponse)
 async def analyze_insurance_risk(request: InsuranceContextRequest):
     """
     Analyze insurance risk based on agricultural score and location context.
     Uses DataService to deterministically fetch/generate auxiliary data.
     """
-    print(f"INFO: Received insurance analysis request for location ({request.lat}, {request.lon}) with agri_risk={request.agri_risk_score}")
+    log(f"Received insurance analysis request for location ({request.lat}, {request.lon}) with agri_risk={request.agri_risk_score}")
     
     model = get_insurance_model()
     data_service = get_data_service()
@@ -140,7 +301,7 @@ async def analyze_insurance_risk(request: InsuranceContextRequest):
         model_path = "insurance_model.joblib"
         if not model.load(model_path):
              # Fallback to training if not found (auto-healing)
-             print("WARNING: Model not found, training new one...")
+             log("Model not found, training new one...", level='warning')
              try:
                  from backend.services.insurance_trainer import InsuranceModelTrainer
                  trainer = InsuranceModelTrainer()
@@ -149,7 +310,7 @@ async def analyze_insurance_risk(request: InsuranceContextRequest):
                  # Try loading again
                  model.load(model_path)
              except Exception as e:
-                 print(f"ERROR: Failed to train fallback model: {e}")
+                 log(f"Failed to train fallback model: {e}", level='error')
                  raise HTTPException(status_code=500, detail="Model not available and training failed")
 
     try:
@@ -166,7 +327,7 @@ async def analyze_insurance_risk(request: InsuranceContextRequest):
             **context_data
         }
         
-        print(f"INFO: Running prediction with features: {features}")
+        log(f"Running prediction with features: {features}")
         
         # 3. Predict
         risk_score = model.predict(features)
@@ -228,204 +389,301 @@ async def analyze_insurance_risk(request: InsuranceContextRequest):
             "recommended_actions": recommended_actions
         }
     except Exception as e:
-        print(f"ERROR: Insurance analysis failed: {str(e)}")
+        log(f"Insurance analysis failed: {str(e)}", level='error')
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/analyze", response_model=AnalysisResponse)
-async def analyze_risk(request: AnalysisRequest):
+class AnalysisError(Exception):
+    """User-facing analysis failure (sent to the client as-is)"""
+
+
+async def _offload(service: str, fn, *args, **kwargs):
     """
-    Main analysis endpoint
-    Receives location and parameters, returns agricultural risk predictions
+    Run a blocking external-service call in a worker thread, counted per
+    service for /metrics and under the request's profile if it is being profiled
     """
-    # This endpoint is kept for compatibility but the primary interaction is via WebSocket
-    # We'll implement a basic synchronous version here if needed, but for now we rely on WS
-    raise HTTPException(status_code=501, detail="Please use WebSocket endpoint /api/analyze/ws for analysis")
+    return await get_loop_monitor().offload(service, profiled_call, fn, *args, **kwargs)
 
 
-@app.websocket("/api/analyze/ws")
-async def analyze_risk_websocket(websocket: WebSocket):
+@contextmanager
+def _stage(name: str, **attributes):
+    """Trace a pipeline stage and record its latency for /metrics"""
+    with span(name, **attributes) as attrs, get_metrics().stage(name):
+        yield attrs
+
+
+def _reverse_geocode(lat: float, lon: float, cancel_token: Optional[CancellationToken] = None) -> str:
+    """Resolve a human-readable place name for the search context (blocking)"""
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    try:
+        from geopy.geocoders import Nominatim
+        geolocator = Nominatim(user_agent="sentry_app")
+        with span('nominatim.reverse'):
+            location = geolocator.reverse(f"{lat}, {lon}", language='en')
+        if location and location.address:
+            address = location.raw.get('address', {})
+            city = address.get('city') or address.get('town') or address.get('village') or address.get('county')
+            state = address.get('state') or address.get('region')
+            country = address.get('country')
+            parts = [p for p in [city, state, country] if p]
+            location_context = ", ".join(parts)
+            log(f"Geocoded location: {location_context}", level='success')
+            return location_context
+    except Exception as e:
+        log(f"Geocoding failed: {e}", level='warning')
+    return f"coordinates {lat:.4f}, {lon:.4f}"
+
+
+def _describe_area_with_gemini(gee, polygon: List[dict], location_context: str, cancel_token: Optional[CancellationToken] = None) -> str:
+    """Describe the crops visible in the area using Gemini (blocking); empty on failure"""
+    try:
+        log("Running Gemini visual analysis...")
+        from backend.services.gemini_service import GeminiService
+
+        gemini = GeminiService()
+
+        # Fetch satellite image from GEE
+        satellite_img_bytes = gee.get_satellite_image(polygon, cancel_token=cancel_token)
+
+        if not satellite_img_bytes:
+            log("Could not fetch satellite image for Gemini analysis", level='warning')
+            return ""
+
+        prompt = f"Analyze this satellite image of an agricultural area at {location_context}. Identify the specific crops grown (e.g. tea, coffee, maize) and the agricultural landscape features. Return a concise 1-sentence description for a search query."
+
+        with span('gemini.analyze_image', imageBytes=len(satellite_img_bytes)):
+            analysis = gemini.analyze_image_with_search(satellite_img_bytes, prompt, cancel_token=cancel_token)
+        if analysis and 'text' in analysis:
+            gemini_context = analysis['text'].strip()
+            log(f"Gemini context: {gemini_context}", level='success')
+            return gemini_context
+
+    except AnalysisCancelled:
+        raise
+    except Exception as e:
+        log(f"Gemini analysis failed: {e}", level='warning')
+    return ""
+
+
+async def run_analysis_pipeline(
+    request: AnalysisRequest,
+    emit,
+    area_km2: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None
+) -> dict:
     """
-    WebSocket analysis endpoint with real-time progress updates
+    Run the full analysis pipeline for one request
+
+    Args:
+        request: Validated analysis request
+        emit: Async callback receiving progress events
+        area_km2: Polygon area if already computed during admission
+        cancel_token: Checked by blocking GEE/external calls so an abandoned
+                      analysis stops using worker threads and quota
+
+    With advanced.latencyBudgetSeconds set, UI pacing pauses are skipped and
+    stages degrade in order when time runs short (see LatencyBudget); the
+    response metadata lists what was degraded.
+
+    Returns:
+        Response payload for the 'complete' message
     """
-    await websocket.accept()
-    
-    try:
-        # Receive the request data
-        data = await websocket.receive_text()
-        request_dict = json.loads(data)
-        request = AnalysisRequest(**request_dict)
-        
-        # Validate polygon
-        if request.location.type == "custom":
-            if not request.location.polygon or len(request.location.polygon) < 3:
-                await websocket.send_json({'type': 'error', 'step': 'error', 'message': 'Invalid polygon', 'progressPercent': 0})
-                await websocket.close()
-                return
-            polygon = request.location.polygon
+    # Validate polygon
+    if request.location.type == "custom":
+        if not request.location.polygon or len(request.location.polygon) < 3:
+            raise AnalysisError('Invalid polygon')
+    else:
+        # Mock farm selection
+        pass
+    polygon = request.location.polygon
+    budget = LatencyBudget(request.advanced.latencyBudgetSeconds)
+    metrics = get_metrics()
+
+    async def pace(seconds: float):
+        """UI pacing pause, skipped when the analysis has a latency budget"""
+        if not budget.limited:
+            await asyncio.sleep(seconds)
+
+    # Initialize
+    log("Sending: initializing", step='initializing')
+    await emit({'type': 'status', 'step': 'initializing', 'message': 'Initializing Agri-Climate Engine...', 'progressPercent': 5})
+    await pace(0.5)
+
+    gee = get_gee_instance()
+    if area_km2 is None:
+        with _stage('area'):
+            area_km2 = await _offload('gee', gee.calculate_polygon_area_km2, polygon)
+
+    if area_km2 > MAX_AREA_KM2:
+        raise AnalysisError(f'Area too large: {area_km2:.1f} km². Maximum: {MAX_AREA_KM2} km²')
+
+    # Coarsen the grid first if extraction would not fit in the budget
+    cell_size_km = budget.plan_grid(area_km2, request.advanced.gridGranularity)
+    extraction_seconds = estimate_extraction_seconds(math.ceil(area_km2 / (cell_size_km ** 2)))
+
+    # Soil Analysis
+    log("Sending: soil_analysis", step='soil_analysis')
+    await emit({'type': 'status', 'step': 'soil_analysis', 'message': f'Analyzing soil moisture and composition...', 'progressPercent': 20})
+    await pace(1.0)
+
+    # Weather Forecasting
+    log("Sending: weather_forecast", step='weather_forecast')
+    await emit({'type': 'status', 'step': 'weather_forecast', 'message': 'Retrieving long-term precipitation and temperature forecasts...', 'progressPercent': 40})
+    await pace(1.0)
+
+    # Market Data
+    log("Sending: market_data", step='market_data')
+    await emit({'type': 'status', 'step': 'market_data', 'message': f'Fetching regional market volatility data...', 'progressPercent': 50})
+    await pace(1.0)
+
+    # Web Search for Agricultural Intelligence
+    log("Sending: web_search", step='web_search')
+    await emit({'type': 'status', 'step': 'web_search', 'message': 'Searching latest climatic intelligence and research...', 'progressPercent': 60})
+
+    # Calculate centroid for search context
+    location_context = "Kenya"
+    gemini_context = ""
+
+    if polygon:
+        lats = [p['lat'] for p in polygon]
+        lons = [p['lng'] for p in polygon]
+        center_lat = sum(lats) / len(lats)
+        center_lon = sum(lons) / len(lons)
+
+        # 1. Reverse Geocoding
+        with _stage('geocode'):
+            location_context = await _offload('nominatim', _reverse_geocode, center_lat, center_lon, cancel_token)
+
+        # 2. Gemini Visual Analysis
+        if budget.fits(GEMINI_SECONDS + PERPLEXITY_SECONDS + extraction_seconds + MODELING_SECONDS):
+            with _stage('gemini'):
+                gemini_context = await _offload('gemini', _describe_area_with_gemini, gee, polygon, location_context, cancel_token)
         else:
-            # Mock farm selection
-            pass
-        
-        # Initialize
-        print(">>> Sending: initializing")
-        await websocket.send_json({'type': 'status', 'step': 'initializing', 'message': 'Initializing Agri-Climate Engine...', 'progressPercent': 5})
-        await asyncio.sleep(0.5)
-        
-        gee = get_gee_instance()
-        area_km2 = gee.calculate_polygon_area_km2(polygon)
-        
-        MAX_AREA_KM2 = 5000 # Larger area allowed for farms/regions
-        if area_km2 > MAX_AREA_KM2:
-            await websocket.send_json({'type': 'error', 'step': 'error', 'message': f'Area too large: {area_km2:.1f} km². Maximum: {MAX_AREA_KM2} km²', 'progressPercent': 0})
-            await websocket.close()
-            return
-        
-        # Soil Analysis
-        print(f">>> Sending: soil_analysis")
-        await websocket.send_json({'type': 'status', 'step': 'soil_analysis', 'message': f'Analyzing soil moisture and composition...', 'progressPercent': 20})
-        await asyncio.sleep(1.0)
-        
-        # Weather Forecasting
-        print(f">>> Sending: weather_forecast")
-        await websocket.send_json({'type': 'status', 'step': 'weather_forecast', 'message': 'Retrieving long-term precipitation and temperature forecasts...', 'progressPercent': 40})
-        await asyncio.sleep(1.0)
-        
-        # Market Data
-        print(f">>> Sending: market_data")
-        await websocket.send_json({'type': 'status', 'step': 'market_data', 'message': f'Fetching regional market volatility data...', 'progressPercent': 50})
-        await asyncio.sleep(1.0)
-        
-        # Web Search for Agricultural Intelligence
-        print(f">>> Sending: web_search")
-        await websocket.send_json({'type': 'status', 'step': 'web_search', 'message': 'Searching latest climatic intelligence and research...', 'progressPercent': 60})
-        
-        # Calculate centroid for search context
-        location_context = "Kenya"
-        gemini_context = ""
-        
-        if polygon:
-            lats = [p['lat'] for p in polygon]
-            lons = [p['lng'] for p in polygon]
-            center_lat = sum(lats) / len(lats)
-            center_lon = sum(lons) / len(lons)
-            
-            # 1. Reverse Geocoding
-            try:
-                from geopy.geocoders import Nominatim
-                geolocator = Nominatim(user_agent="sentry_app")
-                location = geolocator.reverse(f"{center_lat}, {center_lon}", language='en')
-                if location and location.address:
-                    address = location.raw.get('address', {})
-                    city = address.get('city') or address.get('town') or address.get('village') or address.get('county')
-                    state = address.get('state') or address.get('region')
-                    country = address.get('country')
-                    parts = [p for p in [city, state, country] if p]
-                    location_context = ", ".join(parts)
-                    print(f"  ✓ Geocoded location: {location_context}")
-                else:
-                    location_context = f"coordinates {center_lat:.4f}, {center_lon:.4f}"
-            except Exception as e:
-                print(f"  ⚠ Geocoding failed: {e}")
-                location_context = f"coordinates {center_lat:.4f}, {center_lon:.4f}"
-
-            # 2. Gemini Visual Analysis
-            try:
-                print("  Running Gemini visual analysis...")
-                from backend.services.gemini_service import GeminiService
-                
-                gemini = GeminiService()
-                
-                # Fetch satellite image from GEE
-                # Note: 'gee' instance is already initialized above
-                satellite_img_bytes = gee.get_satellite_image(polygon)
-                
-                if satellite_img_bytes:
-                    prompt = f"Analyze this satellite image of an agricultural area at {location_context}. Identify the specific crops grown (e.g. tea, coffee, maize) and the agricultural landscape features. Return a concise 1-sentence description for a search query."
-                    
-                    analysis = gemini.analyze_image_with_search(satellite_img_bytes, prompt)
-                    if analysis and 'text' in analysis:
-                        gemini_context = analysis['text'].strip()
-                        print(f"  ✓ Gemini Context: {gemini_context}")
-                        
-                        # Enhance location context with Gemini's findings
-                        location_context = f"{location_context}. {gemini_context}"
-                else:
-                    print("  ⚠ Could not fetch satellite image for Gemini analysis")
-                    
-            except Exception as e:
-                print(f"  ⚠ Gemini analysis failed: {e}")
-
-        perplexity = get_perplexity_instance()
-        search_results = perplexity.search_agricultural_intelligence(
-            crop_type=request.parameters.cropType,
-            risk_factors=request.parameters.riskFactors,
-            region=location_context,
-            max_results=5
+            budget.degrade(SKIP_GEMINI, "Gemini enrichment skipped")
+
+    # Recent results are kept per geocoded region: Gemini's description of the
+    # same area varies between analyses, so it is left out of the cache key
+    search_region = location_context
+    if gemini_context:
+        # Enhance location context with Gemini's findings
+        location_context = f"{location_context}. {gemini_context}"
+
+    perplexity = get_perplexity_instance()
+    search_results = None
+    reserve_seconds = extraction_seconds + MODELING_SECONDS
+    if budget.fits(PERPLEXITY_SECONDS + reserve_seconds):
+        try:
+            with _stage('perplexity'):
+                search_results = await asyncio.wait_for(
+                    _offload(
+                        'perplexity',
+                        perplexity.search_agricultural_intelligence,
+                        crop_type=request.parameters.cropType,
+                        risk_factors=request.parameters.riskFactors,
+                        region=location_context,
+                        max_results=5,
+                        cancel_token=cancel_token,
+                        cache_region=search_region
+                    ),
+                    timeout=budget.remaining() - reserve_seconds if budget.limited else None
+                )
+        except asyncio.TimeoutError:
+            # The worker thread is left running on purpose (cancel_token is the
+            # whole analysis's): its results still fill the cache for later
+            # analyses of the area
+            search_reason = "live search timed out"
+    else:
+        search_reason = "no time for live search"
+
+    if search_results is None:
+        search_results = perplexity.get_cached_results(search_region)
+        if search_results is None:
+            search_results = {'query': location_context, 'results': [], 'cached': False}
+            budget.degrade(CACHED_SEARCH, f"{search_reason}; no cached results available")
+        else:
+            count_cache_hit()
+            budget.degrade(CACHED_SEARCH, f"{search_reason}; cached results served")
+
+    # Send search results to frontend
+    await emit({
+        'type': 'search_results',
+        'step': 'web_search',
+        'data': search_results,
+        'progressPercent': 65
+    })
+    await pace(0.5)
+
+    # Generate grid and extract satellite features
+    with _stage('grid'):
+        grid = gee.grid_spec(polygon, cell_size_km)
+        cells = await _offload('gee', gee.create_grid_cells, polygon, cell_size_km)
+
+    # Extract satellite features (including thumbnail URLs)
+    log("Sending: satellite_extraction", step='satellite_extraction')
+    await emit({'type': 'status', 'step': 'satellite_extraction', 'message': 'Extracting satellite imagery and NDVI data...', 'progressPercent': 70})
+
+    date_start = request.parameters.dateRange['start']
+    date_end = request.parameters.dateRange['end']
+    # Cells not sampled before the deadline fall back to default NDVI
+    ndvi_deadline = budget.deadline(reserve_seconds=MODELING_SECONDS)
+    if budget.limited and not budget.fits(GEE_FIXED_SECONDS + MODELING_SECONDS):
+        ndvi_deadline = time.monotonic()
+    with _stage('gee_extraction'):
+        cells_with_features = await _offload(
+            'gee', gee.extract_features_for_cells, cells, date_start, date_end,
+            cancel_token=cancel_token, deadline=ndvi_deadline
         )
-        
-        # Send search results to frontend
-        await websocket.send_json({
-            'type': 'search_results',
-            'step': 'web_search',
-            'data': search_results,
-            'progressPercent': 65
-        })
-        await asyncio.sleep(0.5)
+    defaulted_cells = sum(
+        1 for cell in cells_with_features
+        if cell.get('features', {}).get('ndvi_source') == 'default'
+    )
+    if defaulted_cells:
+        budget.degrade(DEFAULT_NDVI_FALLBACK, f"default NDVI used for {defaulted_cells} of {len(cells)} cells")
 
-        # Generate grid and extract satellite features
-        cell_size_km = request.advanced.gridGranularity
-        cells = gee.create_grid_cells(polygon, cell_size_km)
-        
-        # Extract satellite features (including thumbnail URLs)
-        print(f">>> Sending: satellite_extraction")
-        await websocket.send_json({'type': 'status', 'step': 'satellite_extraction', 'message': 'Extracting satellite imagery and NDVI data...', 'progressPercent': 70})
-        
-        date_start = request.parameters.dateRange['start']
-        date_end = request.parameters.dateRange['end']
-        cells_with_features = gee.extract_features_for_cells(cells, date_start, date_end)
-        
-        # Extract satellite images from first cell (they're shared across all cells)
-        satellite_images = []
-        if cells_with_features and len(cells_with_features) > 0:
-            first_cell_features = cells_with_features[0].get('features', {})
-            image_urls = first_cell_features.get('image_urls', [])
-            
-            # Transform to frontend format
-            for img_data in image_urls:
-                satellite_images.append({
-                    'url': img_data['url'],
-                    'id': img_data['id'],
-                    'timestamp': img_data.get('date')  # milliseconds since epoch
-                })
-            
-            print(f"  Extracted {len(satellite_images)} satellite images")
-            
-            # Send satellite images in real-time as they're extracted
-            if satellite_images:
-                await websocket.send_json({
-                    'type': 'satellite_images',
-                    'step': 'satellite_extraction',
-                    'data': {'satelliteImages': satellite_images},
-                    'progressPercent': 75
-                })
-        # 5. Calculate Risk Score
-        # -----------------------
-        print(f">>> Sending: risk_modeling")
-        await websocket.send_json({'type': 'status', 'step': 'risk_modeling', 'message': 'Calculating composite risk scores...', 'progressPercent': 85})
-        await asyncio.sleep(0.5)
-
-        # Mock Risk Calculation (TODO: Use real model predictions with extracted features)
+    # Extract satellite images from first cell (they're shared across all cells)
+    satellite_images = []
+    if cells_with_features and len(cells_with_features) > 0:
+        first_cell_features = cells_with_features[0].get('features', {})
+        image_urls = first_cell_features.get('image_urls', [])
+
+        # Transform to frontend format
+        for img_data in image_urls:
+            satellite_images.append({
+                'url': img_data['url'],
+                'id': img_data['id'],
+                'timestamp': img_data.get('date')  # milliseconds since epoch
+            })
+
+        log(f"Extracted {len(satellite_images)} satellite images")
+
+        # Send satellite images in real-time as they're extracted
+        if satellite_images:
+            await emit({
+                'type': 'satellite_images',
+                'step': 'satellite_extraction',
+                'data': {'satelliteImages': satellite_images},
+                'progressPercent': 75
+            })
+    # 5. Calculate Risk Score
+    # -----------------------
+    log("Sending: risk_modeling", step='risk_modeling')
+    await emit({'type': 'status', 'step': 'risk_modeling', 'message': 'Calculating composite risk scores...', 'progressPercent': 85})
+    await pace(0.5)
+
+    # Mock Risk Calculation (TODO: Use real model predictions with extracted features)
+    prediction_start = time.perf_counter()
+    with _stage('prediction', cells=len(cells)), profiled_section():
         cells_with_risk = []
         for i, cell in enumerate(cells):
             # Generate deterministic pseudo-random risk based on location
-            random.seed(i) 
+            random.seed(i)
             risk_score = random.randint(20, 95)
-            
+
             risk_level = "Low"
             if risk_score > 75: risk_level = "High"
             elif risk_score > 50: risk_level = "Medium"
-            
+
             # Mock factors
             factors = []
             if risk_score > 50:
@@ -439,87 +697,543 @@ async def analyze_risk_websocket(websocket: WebSocket):
                 "risk_factors": factors,
                 "features": {} # Placeholder for satellite features
             })
+    metrics.observe_inference(time.perf_counter() - prediction_start, len(cells_with_risk))
 
-        # Build response
-        features = []
-        for cell in cells_with_risk:
-            bounds = cell['bounds']
-            sw = bounds['southWest']
-            ne = bounds['northEast']
-            
-            coordinates = [[
-                [sw['lng'], sw['lat']],
-                [ne['lng'], sw['lat']],
-                [ne['lng'], ne['lat']],
-                [sw['lng'], ne['lat']],
-                [sw['lng'], sw['lat']]
-            ]]
-            
-            features.append({
-                "type": "Feature",
-                "id": cell['id'],
-                "geometry": {
-                    "type": "Polygon",
-                    "coordinates": coordinates
-                },
-                "properties": {
-                    "riskScore": cell['risk_score'],
-                    "riskLevel": cell['risk_level'],
-                    "factors": cell['risk_factors'],
-                }
-            })
-        
-        # Summary Stats
-        risk_scores = [c['risk_score'] for c in cells_with_risk]
-        high_risk = sum(1 for s in risk_scores if s >= 75)
-        medium_risk = sum(1 for s in risk_scores if 50 <= s < 75)
-        low_risk = sum(1 for s in risk_scores if s < 50)
-        
-        # Market Data Mock
-        market_data = {
-            "currentPrice": 145.50,
-            "currency": "KES/kg",
-            "trend": "down",
-            "volatility": "High",
-            "forecast": "Bearish due to expected surplus"
-        }
+    # Build response: compact columnar grid (tiles, binary frames), plus the
+    # GeoJSON view for existing clients; JSON responses send only one of them
+    with _stage('serialization'), profiled_section():
+        risk_grid = build_risk_grid(grid, cells_with_risk)
+        geojson = build_geojson(risk_grid)
 
-        response_data = {
-            "geoJSON": {
-                "type": "FeatureCollection",
-                "features": features
-            },
-            "priorities": [], # Can populate if needed
-            "summary": {
-                "totalCells": len(cells_with_risk),
-                "highRiskCells": high_risk,
-                "mediumRiskCells": medium_risk,
-                "lowRiskCells": low_risk,
-                "averageRisk": round(sum(risk_scores) / len(risk_scores), 1) if risk_scores else 0,
-                "areaKm2": round(area_km2, 2),
-            },
-            "marketData": market_data,
-            "satelliteImages": satellite_images
+    # Summary Stats
+    risk_scores = [c['risk_score'] for c in cells_with_risk]
+    high_risk = sum(1 for s in risk_scores if s >= 75)
+    medium_risk = sum(1 for s in risk_scores if 50 <= s < 75)
+    low_risk = sum(1 for s in risk_scores if s < 50)
+
+    # Market Data Mock
+    market_data = {
+        "currentPrice": 145.50,
+        "currency": "KES/kg",
+        "trend": "down",
+        "volatility": "High",
+        "forecast": "Bearish due to expected surplus"
+    }
+
+    return {
+        "geoJSON": geojson,
+        "grid": risk_grid,
+        "priorities": [], # Can populate if needed
+        "summary": {
+            "totalCells": len(cells_with_risk),
+            "highRiskCells": high_risk,
+            "mediumRiskCells": medium_risk,
+            "lowRiskCells": low_risk,
+            "averageRisk": round(sum(risk_scores) / len(risk_scores), 1) if risk_scores else 0,
+            "areaKm2": round(area_km2, 2),
+        },
+        "marketData": market_data,
+        "satelliteImages": satellite_images,
+        "metadata": {
+            **budget.metadata(),
+            "gridGranularity": cell_size_km,
         }
-        
-        print(f">>> Sending: complete")
-        await websocket.send_json({'type': 'complete', 'step': 'complete', 'message': 'Analysis complete.', 'progressPercent': 100, 'data': response_data})
+    }
+
+
+def _performance_metadata(stats: dict, gee_calls: int, cells: int) -> dict:
+    """
+    Timings and counters of one analysis for the response metadata block
+    The prediction stage times the pipeline's own cell scoring (not yet
+    RiskPredictionModel, whose batch timings come from predict_batch_with_metadata).
+    """
+    prediction_seconds = stats['stageSeconds'].get('prediction')
+    return {
+        'stageSeconds': {name: round(seconds, 4) for name, seconds in stats['stageSeconds'].items()},
+        'cells': cells,
+        'cellsPerSecond': round(cells / prediction_seconds, 1) if prediction_seconds else None,
+        'geeCalls': gee_calls,
+        'cacheHits': stats['cacheHits'],
+        'cached': False,
+    }
+
+
+def _from_cache(result: dict) -> dict:
+    """
+    Cached result as served on a cache hit: its 'performance' block describes
+    the analysis that computed it, not this request, so it is marked cached
+    """
+    metadata = result.get('metadata') or {}
+    if 'performance' not in metadata:
+        return result
+    return {**result, 'metadata': {**metadata, 'performance': {**metadata['performance'], 'cached': True}}}
+
+
+async def _run_and_cache_analysis(
+    request: AnalysisRequest,
+    cache_key: str,
+    emit,
+    cancel_token: CancellationToken,
+    area_km2: Optional[float] = None,
+    profile_settings: Optional[dict] = None
+) -> Optional[dict]:
+    """
+    Run the pipeline, emit its terminal event and cache successful results
+    Returns the response payload, or None if the failure was reported to the client
+
+    With profile_settings (from Profiler.claim) the run is profiled under
+    its request id. The response metadata gets a 'performance' block with
+    the analysis's stage timings, throughput, GEE calls and cache hits
+    (marked 'cached' when the result is later served from the cache).
+    """
+    metrics = get_metrics()
+    metrics.in_flight.inc()
+    round_trips = track_round_trips()
+    stats = track_analysis_stats()
+    outcome = 'failed'
+    try:
+        with get_profiler().profile(current_request_id() or cache_key, profile_settings):
+            response_data = await run_analysis_pipeline(request, emit, area_km2=area_km2, cancel_token=cancel_token)
+        response_data['metadata']['performance'] = _performance_metadata(
+            stats, round_trips[0], response_data['summary']['totalCells']
+        )
+        outcome = 'degraded' if response_data.get('metadata', {}).get('degraded') else 'completed'
+    except (AnalysisCancelled, asyncio.CancelledError):
+        outcome = 'cancelled'
+        raise
+    except AnalysisError as e:
+        await emit({'type': 'error', 'step': 'error', 'message': str(e), 'progressPercent': 0})
+        return None
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        await emit({'type': 'error', 'step': 'error', 'message': f'Analysis failed: {str(e)}', 'progressPercent': 0})
+        return None
+    finally:
+        metrics.in_flight.dec()
+        metrics.analyses.inc(outcome=outcome)
+        metrics.gee_round_trips.observe(round_trips[0])
+
+    # Degraded results are not cached: a later request with more time should get the full analysis
+    if not response_data.get('metadata', {}).get('degraded'):
+        try:
+            await asyncio.to_thread(get_analysis_cache().put, cache_key, response_data, current_request_id())
+        except Exception as e:
+            log(f"Failed to cache analysis result: {e}", level='warning')
+
+    log("Sending: complete", step='complete')
+    await emit({'type': 'complete', 'step': 'complete', 'message': 'Analysis complete.', 'progressPercent': 100, 'data': response_data})
+    return response_data
+
+
+def _client_id(connection) -> str:
+    """Identify the submitting client for per-client admission budgets"""
+    client_id = connection.headers.get('x-client-id')
+    if client_id:
+        return client_id
+    return connection.client.host if connection.client else 'anonymous'
+
+
+async def submit_analysis(request: AnalysisRequest, client_id: str = 'anonymous'):
+    """
+    Submit an analysis as a background job
+    Cache hits are returned as already completed jobs; identical requests
+    in flight share one job. New work is costed from its area and grid
+    granularity before admission.
+
+    Raises:
+        AdmissionRejected: If the analysis is too large or the client/queue is over budget
+    """
+    cache_key = canonical_request_key(request.dict())
+    job_manager = get_job_manager()
+
+    cached = await asyncio.to_thread(get_analysis_cache().get, cache_key)
+    if cached is not None:
+        log("Serving cached analysis")
+        cached = _from_cache(cached)
+        job = await job_manager.add_completed(
+            cache_key,
+            {'type': 'complete', 'step': 'complete', 'message': 'Analysis complete.', 'progressPercent': 100, 'data': cached, 'cached': True},
+            cached
+        )
+        await asyncio.to_thread(get_analysis_cache().link, job.id, cache_key)
+        return job
+
+    # Budgeted runs may be degraded, so they only share jobs with the same budget
+    job_key = cache_key
+    if request.advanced.latencyBudgetSeconds is not None:
+        job_key = f"{cache_key}:budget={request.advanced.latencyBudgetSeconds}"
+
+    active = job_manager.find_active(job_key)
+    if active is not None:
+        return active
+
+    polygon = request.location.polygon
+    if not polygon or len(polygon) < 3:
+        raise AdmissionRejected('Invalid polygon', status_code=400)
+
+    with _stage('area'):
+        area_km2 = await _offload('gee', get_gee_instance().calculate_polygon_area_km2, polygon)
+    if area_km2 > MAX_AREA_KM2:
+        raise AdmissionRejected(f'Area too large: {area_km2:.1f} km². Maximum: {MAX_AREA_KM2} km²', status_code=413)
+
+    estimate = estimate_analysis_cost(area_km2, request.advanced.gridGranularity)
+    log(f"Admission: {estimate['areaKm2']} km², ~{estimate['cells']} cells, cost {estimate['cost']}", **estimate)
+
+    # Profiles are claimed when the job starts, so rejected or queue-full
+    # submissions don't use up an armed count
+    profile_attributes = {'clientId': client_id, 'cropType': request.parameters.cropType, 'areaKm2': area_km2}
+
+    return job_manager.submit(
+        job_key,
+        lambda emit, cancel_token: _run_and_cache_analysis(
+            request, cache_key, emit, cancel_token, area_km2=area_km2,
+            profile_settings=get_profiler().claim(**profile_attributes)
+        ),
+        cost=estimate['cost'],
+        client_id=client_id
+    )
+
+
+def _job_handle(job) -> dict:
+    """Build the client-facing handle for a job"""
+    return {
+        "jobId": job.id,
+        "status": job.status,
+        "statusUrl": f"/api/jobs/{job.id}",
+        "eventsUrl": f"/api/jobs/{job.id}/events",
+        "websocketUrl": f"/api/jobs/{job.id}/ws",
+        "estimatedCost": job.cost,
+        "estimatedWaitSeconds": job.estimated_wait_seconds,
+    }
+
+
+def _get_job_or_404(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Analysis job not found: {job_id}")
+    return job
+
+
+# Close codes sent when the browser closes the socket on purpose (abort, navigation).
+# 1005 (no status) is excluded: servers also report it for dropped connections.
+CLEAN_CLOSE_CODES = {1000, 1001}
+
+
+def _binary_grid_frames(event: dict):
+    """
+    Split a 'complete' event into a JSON message without the per-cell
+    payload (geoJSON and grid columns) and the binary grid frame that
+    follows it; the message's grid descriptor announces the frame.
+    Other events are returned unchanged with no frame.
+    """
+    data = event.get('data') or {}
+    if event.get('type') != 'complete' or not data.get('grid'):
+        return event, None
+
+    frame = encode_grid(data['grid'])
+    data = {k: v for k, v in data.items() if k not in ('geoJSON', 'grid')}
+    data['grid'] = {'format': GRID_FORMAT, 'byteLength': len(frame), 'cellCount': len(event['data']['grid']['cellIndex'])}
+    return {**event, 'data': data}, frame
+
+
+def _result_view_name(format: str) -> str:
+    """Result view (see result_view) sent by JSON responses: ?format=grid or the GeoJSON"""
+    return 'grid' if format == 'grid' else 'geojson'
+
+
+def _json_result_event(event: dict, format: str = 'json') -> dict:
+    """A 'complete' event with only the result view the client asked for"""
+    if event.get('type') != 'complete' or not event.get('data'):
+        return event
+    return {**event, 'data': result_view(event['data'], _result_view_name(format))}
+
+
+async def _stream_job_events(websocket: WebSocket, job, after: int = 0, format: str = 'json'):
+    """
+    Forward a job's progress events to a WebSocket client
+    The socket is read concurrently so a departing client is noticed at once
+    rather than on the next send. A clean close or a {"type": "cancel"}
+    message abandons the job (cancelled once no other client is watching);
+    an unclean drop leaves it resumable for a grace period.
+    The 'complete' message carries the result's GeoJSON, or with
+    format='grid' only its columnar grid; with format='binary' the grid is
+    sent as a binary frame right after the message instead.
+
+    Raises:
+        WebSocketDisconnect: If the client disconnected before the job finished
+    """
+    job_manager = get_job_manager()
+    job_manager.attach(job)
+    abandoned = False
+
+    async def forward_events():
+        async for event in job.subscribe(after=after):
+            frame = None
+            if format == 'binary':
+                event, frame = _binary_grid_frames(event)
+            else:
+                event = _json_result_event(event, format)
+            await send_ws_json(websocket, event)
+            if frame is not None:
+                await websocket.send_bytes(frame)
+
+    async def watch_client():
+        while True:
+            message = await websocket.receive()
+            if message['type'] == 'websocket.disconnect':
+                return message.get('code', 1000)
+            try:
+                if json.loads(message.get('text') or '{}').get('type') == 'cancel':
+                    return None
+            except (ValueError, AttributeError):
+                pass
+
+    sender = asyncio.create_task(forward_events())
+    watcher = asyncio.create_task(watch_client())
+    try:
+        await asyncio.wait({sender, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if sender.done():
+            sender.result()
+            return
+
+        close_code = watcher.result()
+        abandoned = close_code is None or close_code in CLEAN_CLOSE_CODES
+        if close_code is not None:
+            raise WebSocketDisconnect(close_code)
+        log(f"Client cancelled job {job.id}")
+    finally:
+        sender.cancel()
+        watcher.cancel()
+        job_manager.detach(job, abandoned=abandoned)
+
+
+def _rejection_headers(error: AdmissionRejected) -> Optional[dict]:
+    if error.estimated_wait_seconds is None:
+        return None
+    return {"Retry-After": str(max(1, int(round(error.estimated_wait_seconds))))}
+
+
+@app.post("/api/analyze", response_model=JobHandle, status_code=202)
+async def analyze_risk(request: AnalysisRequest, http_request: Request):
+    """
+    Main analysis endpoint
+    Submits the analysis as a background job and returns its handle.
+    Progress can be streamed (and resumed) via the handle's SSE or WebSocket URL.
+    Oversized or over-budget analyses are rejected (413/429/503) with Retry-After
+    when a wait estimate is available.
+    """
+    try:
+        job = await submit_analysis(request, _client_id(http_request))
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=_rejection_headers(e))
+    return _job_handle(job)
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_analysis_job(job_id: str, format: str = 'json'):
+    """
+    Job status, including the result once completed
+    The result carries its cells as GeoJSON, or with ?format=grid as the columnar grid
+    """
+    data = _get_job_or_404(job_id).to_dict(include_result=True)
+    if data.get('result'):
+        data['result'] = result_view(data['result'], _result_view_name(format))
+    # Rendered directly: results can hold tens of thousands of cells
+    return FastJSONResponse(data)
+
+
+async def _result_grid_or_404(analysis_id: str) -> dict:
+    """
+    Risk grid of a completed analysis job
+    Once the job is no longer retained (or after a restart) the grid is
+    read from the analysis cache entry the job's result was stored in.
+    """
+    job = get_job_manager().get(analysis_id)
+    if job is not None:
+        result = job.result if job.status == COMPLETED else None
+    else:
+        result = await asyncio.to_thread(get_analysis_cache().get_by_analysis_id, analysis_id)
+    grid = (result or {}).get('grid')
+    if grid is None:
+        raise HTTPException(status_code=404, detail=f"No result grid for analysis: {analysis_id}")
+    return grid
+
+
+def _check_tile_coordinates(z: int, x: int, y: int):
+    if not (0 <= z <= MAX_TILE_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail=f"Invalid tile coordinates: {z}/{x}/{y}")
+
+
+@app.get("/api/jobs/{job_id}/grid")
+async def get_analysis_job_grid(job_id: str):
+    """Result grid of a completed job as a binary frame (see services/grid_encoding.py)"""
+    return Response(content=encode_grid(await _result_grid_or_404(job_id)), media_type="application/octet-stream")
+
+
+@app.get("/api/analysis/{analysis_id}/tiles/{z}/{x}/{y}.mvt")
+async def get_analysis_tile(analysis_id: str, z: int, x: int, y: int):
+    """
+    Mapbox Vector Tile of a completed analysis's risk grid (layer 'risk')
+    The analysis id is its job id. Cells are merged into blocks at low zoom
+    levels; rendered tiles are cached.
+    """
+    _check_tile_coordinates(z, x, y)
+
+    tile_cache = get_tile_cache()
+    key = (analysis_id, z, x, y)
+    tile = tile_cache.get(key)
+    if tile is None:
+        grid = await _result_grid_or_404(analysis_id)
+        tile = await asyncio.to_thread(render_tile, grid, z, x, y)
+        tile_cache.put(key, tile)
+
+    return Response(content=tile, media_type=MVT_MEDIA_TYPE, headers={"Cache-Control": "public, max-age=3600"})
+
+
+@app.get("/api/analysis/{analysis_id}/tiles/{z}/{x}/{y}.png")
+async def get_analysis_raster_tile(analysis_id: str, z: int, x: int, y: int, threshold: float = 0):
+    """
+    PNG heatmap tile of a completed analysis's risk grid
+    Cells scoring below ?threshold= are transparent. Rendered tiles are cached.
+    """
+    _check_tile_coordinates(z, x, y)
+
+    tile_cache = get_raster_tile_cache()
+    key = (analysis_id, z, x, y, threshold)
+    tile = tile_cache.get(key)
+    if tile is None:
+        grid = await _result_grid_or_404(analysis_id)
+        tile = await asyncio.to_thread(render_raster_tile, grid, z, x, y, threshold)
+        tile_cache.put(key, tile)
+
+    return Response(content=tile, media_type=PNG_MEDIA_TYPE, headers={"Cache-Control": "public, max-age=3600"})
+
+
+async def _risk_map_image(analysis_id: str) -> Optional[bytes]:
+    """Cached whole-grid PNG of an analysis, or None if it has no result grid (the report notes the missing map)"""
+    tile_cache = get_raster_tile_cache()
+    key = (analysis_id, 'overview')
+    image = tile_cache.get(key)
+    if image is None:
+        try:
+            grid = await _result_grid_or_404(analysis_id)
+        except HTTPException:
+            return None
+        image = await asyncio.to_thread(render_grid_image, grid)
+        tile_cache.put(key, image)
+    return image
+
+
+@app.delete("/api/jobs/{job_id}", status_code=202)
+async def cancel_analysis_job(job_id: str):
+    """
+    Cancel a queued or running analysis job (no-op once finished)
+    A running job stops at its next cancellation check; poll the status URL
+    for the final 'cancelled' state.
+    """
+    _get_job_or_404(job_id)
+    return get_job_manager().cancel(job_id, 'Cancelled by client').to_dict()
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_analysis_job_events(job_id: str, request: Request, after: Optional[int] = None, format: str = 'json'):
+    """
+    Server-Sent Events stream of job progress
+    Resume by passing the Last-Event-ID header (or ?after=<count of events seen>);
+    ?format=grid sends the result's columnar grid instead of its GeoJSON
+    """
+    job = _get_job_or_404(job_id)
+
+    if after is None:
+        last_event_id = request.headers.get('last-event-id')
+        after = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+
+    async def event_stream():
+        job_manager = get_job_manager()
+        job_manager.attach(job)
+        try:
+            async for event in job.subscribe(after=after):
+                event = _json_result_event(event, format)
+                yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {dumps(event).decode()}\n\n"
+        finally:
+            # SSE cannot tell an abort from a dropped connection: keep the resume window
+            job_manager.detach(job)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.websocket("/api/jobs/{job_id}/ws")
+async def stream_analysis_job_websocket(websocket: WebSocket, job_id: str, after: int = 0, format: str = 'json'):
+    """
+    WebSocket stream of job progress
+    Reconnecting clients pass ?after=<count of events seen> to resume;
+    ?format=grid sends the result's columnar grid instead of its GeoJSON,
+    ?format=binary delivers the grid as a binary frame
+    """
+    await websocket.accept()
+
+    job = get_job_manager().get(job_id)
+    if job is None:
+        await send_ws_json(websocket, {'type': 'error', 'step': 'error', 'message': f'Analysis job not found: {job_id}', 'progressPercent': 0})
+        await websocket.close()
+        return
+
+    try:
+        await _stream_job_events(websocket, job, after=after, format=format)
+        await websocket.close()
+    except WebSocketDisconnect as e:
+        log(f"WebSocket disconnected from job {job_id} (code {e.code})")
+
+
+@app.websocket("/api/analyze/ws")
+async def analyze_risk_websocket(websocket: WebSocket, format: str = 'json'):
+    """
+    WebSocket analysis endpoint with real-time progress updates
+    The analysis runs as a background job: the first message carries its
+    jobId so a dropped client can resume via /api/jobs/{jobId}/ws.
+    ?format=grid sends the result's columnar grid instead of its GeoJSON,
+    ?format=binary delivers the grid as a binary frame.
+    """
+    await websocket.accept()
+    
+    try:
+        # Receive the request data
+        data = await websocket.receive_text()
+        request_dict = json.loads(data)
+        request = AnalysisRequest(**request_dict)
+
+        try:
+            job = await submit_analysis(request, _client_id(websocket))
+        except AdmissionRejected as e:
+            await send_ws_json(websocket, {'type': 'error', 'step': 'error', 'message': str(e), 'progressPercent': 0, 'estimatedWaitSeconds': e.estimated_wait_seconds})
+            await websocket.close()
+            return
+
+        await send_ws_json(websocket, {
+            'type': 'job', 'step': 'queued', 'jobId': job.id, 'status': job.status, 'progressPercent': 0,
+            'estimatedCost': job.cost, 'estimatedWaitSeconds': job.estimated_wait_seconds
+        })
+        await _stream_job_events(websocket, job, format=format)
         
         await websocket.close()
         
-    except WebSocketDisconnect:
-        print(">>> WebSocket disconnected")
+    except WebSocketDisconnect as e:
+        log(f"WebSocket disconnected (code {e.code})")
     except Exception as e:
         import traceback
         traceback.print_exc()
         try:
-            await websocket.send_json({'type': 'error', 'step': 'error', 'message': f'Analysis failed: {str(e)}', 'progressPercent': 0})
+            await send_ws_json(websocket, {'type': 'error', 'step': 'error', 'message': f'Analysis failed: {str(e)}', 'progressPercent': 0})
             await websocket.close()
         except:
             pass
 
 
-from fastapi.responses import StreamingResponse
 from backend.services.pdf_service import PDFService
 
 class PDFRequest(BaseModel):
@@ -537,6 +1251,7 @@ class PDFRequest(BaseModel):
     factors: List[dict]
     recommended_actions: List[str]
     polygon: Optional[List[dict]] = None
+    analysisId: Optional[str] = None  # Adds the analysis's risk map figure
 
 @app.post("/api/insurance/pdf")
 async def generate_pdf(request: PDFRequest):
@@ -544,8 +1259,12 @@ async def generate_pdf(request: PDFRequest):
     Generate a PDF report for the insurance policy.
     """
     try:
+        data = request.dict()
+        if request.analysisId:
+            data['risk_map_png'] = await _risk_map_image(request.analysisId)
+
         pdf_service = PDFService()
-        pdf_buffer = pdf_service.generate_insurance_report(request.dict())
+        pdf_buffer = pdf_service.generate_insurance_report(data)
         
         return StreamingResponse(
             pdf_buffer,
@@ -553,7 +1272,7 @@ async def generate_pdf(request: PDFRequest):
             headers={"Content-Disposition": "attachment; filename=insurance_proposal.pdf"}
         )
     except Exception as e:
-        print(f"ERROR: PDF generation failed: {str(e)}")
+        log(f"PDF generation failed: {str(e)}", level='error')
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/regions")
@@ -583,4 +1302,4 @@ async def get_regions():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True, ws_per_message_deflate=True)
@@ -5,11 +5,28 @@ Production model for pest/disease risk prediction using trained LightGBM
 
 import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import joblib
 import json
 import random
+import time
+
+try:
+    from backend.services.feature_engineering import FeatureTransform
+    from backend.utils.tracing import log, span
+except ImportError:  # imported with backend/ on sys.path (tests, scripts)
+    from services.feature_engineering import FeatureTransform
+    from utils.tracing import log, span
+
+
+def _default_value(feature: str) -> float:
+    """Value used for an agricultural feature that is missing from a cell"""
+    if 'encoded' in feature:
+        return 0
+    if 'dist_' in feature:
+        return 5000
+    return {'ndvi': 0.6, 'humidity': 60.0, 'temperature': 25.0, 'soil_moisture': 0.5}.get(feature, 0)
 
 
 class RiskPredictionModel:
@@ -23,8 +40,8 @@ class RiskPredictionModel:
         Initialize and load trained model
         
         Args:
-            model_path: Path to trained model pickle file
-                       (default: backend/models/trained/risk_model_v1.pkl)
+            model_path: Path to trained model pickle file, or a LightGBM text model (.txt)
+                       saved by ModelTrainer.save_model (default: backend/models/trained/risk_model_v1.pkl)
         """
         if model_path is None:
             model_path = Path(__file__).parent / 'trained' / 'risk_model_v1.pkl'
@@ -34,7 +51,9 @@ class RiskPredictionModel:
         self.model_path = model_path
         self.model = None
         self.feature_names = []
-        self.label_encoders = {}
+        self.label_encoders = {}  # feature -> categories, in code order
+        self.category_lookup = {}  # <feature>_encoded -> (feature, pd.Index of its categories)
+        self.feature_transform = None  # Derived features computed at prediction (older artifacts: none)
         self.metadata = {}
         self.is_loaded = False
         
@@ -51,21 +70,37 @@ class RiskPredictionModel:
         
         try:
             # Load model
-            print(f"Loading model from {self.model_path}...")
-            model_data = joblib.load(self.model_path)
-            
-            self.model = model_data['model']
-            self.feature_names = model_data['feature_names']
-            self.label_encoders = model_data.get('label_encoders', {})
-            
-            # Load metadata
-            metadata_path = self.model_path.parent / self.model_path.name.replace('.pkl', '_metadata.json')
+            log(f"Loading model from {self.model_path}...")
+            metadata_path = self.model_path.parent / f'{self.model_path.stem}_metadata.json'
             if metadata_path.exists():
                 with open(metadata_path, 'r') as f:
                     self.metadata = json.load(f)
             
+            if self.model_path.suffix == '.txt':
+                # Native LightGBM model; the preprocessing is in its metadata
+                import lightgbm as lgb
+                booster = lgb.Booster(model_file=str(self.model_path))
+                model_data = {**self.metadata, 'model': booster, 'feature_names': self.metadata.get('features') or booster.feature_name()}
+            else:
+                model_data = joblib.load(self.model_path)
+            
+            self.model = model_data['model']
+            self.feature_names = model_data['feature_names']
+            # Older artifacts hold fitted LabelEncoders rather than category lists
+            self.label_encoders = {
+                feature: [str(c) for c in getattr(encoder, 'classes_', encoder)]
+                for feature, encoder in model_data.get('label_encoders', {}).items()
+            }
+            self.category_lookup = {
+                f'{feature}_encoded': (feature, pd.Index(categories))
+                for feature, categories in self.label_encoders.items()
+                if f'{feature}_encoded' in self.feature_names
+            }
+            transform = model_data.get('feature_transform')
+            self.feature_transform = FeatureTransform.from_dict(transform) if transform else None
+            
             self.is_loaded = True
-            print(f"SUCCESS: Model loaded ({self.metadata.get('num_trees', 'unknown')} trees)")
+            log(f"Model loaded ({self.metadata.get('num_trees', 'unknown')} trees)", level='success')
             
         except FileNotFoundError:
             raise
@@ -87,91 +122,138 @@ class RiskPredictionModel:
         Returns:
             List of cells with predictions, confidence scores, and explanations
         """
+        predictions, _ = self.predict_batch_with_metadata(cells_with_features, threat_type)
+        return predictions
+
+    def predict_batch_with_metadata(
+        self,
+        cells_with_features: List[Dict[str, Any]],
+        threat_type: str = "pest_disease"
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Predict risk scores for a batch of grid cells, with batch metadata
+        
+        Returns:
+            (predictions as from predict_batch, metadata) where metadata holds
+            the model version and the measured feature matrix build, predict
+            and explanation times for the whole batch, in the shape of
+            ModelOutput.metadata (utils/schema.py)
+        """
         if not self.is_loaded:
             raise RuntimeError("Model not loaded. Cannot make predictions.")
 
         # Return empty list if no input
         if not cells_with_features:
-            return []
+            return [], self._batch_metadata(0, {})
 
+        timings = {}
         predictions = []
 
-        # Prepare features for batch prediction, replacing None/non-numeric with defaults
-        feature_data = []
-        original_missing = []
-        for cell in cells_with_features:
-            features = cell.get('features', {})
-            clean_features = {}
-            missing_count = 0
-            for feature in self.feature_names:
-                value = features.get(feature)
-                if value is None or (isinstance(value, str) and not value.replace('.', '', 1).isdigit()):
-                    missing_count += 1
-                    # Defaults for agricultural features
-                    if 'encoded' in feature:
-                        clean_features[feature] = 0
-                    elif 'dist_' in feature:
-                        clean_features[feature] = 5000
-                    elif feature == 'ndvi':
-                        clean_features[feature] = 0.6
-                    elif feature == 'humidity':
-                        clean_features[feature] = 60.0
-                    elif feature == 'temperature':
-                        clean_features[feature] = 25.0
-                    elif feature == 'soil_moisture':
-                        clean_features[feature] = 0.5
-                    else:
-                        clean_features[feature] = 0
-                else:
-                    clean_features[feature] = value
-            feature_data.append(clean_features)
-            original_missing.append(missing_count)
-
-        # Convert to DataFrame
-        df = pd.DataFrame(feature_data)
-
-        # Reorder columns to match training
-        df = df[self.feature_names]
+        # Prepare features for batch prediction in one columnar pass
+        started = time.perf_counter()
+        with span('model.prepare_features', cells=len(cells_with_features)):
+            df, original_missing = self._feature_matrix(cells_with_features)
+        timings['prepare_features_seconds'] = time.perf_counter() - started
 
         # Make predictions
-        risk_scores = self.model.predict(df, num_iteration=self.model.best_iteration)
+        started = time.perf_counter()
+        with span('model.predict', cells=len(cells_with_features)):
+            risk_scores = self.model.predict(df, num_iteration=self.model.best_iteration)
+        timings['predict_seconds'] = time.perf_counter() - started
 
         # Clip to valid range
         risk_scores = np.clip(risk_scores, 0, 100)
 
         # Build results
-        for i, cell in enumerate(cells_with_features):
-            risk_score = int(round(risk_scores[i]))
-            risk_level = self._categorize_risk(risk_score)
+        started = time.perf_counter()
+        with span('model.explain', cells=len(cells_with_features)):
+            for i, cell in enumerate(cells_with_features):
+                risk_score = int(round(risk_scores[i]))
+                risk_level = self._categorize_risk(risk_score)
 
-            # Calculate confidence (based on model if available)
-            confidence = self._calculate_confidence(risk_score, df.iloc[i])
-            # Penalize confidence if original input had missing features
-            if original_missing[i] > 0:
-                confidence *= max(0.5, 1 - (original_missing[i] / len(self.feature_names)))
+                # Calculate confidence (based on model if available)
+                confidence = self._calculate_confidence(risk_score, df.iloc[i])
+                # Penalize confidence if original input had missing features
+                if original_missing[i] > 0:
+                    confidence *= max(0.5, 1 - (original_missing[i] / len(self.feature_names)))
 
-            # Generate explanation
-            risk_factors = self._generate_risk_factors(
-                df.iloc[i].to_dict(),
-                risk_score,
-                threat_type
-            )
+                # Generate explanation
+                risk_factors = self._generate_risk_factors(
+                    df.iloc[i].to_dict(),
+                    risk_score,
+                    threat_type
+                )
 
-            predictions.append({
-                **cell,
-                'risk_score': risk_score,
-                'risk_level': risk_level,
-                'confidence': confidence,
-                'risk_factors': risk_factors,
-                'model_metadata': {
-                    'version': self.metadata.get('model_version', 'v2.0-agri'),
-                    'model_type': self.metadata.get('model_type', 'LightGBM (Agri)'),
-                    'features_used': len(self.feature_names),
-                    'prediction_time': '0.005s'
-                }
-            })
+                predictions.append({
+                    **cell,
+                    'risk_score': risk_score,
+                    'risk_level': risk_level,
+                    'confidence': confidence,
+                    'risk_factors': risk_factors,
+                })
+        timings['explain_seconds'] = time.perf_counter() - started
 
-        return predictions
+        return predictions, self._batch_metadata(len(predictions), timings)
+
+    def _feature_matrix(self, cells_with_features: List[Dict[str, Any]]) -> Tuple[pd.DataFrame, List[int]]:
+        """
+        Model input for a batch, built column by column: values that are
+        absent or not numeric count as missing and take the feature's
+        default, categories are coded in bulk, and derived features are
+        computed from the other columns by the model's feature transform
+        
+        Returns:
+            (float32 DataFrame in feature_names order, missing input count per cell)
+        """
+        derived = set(self.feature_transform.features) if self.feature_transform else set()
+        inputs = [f for f in self.feature_names if f not in derived]
+        transform_inputs = self.feature_transform.inputs if self.feature_transform else []
+        raw = pd.DataFrame(
+            [cell.get('features', {}) for cell in cells_with_features],
+            columns=list(dict.fromkeys(inputs + transform_inputs))
+        )
+        
+        df = raw[inputs].apply(pd.to_numeric, errors='coerce')
+        for column, codes in self._encode_categories(cells_with_features).items():
+            df[column] = df[column].fillna(pd.Series(codes, index=df.index))
+        original_missing = df.isna().sum(axis=1).tolist()
+        # Categories left missing stay NaN, LightGBM's missing category
+        df = df.fillna({f: _default_value(f) for f in inputs if f not in self.category_lookup})
+        
+        if self.feature_transform:
+            # Inputs of derived features that aren't model features themselves (e.g. after compaction) also take defaults
+            columns = {**{c: raw[c].fillna(_default_value(c)) for c in transform_inputs}, **{c: df[c] for c in df.columns}}
+            df = df.assign(**self.feature_transform.apply(columns))
+        return df[self.feature_names].astype(np.float32), original_missing
+
+    def _encode_categories(self, cells_with_features: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """
+        Codes of the categorical features for a batch, looked up in bulk
+        from the categories stored with the model (as in training)
+        
+        Returns:
+            Dictionary of <feature>_encoded -> float32 codes per cell (NaN: absent or unknown)
+        """
+        codes = {}
+        for column, (feature, categories) in self.category_lookup.items():
+            values = [cell.get('features', {}).get(feature) for cell in cells_with_features]
+            found = categories.get_indexer(pd.Index(values, dtype=object)).astype(np.float32)
+            found[found < 0] = np.nan
+            codes[column] = found
+        return codes
+
+    def _batch_metadata(self, cells: int, timings: Dict[str, float]) -> Dict[str, Any]:
+        """Model version and measured timings of one predict_batch call"""
+        total = sum(timings.values())
+        return {
+            'model_version': self.metadata.get('model_version', 'v2.0-agri'),
+            'model_type': self.metadata.get('model_type', 'LightGBM (Agri)'),
+            'features_used': len(self.feature_names),
+            'cells': cells,
+            **{name: round(seconds, 6) for name, seconds in timings.items()},
+            'processing_time_seconds': round(total, 6),
+            'cells_per_second': round(cells / total, 1) if total > 0 else None,
+        }
     
     def _categorize_risk(self, score: float) -> str:
         """Convert continuous risk score to categorical level"""
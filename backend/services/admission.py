@@ -0,0 +1,217 @@
+"""
+Analysis Admission Control
+Estimates the cost of an analysis from its area and grid granularity and
+schedules jobs shortest-first under global and per-client cost budgets
+"""
+
+import math
+import time
+from typing import Dict, List, Optional
+
+
+MAX_AREA_KM2 = 5000  # Larger area allowed for farms/regions
+
+# Fixed per-analysis work (geocoding, Gemini, Perplexity, thumbnails)
+# expressed in equivalent grid cells
+FIXED_COST_UNITS = 50
+
+DEFAULT_MAX_JOB_COST = 10000
+DEFAULT_GLOBAL_BUDGET = 12000
+DEFAULT_PER_CLIENT_BUDGET = 15000
+DEFAULT_SMALL_JOB_COST = 500
+DEFAULT_AGING_UNITS_PER_SECOND = 20.0
+DEFAULT_THROUGHPUT_UNITS_PER_SECOND = 5.0
+
+
+class AdmissionRejected(Exception):
+    """Raised when an analysis cannot be admitted"""
+
+    def __init__(self, message: str, status_code: int = 429, estimated_wait_seconds: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.estimated_wait_seconds = estimated_wait_seconds
+
+
+def estimate_cell_count(area_km2: float, cell_size_km: float) -> int:
+    """Approximate number of grid cells covering the area"""
+    cell_size_km = max(float(cell_size_km), 1e-6)
+    return max(1, int(math.ceil(area_km2 / (cell_size_km ** 2))))
+
+
+def estimate_analysis_cost(area_km2: float, cell_size_km: float) -> Dict[str, float]:
+    """
+    Estimate analysis cost in grid-cell units
+
+    Args:
+        area_km2: Polygon area (from GEESatellite.calculate_polygon_area_km2)
+        cell_size_km: Grid granularity
+
+    Returns:
+        Dictionary with areaKm2, cells and cost
+    """
+    cells = estimate_cell_count(area_km2, cell_size_km)
+    return {
+        'areaKm2': round(area_km2, 2),
+        'cells': cells,
+        'cost': cells + FIXED_COST_UNITS,
+    }
+
+
+class _ScheduledJob:
+    def __init__(self, job_id: str, client_id: str, cost: float):
+        self.job_id = job_id
+        self.client_id = client_id
+        self.cost = cost
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+
+
+class AnalysisScheduler:
+    """
+    Shortest-job-first scheduler with aging and cost budgets
+
+    - Jobs above max_job_cost are rejected outright
+    - A client's queued + running cost may not exceed per_client_budget
+    - Running jobs may not exceed global_budget in total (a lone job always runs)
+    - Jobs above small_job_cost don't occupy the last free worker, so small
+      farms are not stuck behind regional analyses, until aging has brought
+      their priority down to small_job_cost
+    - Waiting jobs gain priority over time (aging) so large jobs still run,
+      also when small jobs keep the other workers busy
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_job_cost: float = DEFAULT_MAX_JOB_COST,
+        global_budget: float = DEFAULT_GLOBAL_BUDGET,
+        per_client_budget: float = DEFAULT_PER_CLIENT_BUDGET,
+        small_job_cost: float = DEFAULT_SMALL_JOB_COST,
+        aging_units_per_second: float = DEFAULT_AGING_UNITS_PER_SECOND
+    ):
+        """
+        Initialize scheduler
+
+        Args:
+            max_workers: Concurrent jobs allowed by the worker pool
+            max_job_cost: Largest admissible job
+            global_budget: Total cost allowed to run at once
+            per_client_budget: Outstanding cost allowed per client
+            small_job_cost: Jobs at or below this cost count as small
+            aging_units_per_second: Priority boost per second of waiting
+        """
+        self.max_workers = max_workers
+        self.max_job_cost = max_job_cost
+        self.global_budget = global_budget
+        self.per_client_budget = per_client_budget
+        self.small_job_cost = small_job_cost
+        self.aging_units_per_second = aging_units_per_second
+        self.throughput = DEFAULT_THROUGHPUT_UNITS_PER_SECOND
+
+        self._queued: Dict[str, _ScheduledJob] = {}
+        self._running: Dict[str, _ScheduledJob] = {}
+
+    def check_admission(self, client_id: str, cost: float) -> float:
+        """
+        Decide whether a job may be queued
+
+        Returns:
+            Estimated wait in seconds before the job starts
+
+        Raises:
+            AdmissionRejected: If the job is too large or the client is over budget
+        """
+        if cost > self.max_job_cost:
+            raise AdmissionRejected(
+                f"Analysis too large: estimated {int(cost)} cost units "
+                f"(maximum {int(self.max_job_cost)}). Use a coarser grid or a smaller area.",
+                status_code=413
+            )
+
+        outstanding = self._client_cost(client_id)
+        if outstanding + cost > self.per_client_budget:
+            wait = self._drain_seconds(self._client_jobs(client_id))
+            raise AdmissionRejected(
+                f"Too many analyses in progress for this client "
+                f"({int(outstanding)} cost units outstanding). Retry in about {int(wait)}s.",
+                status_code=429,
+                estimated_wait_seconds=wait
+            )
+
+        return self.estimate_wait(cost)
+
+    def enqueue(self, job_id: str, client_id: str, cost: float):
+        """Add an admitted job to the queue"""
+        self._queued[job_id] = _ScheduledJob(job_id, client_id, cost)
+
+    def pop_runnable(self) -> Optional[str]:
+        """Return the id of the next job allowed to start, or None"""
+        if not self._queued or len(self._running) >= self.max_workers:
+            return None
+
+        now = time.monotonic()
+        running_cost = sum(job.cost for job in self._running.values())
+        last_free_worker = len(self._running) == self.max_workers - 1
+
+        for job in sorted(self._queued.values(), key=lambda j: self._priority(j, now)):
+            if self._running and running_cost + job.cost > self.global_budget:
+                continue
+            if last_free_worker and self.max_workers > 1 and self._priority(job, now) > self.small_job_cost:
+                continue
+
+            del self._queued[job.job_id]
+            job.started_at = now
+            self._running[job.job_id] = job
+            return job.job_id
+
+        return None
+
+    def finish(self, job_id: str):
+        """Release a job's budget and update the throughput estimate"""
+        job = self._running.pop(job_id, None) or self._queued.pop(job_id, None)
+        if job is None or job.started_at is None:
+            return
+
+        elapsed = time.monotonic() - job.started_at
+        if elapsed > 0:
+            observed = job.cost / elapsed
+            self.throughput = 0.8 * self.throughput + 0.2 * observed
+
+    def estimate_wait(self, cost: float) -> float:
+        """Estimated seconds before a new job of this cost would start"""
+        now = time.monotonic()
+        ahead = [job for job in self._queued.values() if self._priority(job, now) <= cost]
+        slots = self.max_workers
+        if self.max_workers > 1 and cost > self.small_job_cost:
+            slots -= 1  # large jobs cannot take the last free worker
+        if len(self._running) + len(ahead) < slots:
+            return 0.0
+        return self._drain_seconds(list(self._running.values()) + ahead)
+
+    def stats(self) -> Dict[str, float]:
+        """Queue depth, running cost and throughput"""
+        return {
+            'queued': len(self._queued),
+            'queuedCost': sum(job.cost for job in self._queued.values()),
+            'running': len(self._running),
+            'runningCost': sum(job.cost for job in self._running.values()),
+            'throughputUnitsPerSecond': round(self.throughput, 2),
+        }
+
+    def _priority(self, job: _ScheduledJob, now: float) -> float:
+        """Lower runs first: job cost minus credit for time spent waiting"""
+        return job.cost - self.aging_units_per_second * (now - job.enqueued_at)
+
+    def _client_jobs(self, client_id: str) -> List[_ScheduledJob]:
+        return [
+            job for job in list(self._queued.values()) + list(self._running.values())
+            if job.client_id == client_id
+        ]
+
+    def _client_cost(self, client_id: str) -> float:
+        return sum(job.cost for job in self._client_jobs(client_id))
+
+    def _drain_seconds(self, jobs: List[_ScheduledJob]) -> float:
+        """Time for the worker pool to process the given jobs"""
+        total = sum(job.cost for job in jobs)
+        return round(total / (self.throughput * self.max_workers), 1)
@@ -0,0 +1,313 @@
+"""
+Analysis Result Cache
+Caches completed analysis responses keyed by a canonical request hash
+and provides replayable progress channels for in-flight analyses
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import orjson
+
+
+# Bump when the shape of cached responses changes so stale entries are ignored
+CACHE_SCHEMA_VERSION = 2
+
+DEFAULT_TTL_SECONDS = 6 * 3600
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def canonical_request_key(request: Dict[str, Any]) -> str:
+    """
+    Build a stable hash for an analysis request
+
+    Only the inputs that change the analysis output are included: polygon,
+    date range, crop, risk factors and grid granularity. Coordinates are
+    rounded to 6 decimals (~0.1 m) so float noise from the map does not
+    defeat the cache.
+
+    Args:
+        request: AnalysisRequest as a plain dict (request.dict())
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    location = request.get('location') or {}
+    parameters = request.get('parameters') or {}
+    advanced = request.get('advanced') or {}
+    date_range = parameters.get('dateRange') or {}
+
+    polygon = [
+        [round(float(p['lat']), 6), round(float(p['lng']), 6)]
+        for p in (location.get('polygon') or [])
+    ]
+
+    canonical = {
+        'version': CACHE_SCHEMA_VERSION,
+        'location': {
+            'type': location.get('type'),
+            'farmId': location.get('farmId'),
+            'polygon': polygon,
+        },
+        'dateRange': [date_range.get('start'), date_range.get('end')],
+        'cropType': parameters.get('cropType'),
+        'riskFactors': sorted(parameters.get('riskFactors') or []),
+        'gridGranularity': float(advanced.get('gridGranularity', 1)),
+    }
+
+    encoded = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class AnalysisResultCache:
+    """
+    SQLite-backed cache of completed analysis responses
+    Entries expire after a TTL and the least recently used entries are
+    evicted once the entry count or total payload size exceeds its limit.
+    Analysis (job) ids are indexed to the entry holding their result so
+    it can still be found once the job itself is forgotten.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        """
+        Initialize cache
+
+        Args:
+            db_path: SQLite file path (default: backend/cache/analysis_cache.sqlite3)
+            ttl_seconds: Time-to-live for each entry
+            max_entries: Maximum number of cached analyses
+            max_bytes: Maximum total size of compressed payloads
+        """
+        if db_path is None:
+            db_path = Path(__file__).parent.parent / 'cache' / 'analysis_cache.sqlite3'
+        else:
+            db_path = Path(db_path)
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_results ("
+            " key TEXT PRIMARY KEY,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " size_bytes INTEGER NOT NULL,"
+            " payload BLOB NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_ids ("
+            " analysis_id TEXT PRIMARY KEY,"
+            " key TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, payload FROM analysis_results WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            created_at, payload = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM analysis_results WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE analysis_results SET last_access = ? WHERE key = ?",
+                (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        return orjson.loads(zlib.decompress(payload))
+
+    def get_by_analysis_id(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response of an analysis (see link), or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT key FROM analysis_ids WHERE analysis_id = ?",
+                (analysis_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return self.get(row[0])
+
+    def put(self, key: str, result: Dict[str, Any], analysis_id: Optional[str] = None):
+        """
+        Store a completed response and enforce size limits
+
+        Args:
+            key: Canonical request key
+            result: Response payload
+            analysis_id: Job id that computed it (see get_by_analysis_id)
+        """
+        payload = zlib.compress(orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS))
+        now = time.time()
+
+        if len(payload) > self.max_bytes:
+            print(f"WARNING: Analysis result too large to cache ({len(payload) / 1024:.1f} KB)")
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_results"
+                " (key, created_at, last_access, size_bytes, payload) VALUES (?, ?, ?, ?, ?)",
+                (key, now, now, len(payload), payload)
+            )
+            # Earlier analyses of this key computed the replaced result, not this one
+            self._conn.execute("DELETE FROM analysis_ids WHERE key = ?", (key,))
+            if analysis_id is not None:
+                self._link(analysis_id, key)
+            self._evict(now)
+            self._conn.commit()
+
+    def link(self, analysis_id: str, key: str):
+        """Index another analysis id (e.g. a cache hit's job) to the entry for key"""
+        with self._lock:
+            self._link(analysis_id, key)
+            self._conn.commit()
+
+    def invalidate(self, key: str):
+        """Remove a single entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM analysis_results WHERE key = ?", (key,))
+            self._conn.execute("DELETE FROM analysis_ids WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._conn.execute("DELETE FROM analysis_results")
+            self._conn.execute("DELETE FROM analysis_ids")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry count, stored bytes and hit/miss counters"""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM analysis_results"
+            ).fetchone()
+        return {
+            'entries': count,
+            'bytes': total,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def _evict(self, now: float):
+        """Drop expired entries, then least recently used ones over the limits"""
+        self._conn.execute(
+            "DELETE FROM analysis_results WHERE created_at < ?",
+            (now - self.ttl_seconds,)
+        )
+
+        rows = self._conn.execute(
+            "SELECT key, size_bytes FROM analysis_results ORDER BY last_access DESC"
+        ).fetchall()
+
+        total_bytes = 0
+        stale_keys = []
+        for index, (key, size_bytes) in enumerate(rows):
+            total_bytes += size_bytes
+            if index >= self.max_entries or total_bytes > self.max_bytes:
+                stale_keys.append((key,))
+
+        if stale_keys:
+            self._conn.executemany("DELETE FROM analysis_results WHERE key = ?", stale_keys)
+
+        self._conn.execute("DELETE FROM analysis_ids WHERE key NOT IN (SELECT key FROM analysis_results)")
+
+    def _link(self, analysis_id: str, key: str):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO analysis_ids (analysis_id, key) VALUES (?, ?)",
+            (analysis_id, key)
+        )
+
+
+class ProgressChannel:
+    """
+    Replayable stream of progress events for one in-flight analysis
+    Late subscribers receive every event published so far, then live events
+    """
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.done = False
+        self._condition = asyncio.Condition()
+
+    async def publish(self, event: Dict[str, Any]):
+        """Append an event (numbered by its 'seq' index) and wake all subscribers"""
+        async with self._condition:
+            self.events.append({**event, 'seq': len(self.events)})
+            self._condition.notify_all()
+
+    async def close(self):
+        """Mark the stream finished"""
+        async with self._condition:
+            self.done = True
+            self._condition.notify_all()
+
+    async def subscribe(self, after: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield events starting at index `after` until the stream is closed
+
+        Args:
+            after: Number of events the caller has already seen
+        """
+        index = after
+        while True:
+            async with self._condition:
+                while index >= len(self.events) and not self.done:
+                    await self._condition.wait()
+                pending = self.events[index:]
+                finished = self.done
+
+            for event in pending:
+                yield event
+            index += len(pending)
+
+            if finished and index >= len(self.events):
+                return
+
+
+# Singleton instance
+_cache_instance = None
+
+def get_analysis_cache() -> AnalysisResultCache:
+    """Get or create analysis result cache instance"""
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = AnalysisResultCache()
+    return _cache_instance
+
@@ -0,0 +1,122 @@
+"""
+Shared Feature Engineering
+Derived features computed column-wise over a whole feature matrix, in one
+vectorized pass. ModelTrainer uses it when training, RiskPredictionModel
+when serving and FeatureExtractor when extracting, so all of them compute
+identical values.
+
+A FeatureTransform names the derived features it adds. Only those names and
+the transform version are stored in a model artifact (see to_dict()); the
+formulas live here, so artifacts stay plain data.
+"""
+
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+TRANSFORM_VERSION = 1
+
+# Derived feature -> (input columns, formula over a mapping of column arrays)
+DERIVED_FEATURES = {
+    # Environmental stress: high humidity + high temperature = fungal risk
+    'fungal_risk_index': (('humidity', 'temperature'), lambda c: (c['humidity'] * c['temperature']) / 100),
+    'water_stress_index': (('soil_moisture', 'temperature'), lambda c: (1 - c['soil_moisture']) * (c['temperature'] / 30)),
+    # Pest vulnerability: closer to water + high temperature = pest risk
+    'pest_habitat_suitability': (('dist_to_water', 'temperature'), lambda c: (1 / (c['dist_to_water'] + 100)) * c['temperature']),
+    'crop_health_score': (('ndvi', 'soil_moisture'), lambda c: c['ndvi'] * c['soil_moisture']),
+    'pest_pressure_history': (
+        ('pest_reports_5km', 'days_since_last_report'),
+        lambda c: c['pest_reports_5km'] / (c['days_since_last_report'] + 1)
+    ),
+
+    # Proximity-based risk
+    'boundary_risk': (('dist_to_boundary',), lambda c: 1 / (c['dist_to_boundary'] + 100)),
+    'water_attraction': (('dist_to_water',), lambda c: 1 / (c['dist_to_water'] + 50)),
+    'access_ease': (('dist_to_road',), lambda c: 1 / (c['dist_to_road'] + 200)),
+    'isolation_score': (('dist_to_settlement', 'dist_to_road'), lambda c: (c['dist_to_settlement'] + c['dist_to_road']) / 2000),
+    # Vegetation and temporal indicators
+    'dense_vegetation': (('ndvi',), lambda c: (c['ndvi'] > 0.5).astype(np.int64)),
+    'dry_season': (('season',), lambda c: (c['season'] == 'dry').astype(np.int64)),
+    'is_weekend': (('day_of_week',), lambda c: np.isin(c['day_of_week'], [5, 6]).astype(np.int64)),
+}
+
+# Derived features of the agricultural risk model (ModelTrainer)
+AGRICULTURAL_FEATURES = (
+    'fungal_risk_index',
+    'water_stress_index',
+    'pest_habitat_suitability',
+    'crop_health_score',
+    'pest_pressure_history',
+)
+
+# Derived features added by FeatureExtractor
+EXTRACTOR_FEATURES = (
+    'boundary_risk',
+    'water_attraction',
+    'access_ease',
+    'isolation_score',
+    'dense_vegetation',
+    'dry_season',
+    'is_weekend',
+)
+
+
+class FeatureTransform:
+    """Vectorized derived features, shared by training and serving"""
+
+    def __init__(self, features: Sequence[str] = AGRICULTURAL_FEATURES):
+        """
+        Args:
+            features: Names of DERIVED_FEATURES to compute, in output order
+        """
+        unknown = [name for name in features if name not in DERIVED_FEATURES]
+        if unknown:
+            raise ValueError(f"Unknown derived features: {unknown}")
+        self.features = list(features)
+
+    @property
+    def inputs(self) -> List[str]:
+        """Columns the derived features are computed from"""
+        return list(dict.fromkeys(column for name in self.features for column in DERIVED_FEATURES[name][0]))
+
+    def apply(self, columns: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+        """
+        Compute the derived features
+
+        Args:
+            columns: Column name -> values (a DataFrame, or a dict of arrays)
+
+        Returns:
+            Dictionary of derived feature -> array
+        """
+        arrays = {column: np.asarray(columns[column]) for column in self.inputs}
+        return {name: DERIVED_FEATURES[name][1](arrays) for name in self.features}
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Copy of df with the derived features added (or recomputed) as columns"""
+        return df.assign(**self.apply(df))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-data form stored in a model artifact"""
+        return {'version': TRANSFORM_VERSION, 'features': self.features}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'FeatureTransform':
+        """Transform stored by to_dict()"""
+        if data.get('version', TRANSFORM_VERSION) > TRANSFORM_VERSION:
+            raise ValueError(f"Feature transform version {data['version']} is newer than supported ({TRANSFORM_VERSION})")
+        return cls(data['features'])
+
+
+def required_inputs(feature_names: Sequence[str], transform: Optional[FeatureTransform] = None) -> List[str]:
+    """
+    Cell features a model needs at prediction time: its own features, with
+    categories by their raw name, plus the inputs of its derived features
+    """
+    derived = set(transform.features) if transform else set()
+    inputs = [f[:-len('_encoded')] if f.endswith('_encoded') else f for f in feature_names if f not in derived]
+    if transform:
+        inputs += transform.inputs
+    return list(dict.fromkeys(inputs))
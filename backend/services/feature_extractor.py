@@ -11,6 +11,59 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import ephem
 
+try:
+    from backend.services.feature_engineering import EXTRACTOR_FEATURES, FeatureTransform, required_inputs
+    from backend.utils.cancellation import CancellationToken
+    from backend.utils.tracing import log, span
+except ImportError:  # imported with backend/ on sys.path (tests, scripts)
+    from services.feature_engineering import EXTRACTOR_FEATURES, FeatureTransform, required_inputs
+    from utils.cancellation import CancellationToken
+    from utils.tracing import log, span
+
+
+# Model inputs (with their defaults) when no model artifact is given
+DEFAULT_MODEL_INPUTS = {
+    # Satellite features
+    'ndvi': 0.5,
+    'vegetation_type_encoded': 2,
+    
+    # Proximity features
+    'dist_to_boundary': 10000,
+    'dist_to_water': 5000,
+    'dist_to_road': 10000,
+    'dist_to_settlement': 30000,
+    
+    # Historical features
+    'incidents_5km_radius': 0,
+    'days_since_last_incident': 180,
+    'seasonal_incident_rate': 0.05,
+    
+    # Temporal features
+    'moon_illumination': 0.5,
+    'season_encoded': 0,
+    'day_of_week': 3,
+    
+    # Topographical features
+    'elevation': 1000,
+    'slope': 10,
+    'terrain_ruggedness': 5,
+    
+    # Species features
+    'elephant_migration_route': 0,
+    'breeding_season': 0,
+    'watering_pattern_encoded': 1,
+    
+    # Derived features
+    'boundary_risk': 0,
+    'water_attraction': 0,
+    'access_ease': 0,
+    'isolation_score': 0,
+    'dense_vegetation': 0,
+    'dry_season': 0,
+    'is_weekend': 0,
+    'incident_density': 0,
+}
+
 
 class FeatureExtractor:
     """
@@ -18,9 +71,29 @@ class FeatureExtractor:
     Bridges gap between user map input and ML model input
     """
     
-    def __init__(self):
-        """Initialize feature extractor"""
-        self.feature_names = []
+    def __init__(self, model_features: Optional[List[str]] = None, feature_transform: Optional[FeatureTransform] = None):
+        """
+        Initialize feature extractor
+        
+        Args:
+            model_features: Feature list of the model artifact the cells are for;
+                            format_for_model_input outputs the inputs it needs
+                            (default: DEFAULT_MODEL_INPUTS)
+            feature_transform: The artifact's feature transform (its derived
+                               features are computed by the model from their inputs)
+        """
+        self.feature_names = list(model_features or [])
+        if model_features:
+            self.model_inputs = required_inputs(model_features, feature_transform)
+            self.defaults = {}
+        else:
+            self.model_inputs = list(DEFAULT_MODEL_INPUTS)
+            self.defaults = DEFAULT_MODEL_INPUTS
+    
+    @classmethod
+    def for_model(cls, model) -> 'FeatureExtractor':
+        """Extractor whose model input columns are those of a loaded RiskPredictionModel"""
+        return cls(model.feature_names, model.feature_transform)
     
     def extract_features_for_cells(
         self,
@@ -28,7 +101,8 @@ class FeatureExtractor:
         polygon: List[Dict[str, float]],
         date_start: str,
         date_end: str,
-        park_boundary: Optional[List[Dict]] = None
+        park_boundary: Optional[List[Dict]] = None,
+        cancel_token=None
     ) -> List[Dict[str, Any]]:
         """
         Extract all model features for grid cells
@@ -39,35 +113,45 @@ class FeatureExtractor:
             date_start: Analysis start date (YYYY-MM-DD)
             date_end: Analysis end date (YYYY-MM-DD)
             park_boundary: Optional park boundary polygon
+            cancel_token: Optional CancellationToken checked between cells and stages
         
         Returns:
             List of cells with extracted features ready for model prediction
         """
-        print(f"\nExtracting features for {len(cells)} cells...")
+        cancel_token = cancel_token or CancellationToken()
+        log(f"Extracting features for {len(cells)} cells...", cells=len(cells))
         
         # Extract satellite features
-        cells_with_satellite = self._extract_satellite_features(cells, date_start, date_end)
+        with span('features.satellite', cells=len(cells)):
+            cells_with_satellite = self._extract_satellite_features(cells, date_start, date_end, cancel_token)
+        cancel_token.raise_if_cancelled()
         
         # Calculate proximity features
-        cells_with_proximity = self._calculate_proximity_features(
-            cells_with_satellite, polygon, park_boundary
-        )
+        with span('features.proximity'):
+            cells_with_proximity = self._calculate_proximity_features(
+                cells_with_satellite, polygon, park_boundary
+            )
         
         # Add temporal features
-        cells_with_temporal = self._add_temporal_features(
-            cells_with_proximity, date_start, date_end
-        )
+        with span('features.temporal'):
+            cells_with_temporal = self._add_temporal_features(
+                cells_with_proximity, date_start, date_end
+            )
         
         # Add topographical features
-        cells_with_topo = self._extract_topographical_features(cells_with_temporal)
+        with span('features.topography', cells=len(cells)):
+            cells_with_topo = self._extract_topographical_features(cells_with_temporal, cancel_token)
+        cancel_token.raise_if_cancelled()
         
         # Add species features (placeholder for now)
-        cells_with_species = self._add_species_features(cells_with_topo)
+        with span('features.species'):
+            cells_with_species = self._add_species_features(cells_with_topo)
         
         # Calculate derived features (feature engineering)
-        cells_final = self._calculate_derived_features(cells_with_species)
+        with span('features.derived'):
+            cells_final = self._calculate_derived_features(cells_with_species)
         
-        print(f"SUCCESS: Extracted features for {len(cells_final)} cells")
+        log(f"Extracted features for {len(cells_final)} cells", level='success')
         
         return cells_final
     
@@ -75,13 +159,15 @@ class FeatureExtractor:
         self,
         cells: List[Dict],
         date_start: str,
-        date_end: str
+        date_end: str,
+        cancel_token=None
     ) -> List[Dict]:
         """
         Extract NDVI and vegetation features from satellite imagery
         Uses Google Earth Engine Sentinel-2 data
         """
-        print("  Extracting satellite features (NDVI, vegetation)...")
+        cancel_token = cancel_token or CancellationToken()
+        log("Extracting satellite features (NDVI, vegetation)...")
         
         # Create GEE points
         points = [
@@ -95,10 +181,12 @@ class FeatureExtractor:
             .filterDate(date_start, date_end) \
             .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 20))
         
-        image_count = collection.size().getInfo()
+        cancel_token.raise_if_cancelled()
+        with span('gee.image_count'):
+            image_count = collection.size().getInfo()
         
         if image_count == 0:
-            print("    WARNING: No satellite images available")
+            log("No satellite images available", level='warning')
             # Return cells with default NDVI
             for cell in cells:
                 cell['features'] = {
@@ -113,6 +201,7 @@ class FeatureExtractor:
         # Extract NDVI for each cell
         results = []
         for cell in cells:
+            cancel_token.raise_if_cancelled()
             point = ee.Geometry.Point([cell['center']['lng'], cell['center']['lat']])
             
             try:
@@ -121,7 +210,8 @@ class FeatureExtractor:
                 red = median.select('B4')
                 ndvi = nir.subtract(red).divide(nir.add(red))
                 
-                ndvi_value = ndvi.sample(point, 30).first().get('NDVI').getInfo()
+                with span('gee.sample_ndvi', cell=cell['id']):
+                    ndvi_value = ndvi.sample(point, 30).first().get('NDVI').getInfo()
                 ndvi_value = round(ndvi_value, 3) if ndvi_value else 0.5
                 
                 # Determine vegetation type from NDVI
@@ -141,7 +231,7 @@ class FeatureExtractor:
                 }
             
             except Exception as e:
-                print(f"    Error extracting NDVI for {cell['id']}: {str(e)}")
+                log(f"Error extracting NDVI for {cell['id']}: {str(e)}", level='error', cell=cell['id'])
                 cell['features'] = {
                     'ndvi': 0.5,
                     'vegetation_type': 'grassland',
@@ -165,7 +255,7 @@ class FeatureExtractor:
         - Distance to roads
         - Distance to settlements
         """
-        print("  Calculating proximity features...")
+        log("Calculating proximity features...")
         
         # Use user polygon as boundary if no park boundary provided
         if park_boundary is None:
@@ -212,7 +302,7 @@ class FeatureExtractor:
         - Season
         - Day of week
         """
-        print("  Adding temporal features...")
+        log("Adding temporal features...")
         
         # Use middle date of analysis period
         start = datetime.strptime(date_start, '%Y-%m-%d')
@@ -251,14 +341,15 @@ class FeatureExtractor:
         
         return cells
     
-    def _extract_topographical_features(self, cells: List[Dict]) -> List[Dict]:
+    def _extract_topographical_features(self, cells: List[Dict], cancel_token=None) -> List[Dict]:
         """
         Extract terrain features from DEM
         - Elevation
         - Slope
         - Terrain ruggedness
         """
-        print("  Extracting topographical features...")
+        cancel_token = cancel_token or CancellationToken()
+        log("Extracting topographical features...")
         
         # Use SRTM Digital Elevation Model
         dem = ee.Image('USGS/SRTMGL1_003')
@@ -267,15 +358,18 @@ class FeatureExtractor:
         slope = ee.Terrain.slope(dem)
         
         for cell in cells:
+            cancel_token.raise_if_cancelled()
             point = ee.Geometry.Point([cell['center']['lng'], cell['center']['lat']])
             
             try:
                 # Extract elevation
-                elevation = dem.sample(point, 30).first().get('elevation').getInfo()
+                with span('gee.sample_elevation', cell=cell['id']):
+                    elevation = dem.sample(point, 30).first().get('elevation').getInfo()
                 elevation = float(elevation) if elevation else 1000.0
                 
                 # Extract slope
-                slope_value = slope.sample(point, 30).first().get('slope').getInfo()
+                with span('gee.sample_slope', cell=cell['id']):
+                    slope_value = slope.sample(point, 30).first().get('slope').getInfo()
                 slope_value = float(slope_value) if slope_value else 10.0
                 
                 # Calculate terrain ruggedness index
@@ -289,7 +383,7 @@ class FeatureExtractor:
                 })
             
             except Exception as e:
-                print(f"    Error extracting terrain for {cell['id']}: {str(e)}")
+                log(f"Error extracting terrain for {cell['id']}: {str(e)}", level='error', cell=cell['id'])
                 cell['features'].update({
                     'elevation': 1000.0,
                     'slope': 10.0,
@@ -304,7 +398,7 @@ class FeatureExtractor:
         These would come from wildlife databases in production
         For now, use heuristics based on location
         """
-        print("  Adding species features...")
+        log("Adding species features...")
         
         for cell in cells:
             lat = cell['center']['lat']
@@ -344,27 +438,22 @@ class FeatureExtractor:
     def _calculate_derived_features(self, cells: List[Dict]) -> List[Dict]:
         """
         Calculate derived features used in model training
-        Must match feature engineering in model_trainer.py
+        Computed for all cells at once by the shared feature transform
+        (feature_engineering.py), as in training and serving
         """
-        print("  Calculating derived features...")
+        log("Calculating derived features...")
         
-        for cell in cells:
+        if not cells:
+            return cells
+        transform = FeatureTransform(EXTRACTOR_FEATURES)
+        derived = transform.apply({
+            column: [cell['features'][column] for cell in cells] for column in transform.inputs
+        })
+        derived = {name: values.tolist() for name, values in derived.items()}
+        
+        for i, cell in enumerate(cells):
             features = cell['features']
-            
-            # Proximity-based risk features
-            features['boundary_risk'] = 1 / (features['dist_to_boundary'] + 100)
-            features['water_attraction'] = 1 / (features['dist_to_water'] + 50)
-            features['access_ease'] = 1 / (features['dist_to_road'] + 200)
-            features['isolation_score'] = (
-                features['dist_to_settlement'] + features['dist_to_road']
-            ) / 2000
-            
-            # Vegetation binary
-            features['dense_vegetation'] = 1 if features['ndvi'] > 0.5 else 0
-            
-            # Temporal interactions
-            features['dry_season'] = 1 if features['season'] == 'dry' else 0
-            features['is_weekend'] = 1 if features['day_of_week'] in [5, 6] else 0
+            features.update({name: values[i] for name, values in derived.items()})
             
             # Historical features (placeholder - no historical data yet)
             # In production, query incident database
@@ -490,56 +579,15 @@ class FeatureExtractor:
             cells: Cells with extracted features
         
         Returns:
-            List of dictionaries with model input features
+            List of dictionaries with the model input features (model_inputs);
+            inputs the extractor did not produce are None when the columns
+            come from a model artifact, so the model counts them missing
         """
         model_inputs = []
         
         for cell in cells:
             features = cell['features']
-            
-            # Extract only features used in model training
-            # Must match feature list from model_trainer.py
-            model_input = {
-                # Satellite features
-                'ndvi': features.get('ndvi', 0.5),
-                'vegetation_type_encoded': features.get('vegetation_type_encoded', 2),
-                
-                # Proximity features
-                'dist_to_boundary': features.get('dist_to_boundary', 10000),
-                'dist_to_water': features.get('dist_to_water', 5000),
-                'dist_to_road': features.get('dist_to_road', 10000),
-                'dist_to_settlement': features.get('dist_to_settlement', 30000),
-                
-                # Historical features
-                'incidents_5km_radius': features.get('incidents_5km_radius', 0),
-                'days_since_last_incident': features.get('days_since_last_incident', 180),
-                'seasonal_incident_rate': features.get('seasonal_incident_rate', 0.05),
-                
-                # Temporal features
-                'moon_illumination': features.get('moon_illumination', 0.5),
-                'season_encoded': features.get('season_encoded', 0),
-                'day_of_week': features.get('day_of_week', 3),
-                
-                # Topographical features
-                'elevation': features.get('elevation', 1000),
-                'slope': features.get('slope', 10),
-                'terrain_ruggedness': features.get('terrain_ruggedness', 5),
-                
-                # Species features
-                'elephant_migration_route': features.get('elephant_migration_route', 0),
-                'breeding_season': features.get('breeding_season', 0),
-                'watering_pattern_encoded': features.get('watering_pattern_encoded', 1),
-                
-                # Derived features
-                'boundary_risk': features.get('boundary_risk', 0),
-                'water_attraction': features.get('water_attraction', 0),
-                'access_ease': features.get('access_ease', 0),
-                'isolation_score': features.get('isolation_score', 0),
-                'dense_vegetation': features.get('dense_vegetation', 0),
-                'dry_season': features.get('dry_season', 0),
-                'is_weekend': features.get('is_weekend', 0),
-                'incident_density': features.get('incident_density', 0)
-            }
+            model_input = {name: features.get(name, self.defaults.get(name)) for name in self.model_inputs}
             
             model_inputs.append({
                 'cell_id': cell['id'],
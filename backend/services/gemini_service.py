@@ -45,10 +45,14 @@ class GeminiService:
         # I will stick to what they provided but keep in mind version names.
         self.model_id = "gemini-2.0-flash-exp" 
 
-    def analyze_image_with_search(self, image_data: bytes, prompt: str):
+    def analyze_image_with_search(self, image_data: bytes, prompt: str, cancel_token=None):
         """
         Analyze an image using Gemini with Google Search grounding.
+        Raises AnalysisCancelled instead of calling (or returning) if cancel_token is cancelled.
         """
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        
         try:
             # Create config with Google Search tool
             config = GenerateContentConfig(
@@ -71,6 +75,9 @@ class GeminiService:
                 config=config
             )
             
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            
             # Extract relevant data
             result = {
                 "text": response.text,
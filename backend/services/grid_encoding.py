@@ -0,0 +1,247 @@
+"""
+Risk Grid Encoding
+Compact columnar representation of per-cell risk results (grid origin,
+step and shape plus typed arrays of cell indices, scores, levels and
+factor flags), its little-endian binary frame format, and the GeoJSON
+FeatureCollection kept as a compatibility view
+
+Binary frame layout (all little-endian):
+
+    offset  type        field
+    0       4s          magic b'SRG1'
+    4       uint16      format version
+    6       uint16      reserved (0)
+    8       float64     origin latitude (south-west corner)
+    16      float64     origin longitude
+    24      float64     latitude step (degrees)
+    32      float64     longitude step (degrees)
+    40      uint32      rows
+    44      uint32      cols
+    48      uint32      cell count N
+    52      uint32      byte length of the factor-name table
+    56      uint32[N]   cell index (row * cols + col)
+            float32[N]  risk score
+            uint32[N]   risk factor bitmask (bit i -> factorNames[i])
+            uint8[N]    risk level code (index into RISK_LEVELS)
+            padding to a multiple of 4 bytes
+            utf-8       factor-name table (JSON array of strings)
+
+The typed arrays start at 4-byte aligned offsets so browsers can view
+them in place (new Float32Array(buffer, offset, N)) without copying.
+"""
+
+import json
+import struct
+from typing import Any, Dict, List
+
+import numpy as np
+
+
+GRID_MAGIC = b'SRG1'
+GRID_FORMAT = 'srg1'
+GRID_FORMAT_VERSION = 1
+MAX_FACTORS = 32
+
+RISK_LEVELS = ['Low', 'Medium', 'High']
+
+_HEADER = struct.Struct('<4sHHddddIIII')
+
+
+def build_risk_grid(spec: Dict[str, Any], cells: List[Dict]) -> Dict[str, Any]:
+    """
+    Build the columnar risk grid for scored cells
+
+    Args:
+        spec: Grid spec from GEESatellite.grid_spec (origin, step, shape)
+        cells: Cells from GEESatellite.create_grid_cells with risk_score,
+               risk_level and risk_factors added, in cell-id order
+
+    Returns:
+        JSON-serializable dictionary with origin, step, shape, levels,
+        factorNames and the per-cell columns cellIndex, riskScore,
+        riskLevel (codes) and factorMask
+    """
+    cols = spec['shape'][1]
+
+    factor_names: List[str] = []
+    for cell in cells:
+        for factor in cell.get('risk_factors', []):
+            if factor not in factor_names:
+                factor_names.append(factor)
+    if len(factor_names) > MAX_FACTORS:
+        raise ValueError(f"At most {MAX_FACTORS} distinct risk factors can be encoded, got {len(factor_names)}")
+    factor_bits = {name: 1 << i for i, name in enumerate(factor_names)}
+
+    return {
+        'origin': dict(spec['origin']),
+        'step': dict(spec['step']),
+        'shape': list(spec['shape']),
+        'levels': list(RISK_LEVELS),
+        'factorNames': factor_names,
+        'cellIndex': [cell['row'] * cols + cell['col'] for cell in cells],
+        'riskScore': [cell['risk_score'] for cell in cells],
+        'riskLevel': [RISK_LEVELS.index(cell['risk_level']) for cell in cells],
+        'factorMask': [
+            sum(factor_bits[f] for f in cell.get('risk_factors', []))
+            for cell in cells
+        ],
+    }
+
+
+def build_geojson(grid: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    GeoJSON FeatureCollection view of a risk grid
+    One rectangular Polygon feature per cell with riskScore, riskLevel and
+    factors properties (the original /api/analyze response format);
+    factors are listed in factorNames order.
+
+    Args:
+        grid: Risk grid from build_risk_grid or decode_grid
+
+    Returns:
+        GeoJSON FeatureCollection
+    """
+    origin_lat, origin_lng = grid['origin']['lat'], grid['origin']['lng']
+    lat_step, lng_step = grid['step']['lat'], grid['step']['lng']
+    cols = grid['shape'][1]
+    levels = grid['levels']
+    factor_names = grid['factorNames']
+
+    features = []
+    for i, (index, score, level, mask) in enumerate(zip(
+        _as_list(grid['cellIndex']), _as_list(grid['riskScore']),
+        _as_list(grid['riskLevel']), _as_list(grid['factorMask'])
+    )):
+        row, col = divmod(index, cols)
+        south = origin_lat + row * lat_step
+        west = origin_lng + col * lng_step
+        north = south + lat_step
+        east = west + lng_step
+
+        features.append({
+            "type": "Feature",
+            "id": f"cell-{i}",
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [[
+                    [west, south],
+                    [east, south],
+                    [east, north],
+                    [west, north],
+                    [west, south]
+                ]]
+            },
+            "properties": {
+                "riskScore": score,
+                "riskLevel": levels[level],
+                "factors": [name for bit, name in enumerate(factor_names) if mask & (1 << bit)],
+            }
+        })
+
+    return {
+        "type": "FeatureCollection",
+        "features": features
+    }
+
+
+def result_view(result: Dict[str, Any], view: str = 'geojson') -> Dict[str, Any]:
+    """
+    Analysis result with a single representation of its cells
+    Results keep both the columnar 'grid' (for tiles and binary frames) and
+    its 'geoJSON' view; JSON responses send only one of them.
+
+    Args:
+        result: Analysis response payload
+        view: 'geojson' (the original response format) or 'grid'
+
+    Returns:
+        Shallow copy of result without the other representation
+    """
+    if view not in ('geojson', 'grid'):
+        raise ValueError(f"Unknown result view: {view}")
+    dropped = 'geoJSON' if view == 'grid' else 'grid'
+    return {k: v for k, v in result.items() if k != dropped}
+
+
+def encode_grid(grid: Dict[str, Any]) -> bytes:
+    """
+    Encode a risk grid as a binary frame (layout in the module docstring)
+
+    Args:
+        grid: Risk grid from build_risk_grid
+
+    Returns:
+        Frame bytes
+    """
+    count = len(grid['cellIndex'])
+    names = json.dumps(grid['factorNames']).encode('utf-8')
+
+    header = _HEADER.pack(
+        GRID_MAGIC, GRID_FORMAT_VERSION, 0,
+        grid['origin']['lat'], grid['origin']['lng'],
+        grid['step']['lat'], grid['step']['lng'],
+        grid['shape'][0], grid['shape'][1],
+        count, len(names)
+    )
+    levels = np.asarray(grid['riskLevel'], dtype='<u1').tobytes()
+
+    return b''.join([
+        header,
+        np.asarray(grid['cellIndex'], dtype='<u4').tobytes(),
+        np.asarray(grid['riskScore'], dtype='<f4').tobytes(),
+        np.asarray(grid['factorMask'], dtype='<u4').tobytes(),
+        levels,
+        b'\x00' * (-count % 4),
+        names,
+    ])
+
+
+def decode_grid(payload: bytes) -> Dict[str, Any]:
+    """
+    Decode a binary frame produced by encode_grid
+
+    Args:
+        payload: Frame bytes
+
+    Returns:
+        Risk grid with the per-cell columns as NumPy arrays
+
+    Raises:
+        ValueError: If the payload is not a supported grid frame
+    """
+    if len(payload) < _HEADER.size:
+        raise ValueError("Grid frame too short")
+
+    (magic, version, _, origin_lat, origin_lng, lat_step, lng_step,
+     rows, cols, count, names_length) = _HEADER.unpack_from(payload)
+    if magic != GRID_MAGIC:
+        raise ValueError(f"Not a risk grid frame (magic {magic!r})")
+    if version != GRID_FORMAT_VERSION:
+        raise ValueError(f"Unsupported risk grid format version {version}")
+
+    offset = _HEADER.size
+    cell_index = np.frombuffer(payload, dtype='<u4', count=count, offset=offset)
+    offset += 4 * count
+    risk_score = np.frombuffer(payload, dtype='<f4', count=count, offset=offset)
+    offset += 4 * count
+    factor_mask = np.frombuffer(payload, dtype='<u4', count=count, offset=offset)
+    offset += 4 * count
+    risk_level = np.frombuffer(payload, dtype='<u1', count=count, offset=offset)
+    offset += count + (-count % 4)
+
+    return {
+        'origin': {'lat': origin_lat, 'lng': origin_lng},
+        'step': {'lat': lat_step, 'lng': lng_step},
+        'shape': [rows, cols],
+        'levels': list(RISK_LEVELS),
+        'factorNames': json.loads(payload[offset:offset + names_length].decode('utf-8')),
+        'cellIndex': cell_index,
+        'riskScore': risk_score,
+        'riskLevel': risk_level,
+        'factorMask': factor_mask,
+    }
+
+
+def _as_list(column) -> list:
+    """Plain Python values for a list or NumPy column"""
+    return column.tolist() if isinstance(column, np.ndarray) else column
@@ -0,0 +1,360 @@
+"""
+Hyperparameter Search for the Agricultural Risk Model
+Hyperband over LightGBM's num_leaves, learning rate, feature/bagging
+fractions and regularization, with trials trained in a process pool.
+
+Each Hyperband bracket is a successive-halving run: many configurations
+are trained for a few boosting rounds, the best 1/eta of them continue
+(from their existing trees) with eta times the rounds, and so on up to
+max_rounds. Poor configurations are dropped after their first rung
+instead of being trained to completion.
+
+Every evaluation logs the validation RMSE next to an inference cost, the
+total leaves of the trees used for prediction (trees x leaves), so a model
+can be chosen on the accuracy/latency frontier.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+if not __package__:  # run as a script: python backend/services/hyperparameter_search.py
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    from backend.services.model_trainer import EARLY_STOPPING_ROUNDS, NUM_BOOST_ROUND, TRAINING_PARAMS, ModelTrainer
+except ImportError:  # imported with backend/ on sys.path (tests, scripts)
+    from services.model_trainer import EARLY_STOPPING_ROUNDS, NUM_BOOST_ROUND, TRAINING_PARAMS, ModelTrainer
+
+
+# Parameter -> (scale, low, high); 'log' and 'int_log' sample uniformly in log space
+SEARCH_SPACE = {
+    'num_leaves': ('int_log', 7, 255),
+    'learning_rate': ('log', 0.01, 0.3),
+    'feature_fraction': ('uniform', 0.5, 1.0),
+    'bagging_fraction': ('uniform', 0.5, 1.0),
+    'min_data_in_leaf': ('int_log', 5, 200),
+    'lambda_l1': ('log', 1e-3, 10.0),
+    'lambda_l2': ('log', 1e-3, 10.0),
+}
+
+DEFAULT_MIN_ROUNDS = 30
+DEFAULT_ETA = 3
+
+# Training data of the trials in this process (set by _init_worker)
+_trial_data = None
+
+
+def sample_configs(n: int, rng: np.random.Generator, space: Dict[str, Tuple] = SEARCH_SPACE) -> List[Dict[str, Any]]:
+    """
+    Draw n random configurations from the search space
+
+    Args:
+        n: Number of configurations
+        rng: Random generator
+        space: Parameter -> (scale, low, high), as SEARCH_SPACE
+
+    Returns:
+        List of parameter dictionaries
+    """
+    configs = [{} for _ in range(n)]
+    for name, (scale, low, high) in space.items():
+        if scale == 'uniform':
+            values = rng.uniform(low, high, n)
+        elif scale in ('log', 'int_log'):
+            values = np.exp(rng.uniform(np.log(low), np.log(high), n))
+        else:
+            raise ValueError(f"Unknown scale for {name}: {scale}")
+        for config, value in zip(configs, values):
+            config[name] = int(round(value)) if scale == 'int_log' else float(value)
+    return configs
+
+
+def hyperband_brackets(min_rounds: int, max_rounds: int, eta: int = DEFAULT_ETA) -> List[Tuple[int, int]]:
+    """
+    Hyperband's successive-halving brackets, most exploratory first
+
+    Every bracket ends with max_rounds and costs about the same; bracket s
+    starts ceil((s_max + 1) / (s + 1) * eta^s) configurations at max_rounds / eta^s.
+
+    Returns:
+        List of (number of configurations, rounds of the first rung)
+    """
+    s_max = int(math.floor(math.log(max_rounds / min_rounds, eta) + 1e-9))
+    return [
+        (int(math.ceil((s_max + 1) / (s + 1) * eta ** s)), max(1, int(round(max_rounds / eta ** s))))
+        for s in range(s_max, -1, -1)
+    ]
+
+
+def inference_cost(booster: lgb.Booster, num_iteration: Optional[int] = None) -> int:
+    """Leaves across the trees used for prediction (trees x leaves), the per-row work of predict()"""
+    trees = booster.dump_model(num_iteration=num_iteration)['tree_info']
+    return int(sum(tree['num_leaves'] for tree in trees))
+
+
+def _init_worker(data: Dict[str, Any]):
+    """Keep the trial data in the process, so tasks carry only parameters"""
+    global _trial_data
+    _trial_data = data
+
+
+def _run_trial(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Train one configuration up to task['rounds'] boosting rounds
+
+    Training continues from task['model'] (the configuration's booster from
+    the previous rung) when there is one. Early stopping on the validation
+    set ends configurations that stop improving before the rung's budget.
+    The returned model is truncated to the best iteration, so a promoted
+    configuration continues from its best trees, not the ones after them.
+    """
+    data = _trial_data
+    started = time.perf_counter()
+    params = {**TRAINING_PARAMS, **task['params'], 'num_threads': data['threads']}
+    train_set = lgb.Dataset(
+        data['X_train'], label=data['y_train'], categorical_feature=data['categorical_features'], free_raw_data=False
+    )
+    val_set = lgb.Dataset(data['X_val'], label=data['y_val'], reference=train_set)
+    init_model = lgb.Booster(model_str=task['model']) if task.get('model') else None
+    done = init_model.current_iteration() if init_model is not None else 0
+
+    booster = lgb.train(
+        params,
+        train_set,
+        num_boost_round=task['rounds'] - done,
+        init_model=init_model,
+        keep_training_booster=True,
+        valid_sets=[val_set],
+        valid_names=['valid'],
+        callbacks=[lgb.early_stopping(stopping_rounds=EARLY_STOPPING_ROUNDS, verbose=False)]
+    )
+    best_iteration = booster.best_iteration or booster.current_iteration()
+    predictions = booster.predict(data['X_val'], num_iteration=best_iteration)
+
+    return {
+        'config': task['config'],
+        'bracket': task['bracket'],
+        'rung': task['rung'],
+        'rounds': task['rounds'],
+        'params': task['params'],
+        'best_iteration': best_iteration,
+        'rmse': float(np.sqrt(np.mean((np.asarray(data['y_val']) - predictions) ** 2))),
+        'inference_cost': inference_cost(booster, best_iteration),
+        'stopped_early': booster.current_iteration() < task['rounds'],
+        'seconds': time.perf_counter() - started,
+        'model': booster.model_to_string(num_iteration=best_iteration),
+    }
+
+
+def pareto_frontier(trials: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Trials no other trial beats on both RMSE and inference cost, cheapest first"""
+    frontier = []
+    for trial in sorted(trials, key=lambda t: (t['inference_cost'], t['rmse'])):
+        if not frontier or trial['rmse'] < frontier[-1]['rmse']:
+            frontier.append(trial)
+    return frontier
+
+
+def select_trial(frontier: Sequence[Dict[str, Any]], max_cost: Optional[int] = None) -> Dict[str, Any]:
+    """Most accurate frontier trial within max_cost leaves (default: no limit)"""
+    affordable = [t for t in frontier if max_cost is None or t['inference_cost'] <= max_cost]
+    if not affordable:
+        raise ValueError(f"No configuration within an inference cost of {max_cost} (cheapest: {frontier[0]['inference_cost']})")
+    return min(affordable, key=lambda t: t['rmse'])
+
+
+def trial_params(trial: Dict[str, Any]) -> Dict[str, Any]:
+    """LightGBM parameters reproducing a trial with ModelTrainer.train(params=...)"""
+    return {**trial['params'], 'num_iterations': trial['best_iteration']}
+
+
+class HyperparameterSearch:
+    """Parallel Hyperband search over LightGBM parameters"""
+
+    def __init__(
+        self,
+        X_train: pd.DataFrame,
+        y_train: pd.Series,
+        X_val: pd.DataFrame,
+        y_val: pd.Series,
+        categorical_features: Sequence[str] = (),
+        space: Dict[str, Tuple] = SEARCH_SPACE,
+        min_rounds: int = DEFAULT_MIN_ROUNDS,
+        max_rounds: int = NUM_BOOST_ROUND,
+        eta: int = DEFAULT_ETA,
+        workers: Optional[int] = None,
+        threads_per_trial: Optional[int] = None,
+        seed: int = 42
+    ):
+        """
+        Args:
+            X_train, y_train: Data the trials train on
+            X_val, y_val: Data ranking the trials (and early stopping them)
+            categorical_features: Columns LightGBM treats as categorical
+            space: Parameter -> (scale, low, high), as SEARCH_SPACE
+            min_rounds: Boosting rounds of the most exploratory bracket's first rung
+            max_rounds: Boosting rounds of every bracket's last rung
+            eta: Each rung keeps the best 1/eta of its configurations, with eta times the rounds
+            workers: Trial processes (default: CPU count; 1: in this process)
+            threads_per_trial: LightGBM threads of each trial (default: CPUs / workers),
+                               so parallel trials don't oversubscribe the cores
+            seed: Seeds the sampled configurations
+        """
+        if min_rounds > max_rounds:
+            raise ValueError("min_rounds must not exceed max_rounds")
+        if eta < 2:
+            raise ValueError("eta must be at least 2")
+        cpus = os.cpu_count() or 1
+        self.workers = workers or cpus
+        self.threads_per_trial = threads_per_trial or max(1, cpus // self.workers)
+        self.data = {
+            'X_train': X_train,
+            'y_train': y_train,
+            'X_val': X_val,
+            'y_val': y_val,
+            'categorical_features': list(categorical_features),
+            'threads': self.threads_per_trial,
+        }
+        self.space = space
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.eta = eta
+        self.seed = seed
+
+    @classmethod
+    def from_trainer(cls, trainer: ModelTrainer, df: pd.DataFrame, **kwargs) -> 'HyperparameterSearch':
+        """
+        Search on the trainer's training and validation split of df; the
+        test split ModelTrainer.train() holds out is never seen
+        """
+        X, y = trainer.prepare_features(df)
+        X_train, X_val, _, y_train, y_val, _ = trainer.split_data(X, y)
+        return cls(X_train, y_train, X_val, y_val, trainer.categorical_features, **kwargs)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run every Hyperband bracket
+
+        Returns:
+            Dictionary with every evaluation ('trials', without boosters), the
+            accuracy/latency 'frontier' and the search settings
+        """
+        brackets = hyperband_brackets(self.min_rounds, self.max_rounds, self.eta)
+        rng = np.random.default_rng(self.seed)
+        print(f"Hyperband: {len(brackets)} brackets, {sum(n for n, _ in brackets)} configurations, "
+              f"{self.workers} workers x {self.threads_per_trial} threads")
+
+        configs = [sample_configs(n, rng, self.space) for n, _ in brackets]
+        first_ids = np.cumsum([0] + [n for n, _ in brackets]).tolist()
+        started = time.perf_counter()
+        trials = []
+        if self.workers == 1:
+            _init_worker(self.data)
+            try:
+                for index, (_, rounds) in enumerate(brackets):
+                    trials += self._successive_halving(map, index, configs[index], rounds, first_ids[index])
+            finally:
+                _init_worker(None)
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.data,)) as pool:
+                for index, (_, rounds) in enumerate(brackets):
+                    trials += self._successive_halving(pool.map, index, configs[index], rounds, first_ids[index])
+        elapsed = time.perf_counter() - started
+
+        for trial in trials:
+            trial.pop('model')
+        frontier = pareto_frontier(trials)
+        print(f"SUCCESS: {len(trials)} evaluations in {elapsed:.1f}s, {len(frontier)} on the frontier")
+        for trial in frontier:
+            print(f"  RMSE {trial['rmse']:7.3f}  cost {trial['inference_cost']:>7}  "
+                  f"({trial['best_iteration']} trees, num_leaves {trial['params']['num_leaves']})")
+
+        return {
+            'settings': {
+                'min_rounds': self.min_rounds,
+                'max_rounds': self.max_rounds,
+                'eta': self.eta,
+                'seed': self.seed,
+                'workers': self.workers,
+                'threads_per_trial': self.threads_per_trial,
+                'brackets': brackets,
+            },
+            'seconds': elapsed,
+            'trials': trials,
+            'frontier': frontier,
+        }
+
+    def _successive_halving(self, map_fn, bracket: int, configs: List[Dict], rounds: int, first_id: int) -> List[Dict]:
+        """One bracket: train all configs for rounds, keep the best 1/eta with eta times the rounds, repeat"""
+        tasks = [
+            {'config': first_id + i, 'bracket': bracket, 'rung': 0, 'rounds': rounds, 'params': config}
+            for i, config in enumerate(configs)
+        ]
+        evaluations = []
+        while True:
+            results = list(map_fn(_run_trial, tasks))
+            evaluations += results
+            keep = len(results) // self.eta
+            if keep == 0 or rounds >= self.max_rounds:
+                return evaluations
+            rounds = min(self.max_rounds, rounds * self.eta)
+            # Configurations early stopping ended have no more to gain from rounds
+            survivors = [r for r in sorted(results, key=lambda r: r['rmse'])[:keep] if not r['stopped_early']]
+            if not survivors:
+                return evaluations
+            tasks = [
+                {'config': r['config'], 'bracket': bracket, 'rung': r['rung'] + 1, 'rounds': rounds,
+                 'params': r['params'], 'model': r['model']}
+                for r in survivors
+            ]
+
+
+def main(argv=None):
+    """Search hyperparameters and write the results (and optionally the chosen parameters)"""
+    parser = argparse.ArgumentParser(description="Hyperband search over the agricultural risk model's LightGBM parameters")
+    parser.add_argument('--data', help="Training data CSV or partition directory (default: backend/data/training_data.csv)")
+    parser.add_argument('--max-rows', type=int, help="Search on the first rows only")
+    parser.add_argument('--min-rounds', type=int, default=DEFAULT_MIN_ROUNDS, help="Boosting rounds of the first rung")
+    parser.add_argument('--max-rounds', type=int, default=NUM_BOOST_ROUND, help="Boosting rounds of the last rung")
+    parser.add_argument('--eta', type=int, default=DEFAULT_ETA, help="Halving rate")
+    parser.add_argument('--workers', type=int, help="Trial processes (default: CPU count)")
+    parser.add_argument('--threads-per-trial', type=int, help="LightGBM threads per trial (default: CPUs / workers)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='hyperparameter_search.json', help="Results JSON (all trials and the frontier)")
+    parser.add_argument('--max-cost', type=int, help="Inference cost budget (leaves) for choosing a configuration")
+    parser.add_argument('--params-out', help="Write the chosen configuration's parameters, for model_trainer.py --params")
+    args = parser.parse_args(argv)
+
+    trainer = ModelTrainer(args.data)
+    search = HyperparameterSearch.from_trainer(
+        trainer, trainer.load_data(max_rows=args.max_rows),
+        min_rounds=args.min_rounds, max_rounds=args.max_rounds, eta=args.eta,
+        workers=args.workers, threads_per_trial=args.threads_per_trial, seed=args.seed
+    )
+    results = search.run()
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.params_out:
+        chosen = select_trial(results['frontier'], args.max_cost)
+        with open(args.params_out, 'w') as f:
+            json.dump(trial_params(chosen), f, indent=2)
+        print(f"Chosen: RMSE {chosen['rmse']:.3f}, cost {chosen['inference_cost']} -> {args.params_out}")
+        print(f"  Train it with: python backend/services/model_trainer.py --params {args.params_out}")
+
+
+if __name__ == '__main__':
+    main()
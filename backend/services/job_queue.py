@@ -0,0 +1,376 @@
+"""
+Analysis Job Queue
+Runs analyses as background jobs in a bounded worker pool so that work
+survives client disconnects and progress can be resumed by job id
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from backend.services.admission import AdmissionRejected, AnalysisScheduler
+from backend.services.analysis_cache import ProgressChannel
+from backend.utils.cancellation import AnalysisCancelled, CancellationToken
+from backend.utils.tracing import log, trace
+
+
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_MAX_QUEUED = 50
+DEFAULT_RETENTION_SECONDS = 3600
+# Most finished jobs kept for resuming; the oldest are forgotten first
+DEFAULT_MAX_RETAINED = 500
+# How long a job with no subscribers left stays resumable after an unclean drop
+DEFAULT_RESUME_GRACE_SECONDS = 30
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+Emit = Callable[[Dict[str, Any]], Awaitable[None]]
+Runner = Callable[[Emit, CancellationToken], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class QueueFullError(AdmissionRejected):
+    """Raised when the job queue cannot accept more work"""
+
+    def __init__(self, message: str, estimated_wait_seconds: Optional[float] = None):
+        super().__init__(message, status_code=503, estimated_wait_seconds=estimated_wait_seconds)
+
+
+class AnalysisJob:
+    """A single submitted analysis and its replayable progress events"""
+
+    def __init__(self, key: str, runner: Optional[Runner] = None, cost: float = 0, client_id: str = ''):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.runner = runner
+        self.cost = cost
+        self.client_id = client_id
+        self.estimated_wait_seconds = 0.0
+        self.cancel_token = CancellationToken()
+        self.subscribers = 0
+        self.status = QUEUED
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.channel = ProgressChannel()
+        self._task: Optional[asyncio.Task] = None
+        self._abandon_timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (COMPLETED, FAILED, CANCELLED)
+
+    async def emit(self, event: Dict[str, Any]):
+        """Publish a progress event tagged with this job's id"""
+        await self.channel.publish({**event, 'jobId': self.id})
+
+    def subscribe(self, after: int = 0):
+        """Stream events starting after the first `after` events"""
+        return self.channel.subscribe(after=after)
+
+    def to_dict(self, include_result: bool = False) -> Dict[str, Any]:
+        """Serialize job state for the status endpoint"""
+        data = {
+            'jobId': self.id,
+            'status': self.status,
+            'createdAt': self.created_at,
+            'startedAt': self.started_at,
+            'finishedAt': self.finished_at,
+            'eventCount': len(self.channel.events),
+            'estimatedCost': self.cost,
+            'estimatedWaitSeconds': self.estimated_wait_seconds,
+            'error': self.error,
+        }
+        if include_result and self.status == COMPLETED:
+            data['result'] = self.result
+        return data
+
+
+class AnalysisJobManager:
+    """
+    Bounded worker pool for analysis jobs
+    Identical requests (same key) attach to the active job instead of
+    starting a new one. Queued jobs are started by an AnalysisScheduler
+    (shortest job first under cost budgets). Finished jobs are retained
+    so clients can resume, up to retention_seconds and max_retained jobs.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+        retention_seconds: float = DEFAULT_RETENTION_SECONDS,
+        max_retained: int = DEFAULT_MAX_RETAINED,
+        scheduler: Optional[AnalysisScheduler] = None
+    ):
+        """
+        Initialize job manager
+
+        Args:
+            max_workers: Number of analyses processed concurrently
+            max_queued: Maximum jobs waiting for a worker
+            retention_seconds: How long finished jobs stay resumable
+            max_retained: Most finished jobs kept (each holds its result)
+            scheduler: Admission/ordering policy (default: AnalysisScheduler(max_workers))
+        """
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self.max_retained = max_retained
+        self.scheduler = scheduler or AnalysisScheduler(max_workers)
+
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._active_by_key: Dict[str, AnalysisJob] = {}
+        self._cached_by_key: Dict[str, AnalysisJob] = {}  # add_completed jobs, reused per key
+        self._tasks: Set[asyncio.Task] = set()
+        self._forget_listeners: List[Callable[[str], None]] = []
+
+    def on_forget(self, listener: Callable[[str], None]):
+        """Call listener(job_id) when a finished job is no longer retained"""
+        self._forget_listeners.append(listener)
+
+    def attach(self, job: AnalysisJob):
+        """Register a client streaming this job's progress"""
+        job.subscribers += 1
+        if job._abandon_timer is not None:
+            job._abandon_timer.cancel()
+            job._abandon_timer = None
+
+    def detach(self, job: AnalysisJob, abandoned: bool = False, grace_seconds: float = DEFAULT_RESUME_GRACE_SECONDS):
+        """
+        Unregister a streaming client
+        Once no subscribers remain, an unfinished job is cancelled: at once if
+        the client abandoned it (clean close or explicit cancel), otherwise
+        after grace_seconds so a dropped client can still resume.
+
+        Args:
+            job: Job the client was streaming
+            abandoned: Client left deliberately
+            grace_seconds: Resume window after an unclean disconnect
+        """
+        job.subscribers = max(0, job.subscribers - 1)
+        if job.subscribers > 0 or job.finished:
+            return
+
+        if abandoned:
+            self.cancel(job.id, 'Client disconnected')
+            return
+
+        if job._abandon_timer is None:
+            job._abandon_timer = asyncio.get_running_loop().call_later(
+                grace_seconds, self._cancel_if_unwatched, job
+            )
+
+    def cancel(self, job_id: str, reason: str = 'Analysis cancelled') -> Optional[AnalysisJob]:
+        """
+        Cancel a queued or running job
+        The job's CancellationToken is set so blocking work in worker threads
+        stops at its next check, and its task is cancelled so awaits return
+        immediately.
+
+        Returns:
+            The job, or None if unknown
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+
+        log(f"Cancelling analysis job {job.id}: {reason}", level='warning')
+        job.cancel_token.cancel(reason)
+
+        if job.status == RUNNING:
+            job._task.cancel()
+            return job
+
+        # Not started yet (queued, or dispatched but not yet scheduled): finish it here
+        if job._task is not None:
+            job._task.cancel()
+            job._task = None
+        self.scheduler.finish(job.id)
+        job.status = CANCELLED
+        job.error = reason
+        job.finished_at = time.time()
+        job.runner = None
+        self._release(job)
+        self._dispatch()
+
+        task = asyncio.create_task(self._close_cancelled(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def find_active(self, key: str) -> Optional[AnalysisJob]:
+        """Return the queued or running job for key, if any"""
+        return self._active_by_key.get(key)
+
+    def submit(self, key: str, runner: Runner, cost: float = 0, client_id: str = '') -> AnalysisJob:
+        """
+        Submit an analysis, or attach to the identical one already active
+
+        Args:
+            key: Canonical request key
+            runner: Coroutine function receiving (emit, cancel_token); returns
+                    the result payload on success or None on a reported failure
+            cost: Estimated cost in grid-cell units (see estimate_analysis_cost)
+            client_id: Submitting client, for per-client budgets
+
+        Returns:
+            The job handling this request
+
+        Raises:
+            AdmissionRejected: If the scheduler refuses the job
+            QueueFullError: If too many jobs are already waiting
+        """
+        self._purge_expired()
+
+        active = self._active_by_key.get(key)
+        if active is not None:
+            return active
+
+        wait = self.scheduler.check_admission(client_id, cost)
+
+        queued = self.scheduler.stats()['queued']
+        if queued >= self.max_queued:
+            raise QueueFullError(
+                f"Analysis queue is full ({self.max_queued} jobs waiting)",
+                estimated_wait_seconds=wait
+            )
+
+        job = AnalysisJob(key, runner, cost=cost, client_id=client_id)
+        job.estimated_wait_seconds = wait
+        self._jobs[job.id] = job
+        self._active_by_key[key] = job
+        self.scheduler.enqueue(job.id, client_id, cost)
+        self._dispatch()
+        return job
+
+    async def add_completed(self, key: str, event: Dict[str, Any], result: Dict[str, Any]) -> AnalysisJob:
+        """
+        Register an already finished job (e.g. a cache hit) so it can be fetched by id
+        Repeated hits for the same key reuse the retained job rather than
+        holding another copy of the result.
+        """
+        self._purge_expired()
+
+        existing = self._cached_by_key.get(key)
+        if existing is not None and existing.id in self._jobs:
+            return existing
+
+        job = AnalysisJob(key)
+        job.status = COMPLETED
+        job.result = result
+        job.started_at = job.finished_at = time.time()
+        self._jobs[job.id] = job
+        self._cached_by_key[key] = job
+
+        await job.emit(event)
+        await job.channel.close()
+        return job
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        """Look up a job by id"""
+        self._purge_expired()
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counts of queued, running and retained jobs plus scheduler budgets"""
+        self._purge_expired()
+        return {
+            **self.scheduler.stats(),
+            'retained': len(self._jobs),
+            'workers': self.max_workers,
+        }
+
+    def _dispatch(self):
+        """Start every queued job the scheduler allows (requires a running event loop)"""
+        while True:
+            job_id = self.scheduler.pop_runnable()
+            if job_id is None:
+                return
+            job = self._jobs[job_id]
+            job._task = asyncio.create_task(self._run(job))
+            self._tasks.add(job._task)
+            job._task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: AnalysisJob):
+        job.status = RUNNING
+        job.started_at = time.time()
+
+        try:
+            # The job id is the request id for tracing (see /api/debug/trace/{id})
+            with trace(job.id, 'analysis', cost=job.cost, client=job.client_id):
+                job.result = await job.runner(job.emit, job.cancel_token)
+            job.status = COMPLETED if job.result is not None else FAILED
+        except (asyncio.CancelledError, AnalysisCancelled):
+            job.status = CANCELLED
+            job.error = job.cancel_token.reason or 'Analysis cancelled'
+            job.result = None
+            await job.emit(self._cancelled_event(job))
+        except Exception as e:
+            log(f"Analysis job {job.id} crashed: {e}", level='error')
+            job.status = FAILED
+            job.error = str(e)
+            await job.emit({'type': 'error', 'step': 'error', 'message': f'Analysis failed: {str(e)}', 'progressPercent': 0})
+        finally:
+            job.finished_at = time.time()
+            job.runner = None
+            job._task = None
+            self._release(job)
+            self.scheduler.finish(job.id)
+            self._dispatch()
+            await job.channel.close()
+
+    async def _close_cancelled(self, job: AnalysisJob):
+        await job.emit(self._cancelled_event(job))
+        await job.channel.close()
+
+    @staticmethod
+    def _cancelled_event(job: AnalysisJob) -> Dict[str, Any]:
+        return {'type': 'cancelled', 'step': 'cancelled', 'message': job.error, 'progressPercent': 0}
+
+    def _release(self, job: AnalysisJob):
+        """Stop routing identical requests to a finished job"""
+        if self._active_by_key.get(job.key) is job:
+            del self._active_by_key[job.key]
+        if job._abandon_timer is not None:
+            job._abandon_timer.cancel()
+            job._abandon_timer = None
+
+    def _cancel_if_unwatched(self, job: AnalysisJob):
+        job._abandon_timer = None
+        if job.subscribers == 0 and not job.finished:
+            self.cancel(job.id, 'No client reconnected')
+
+    def _purge_expired(self):
+        """Forget finished jobs older than the retention window, then the oldest beyond max_retained"""
+        cutoff = time.time() - self.retention_seconds
+        finished = sorted((job for job in self._jobs.values() if job.finished), key=lambda job: job.finished_at)
+        excess = len(finished) - self.max_retained
+        for index, job in enumerate(finished):
+            if index < excess or job.finished_at < cutoff:
+                self._forget(job)
+
+    def _forget(self, job: AnalysisJob):
+        del self._jobs[job.id]
+        if self._cached_by_key.get(job.key) is job:
+            del self._cached_by_key[job.key]
+        for listener in self._forget_listeners:
+            listener(job.id)
+
+
+# Singleton instance
+_job_manager_instance = None
+
+def get_job_manager() -> AnalysisJobManager:
+    """Get or create analysis job manager instance"""
+    global _job_manager_instance
+    if _job_manager_instance is None:
+        _job_manager_instance = AnalysisJobManager()
+    return _job_manager_instance
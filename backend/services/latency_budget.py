@@ -0,0 +1,132 @@
+"""
+Analysis Latency Budget
+Tracks the time left for an analysis and degrades stages in a fixed order
+when it runs short: coarsen the grid, skip Gemini enrichment, serve cached
+Perplexity results, fall back to default NDVI
+"""
+
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from backend.utils.tracing import log
+except ImportError:  # imported with backend/ on sys.path (tests, scripts)
+    from utils.tracing import log
+
+
+# Expected stage durations (seconds) used for planning
+GEOCODE_SECONDS = 1.0
+GEMINI_SECONDS = 8.0
+PERPLEXITY_SECONDS = 6.0
+GEE_FIXED_SECONDS = 4.0  # Collection query and thumbnails
+GEE_SECONDS_PER_CELL = 0.35  # One sample().getInfo() round trip per cell
+MODELING_SECONDS = 0.5
+
+MAX_COARSENING_FACTOR = 4
+
+# Degradation steps, in the order they are applied
+COARSEN_GRID = 'coarsen_grid'
+SKIP_GEMINI = 'skip_gemini'
+CACHED_SEARCH = 'cached_search'
+DEFAULT_NDVI_FALLBACK = 'default_ndvi'
+DEGRADATION_ORDER = [COARSEN_GRID, SKIP_GEMINI, CACHED_SEARCH, DEFAULT_NDVI_FALLBACK]
+
+
+def estimate_extraction_seconds(cell_count: int) -> float:
+    """Expected GEE feature extraction time for a number of cells"""
+    return GEE_FIXED_SECONDS + cell_count * GEE_SECONDS_PER_CELL
+
+
+class LatencyBudget:
+    """
+    Remaining-time tracker for one analysis
+    Without a budget (seconds=None) every check passes and nothing is degraded.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize budget
+
+        Args:
+            seconds: Total latency budget, or None for unlimited
+            clock: Monotonic clock (injectable for tests)
+        """
+        self.seconds = seconds
+        self._clock = clock
+        self.started_at = clock()
+        self.degradations: List[Dict[str, Any]] = []
+
+    @property
+    def limited(self) -> bool:
+        return self.seconds is not None
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.degradations)
+
+    def elapsed(self) -> float:
+        return self._clock() - self.started_at
+
+    def remaining(self) -> float:
+        """Seconds left (infinite without a budget)"""
+        if not self.limited:
+            return math.inf
+        return self.seconds - self.elapsed()
+
+    def deadline(self, reserve_seconds: float = 0.0) -> Optional[float]:
+        """Clock value by which a stage must finish to leave reserve_seconds spare"""
+        if not self.limited:
+            return None
+        return self.started_at + self.seconds - reserve_seconds
+
+    def fits(self, seconds_needed: float) -> bool:
+        """Whether seconds_needed of work still fits in the budget"""
+        return self.remaining() >= seconds_needed
+
+    def degrade(self, step: str, detail: str):
+        """Record a degradation for the response metadata"""
+        log(f"Latency budget: {step} ({detail})", level='warning', step=step)
+        self.degradations.append({
+            'step': step,
+            'detail': detail,
+            'atSeconds': round(self.elapsed(), 2),
+        })
+
+    def plan_grid(self, area_km2: float, cell_size_km: int) -> int:
+        """
+        Choose the grid granularity for the analysis
+        The requested granularity is doubled (up to MAX_COARSENING_FACTOR
+        times) until feature extraction fits in the budget after the
+        enrichment stages.
+
+        Args:
+            area_km2: Polygon area
+            cell_size_km: Requested grid granularity
+
+        Returns:
+            Granularity to use
+        """
+        if not self.limited:
+            return cell_size_km
+
+        reserve = GEOCODE_SECONDS + GEMINI_SECONDS + PERPLEXITY_SECONDS + MODELING_SECONDS
+        size = cell_size_km
+        while size * 2 <= cell_size_km * MAX_COARSENING_FACTOR:
+            cells = math.ceil(area_km2 / (size ** 2))
+            if self.fits(reserve + estimate_extraction_seconds(cells)):
+                break
+            size *= 2
+
+        if size != cell_size_km:
+            self.degrade(COARSEN_GRID, f"grid coarsened from {cell_size_km} km to {size} km")
+        return size
+
+    def metadata(self) -> Dict[str, Any]:
+        """Budget summary for the response metadata block"""
+        return {
+            'latencyBudgetSeconds': self.seconds,
+            'elapsedSeconds': round(self.elapsed(), 2),
+            'degraded': self.degraded,
+            'degradations': list(self.degradations),
+        }
@@ -0,0 +1,230 @@
+"""
+Event Loop Monitor
+Measures event-loop lag and worker-thread saturation for /metrics, and logs
+the event loop thread's stack when a synchronous call stalls the loop (e.g.
+a blocking client call added inside an async handler)
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+from backend.services.metrics import AnalysisMetrics, get_metrics
+from backend.utils.tracing import log
+
+
+DEFAULT_INTERVAL_SECONDS = 0.1
+DEFAULT_STALL_THRESHOLD_SECONDS = 0.25
+MAX_STACK_FRAMES = 25
+
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# External services whose blocking clients run in worker threads (see offload())
+EXTERNAL_SERVICES = ('gee', 'nominatim', 'gemini', 'perplexity')
+
+# Stall causes
+BLOCKING_CALL = 'blocking_call'
+GIL_CONTENTION = 'gil_contention'
+
+# offload() call states
+_QUEUED = 'queued'
+_RUNNING = 'running'
+_ABANDONED = 'abandoned'
+
+
+class LoopMonitor:
+    """
+    Background monitor of the event loop and the default thread pool
+    A coroutine on the loop wakes every interval and records how late it
+    woke; a watchdog thread notices when it has not woken for longer than
+    the stall threshold and logs what the loop thread is running.
+    """
+
+    def __init__(
+        self,
+        metrics: Optional[AnalysisMetrics] = None,
+        interval: float = DEFAULT_INTERVAL_SECONDS,
+        stall_threshold: float = DEFAULT_STALL_THRESHOLD_SECONDS
+    ):
+        """
+        Args:
+            metrics: Metrics the monitor's series are registered with (default: get_metrics())
+            interval: Seconds between lag measurements
+            stall_threshold: Blocked time after which a stall is logged with the loop's stack
+        """
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.last_stall: Optional[Dict[str, Any]] = None
+
+        registry = (metrics or get_metrics()).registry
+        self.lag_seconds = registry.histogram(
+            'agrisentry_event_loop_lag_seconds',
+            'How late the event loop ran a callback scheduled by the monitor',
+            buckets=LAG_BUCKETS,
+        )
+        self.stalls = registry.counter(
+            'agrisentry_event_loop_stalls',
+            'Times the event loop was blocked for longer than the stall threshold, by cause',
+            ['cause'],
+        )
+        self.pool_queue_depth = registry.gauge(
+            'agrisentry_thread_pool_queue_depth',
+            'Calls waiting for a worker in the default thread pool',
+        )
+        self.pool_threads = registry.gauge(
+            'agrisentry_thread_pool_threads',
+            'Worker threads started by the default thread pool',
+        )
+        self.pool_max_workers = registry.gauge(
+            'agrisentry_thread_pool_max_workers',
+            'Size of the default thread pool',
+        )
+        self.executor_queued = registry.gauge(
+            'agrisentry_executor_queued',
+            'Blocking external-service calls waiting for a worker thread',
+            ['service'],
+        )
+        self.executor_active = registry.gauge(
+            'agrisentry_executor_active',
+            'Blocking external-service calls running in a worker thread',
+            ['service'],
+        )
+        for service in EXTERNAL_SERVICES:
+            self.executor_queued.set(0, service=service)
+            self.executor_active.set(0, service=service)
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start monitoring the running event loop (no-op if already started)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        # Joined off the loop: the watchdog may be busy reporting a stall
+        watchdog, self._watchdog = self._watchdog, None
+        if watchdog is not None:
+            await asyncio.to_thread(watchdog.join)
+
+    async def offload(self, service: str, fn: Callable, *args, **kwargs):
+        """
+        asyncio.to_thread(fn, ...) for a blocking external-service call,
+        counted as queued and then active under its service label
+        """
+        state = [_QUEUED]
+
+        def call():
+            with self._lock:
+                if state[0] == _QUEUED:
+                    self.executor_queued.dec(service=service)
+                state[0] = _RUNNING
+            self.executor_active.inc(service=service)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.executor_active.dec(service=service)
+
+        self.executor_queued.inc(service=service)
+        try:
+            return await asyncio.to_thread(call)
+        finally:
+            # Cancelled before a worker picked it up
+            with self._lock:
+                if state[0] == _QUEUED:
+                    self.executor_queued.dec(service=service)
+                    state[0] = _ABANDONED
+
+    async def _run(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        # A fresh event per run, so a restart never revives an unjoined watchdog
+        stop = self._stop = threading.Event()
+        self._watchdog = threading.Thread(target=self._watch, args=(stop,), name='loop-monitor', daemon=True)
+        self._watchdog.start()
+        try:
+            while True:
+                expected = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                self._heartbeat = now = time.monotonic()
+                self.lag_seconds.observe(max(0.0, now - expected))
+                self._sample_thread_pool()
+        finally:
+            stop.set()
+
+    def _sample_thread_pool(self):
+        # asyncio creates the default ThreadPoolExecutor on first use; its
+        # queue and threads are only reachable through private attributes
+        executor = getattr(self._loop, '_default_executor', None)
+        if executor is None:
+            return
+        self.pool_queue_depth.set(executor._work_queue.qsize())
+        self.pool_threads.set(len(executor._threads))
+        self.pool_max_workers.set(executor._max_workers)
+
+    def _watch(self, stop: threading.Event):
+        """Watchdog thread: report each stall once, while it is still in progress"""
+        reported = None
+        while not stop.wait(self.interval / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked >= self.stall_threshold and heartbeat != reported:
+                reported = heartbeat
+                self._report_stall(blocked)
+
+    def _report_stall(self, blocked: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        # A loop that is late while idle in select() is waiting for the GIL
+        # held by worker threads, not running a blocking call itself
+        idle = frame is not None and frame.f_code.co_name == 'select' and frame.f_code.co_filename.endswith('selectors.py')
+        cause = GIL_CONTENTION if idle else BLOCKING_CALL
+        stack = ''.join(traceback.format_stack(frame)[-MAX_STACK_FRAMES:]) if frame is not None and not idle else ''
+        task = None
+        if not idle:
+            try:
+                task = asyncio.current_task(self._loop)
+            except RuntimeError:
+                pass
+        task_name = task.get_name() if task is not None else None
+
+        self.stalls.inc(cause=cause)
+        self.last_stall = {'blockedSeconds': round(blocked, 3), 'cause': cause, 'task': task_name, 'stack': stack}
+        if idle:
+            log(f"Event loop delayed {blocked:.2f}s waiting for the GIL held by worker threads", level='warning', **self.last_stall)
+        else:
+            log(
+                f"Event loop blocked for {blocked:.2f}s (task {task_name or 'unknown'}); "
+                f"a synchronous call is running on the loop:\n{stack}",
+                level='warning',
+                **self.last_stall
+            )
+
+
+# Singleton instance
+_loop_monitor_instance = None
+
+def get_loop_monitor() -> LoopMonitor:
+    """Get or create loop monitor instance"""
+    global _loop_monitor_instance
+    if _loop_monitor_instance is None:
+        _loop_monitor_instance = LoopMonitor(stall_threshold=float(
+            os.getenv('LOOP_STALL_THRESHOLD_SECONDS', DEFAULT_STALL_THRESHOLD_SECONDS)
+        ))
+    return _loop_monitor_instance
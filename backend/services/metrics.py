@@ -0,0 +1,314 @@
+"""
+Analysis Metrics
+Counters, gauges and histograms for the analysis pipeline, rendered in the
+Prometheus text exposition format for the /metrics endpoint, plus the
+per-analysis stage timings reported in the response metadata
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from backend.utils.tracing import log
+except ImportError:  # imported with backend/ on sys.path (tests, scripts)
+    from utils.tracing import log
+
+
+PROMETHEUS_MEDIA_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Pipeline stages timed by AnalysisMetrics.stage()
+PIPELINE_STAGES = [
+    'area', 'geocode', 'gemini', 'perplexity', 'grid',
+    'gee_extraction', 'prediction', 'serialization',
+]
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+ROUND_TRIP_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+PER_CELL_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05)
+
+LabelValues = Tuple[str, ...]
+
+# Stats of the current analysis; asyncio.to_thread copies it to worker threads
+_analysis_stats: ContextVar[Optional[Dict[str, Any]]] = ContextVar('analysis_stats', default=None)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class _Metric:
+    """Base for labelled metrics; one series per combination of label values"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[LabelValues, object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {list(self.labelnames)}, got {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """(sample name, formatted labels, value) for every series"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(f'{name}{labels} {_format_value(value)}' for name, labels, value in self.samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._series.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, value in series:
+            yield f'{self.name}_total', _format_labels(self.labelnames, key), value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._series.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            series = sorted(self._series.items())
+        if not series and not self.labelnames:
+            series = [((), 0)]
+        for key, value in series:
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = STAGE_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def snapshot(self, **labels) -> Dict[str, float]:
+        """Sum and count of one series"""
+        series = self._series.get(self._key(labels))
+        return {'sum': series['sum'], 'count': series['count']} if series else {'sum': 0.0, 'count': 0}
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, {**value, 'counts': list(value['counts'])}) for key, value in self._series.items())
+        names = self.labelnames + ('le',)
+        for key, value in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, value['counts']):
+                cumulative += count
+                yield f'{self.name}_bucket', _format_labels(names, key + (_format_value(bound),)), cumulative
+            yield f'{self.name}_bucket', _format_labels(names, key + ('+Inf',)), value['count']
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum', labels, value['sum']
+            yield f'{self.name}_count', labels, value['count']
+
+
+class MetricsRegistry:
+    """Ordered collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = STAGE_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self, extra: Sequence[_Metric] = ()) -> str:
+        """Prometheus text exposition of every metric"""
+        lines = []
+        for metric in list(self._metrics.values()) + list(extra):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class AnalysisMetrics:
+    """Metrics recorded by the analysis pipeline"""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        self.stage_seconds = self.registry.histogram(
+            'agrisentry_stage_duration_seconds',
+            'Time spent in each analysis pipeline stage',
+            ['stage'],
+        )
+        self.analyses = self.registry.counter(
+            'agrisentry_analyses',
+            'Analyses run by the pipeline, by outcome',
+            ['outcome'],
+        )
+        self.in_flight = self.registry.gauge(
+            'agrisentry_analyses_in_flight',
+            'Analyses currently running',
+        )
+        self.gee_round_trips = self.registry.histogram(
+            'agrisentry_gee_round_trips_per_analysis',
+            'Google Earth Engine requests made by one analysis',
+            buckets=ROUND_TRIP_BUCKETS,
+        )
+        self.inference_seconds_per_cell = self.registry.histogram(
+            'agrisentry_model_inference_seconds_per_cell',
+            'Risk model inference time divided by the number of grid cells',
+            buckets=PER_CELL_BUCKETS,
+        )
+        self._caches: Dict[str, Callable[[], Dict]] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as a pipeline stage (recorded even if it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.stage_seconds.observe(seconds, stage=name)
+            stats = _analysis_stats.get()
+            if stats is not None:
+                stats['stageSeconds'][name] = stats['stageSeconds'].get(name, 0.0) + seconds
+
+    def observe_inference(self, seconds: float, cells: int):
+        """Record a model inference pass over a grid"""
+        if cells > 0:
+            self.inference_seconds_per_cell.observe(seconds / cells)
+
+    def track_cache(self, name: str, stats: Callable[[], Dict]):
+        """
+        Report a cache's hit ratio
+
+        Args:
+            name: Value of the 'cache' label
+            stats: Callable returning a dict with 'hits' and 'misses'
+        """
+        self._caches[name] = stats
+
+    def _cache_metrics(self) -> List[_Metric]:
+        hits = Counter('agrisentry_cache_hits', 'Cache lookups served from the cache', ['cache'])
+        misses = Counter('agrisentry_cache_misses', 'Cache lookups that missed', ['cache'])
+        ratio = Gauge('agrisentry_cache_hit_ratio', 'Fraction of cache lookups that hit', ['cache'])
+        for name, stats in self._caches.items():
+            try:
+                counts = stats()
+            except Exception as e:
+                log(f"Could not read {name} cache stats: {e}", level='warning')
+                continue
+            lookups = counts['hits'] + counts['misses']
+            hits.inc(counts['hits'], cache=name)
+            misses.inc(counts['misses'], cache=name)
+            ratio.set(counts['hits'] / lookups if lookups else 0.0, cache=name)
+        return [hits, misses, ratio]
+
+    def render(self) -> str:
+        """Prometheus text exposition of all analysis metrics"""
+        return self.registry.render(extra=self._cache_metrics())
+
+
+def track_analysis_stats() -> Dict[str, Any]:
+    """
+    Collect stage timings and cache hits of the current analysis from now on
+
+    Returns:
+        Dict with 'stageSeconds' (stage -> seconds) and 'cacheHits', updated in place
+    """
+    stats = {'stageSeconds': {}, 'cacheHits': 0}
+    _analysis_stats.set(stats)
+    return stats
+
+
+def count_cache_hit(count: int = 1):
+    """Count a cache hit towards the current analysis (no-op outside one)"""
+    stats = _analysis_stats.get()
+    if stats is not None:
+        stats['cacheHits'] += count
+
+
+# Singleton instance
+_metrics_instance = None
+
+def get_metrics() -> AnalysisMetrics:
+    """Get or create analysis metrics instance"""
+    global _metrics_instance
+    if _metrics_instance is None:
+        _metrics_instance = AnalysisMetrics()
+    return _metrics_instance
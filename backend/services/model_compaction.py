@@ -0,0 +1,180 @@
+"""
+Model Compaction for the Agricultural Risk Model
+Post-training step that makes the served model smaller and cheaper:
+1. Truncate the booster to its best iteration (trees after it are never used)
+2. Drop features with a negligible share of the total gain and retrain
+   without them, so serving computes (and extracts from GEE) fewer inputs
+3. Save in LightGBM's native text format instead of a joblib pickle
+
+compact_model() reports prediction speedup and test RMSE before and after.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+if not __package__:  # run as a script: python backend/services/model_compaction.py
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    from backend.services.feature_engineering import FeatureTransform, required_inputs
+    from backend.services.model_trainer import ModelTrainer
+except ImportError:  # imported with backend/ on sys.path (tests, scripts)
+    from services.feature_engineering import FeatureTransform, required_inputs
+    from services.model_trainer import ModelTrainer
+
+
+# Features below this share of the model's total gain are dropped
+DEFAULT_GAIN_THRESHOLD = 0.005
+DEFAULT_TIMING_REPEATS = 5
+
+
+def truncate_to_best_iteration(booster: lgb.Booster) -> lgb.Booster:
+    """Copy of booster holding only the trees up to its best iteration"""
+    best = booster.best_iteration if booster.best_iteration > 0 else None
+    return lgb.Booster(model_str=booster.model_to_string(num_iteration=best))
+
+
+def low_gain_features(booster: lgb.Booster, gain_threshold: float = DEFAULT_GAIN_THRESHOLD) -> List[str]:
+    """
+    Features whose share of the booster's total gain is below gain_threshold
+
+    The highest-gain feature is always kept.
+    """
+    gain = booster.feature_importance(importance_type='gain')
+    share = gain / gain.sum() if gain.sum() > 0 else np.zeros(len(gain))
+    top = int(np.argmax(gain))
+    return [name for i, name in enumerate(booster.feature_name()) if share[i] < gain_threshold and i != top]
+
+
+def time_predictions(booster: lgb.Booster, X: pd.DataFrame, repeats: int = DEFAULT_TIMING_REPEATS) -> float:
+    """Best-of-repeats seconds for booster.predict over X (best iteration only)"""
+    best = booster.best_iteration if booster.best_iteration > 0 else None
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        booster.predict(X, num_iteration=best)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def compact_model(
+    trainer: ModelTrainer,
+    X: pd.DataFrame,
+    y: pd.Series,
+    gain_threshold: float = DEFAULT_GAIN_THRESHOLD,
+    cv_folds: int = 5,
+    repeats: int = DEFAULT_TIMING_REPEATS
+) -> Dict[str, Any]:
+    """
+    Compact the trainer's model in place: truncate it to the best iteration
+    and, if any features fall below gain_threshold, retrain without them
+    (with the model's own parameters) and truncate the retrained model
+
+    Args:
+        trainer: Trainer holding the trained or loaded model
+        X, y: Prepared features and target the model was trained on (as from
+              prepare_features); the comparison uses train()'s test split
+        gain_threshold: Share of total gain below which a feature is dropped (0: keep all)
+        cv_folds: Cross-validation folds of the retraining
+        repeats: Timing repeats of each model's predictions
+
+    Returns:
+        Compaction report, also stored in trainer.metadata['compaction']
+    """
+    if trainer.model is None:
+        raise ValueError("No model to compact. Train or load a model first.")
+
+    baseline = trainer.model
+    features_before = list(trainer.feature_names)
+    inputs_before = required_inputs(features_before, trainer.feature_transform)
+    X_test, y_test = trainer.split_data(X, y)[2::3]
+    best = baseline.best_iteration if baseline.best_iteration > 0 else None
+    rmse_before = float(np.sqrt(np.mean((y_test - baseline.predict(X_test, num_iteration=best)) ** 2)))
+
+    print("\n" + "=" * 60)
+    print("Compacting model")
+    print("=" * 60)
+
+    compact = truncate_to_best_iteration(baseline)
+    dropped = low_gain_features(compact, gain_threshold)
+    print(f"  Truncated to {compact.num_trees()} of {baseline.num_trees()} trees")
+    print(f"  Features below {gain_threshold:.2%} of gain: {dropped or 'none'}")
+
+    if dropped:
+        kept = [f for f in features_before if f not in dropped]
+        trainer.feature_names = kept
+        trainer.categorical_features = [f for f in trainer.categorical_features if f in kept]
+        trainer.label_encoders = {
+            feature: categories for feature, categories in trainer.label_encoders.items() if f'{feature}_encoded' in kept
+        }
+        trainer.feature_transform = FeatureTransform([f for f in trainer.feature_transform.features if f in kept])
+        trainer.train(X[kept], y, cv_folds=cv_folds, params=trainer.metadata.get('params'))
+        compact = truncate_to_best_iteration(trainer.model)
+
+    features_after = list(trainer.feature_names)
+    rmse_after = float(np.sqrt(np.mean((y_test - compact.predict(X_test[features_after])) ** 2)))
+    seconds_before = time_predictions(baseline, X_test[features_before], repeats)
+    seconds_after = time_predictions(compact, X_test[features_after], repeats)
+
+    report = {
+        'gain_threshold': gain_threshold,
+        'trees_before': baseline.num_trees(),
+        'trees_used_before': best or baseline.num_trees(),
+        'trees_after': compact.num_trees(),
+        'features_before': len(features_before),
+        'features_after': len(features_after),
+        'dropped_features': dropped,
+        'inputs_before': inputs_before,
+        'inputs_after': required_inputs(features_after, trainer.feature_transform),
+        'test_rmse_before': rmse_before,
+        'test_rmse_after': rmse_after,
+        'rmse_delta': rmse_after - rmse_before,
+        'predict_seconds_before': seconds_before,
+        'predict_seconds_after': seconds_after,
+        'speedup': seconds_before / seconds_after if seconds_after > 0 else float('inf'),
+    }
+    trainer.model = compact
+    trainer.metadata['compaction'] = report
+
+    print(f"\nSUCCESS: {report['trees_before']} ({report['trees_used_before']} used) -> {report['trees_after']} trees, "
+          f"{report['features_before']} -> {report['features_after']} features, "
+          f"{len(report['inputs_before'])} -> {len(report['inputs_after'])} cell inputs")
+    print(f"  Test RMSE:   {rmse_before:.3f} -> {rmse_after:.3f} ({report['rmse_delta']:+.3f})")
+    print(f"  Predictions: {seconds_before * 1000:.2f} ms -> {seconds_after * 1000:.2f} ms "
+          f"({report['speedup']:.2f}x, {len(X_test)} rows)")
+
+    return report
+
+
+def main(argv=None):
+    """Compact a saved model and save it in LightGBM's native format"""
+    parser = argparse.ArgumentParser(description="Truncate, prune and re-save the agricultural risk model")
+    parser.add_argument('--data', help="Training data the model was trained on (default: backend/data/training_data.csv)")
+    parser.add_argument('--model', default='risk_model_v1.pkl', help="Model filename in backend/models/trained/")
+    parser.add_argument('--output', default='risk_model_v1_compact.txt', help="Compact model filename (.txt: LightGBM text format)")
+    parser.add_argument('--gain-threshold', type=float, default=DEFAULT_GAIN_THRESHOLD,
+                        help="Drop features below this share of total gain (0: only truncate)")
+    parser.add_argument('--cv-folds', type=int, default=5, help="Cross-validation folds of the retraining")
+    args = parser.parse_args(argv)
+
+    trainer = ModelTrainer(args.data)
+    trainer.load_model(args.model)
+    X, y = trainer.prepare_features(trainer.load_data(), fit=False)
+
+    compact_model(trainer, X, y, gain_threshold=args.gain_threshold, cv_folds=args.cv_folds)
+    model_path, _ = trainer.save_model(args.output)
+    source_kb = (trainer.models_dir / args.model).stat().st_size / 1024
+    print(f"\nCompact model saved to: {model_path}")
+    print(f"  File size: {source_kb:.1f} KB -> {model_path.stat().st_size / 1024:.1f} KB")
+    print(f"  Serve it with: RiskPredictionModel('{model_path}')")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,28 +3,90 @@ LightGBM Model Training Service
 Trains regression model for agricultural pest/disease risk prediction
 """
 
+import argparse
+import hashlib
+import inspect
 import lightgbm as lgb
 import pandas as pd
 import numpy as np
+import shutil
+import sys
 from pathlib import Path
-from typing import Dict, Tuple, Optional
+from typing import Any, Dict, Tuple, Optional
 import json
 import joblib
 from datetime import datetime
 from sklearn.model_selection import train_test_split, cross_val_score, KFold
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-from sklearn.preprocessing import LabelEncoder
+
+if not __package__:  # run as a script: python backend/services/model_trainer.py
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    from backend.services.feature_engineering import AGRICULTURAL_FEATURES, FeatureTransform
+except ImportError:  # imported with backend/ on sys.path (tests, scripts)
+    from services.feature_engineering import AGRICULTURAL_FEATURES, FeatureTransform
+
+
+# Categorical columns of the training data; each is fed to LightGBM as
+# <name>_encoded, a native categorical feature holding the category's code
+CATEGORICAL_FEATURES = ['crop_type', 'pest_pressure', 'crop_stage']
+
+MODELS_DIR = Path(__file__).parent.parent / 'models' / 'trained'
+
+# LightGBM parameters for regression
+TRAINING_PARAMS = {
+    'objective': 'regression',
+    'metric': 'rmse',
+    'boosting_type': 'gbdt',
+    'num_leaves': 31,
+    'learning_rate': 0.05,
+    'feature_fraction': 0.8,
+    'bagging_fraction': 0.8,
+    'bagging_freq': 5,
+    'max_depth': -1,
+    'min_data_in_leaf': 20,
+    'lambda_l1': 0.1,
+    'lambda_l2': 0.1,
+    'verbose': -1,
+    'seed': 42
+}
+NUM_BOOST_ROUND = 1000
+EARLY_STOPPING_ROUNDS = 50
+
+# Lighter parameters for each cross-validation fold
+CV_PARAMS = {
+    'objective': 'regression',
+    'metric': 'rmse',
+    'boosting_type': 'gbdt',
+    'num_leaves': 31,
+    'learning_rate': 0.05,
+    'feature_fraction': 0.8,
+    'verbose': -1,
+    'seed': 42
+}
+CV_NUM_BOOST_ROUND = 300
+CV_EARLY_STOPPING_ROUNDS = 30
+
+# Continued training on newly labeled observations (update())
+UPDATE_NUM_BOOST_ROUND = 100
+UPDATE_EARLY_STOPPING_ROUNDS = 20
+DEFAULT_REPLAY_ROWS = 20000
+
+_HASH_BLOCK_SIZE = 1 << 20
 
 
 class ModelTrainer:
     """LightGBM model training and evaluation for agricultural risk"""
     
-    def __init__(self, data_path: Optional[str] = None):
+    def __init__(self, data_path: Optional[str] = None, models_dir: Optional[str] = None):
         """
         Initialize trainer
         
         Args:
-            data_path: Path to training data CSV (default: backend/data/training_data.csv)
+            data_path: Path to training data CSV, or a directory of partitions written by
+                       synthetic_data_generator.py --output-dir (default: backend/data/training_data.csv)
+            models_dir: Where trained models are saved and looked up (default: backend/models/trained/)
         """
         if data_path is None:
             data_path = Path(__file__).parent.parent / 'data' / 'training_data.csv'
@@ -32,16 +94,22 @@ class ModelTrainer:
             data_path = Path(data_path)
         
         self.data_path = data_path
+        self.models_dir = Path(models_dir) if models_dir is not None else MODELS_DIR
         self.model = None
-        self.label_encoders = {}
+        self.label_encoders = {}  # feature -> categories, in code order
+        self.categorical_features = []
+        self.feature_transform = FeatureTransform(AGRICULTURAL_FEATURES)
         self.feature_names = []
         self.metadata = {}
         
         print(f"Model Trainer initialized with data: {data_path}")
     
-    def load_data(self) -> pd.DataFrame:
+    def load_data(self, max_rows: Optional[int] = None) -> pd.DataFrame:
         """
-        Load training data from CSV
+        Load training data from CSV or a partitioned dataset
+        
+        Args:
+            max_rows: Load only the first rows (default: all)
         
         Returns:
             DataFrame with all features and target
@@ -54,7 +122,14 @@ class ModelTrainer:
                 "Run: python backend/data/synthetic_data_generator.py"
             )
         
-        df = pd.read_csv(self.data_path)
+        if self.data_path.is_dir():
+            try:
+                from backend.data.synthetic_data_generator import read_partitions
+            except ImportError:  # imported with backend/ on sys.path (tests, scripts)
+                from data.synthetic_data_generator import read_partitions
+            df = read_partitions(self.data_path, max_rows=max_rows)
+        else:
+            df = pd.read_csv(self.data_path, nrows=max_rows)
         
         print(f"SUCCESS: Loaded {len(df)} samples with {len(df.columns)} features")
         print(f"  Risk score range: [{df['risk_score'].min():.1f}, {df['risk_score'].max():.1f}]")
@@ -62,16 +137,18 @@ class ModelTrainer:
         
         return df
     
-    def prepare_features(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    def prepare_features(self, df: pd.DataFrame, fit: bool = True) -> Tuple[pd.DataFrame, pd.Series]:
         """
         Prepare features for model training
         - Handle missing values
-        - Encode categorical features
+        - Encode categorical features as codes for LightGBM's native categoricals
         - Create derived features
-        - Split features and target
+        - Split features and target (features as float32)
         
         Args:
             df: Raw DataFrame
+            fit: Derive the category codes and feature list from df; False reuses
+                 those of the trained or loaded model, as update() needs
         
         Returns:
             Tuple of (X_features, y_target)
@@ -93,57 +170,66 @@ class ModelTrainer:
             if df[col].isnull().any() and col != 'risk_score':
                 df[col] = df[col].fillna(df[col].median())
         
-        # Encode categorical features
-        categorical_features = ['crop_type', 'pest_pressure', 'crop_stage']
-        
-        for feature in categorical_features:
-            if feature in df.columns:
-                le = LabelEncoder()
-                df[f'{feature}_encoded'] = le.fit_transform(df[feature])
-                self.label_encoders[feature] = le
-                print(f"  Encoded {feature}: {list(le.classes_)}")
-        
-        # Create derived features (feature engineering)
+        # Encode categorical features (sorted categories, so codes match LabelEncoder's)
+        if fit:
+            self.categorical_features = []
+        for feature in CATEGORICAL_FEATURES:
+            if feature not in df.columns:
+                continue
+            if fit:
+                self.label_encoders[feature] = [str(c) for c in sorted(df[feature].dropna().unique())]
+                self.categorical_features.append(f'{feature}_encoded')
+                print(f"  Encoded {feature}: {self.label_encoders[feature]}")
+            elif f'{feature}_encoded' not in self.categorical_features:
+                continue
+            # Categories the model has not seen become missing (NaN)
+            codes = pd.Index(self.label_encoders[feature]).get_indexer(df[feature].astype(str).where(df[feature].notna()))
+            df[f'{feature}_encoded'] = np.where(codes < 0, np.nan, codes)
+        
+        # Create derived features (shared with serving, see feature_engineering.py)
         print("\nCreating derived features...")
-        
-        # Environmental Stress Indices
-        # High humidity + High Temp = Fungal Risk
-        df['fungal_risk_index'] = (df['humidity'] * df['temperature']) / 100
-        
-        # Water Stress
-        df['water_stress_index'] = (1 - df['soil_moisture']) * (df['temperature'] / 30)
-        
-        # Pest Vulnerability
-        # Closer to water + High Temp = Pest Risk
-        df['pest_habitat_suitability'] = (1 / (df['dist_to_water'] + 100)) * df['temperature']
-        
-        # Crop Health
-        df['crop_health_score'] = df['ndvi'] * df['soil_moisture']
-        
-        # Historical Pressure
-        df['pest_pressure_history'] = df['pest_reports_5km'] / (df['days_since_last_report'] + 1)
+        df = self.feature_transform.transform(df)
         
         # Define feature columns (exclude identifiers and target)
-        exclude_cols = ['cell_id', 'lat', 'lng', 'risk_score', 
-                       'crop_type', 'pest_pressure', 'crop_stage']  # Use encoded versions
+        exclude_cols = ['cell_id', 'lat', 'lng', 'risk_score'] + CATEGORICAL_FEATURES  # Use encoded versions
         
-        self.feature_names = [col for col in df.columns if col not in exclude_cols]
+        if fit:
+            self.feature_names = [col for col in df.columns if col not in exclude_cols]
         
-        X = df[self.feature_names]
+        X = df[self.feature_names].astype(np.float32)
         y = df['risk_score']
         
-        print(f"SUCCESS: Prepared {len(self.feature_names)} features")
+        print(f"SUCCESS: Prepared {len(self.feature_names)} features ({len(self.categorical_features)} categorical)")
         print(f"  Feature list: {self.feature_names[:10]}... (showing first 10)")
         
         return X, y
     
+    def split_data(self, X: pd.DataFrame, y: pd.Series, test_size: float = 0.15, val_size: float = 0.15) -> Tuple:
+        """
+        Stratified train/validation/test split used by train()
+        
+        Returns:
+            Tuple of (X_train, X_val, X_test, y_train, y_val, y_test)
+        """
+        X_temp, X_test, y_temp, y_test = train_test_split(
+            X, y, test_size=test_size, random_state=42, stratify=pd.cut(y, bins=[0, 40, 60, 80, 100])
+        )
+        
+        val_size_adjusted = val_size / (1 - test_size)
+        X_train, X_val, y_train, y_val = train_test_split(
+            X_temp, y_temp, test_size=val_size_adjusted, random_state=42,
+            stratify=pd.cut(y_temp, bins=[0, 40, 60, 80, 100])
+        )
+        return X_train, X_val, X_test, y_train, y_val, y_test
+    
     def train(
         self, 
         X: pd.DataFrame, 
         y: pd.Series,
         test_size: float = 0.15,
         val_size: float = 0.15,
-        cv_folds: int = 5
+        cv_folds: int = 5,
+        params: Optional[Dict] = None
     ) -> Dict:
         """
         Train LightGBM model with cross-validation
@@ -154,6 +240,8 @@ class ModelTrainer:
             test_size: Proportion for test set
             val_size: Proportion for validation set (from remaining data)
             cv_folds: Number of cross-validation folds
+            params: LightGBM parameters overriding TRAINING_PARAMS, e.g. a configuration
+                    chosen by hyperparameter_search.py ('num_iterations' caps the trees)
         
         Returns:
             Dictionary with training metrics and model
@@ -163,15 +251,7 @@ class ModelTrainer:
         print("=" * 60)
         
         # Split data: train/val/test
-        X_temp, X_test, y_temp, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=42, stratify=pd.cut(y, bins=[0, 40, 60, 80, 100])
-        )
-        
-        val_size_adjusted = val_size / (1 - test_size)
-        X_train, X_val, y_train, y_val = train_test_split(
-            X_temp, y_temp, test_size=val_size_adjusted, random_state=42,
-            stratify=pd.cut(y_temp, bins=[0, 40, 60, 80, 100])
-        )
+        X_train, X_val, X_test, y_train, y_val, y_test = self.split_data(X, y, test_size, val_size)
         
         print(f"\nData Split:")
         print(f"  Training:   {len(X_train)} samples ({len(X_train)/len(X)*100:.1f}%)")
@@ -179,40 +259,29 @@ class ModelTrainer:
         print(f"  Test:       {len(X_test)} samples ({len(X_test)/len(X)*100:.1f}%)")
         
         # Create LightGBM datasets
-        train_data = lgb.Dataset(X_train, label=y_train, feature_name=self.feature_names)
-        val_data = lgb.Dataset(X_val, label=y_val, reference=train_data, feature_name=self.feature_names)
-        
-        # LightGBM parameters for regression
-        params = {
-            'objective': 'regression',
-            'metric': 'rmse',
-            'boosting_type': 'gbdt',
-            'num_leaves': 31,
-            'learning_rate': 0.05,
-            'feature_fraction': 0.8,
-            'bagging_fraction': 0.8,
-            'bagging_freq': 5,
-            'max_depth': -1,
-            'min_data_in_leaf': 20,
-            'lambda_l1': 0.1,
-            'lambda_l2': 0.1,
-            'verbose': -1,
-            'seed': 42
-        }
+        train_data = lgb.Dataset(
+            X_train, label=y_train, feature_name=self.feature_names, categorical_feature=self.categorical_features
+        )
+        val_data = lgb.Dataset(
+            X_val, label=y_val, reference=train_data, feature_name=self.feature_names,
+            categorical_feature=self.categorical_features
+        )
+        
+        params = {**TRAINING_PARAMS, **(params or {})}
         
         print("\nTraining model...")
         print(f"Parameters: {params}")
         
         # Train model
         callbacks = [
-            lgb.early_stopping(stopping_rounds=50, verbose=False),
+            lgb.early_stopping(stopping_rounds=EARLY_STOPPING_ROUNDS, verbose=False),
             lgb.log_evaluation(period=100)
         ]
         
         self.model = lgb.train(
             params,
             train_data,
-            num_boost_round=1000,
+            num_boost_round=NUM_BOOST_ROUND,
             valid_sets=[train_data, val_data],
             valid_names=['train', 'valid'],
             callbacks=callbacks
@@ -269,9 +338,12 @@ class ModelTrainer:
             'test_r2': float(test_metrics['r2']),
             'cv_rmse_mean': float(cv_scores['rmse_mean']),
             'cv_rmse_std': float(cv_scores['rmse_std']),
+            'params': params,
             'features': self.feature_names,
             'feature_importance': importance_df.to_dict('records'),
-            'label_encoders': {k: list(v.classes_) for k, v in self.label_encoders.items()}
+            'categorical_features': self.categorical_features,
+            'label_encoders': self.label_encoders,
+            'feature_transform': self.feature_transform.to_dict()
         }
         
         return {
@@ -333,26 +405,15 @@ class ModelTrainer:
             X_fold_train, X_fold_val = X.iloc[train_idx], X.iloc[val_idx]
             y_fold_train, y_fold_val = y.iloc[train_idx], y.iloc[val_idx]
             
-            train_data = lgb.Dataset(X_fold_train, label=y_fold_train)
+            train_data = lgb.Dataset(X_fold_train, label=y_fold_train, categorical_feature=self.categorical_features)
             val_data = lgb.Dataset(X_fold_val, label=y_fold_val, reference=train_data)
             
-            params = {
-                'objective': 'regression',
-                'metric': 'rmse',
-                'boosting_type': 'gbdt',
-                'num_leaves': 31,
-                'learning_rate': 0.05,
-                'feature_fraction': 0.8,
-                'verbose': -1,
-                'seed': 42
-            }
-            
             model = lgb.train(
-                params,
+                CV_PARAMS,
                 train_data,
-                num_boost_round=300,
+                num_boost_round=CV_NUM_BOOST_ROUND,
                 valid_sets=[val_data],
-                callbacks=[lgb.early_stopping(stopping_rounds=30, verbose=False)]
+                callbacks=[lgb.early_stopping(stopping_rounds=CV_EARLY_STOPPING_ROUNDS, verbose=False)]
             )
             
             y_pred = model.predict(X_fold_val, num_iteration=model.best_iteration)
@@ -370,48 +431,333 @@ class ModelTrainer:
             'r2_std': np.std(r2_scores)
         }
     
-    def save_model(self, filename: str = 'risk_model_v1.pkl'):
+    def replay_sample(self, n_rows: int = DEFAULT_REPLAY_ROWS, seed: int = 42) -> pd.DataFrame:
+        """Uniform sample of up to n_rows of the original training data (data_path)"""
+        df = self.load_data()
+        return df.sample(n=min(n_rows, len(df)), random_state=seed)
+    
+    def update(
+        self,
+        new_df: pd.DataFrame,
+        replay_rows: int = DEFAULT_REPLAY_ROWS,
+        num_boost_round: int = UPDATE_NUM_BOOST_ROUND,
+        holdout_size: float = 0.15
+    ) -> Dict:
+        """
+        Continue training the current model on newly labeled observations
+        
+        Trees are added to the existing booster (init_model) instead of
+        retraining from scratch. The new rows are mixed with a bounded replay
+        sample of the original training data, so the added trees fit the new
+        observations without forgetting the old distribution. Category codes
+        and features are those of the existing model. The holdout is drawn
+        from the new rows only; if the added trees do not lower its RMSE the
+        current model is kept (trees_added: 0).
+        
+        Args:
+            new_df: Newly labeled rows, in the training data's format
+            replay_rows: Rows of the original training data mixed in (0: none)
+            num_boost_round: Maximum trees added (early stopping on the holdout)
+            holdout_size: Share of the new rows held out for early stopping and metrics
+        
+        Returns:
+            Dictionary with holdout metrics before and after, and the update record
+        """
+        if self.model is None:
+            raise ValueError("No model to update. Train or load a model first.")
+        
+        print("\n" + "=" * 60)
+        print(f"Updating model with {len(new_df)} new samples")
+        print("=" * 60)
+        
+        replay = self.replay_sample(replay_rows) if replay_rows else new_df.iloc[:0]
+        X, y = self.prepare_features(pd.concat([new_df, replay], ignore_index=True), fit=False)
+        # Replayed rows would mostly measure the old distribution the current model already fits
+        _, val_index = train_test_split(X.index[:len(new_df)], test_size=holdout_size, random_state=42)
+        X_train, y_train = X.drop(val_index), y.drop(val_index)
+        X_val, y_val = X.loc[val_index], y.loc[val_index]
+        
+        # Continue from the trees early stopping kept, not the ones after them
+        base = lgb.Booster(model_str=self.model.model_to_string(num_iteration=self.model.best_iteration or None))
+        before = self._calculate_metrics(y_val, base.predict(X_val))
+        
+        train_data = lgb.Dataset(
+            X_train, label=y_train, feature_name=self.feature_names, categorical_feature=self.categorical_features
+        )
+        val_data = lgb.Dataset(
+            X_val, label=y_val, reference=train_data, feature_name=self.feature_names,
+            categorical_feature=self.categorical_features
+        )
+        updated = lgb.train(
+            dict(TRAINING_PARAMS),
+            train_data,
+            num_boost_round=num_boost_round,
+            init_model=base,
+            keep_training_booster=True,
+            valid_sets=[val_data],
+            valid_names=['valid'],
+            callbacks=[lgb.early_stopping(stopping_rounds=UPDATE_EARLY_STOPPING_ROUNDS, verbose=False)]
+        )
+        candidate = self._calculate_metrics(y_val, updated.predict(X_val, num_iteration=updated.best_iteration))
+        
+        print("\nHoldout Performance (before -> after):")
+        for metric in ('rmse', 'mae', 'r2'):
+            print(f"  {metric.upper():<5} {before[metric]:.3f} -> {candidate[metric]:.3f}")
+        
+        improved = candidate['rmse'] < before['rmse']
+        after = candidate if improved else before
+        record = {
+            'date': datetime.now().isoformat(),
+            'new_samples': len(new_df),
+            'replay_samples': len(replay),
+            'trees_added': updated.best_iteration - base.current_iteration() if improved else 0,
+            'holdout_rmse_before': float(before['rmse']),
+            'holdout_rmse_after': float(after['rmse']),
+            'holdout_rmse_candidate': float(candidate['rmse']),
+        }
+        self.metadata['updates'] = self.metadata.get('updates', []) + [record]
+        if not improved:
+            print("\nWARNING: Added trees did not improve the holdout RMSE; keeping the current model")
+            return {'before_metrics': before, 'after_metrics': after, 'update': record, 'metadata': self.metadata}
+        
+        self.model = updated
+        # The model no longer matches the hash of the data it was first trained on
+        if 'training_hash' in self.metadata:
+            self.metadata['base_training_hash'] = self.metadata.pop('training_hash')
+        self.metadata.update({
+            'training_date': record['date'],
+            'num_trees': self.model.num_trees(),
+            'best_iteration': self.model.best_iteration,
+        })
+        print(f"\nSUCCESS: Added {record['trees_added']} trees ({self.model.best_iteration} in total)")
+        
+        return {'before_metrics': before, 'after_metrics': after, 'update': record, 'metadata': self.metadata}
+    
+    def data_fingerprint(self) -> str:
+        """SHA-256 of the training data's contents (every file, for a partitioned dataset)"""
+        if not self.data_path.exists():
+            raise FileNotFoundError(
+                f"Training data not found at {self.data_path}. "
+                "Run: python backend/data/synthetic_data_generator.py"
+            )
+        
+        partitioned = self.data_path.is_dir()
+        files = sorted(p for p in self.data_path.iterdir() if p.is_file()) if partitioned else [self.data_path]
+        digest = hashlib.sha256()
+        for path in files:
+            if partitioned:
+                digest.update(path.name.encode() + b'\0')
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+    
+    def training_hash(self, max_rows: Optional[int] = None, **train_options: Any) -> str:
+        """
+        Content hash of everything that determines the trained model
+        - Training data contents
+        - Feature pipeline (prepare_features and the shared feature transform)
+        - Hyperparameters and split/CV options, and the LightGBM version
+        
+        Args:
+            max_rows: As passed to load_data
+            train_options: test_size, val_size, cv_folds and params as passed to train
+        
+        Returns:
+            Hex SHA-256 digest
+        """
+        defaults = inspect.signature(self.train).parameters
+        options = {name: train_options.get(name, defaults[name].default) for name in ('test_size', 'val_size', 'cv_folds')}
+        config = {
+            'data': self.data_fingerprint(),
+            'max_rows': max_rows,
+            'feature_pipeline': {
+                'prepare_features': inspect.getsource(ModelTrainer.prepare_features),
+                'feature_engineering': inspect.getsource(sys.modules[FeatureTransform.__module__]),
+                'categorical_features': CATEGORICAL_FEATURES,
+                'feature_transform': self.feature_transform.to_dict(),
+            },
+            'params': {**TRAINING_PARAMS, **(train_options.get('params') or {})},
+            'num_boost_round': NUM_BOOST_ROUND,
+            'early_stopping_rounds': EARLY_STOPPING_ROUNDS,
+            'cv': {'params': CV_PARAMS, 'num_boost_round': CV_NUM_BOOST_ROUND, 'early_stopping_rounds': CV_EARLY_STOPPING_ROUNDS},
+            'options': options,
+            'lightgbm': lgb.__version__,
+        }
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+    
+    def find_trained_model(self, training_hash: str, filename: str = 'risk_model_v1.pkl') -> Optional[Path]:
+        """
+        Look up a model already trained with the same training hash
+        
+        A match saved under another filename in the same format (.pkl or .txt)
+        is copied (with its metadata) to filename; a model saved in the other
+        format is not converted.
+        
+        Args:
+            training_hash: From training_hash()
+            filename: Model filename in models_dir
+        
+        Returns:
+            Path of the model at filename, or None if no saved model matches
+        """
+        model_path = self.models_dir / filename
+        own_metadata = f'{model_path.stem}_metadata.json'
+        # Check the requested file's metadata first
+        metadata_paths = sorted(
+            self.models_dir.glob('*_metadata.json'),
+            key=lambda p: (p.name != own_metadata, p.name)
+        )
+        
+        for metadata_path in metadata_paths:
+            try:
+                with open(metadata_path, 'r') as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError):
+                continue
+            match = metadata_path.with_name(metadata_path.name[:-len('_metadata.json')] + model_path.suffix)
+            if not isinstance(metadata, dict) or metadata.get('training_hash') != training_hash or not match.exists():
+                continue
+            
+            if match != model_path:
+                shutil.copyfile(match, model_path)
+                shutil.copyfile(metadata_path, self.models_dir / own_metadata)
+            self.metadata = metadata
+            return model_path
+        return None
+    
+    def save_model(self, filename: str = 'risk_model_v1.pkl', training_hash: Optional[str] = None):
         """
         Save trained model and metadata to disk
         
+        A .txt filename saves the booster in LightGBM's native text format,
+        truncated to the best iteration, with the feature list, categories and
+        feature transform in the metadata instead of a joblib pickle.
+        
         Args:
-            filename: Output filename (saved to backend/models/trained/)
+            filename: Output filename (saved to models_dir, default backend/models/trained/)
+            training_hash: From training_hash(), recorded in the metadata so
+                           later runs with the same inputs can skip training
         """
         if self.model is None:
             raise ValueError("No model to save. Train model first.")
         
-        models_dir = Path(__file__).parent.parent / 'models' / 'trained'
+        if training_hash is not None:
+            self.metadata['training_hash'] = training_hash
+        
+        models_dir = self.models_dir
         models_dir.mkdir(parents=True, exist_ok=True)
         
-        # Save model using joblib
         model_path = models_dir / filename
-        joblib.dump({
-            'model': self.model,
-            'feature_names': self.feature_names,
-            'label_encoders': self.label_encoders
-        }, model_path)
+        if model_path.suffix == '.txt':
+            # Native format: the trees early stopping kept, preprocessing in the metadata
+            trees = self.model.best_iteration if self.model.best_iteration > 0 else self.model.current_iteration()
+            self.model.save_model(str(model_path), num_iteration=trees)
+            self.metadata.update({
+                'num_trees': trees,
+                'best_iteration': trees,
+                'features': self.feature_names,
+                'categorical_features': self.categorical_features,
+                'label_encoders': self.label_encoders,
+                'feature_transform': self.feature_transform.to_dict()
+            })
+        else:
+            # Save model using joblib
+            joblib.dump({
+                'model': self.model,
+                'feature_names': self.feature_names,
+                'categorical_features': self.categorical_features,
+                'label_encoders': self.label_encoders,
+                'feature_transform': self.feature_transform.to_dict()
+            }, model_path)
         
         print(f"\nSUCCESS: Model saved to {model_path}")
         print(f"  File size: {model_path.stat().st_size / 1024:.1f} KB")
         
         # Save metadata as JSON
-        metadata_path = models_dir / filename.replace('.pkl', '_metadata.json')
+        metadata_path = models_dir / f'{model_path.stem}_metadata.json'
         with open(metadata_path, 'w') as f:
             json.dump(self.metadata, f, indent=2)
         
         print(f"SUCCESS: Metadata saved to {metadata_path}")
         
         return model_path, metadata_path
+    
+    def load_model(self, filename: str = 'risk_model_v1.pkl'):
+        """
+        Load a model saved by save_model, e.g. to update() it
+        
+        Args:
+            filename: Model filename in models_dir (.pkl, or .txt for the native format)
+        """
+        model_path = self.models_dir / filename
+        if not model_path.exists():
+            raise FileNotFoundError(f"Trained model not found at {model_path}")
+        
+        metadata_path = self.models_dir / f'{model_path.stem}_metadata.json'
+        if metadata_path.exists():
+            with open(metadata_path, 'r') as f:
+                self.metadata = json.load(f)
+        
+        if model_path.suffix == '.txt':
+            model_data = {'model': lgb.Booster(model_file=str(model_path)), **self.metadata}
+            model_data['feature_names'] = self.metadata.get('features') or model_data['model'].feature_name()
+        else:
+            model_data = joblib.load(model_path)
+        self.model = model_data['model']
+        self.feature_names = model_data['feature_names']
+        self.categorical_features = model_data.get('categorical_features', [])
+        # Older artifacts hold fitted LabelEncoders rather than category lists
+        self.label_encoders = {
+            feature: [str(c) for c in getattr(encoder, 'classes_', encoder)]
+            for feature, encoder in model_data.get('label_encoders', {}).items()
+        }
+        if model_data.get('feature_transform'):
+            self.feature_transform = FeatureTransform.from_dict(model_data['feature_transform'])
+        
+        print(f"SUCCESS: Loaded model from {model_path} ({self.model.num_trees()} trees)")
 
 
-def main():
+def main(argv=None):
     """Main training pipeline"""
+    parser = argparse.ArgumentParser(description="Train the agricultural risk model")
+    parser.add_argument('--data', help="Training data CSV or partition directory (default: backend/data/training_data.csv)")
+    parser.add_argument('--output', default='risk_model_v1.pkl', help="Model filename in backend/models/trained/")
+    parser.add_argument('--force', action='store_true', help="Retrain even if a model with the same training hash exists")
+    parser.add_argument('--update', metavar='NEW_DATA', help="Continue training --output on newly labeled rows (CSV or partition directory) instead of retraining")
+    parser.add_argument('--replay-rows', type=int, default=DEFAULT_REPLAY_ROWS, help="Rows of --data replayed alongside the new rows (with --update)")
+    parser.add_argument('--rounds', type=int, default=UPDATE_NUM_BOOST_ROUND, help="Maximum trees added (with --update)")
+    parser.add_argument('--params', metavar='PARAMS_JSON', help="JSON file of LightGBM parameters overriding the defaults (e.g. from hyperparameter_search.py --params-out)")
+    args = parser.parse_args(argv)
+    
     print("=" * 60)
     print("Sentry Model Training Pipeline (Agriculture)")
     print("=" * 60)
     
     # Initialize trainer
-    trainer = ModelTrainer()
+    trainer = ModelTrainer(args.data)
+    
+    if args.update:
+        trainer.load_model(args.output)
+        new_df = ModelTrainer(args.update).load_data()
+        results = trainer.update(new_df, replay_rows=args.replay_rows, num_boost_round=args.rounds)
+        model_path, metadata_path = trainer.save_model(args.output)
+        print(f"\nUpdated model saved to: {model_path}")
+        print(f"  Holdout RMSE: {results['before_metrics']['rmse']:.3f} -> {results['after_metrics']['rmse']:.3f}")
+        return
+    
+    train_options = {'test_size': 0.15, 'val_size': 0.15, 'cv_folds': 5}
+    if args.params:
+        with open(args.params, 'r') as f:
+            train_options['params'] = json.load(f)
+    
+    # Skip training if the data, feature pipeline and parameters are unchanged
+    training_hash = trainer.training_hash(**train_options)
+    model_path = None if args.force else trainer.find_trained_model(training_hash, args.output)
+    if model_path is not None:
+        print(f"\nSUCCESS: Model with training hash {training_hash[:12]} already trained: {model_path}")
+        print("  Use --force to retrain")
+        return
     
     # Load data
     df = trainer.load_data()
@@ -420,10 +766,10 @@ def main():
     X, y = trainer.prepare_features(df)
     
     # Train model
-    results = trainer.train(X, y, test_size=0.15, val_size=0.15, cv_folds=5)
+    results = trainer.train(X, y, **train_options)
     
     # Save model
-    model_path, metadata_path = trainer.save_model('risk_model_v1.pkl')
+    model_path, metadata_path = trainer.save_model(args.output, training_hash=training_hash)
     
     print("\n" + "=" * 60)
     print("Training Complete!")
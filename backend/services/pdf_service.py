@@ -239,6 +239,28 @@ class PDFService:
         story.append(Paragraph("This score is calculated using our proprietary multi-factor actuarial model, incorporating satellite vegetation indices (NDVI), historical weather volatility, and soil moisture analytics.", normal_style))
         story.append(Spacer(1, 15))
 
+        # --- Risk Map ---
+        # Rendered from the analysis grid by backend.services.raster_tiles.
+        # A requested map that is missing (None) or unreadable is noted rather than left out.
+        if 'risk_map_png' in data:
+            story.append(Paragraph("Field Risk Map", heading_style))
+            try:
+                if not data['risk_map_png']:
+                    raise ValueError("analysis result not found")
+                map_reader = ImageReader(BytesIO(data['risk_map_png']))
+                map_width, map_height = map_reader.getSize()
+                width = 5 * inch
+                height = min(4 * inch, width * map_height / map_width)
+                width = height * map_width / map_height
+
+                story.append(Paragraph("Risk score per analysis grid cell (north up): green below 40, yellow 40-59, orange 60-79, red 80 and above.", normal_style))
+                story.append(Spacer(1, 10))
+                story.append(Image(BytesIO(data['risk_map_png']), width=width, height=height))
+            except Exception as e:
+                print(f"Risk map skipped in PDF: {e}")
+                story.append(Paragraph("<i>The risk map for this analysis could not be rendered (its result is no longer available). Run the analysis again to include it.</i>", normal_style))
+            story.append(Spacer(1, 20))
+
         # --- Insurance Quote ---
         story.append(Paragraph("Insurance Policy Proposal", heading_style))
         
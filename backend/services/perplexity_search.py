@@ -4,12 +4,19 @@ Provides real-time web search for agricultural intelligence
 """
 
 import os
+import threading
+import time
+from collections import OrderedDict
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Recent successful searches kept for degraded (latency-budgeted) analyses
+RECENT_RESULTS_MAX_ENTRIES = 200
+RECENT_RESULTS_TTL_SECONDS = 24 * 3600
+
 class PerplexitySearch:
     """Wrapper for Perplexity AI search API"""
     
@@ -21,6 +28,8 @@ class PerplexitySearch:
         
         # Remove quotes if present
         self.api_key = self.api_key.strip('"').strip("'")
+        self._recent_results: OrderedDict = OrderedDict()
+        self._recent_lock = threading.Lock()
         
         try:
             from perplexity import Perplexity
@@ -38,18 +47,24 @@ class PerplexitySearch:
         crop_type: str, 
         risk_factors: List[str],
         region: str = "Kenya",
-        max_results: int = 5
+        max_results: int = 5,
+        cancel_token=None,
+        cache_region: Optional[str] = None
     ) -> Dict:
         """
         Search for agricultural intelligence related to crop and risks
+        The search is skipped (AnalysisCancelled raised) if cancel_token is cancelled.
+        Successful results are kept for get_cached_results(cache_region)
+        (default: region).
         """
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        
         if not self.client:
             return self._mock_search_results(crop_type, risk_factors, region)
         
         # Build search query
-        # Build search query - Focus on climatic forecast and general risks for the area
-        # risk_terms = ", ".join(risk_factors)        # Build specific query for the region
-        query = f"current climatic forecast {region} drought predictions crop yield outlook weather extremes 2025"
+        query = self._build_query(region)
         
         try:
             print(f"  Searching: {query}")
@@ -64,6 +79,10 @@ class PerplexitySearch:
                 max_tokens_per_page=1024
             )
             
+            # Discard the response if the analysis was abandoned mid-request
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            
             results = []
             for result in response.results:
                 results.append({
@@ -76,13 +95,17 @@ class PerplexitySearch:
             
             print(f"  ✓ Search successful: {len(results)} results")
             
-            return {
+            search_results = {
                 'query': query,
                 'results': results,
                 'id': getattr(response, 'id', 'unknown')
             }
+            self._remember(self._build_query(cache_region or region), search_results)
+            return search_results
             
         except Exception as e:
+            if cancel_token is not None and cancel_token.cancelled:
+                raise
             import traceback
             print(f"  ✗ CRITICAL SEARCH ERROR: {str(e)}")
             print(f"  ✗ Traceback: {traceback.format_exc()}")
@@ -93,6 +116,39 @@ class PerplexitySearch:
                 'error': str(e)
             }
 
+    def get_cached_results(self, region: str = "Kenya") -> Optional[Dict]:
+        """
+        Most recent successful search for the region, without calling the API
+        Used when an analysis has no time left for a live search.
+        
+        Returns:
+            Search results marked 'cached': True, or None if none are fresh
+        """
+        query = self._build_query(region)
+        with self._recent_lock:
+            entry = self._recent_results.get(query)
+            if entry is None:
+                return None
+            
+            stored_at, search_results = entry
+            if time.time() - stored_at > RECENT_RESULTS_TTL_SECONDS:
+                del self._recent_results[query]
+                return None
+        
+        return {**search_results, 'cached': True}
+    
+    @staticmethod
+    def _build_query(region: str) -> str:
+        """Focus on climatic forecast and general risks for the area"""
+        return f"current climatic forecast {region} drought predictions crop yield outlook weather extremes 2025"
+    
+    def _remember(self, query: str, search_results: Dict):
+        with self._recent_lock:
+            self._recent_results[query] = (time.time(), search_results)
+            self._recent_results.move_to_end(query)
+            while len(self._recent_results) > RECENT_RESULTS_MAX_ENTRIES:
+                self._recent_results.popitem(last=False)
+
 
 # Singleton instance
 _perplexity_instance = None
@@ -0,0 +1,292 @@
+"""
+On-Demand Profiling
+Profiles selected analyses in production: armed for the next N analyses
+and/or analyses matching a filter, each profiled request's blocking work
+(worker-thread calls and synchronous sections on the event loop) is run
+under cProfile or a sampling profiler and the result kept by request id
+"""
+
+import cProfile
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+
+CPROFILE = 'cprofile'
+SAMPLING = 'sampling'
+PROFILE_MODES = (CPROFILE, SAMPLING)
+
+# Download format of each mode
+PROFILE_FORMATS = {CPROFILE: 'pstats', SAMPLING: 'collapsed'}
+
+DEFAULT_SAMPLE_INTERVAL_SECONDS = 0.005
+MIN_SAMPLE_INTERVAL_SECONDS = 0.001
+DEFAULT_MAX_PROFILES = 50
+
+# Filter keys matched against the attributes passed to Profiler.claim()
+FILTER_KEYS = ('clientId', 'cropType', 'minAreaKm2')
+
+_active_profile: ContextVar[Optional['RequestProfile']] = ContextVar('active_profile', default=None)
+_thread_state = threading.local()
+
+
+class RequestProfile:
+    """Profile of one request, accumulated over the calls run under it"""
+
+    def __init__(self, request_id: str, mode: str = CPROFILE, sample_interval: float = DEFAULT_SAMPLE_INTERVAL_SECONDS):
+        self.request_id = request_id
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._profiles: List[cProfile.Profile] = []
+        self._stacks: Counter = Counter()
+        self._threads: Dict[int, int] = {}  # thread id -> nesting depth
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the sampler thread (sampling mode)"""
+        if self.mode == SAMPLING and self._sampler is None:
+            self._sampler = threading.Thread(target=self._sample_loop, name=f'profiler-{self.request_id[:8]}', daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.finished_at = time.time()
+
+    @contextmanager
+    def attach(self):
+        """Profile the current thread for the enclosed (synchronous) block"""
+        with self._lock:
+            self.calls += 1
+        if self.mode == CPROFILE:
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                with self._lock:
+                    self._profiles.append(profile)
+        else:
+            thread_id = threading.get_ident()
+            with self._lock:
+                self._threads[thread_id] = self._threads.get(thread_id, 0) + 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self._threads[thread_id] -= 1
+                    if not self._threads[thread_id]:
+                        del self._threads[thread_id]
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            with self._lock:
+                thread_ids = list(self._threads)
+            if not thread_ids:
+                continue
+            frames = sys._current_frames()
+            samples = [_collapse(frames[tid]) for tid in thread_ids if tid in frames]
+            with self._lock:
+                self._stacks.update(samples)
+
+    def to_pstats(self) -> bytes:
+        """Merged cProfile stats in the pstats file format (cprofile mode)"""
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return marshal.dumps({})
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return marshal.dumps(stats.stats)
+
+    def to_collapsed(self) -> str:
+        """Sampled stacks in collapsed format ('root;...;leaf count' per line) for flame graphs"""
+        with self._lock:
+            stacks = sorted(self._stacks.items())
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'requestId': self.request_id,
+                'mode': self.mode,
+                'createdAt': self.created_at,
+                'finishedAt': self.finished_at,
+                'calls': self.calls,
+                'samples': sum(self._stacks.values()),
+            }
+
+
+def _collapse(frame) -> str:
+    """Stack of a frame as 'file:function' entries, outermost first"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def _matches(filters: Dict[str, Any], attributes: Dict[str, Any]) -> bool:
+    for key, expected in filters.items():
+        if key == 'minAreaKm2':
+            if (attributes.get('areaKm2') or 0) < expected:
+                return False
+        elif attributes.get(key) != expected:
+            return False
+    return True
+
+
+class Profiler:
+    """Arming state and stored profiles"""
+
+    def __init__(self, max_profiles: int = DEFAULT_MAX_PROFILES):
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        self._armed: Optional[Dict[str, Any]] = None
+        self._profiles: OrderedDict = OrderedDict()
+
+    def arm(
+        self,
+        count: Optional[int] = 1,
+        filters: Optional[Dict[str, Any]] = None,
+        mode: str = CPROFILE,
+        sample_interval: float = DEFAULT_SAMPLE_INTERVAL_SECONDS
+    ) -> Dict[str, Any]:
+        """
+        Profile upcoming analyses
+
+        Args:
+            count: Number of analyses to profile (None: until disarmed)
+            filters: Only analyses matching all of clientId, cropType, minAreaKm2
+            mode: 'cprofile' (deterministic, pstats) or 'sampling' (collapsed stacks)
+            sample_interval: Seconds between samples in sampling mode
+
+        Raises:
+            ValueError: On an unknown mode or filter key, or a non-positive count
+        """
+        filters = filters or {}
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        unknown = set(filters) - set(FILTER_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown profiling filters: {sorted(unknown)}")
+        if count is not None and count < 1:
+            raise ValueError("count must be at least 1")
+        if count is None and not filters:
+            raise ValueError("Profiling without a count needs a filter")
+
+        with self._lock:
+            self._armed = {
+                'remaining': count,
+                'filters': dict(filters),
+                'mode': mode,
+                'sampleInterval': max(sample_interval, MIN_SAMPLE_INTERVAL_SECONDS),
+            }
+            return dict(self._armed)
+
+    def disarm(self):
+        with self._lock:
+            self._armed = None
+
+    def claim(self, **attributes) -> Optional[Dict[str, Any]]:
+        """
+        Decide whether an analysis should be profiled (uses up one of the armed count)
+
+        Returns:
+            Settings for profile(), or None
+        """
+        with self._lock:
+            armed = self._armed
+            if armed is None or not _matches(armed['filters'], attributes):
+                return None
+            if armed['remaining'] is not None:
+                armed['remaining'] -= 1
+                if armed['remaining'] <= 0:
+                    self._armed = None
+            return {'mode': armed['mode'], 'sampleInterval': armed['sampleInterval']}
+
+    @contextmanager
+    def profile(self, request_id: str, settings: Optional[Dict[str, Any]]):
+        """Collect a profile for the enclosed request (no-op without settings)"""
+        if settings is None:
+            yield None
+            return
+
+        request_profile = RequestProfile(request_id, settings['mode'], settings['sampleInterval'])
+        with self._lock:
+            self._profiles[request_id] = request_profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+        token = _active_profile.set(request_profile)
+        request_profile.start()
+        try:
+            yield request_profile
+        finally:
+            _active_profile.reset(token)
+            request_profile.stop()
+
+    def get(self, request_id: str) -> Optional[RequestProfile]:
+        return self._profiles.get(request_id)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            armed = dict(self._armed) if self._armed else None
+            profiles = list(self._profiles.values())
+        return {'armed': armed, 'profiles': [profile.summary() for profile in profiles]}
+
+
+def profiled_call(fn: Callable, *args, **kwargs):
+    """
+    Call fn under the current request's profile, if any
+    Use as asyncio.to_thread(profiled_call, fn, ...): the worker thread
+    inherits the request's context.
+    """
+    with profiled_section():
+        return fn(*args, **kwargs)
+
+
+@contextmanager
+def profiled_section():
+    """
+    Profile the enclosed synchronous block for the current request, if any
+    Must not contain awaits: other tasks would be profiled with it.
+    """
+    request_profile = _active_profile.get()
+    if request_profile is None or getattr(_thread_state, 'active', False):
+        yield
+        return
+
+    _thread_state.active = True
+    try:
+        with request_profile.attach():
+            yield
+    finally:
+        _thread_state.active = False
+
+
+# Singleton instance
+_profiler_instance = None
+
+def get_profiler() -> Profiler:
+    """Get or create profiler instance"""
+    global _profiler_instance
+    if _profiler_instance is None:
+        _profiler_instance = Profiler()
+    return _profiler_instance
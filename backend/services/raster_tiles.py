@@ -0,0 +1,172 @@
+"""
+Risk Grid Raster Tiles
+Rasterizes stored risk grids (see grid_encoding.py) into colour-mapped PNG
+images with NumPy: Web Mercator XYZ tiles for the map, aggregated into a
+zoom pyramid like the vector tiles, and a whole-grid overview image for
+PDF reports
+"""
+
+import math
+import struct
+import zlib
+from typing import Any, Dict
+
+import numpy as np
+
+from backend.services.vector_tiles import TILE_PIXELS, TileCache, aggregation_factor
+
+
+PNG_MEDIA_TYPE = 'image/png'
+OVERVIEW_MAX_PIXELS = 600
+FILL_ALPHA = 140  # ~0.55 opacity, as the vector heatmap layer
+
+# Banded colours by risk score, matching RISK_LEVEL_COLORS in the frontend
+RISK_COLOR_BANDS = [
+    (0, '#7BC67E'),   # safe
+    (40, '#F7E967'),  # low
+    (60, '#FFB347'),  # medium
+    (80, '#FF6B6B'),  # high
+]
+
+DEFAULT_RASTER_CACHE_ENTRIES = 2048
+DEFAULT_RASTER_CACHE_BYTES = 64 * 1024 * 1024
+
+_TRANSPARENT = 101  # LUT index for pixels without a (visible) cell
+
+
+def _build_color_lut() -> np.ndarray:
+    """RGBA lookup table: rows 0-100 by rounded score, row 101 transparent"""
+    lut = np.zeros((102, 4), dtype=np.uint8)
+    for threshold, color in RISK_COLOR_BANDS:
+        rgb = [int(color[i:i + 2], 16) for i in (1, 3, 5)]
+        lut[threshold:101] = rgb + [FILL_ALPHA]
+    return lut
+
+
+COLOR_LUT = _build_color_lut()
+
+
+def score_raster(grid: Dict[str, Any], factor: int = 1) -> np.ndarray:
+    """
+    Dense score array of a risk grid
+
+    Args:
+        grid: Risk grid from build_risk_grid or decode_grid
+        factor: Cells per block side; blocks hold the mean of their cells
+
+    Returns:
+        float32 array of shape (rows, cols) / factor, row 0 at the grid's
+        southern edge, NaN where no cell was scored
+    """
+    rows, cols = grid['shape']
+    out_rows, out_cols = -(-rows // factor), -(-cols // factor)
+    cell_rows, cell_cols = np.divmod(np.asarray(grid['cellIndex'], dtype=np.int64), cols)
+    flat = (cell_rows // factor) * out_cols + cell_cols // factor
+
+    sums = np.bincount(flat, weights=np.asarray(grid['riskScore'], dtype=np.float64), minlength=out_rows * out_cols)
+    counts = np.bincount(flat, minlength=out_rows * out_cols)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        raster = (sums / counts).astype(np.float32)
+    return raster.reshape(out_rows, out_cols)
+
+
+def colorize(scores: np.ndarray, threshold: float = 0.0) -> np.ndarray:
+    """
+    Map scores to RGBA with a single table lookup
+
+    Args:
+        scores: Score array (NaN for no data)
+        threshold: Scores below this are transparent
+
+    Returns:
+        uint8 array of shape scores.shape + (4,)
+    """
+    visible = np.isfinite(scores) & (scores >= threshold)
+    index = np.where(visible, np.clip(np.rint(np.nan_to_num(scores)), 0, 100), _TRANSPARENT)
+    return COLOR_LUT[index.astype(np.intp)]
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """Encode an (height, width, 4) uint8 array as an RGBA PNG"""
+    height, width = rgba.shape[:2]
+    scanlines = np.zeros((height, width * 4 + 1), dtype=np.uint8)  # filter byte 0 per row
+    scanlines[:, 1:] = rgba.reshape(height, width * 4)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)),
+        chunk(b'IDAT', zlib.compress(scanlines.tobytes(), 6)),
+        chunk(b'IEND', b''),
+    ])
+
+
+def render_raster_tile(grid: Dict[str, Any], z: int, x: int, y: int, threshold: float = 0.0) -> bytes:
+    """
+    Render a PNG map tile of a risk grid
+    Pixels are sampled from the grid at their centres; at low zoom the grid
+    is first averaged into blocks of at least one pixel.
+
+    Args:
+        grid: Risk grid from build_risk_grid or decode_grid
+        z, x, y: Tile coordinates
+        threshold: Scores below this are transparent
+
+    Returns:
+        PNG bytes (TILE_PIXELS square, transparent outside the grid)
+    """
+    factor = aggregation_factor(grid, z, min_pixels=1)
+    raster = score_raster(grid, factor)
+
+    n = 2 ** z
+    offsets = (np.arange(TILE_PIXELS) + 0.5) / TILE_PIXELS
+    lngs = (x + offsets) / n * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(math.pi * (1 - 2 * (y + offsets) / n))))
+
+    cols = np.floor((lngs - grid['origin']['lng']) / (grid['step']['lng'] * factor)).astype(np.int64)
+    rows = np.floor((lats - grid['origin']['lat']) / (grid['step']['lat'] * factor)).astype(np.int64)
+    col_inside = (cols >= 0) & (cols < raster.shape[1])
+    row_inside = (rows >= 0) & (rows < raster.shape[0])
+
+    scores = np.full((TILE_PIXELS, TILE_PIXELS), np.nan, dtype=np.float32)
+    if row_inside.any() and col_inside.any():
+        scores[np.ix_(row_inside, col_inside)] = raster[np.ix_(rows[row_inside], cols[col_inside])]
+
+    return encode_png(colorize(scores, threshold))
+
+
+def render_grid_image(grid: Dict[str, Any], max_pixels: int = OVERVIEW_MAX_PIXELS) -> bytes:
+    """
+    Render the whole risk grid as one north-up PNG (e.g. for PDF reports)
+    Cells are drawn as opaque square blocks of pixels; grids larger than
+    max_pixels are averaged down first.
+
+    Args:
+        grid: Risk grid from build_risk_grid or decode_grid
+        max_pixels: Upper bound on the image's longer side
+
+    Returns:
+        PNG bytes
+    """
+    longest = max(max(grid['shape']), 1)
+    factor = max(1, math.ceil(longest / max_pixels))
+    raster = np.flipud(score_raster(grid, factor))
+
+    scale = max(1, max_pixels // max(max(raster.shape), 1))
+    scores = np.repeat(np.repeat(raster, scale, axis=0), scale, axis=1)
+    rgba = colorize(scores)
+    rgba[..., 3] = np.where(rgba[..., 3] > 0, 255, 0)
+    return encode_png(rgba)
+
+
+# Singleton instance
+_raster_cache_instance = None
+
+def get_raster_tile_cache() -> TileCache:
+    """Get or create raster tile cache instance"""
+    global _raster_cache_instance
+    if _raster_cache_instance is None:
+        _raster_cache_instance = TileCache(DEFAULT_RASTER_CACHE_ENTRIES, DEFAULT_RASTER_CACHE_BYTES)
+    return _raster_cache_instance
@@ -0,0 +1,291 @@
+"""
+Risk Grid Vector Tiles
+Encodes stored risk grids (see grid_encoding.py) into Mapbox Vector Tiles
+(MVT 2.1, Web Mercator XYZ scheme) on demand, aggregating cells into
+coarser blocks at low zoom levels, with an LRU cache of rendered tiles
+"""
+
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+
+MVT_MEDIA_TYPE = 'application/vnd.mapbox-vector-tile'
+LAYER_NAME = 'risk'
+TILE_EXTENT = 4096
+TILE_BUFFER = 0  # Clip exactly at tile edges: clients stitch tiles into one overlay
+TILE_PIXELS = 256
+MAX_TILE_ZOOM = 22
+
+# Cells drawn smaller than this (in screen pixels) are merged into blocks
+MIN_CELL_PIXELS = 4
+
+DEFAULT_TILE_CACHE_ENTRIES = 4096
+DEFAULT_TILE_CACHE_BYTES = 64 * 1024 * 1024
+
+# MVT geometry commands and types
+_MOVE_TO = 1
+_LINE_TO = 2
+_CLOSE_PATH = 7
+_POLYGON = 3
+
+# Web Mercator latitude limit
+_MAX_LAT = 85.0511287798
+
+
+def aggregation_factor(grid: Dict[str, Any], z: int, min_pixels: float = MIN_CELL_PIXELS) -> int:
+    """
+    Block size (in cells per side, a power of 2) used at zoom z
+    Cells are merged until a block spans at least min_pixels on screen.
+    """
+    cell_pixels = grid['step']['lng'] / 360.0 * (2 ** z) * TILE_PIXELS
+    factor = 1
+    while cell_pixels * factor < min_pixels and factor < max(grid['shape']):
+        factor *= 2
+    return factor
+
+
+def render_tile(grid: Dict[str, Any], z: int, x: int, y: int) -> bytes:
+    """
+    Encode the grid cells intersecting a tile as an MVT tile
+
+    Each feature is a rectangle in layer 'risk'. At full resolution it
+    carries riskScore, riskLevel and factors (comma-separated, omitted
+    when none). Aggregated
+    blocks carry the mean riskScore, maxRiskScore, the riskLevel of their
+    riskiest cell and cellCount.
+
+    Args:
+        grid: Risk grid from build_risk_grid or decode_grid
+        z, x, y: Tile coordinates
+
+    Returns:
+        Tile bytes (empty when no cell intersects the tile)
+    """
+    cols = grid['shape'][1]
+    cell_index = np.asarray(grid['cellIndex'], dtype=np.int64)
+    if cell_index.size == 0:
+        return b''
+    scores = np.asarray(grid['riskScore'], dtype=np.float64)
+    levels = np.asarray(grid['riskLevel'], dtype=np.int64)
+    rows_of, cols_of = np.divmod(cell_index, cols)
+
+    factor = aggregation_factor(grid, z)
+    if factor > 1:
+        block_cols = -(-cols // factor)
+        keys = (rows_of // factor) * block_cols + cols_of // factor
+        blocks, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        mean_scores = np.bincount(inverse, weights=scores) / counts
+        max_scores = np.full(blocks.size, -np.inf)
+        np.maximum.at(max_scores, inverse, scores)
+        max_levels = np.zeros(blocks.size, dtype=np.int64)
+        np.maximum.at(max_levels, inverse, levels)
+        row0, col0 = np.divmod(blocks, block_cols)
+        row0, col0 = row0 * factor, col0 * factor
+        row1 = np.minimum(row0 + factor, grid['shape'][0])
+        col1 = np.minimum(col0 + factor, cols)
+        ids = blocks
+    else:
+        row0, col0 = rows_of, cols_of
+        row1, col1 = rows_of + 1, cols_of + 1
+        ids = cell_index
+
+    # Project block corners into tile coordinates (y grows downwards)
+    origin_lat, origin_lng = grid['origin']['lat'], grid['origin']['lng']
+    lat_step, lng_step = grid['step']['lat'], grid['step']['lng']
+    x0 = _project_x(origin_lng + col0 * lng_step, z, x)
+    x1 = _project_x(origin_lng + col1 * lng_step, z, x)
+    y0 = _project_y(origin_lat + row1 * lat_step, z, y)  # north edge
+    y1 = _project_y(origin_lat + row0 * lat_step, z, y)  # south edge
+
+    low, high = -TILE_BUFFER, TILE_EXTENT + TILE_BUFFER
+    x0, x1 = np.clip(np.rint(x0), low, high), np.clip(np.rint(x1), low, high)
+    y0, y1 = np.clip(np.rint(y0), low, high), np.clip(np.rint(y1), low, high)
+    visible = np.flatnonzero((x1 > x0) & (y1 > y0))
+    if visible.size == 0:
+        return b''
+
+    layer = _LayerBuilder()
+    level_names = grid['levels']
+    factor_names = grid['factorNames']
+    masks = np.asarray(grid['factorMask'], dtype=np.int64)
+
+    for i in visible.tolist():
+        geometry = _rectangle(int(x0[i]), int(y0[i]), int(x1[i]), int(y1[i]))
+        if factor > 1:
+            properties = {
+                'riskScore': round(float(mean_scores[i]), 1),
+                'maxRiskScore': round(float(max_scores[i]), 1),
+                'riskLevel': level_names[max_levels[i]],
+                'cellCount': int(counts[i]),
+            }
+        else:
+            mask = int(masks[i])
+            properties = {
+                'riskScore': round(float(scores[i]), 1),
+                'riskLevel': level_names[levels[i]],
+            }
+            if mask:
+                properties['factors'] = ','.join(name for bit, name in enumerate(factor_names) if mask & (1 << bit))
+        layer.add_feature(int(ids[i]), geometry, properties)
+
+    return _message_field(3, layer.encode())
+
+
+class TileCache:
+    """
+    LRU cache of rendered tiles keyed by tuples starting with the analysis
+    id, e.g. (analysis_id, z, x, y). Analysis results never change once
+    completed, so entries stay valid until evicted or discarded with
+    their analysis's job.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_TILE_CACHE_ENTRIES, max_bytes: int = DEFAULT_TILE_CACHE_BYTES):
+        """
+        Initialize cache
+
+        Args:
+            max_entries: Maximum number of cached tiles
+            max_bytes: Maximum total size of cached tiles
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._tiles: 'OrderedDict[Tuple, bytes]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is None:
+                self.misses += 1
+                return None
+            self._tiles.move_to_end(key)
+            self.hits += 1
+            return tile
+
+    def put(self, key: Tuple, tile: bytes):
+        with self._lock:
+            previous = self._tiles.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._tiles[key] = tile
+            self._bytes += len(tile)
+            while self._tiles and (len(self._tiles) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._tiles.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def discard(self, analysis_id: str):
+        """Drop every tile of an analysis"""
+        with self._lock:
+            for key in [key for key in self._tiles if key[0] == analysis_id]:
+                self._bytes -= len(self._tiles.pop(key))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._tiles), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+def _project_x(lng: np.ndarray, z: int, x: int) -> np.ndarray:
+    return ((lng + 180.0) / 360.0 * (2 ** z) - x) * TILE_EXTENT
+
+
+def _project_y(lat: np.ndarray, z: int, y: int) -> np.ndarray:
+    phi = np.radians(np.clip(lat, -_MAX_LAT, _MAX_LAT))
+    mercator = (1.0 - np.log(np.tan(phi) + 1.0 / np.cos(phi)) / math.pi) / 2.0
+    return (mercator * (2 ** z) - y) * TILE_EXTENT
+
+
+def _rectangle(x0: int, y0: int, x1: int, y1: int) -> list:
+    """Polygon commands for a rectangle, exterior ring clockwise on screen"""
+    return [
+        _command(_MOVE_TO, 1), _zigzag(x0), _zigzag(y0),
+        _command(_LINE_TO, 3),
+        _zigzag(x1 - x0), 0,
+        0, _zigzag(y1 - y0),
+        _zigzag(x0 - x1), 0,
+        _command(_CLOSE_PATH, 1),
+    ]
+
+
+def _command(command_id: int, count: int) -> int:
+    return (command_id & 0x7) | (count << 3)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 31)
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _message_field(number: int, payload: bytes) -> bytes:
+    """Length-delimited field (wire type 2)"""
+    return _varint((number << 3) | 2) + _varint(len(payload)) + payload
+
+
+def _packed_field(number: int, values: list) -> bytes:
+    return _message_field(number, b''.join(_varint(v) for v in values))
+
+
+class _LayerBuilder:
+    """Accumulates features with shared key/value tables for one MVT layer"""
+
+    def __init__(self):
+        self.features = []
+        self.keys: Dict[str, int] = {}
+        self.values: Dict[Tuple[type, Any], int] = {}
+
+    def add_feature(self, feature_id: int, geometry: list, properties: Dict[str, Any]):
+        tags = []
+        for key, value in properties.items():
+            tags.append(self.keys.setdefault(key, len(self.keys)))
+            tags.append(self.values.setdefault((type(value), value), len(self.values)))
+
+        self.features.append(b''.join([
+            _varint((1 << 3) | 0) + _varint(feature_id),
+            _packed_field(2, tags),
+            _varint((3 << 3) | 0) + _varint(_POLYGON),
+            _packed_field(4, geometry),
+        ]))
+
+    def encode(self) -> bytes:
+        parts = [
+            _varint((15 << 3) | 0) + _varint(2),
+            _message_field(1, LAYER_NAME.encode('utf-8')),
+        ]
+        parts.extend(_message_field(2, feature) for feature in self.features)
+        parts.extend(_message_field(3, key.encode('utf-8')) for key in self.keys)
+        parts.extend(_message_field(4, self._encode_value(value)) for _, value in self.values)
+        parts.append(_varint((5 << 3) | 0) + _varint(TILE_EXTENT))
+        return b''.join(parts)
+
+    @staticmethod
+    def _encode_value(value: Any) -> bytes:
+        if isinstance(value, str):
+            return _message_field(1, value.encode('utf-8'))
+        if isinstance(value, int):
+            return _varint((5 << 3) | 0) + _varint(value)
+        return _varint((3 << 3) | 1) + np.float64(value).astype('<f8').tobytes()
+
+
+# Singleton instance
+_tile_cache_instance = None
+
+def get_tile_cache() -> TileCache:
+    """Get or create vector tile cache instance"""
+    global _tile_cache_instance
+    if _tile_cache_instance is None:
+        _tile_cache_instance = TileCache()
+    return _tile_cache_instance
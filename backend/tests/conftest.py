@@ -0,0 +1,26 @@
+"""
+Shared Test Fixtures
+Helpers used by more than one test module
+"""
+
+import random
+
+import pytest
+
+
+def _score_cells(cells):
+    """Attach deterministic risk results like the analysis pipeline"""
+    scored = []
+    for i, cell in enumerate(cells):
+        random.seed(i)
+        score = random.randint(20, 95)
+        level = "High" if score > 75 else "Medium" if score > 50 else "Low"
+        factors = random.sample(["Drought Stress", "Pest Susceptibility", "Soil Degradation"], k=2) if score > 50 else []
+        scored.append({**cell, 'risk_score': score, 'risk_level': level, 'risk_factors': factors})
+    return scored
+
+
+@pytest.fixture
+def score_cells():
+    """Function attaching deterministic risk results to grid cells"""
+    return _score_cells
@@ -0,0 +1,191 @@
+"""
+Test Analysis Admission Control
+Validates cost estimation, budget enforcement and shortest-job-first
+scheduling of analysis jobs
+"""
+
+import pytest
+import asyncio
+import sys
+from pathlib import Path
+
+# Add repository root to path (job queue imports backend.* modules)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.services.admission import (
+    AdmissionRejected,
+    AnalysisScheduler,
+    FIXED_COST_UNITS,
+    estimate_analysis_cost,
+    estimate_cell_count,
+)
+from backend.services.job_queue import AnalysisJobManager, QueueFullError
+
+
+class TestCostEstimation:
+    """Test suite for analysis cost estimates"""
+
+    def test_cell_count_scales_with_granularity(self):
+        """Test finer grids produce quadratically more cells"""
+        assert estimate_cell_count(100, 1) == 100
+        assert estimate_cell_count(100, 2) == 25
+        assert estimate_cell_count(100, 0.5) == 400
+
+    def test_tiny_area_has_one_cell(self):
+        """Test any area costs at least one cell"""
+        assert estimate_cell_count(0.01, 5) == 1
+
+    def test_cost_includes_fixed_work(self):
+        """Test cost adds fixed per-analysis work to the cell count"""
+        estimate = estimate_analysis_cost(100, 1)
+        assert estimate['cells'] == 100
+        assert estimate['cost'] == 100 + FIXED_COST_UNITS
+
+
+class TestAnalysisScheduler:
+    """Test suite for the shortest-job-first scheduler"""
+
+    def test_oversized_job_rejected(self):
+        """Test jobs above the maximum cost are rejected with 413"""
+        scheduler = AnalysisScheduler(max_workers=2, max_job_cost=1000)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            scheduler.check_admission('client', 5000)
+        assert excinfo.value.status_code == 413
+
+    def test_per_client_budget(self):
+        """Test a client over its budget is rejected with a wait estimate"""
+        scheduler = AnalysisScheduler(max_workers=2, per_client_budget=1000)
+        scheduler.enqueue('a', 'client', 800)
+
+        with pytest.raises(AdmissionRejected) as excinfo:
+            scheduler.check_admission('client', 300)
+        assert excinfo.value.status_code == 429
+        assert excinfo.value.estimated_wait_seconds > 0
+
+        # Other clients are unaffected
+        assert scheduler.check_admission('other', 300) == 0.0
+
+    def test_shortest_job_first(self):
+        """Test the cheapest queued job starts first"""
+        scheduler = AnalysisScheduler(max_workers=1)
+        scheduler.enqueue('large', 'a', 2000)
+        scheduler.enqueue('small', 'b', 100)
+        scheduler.enqueue('medium', 'c', 800)
+
+        order = []
+        while True:
+            job_id = scheduler.pop_runnable()
+            if job_id is None:
+                break
+            order.append(job_id)
+            scheduler.finish(job_id)
+
+        assert order == ['small', 'medium', 'large']
+
+    def test_last_worker_reserved_for_small_jobs(self):
+        """Test a large job cannot take the last free worker"""
+        scheduler = AnalysisScheduler(max_workers=2, small_job_cost=500)
+        scheduler.enqueue('large-1', 'a', 3000)
+        scheduler.enqueue('large-2', 'b', 3000)
+
+        assert scheduler.pop_runnable() == 'large-1'
+        assert scheduler.pop_runnable() is None
+
+        scheduler.enqueue('small', 'c', 100)
+        assert scheduler.pop_runnable() == 'small'
+
+    def test_global_budget(self):
+        """Test running cost stays within the global budget"""
+        scheduler = AnalysisScheduler(max_workers=4, global_budget=1000, small_job_cost=1000)
+        scheduler.enqueue('a', 'a', 600)
+        scheduler.enqueue('b', 'b', 600)
+
+        assert scheduler.pop_runnable() == 'a'
+        assert scheduler.pop_runnable() is None
+
+        scheduler.finish('a')
+        assert scheduler.pop_runnable() == 'b'
+
+    def test_aging_prevents_starvation(self):
+        """Test a long-waiting large job overtakes newer small ones"""
+        scheduler = AnalysisScheduler(max_workers=1, aging_units_per_second=100)
+        scheduler.enqueue('large', 'a', 2000)
+        scheduler._queued['large'].enqueued_at -= 30  # waited 30s
+        scheduler.enqueue('small', 'b', 100)
+
+        assert scheduler.pop_runnable() == 'large'
+
+    def test_aged_large_job_takes_last_worker(self):
+        """Test a large job blocked by a steady stream of small jobs runs once it has aged"""
+        scheduler = AnalysisScheduler(max_workers=2, small_job_cost=500, aging_units_per_second=100)
+        scheduler.enqueue('busy', 'a', 100)
+        assert scheduler.pop_runnable() == 'busy'  # one worker always busy with small jobs
+        scheduler.enqueue('large', 'b', 3000)
+
+        started = []
+        for i in range(3):
+            scheduler.enqueue(f'small-{i}', 'c', 100)
+            started.append(scheduler.pop_runnable())
+            scheduler.finish(started[-1])
+        assert started == ['small-0', 'small-1', 'small-2']
+
+        scheduler._queued['large'].enqueued_at -= 30  # waited 30s: priority 3000 - 3000, ahead of new small jobs
+        scheduler.enqueue('small-3', 'c', 100)
+        assert scheduler.pop_runnable() == 'large'
+
+    def test_wait_estimate(self):
+        """Test wait is zero with a free worker and positive when busy"""
+        scheduler = AnalysisScheduler(max_workers=1)
+        assert scheduler.estimate_wait(100) == 0.0
+
+        scheduler.enqueue('a', 'a', 1000)
+        scheduler.pop_runnable()
+        assert scheduler.estimate_wait(100) > 0
+
+
+class TestJobManagerAdmission:
+    """Test suite for admission through the job manager"""
+
+    def test_small_job_runs_before_queued_large_job(self):
+        """Test a small job submitted later starts before a queued large one"""
+        order = []
+
+        def make_runner(name):
+            async def runner(emit, cancel_token):
+                order.append(name)
+                await asyncio.sleep(0.01)
+                return {}
+            return runner
+
+        async def scenario():
+            manager = AnalysisJobManager(max_workers=1)
+            first = manager.submit('first', make_runner('first'), cost=100)
+            large = manager.submit('large', make_runner('large'), cost=5000)
+            small = manager.submit('small', make_runner('small'), cost=60)
+            for job in (first, large, small):
+                async for _ in job.subscribe():
+                    pass
+
+        asyncio.run(scenario())
+        assert order == ['first', 'small', 'large']
+
+    def test_rejection_does_not_create_job(self):
+        """Test rejected submissions leave no job behind"""
+        async def runner(emit, cancel_token):
+            return {}
+
+        async def scenario():
+            manager = AnalysisJobManager(max_workers=1, scheduler=AnalysisScheduler(1, max_job_cost=100))
+            with pytest.raises(AdmissionRejected):
+                manager.submit('key', runner, cost=500)
+            return manager
+
+        manager = asyncio.run(scenario())
+        assert manager.stats()['retained'] == 0
+        assert manager.find_active('key') is None
+
+    def test_queue_full_is_admission_rejection(self):
+        """Test a full queue is reported as a 503 admission rejection"""
+        error = QueueFullError('full')
+        assert isinstance(error, AdmissionRejected)
+        assert error.status_code == 503
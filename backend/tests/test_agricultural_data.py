@@ -0,0 +1,142 @@
+"""
+Test Agricultural Data Generator
+Validates vectorized generation, deterministic per-chunk seeds, the
+partitioned dataset written for large-scale training runs and native
+categorical features from training through prediction
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+import joblib
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data.synthetic_data_generator import (
+    CROP_STAGES,
+    CROP_TYPES,
+    PEST_PRESSURE_LEVELS,
+    AgriculturalDataGenerator,
+    partition_files,
+    read_partitions,
+)
+from models.risk_model import RiskPredictionModel
+from services.model_trainer import CATEGORICAL_FEATURES, ModelTrainer
+
+
+@pytest.fixture(scope='module')
+def generated_data():
+    return AgriculturalDataGenerator(n_samples=5000, seed=7).generate()
+
+
+class TestAgriculturalDataGenerator:
+    """Test suite for agricultural training data"""
+
+    def test_columns_and_ranges(self, generated_data):
+        """Test every row is within the documented feature ranges"""
+        df = generated_data
+
+        assert len(df) == 5000
+        assert df['cell_id'].is_unique
+        assert df['cell_id'].iloc[0] == 'cell-00000'
+        assert df['risk_score'].between(0, 100).all()
+        assert df['lat'].between(-4, 1).all() and df['lng'].between(34, 40).all()
+        assert set(df['crop_type']) == set(CROP_TYPES)
+        assert set(df['pest_pressure']) == set(PEST_PRESSURE_LEVELS)
+        assert set(df['crop_stage']) == set(CROP_STAGES)
+        for feature in ('ndvi', 'soil_moisture', 'humidity'):
+            assert df[feature].isna().mean() == pytest.approx(0.025, abs=0.001)
+
+    def test_risk_correlations(self, generated_data):
+        """Test the features keep their relationship with risk"""
+        df = generated_data
+
+        assert df['ndvi'].corr(df['risk_score']) < -0.3
+        assert df['pest_reports_5km'].corr(df['risk_score']) > 0.5
+        assert df['days_since_last_report'].corr(df['risk_score']) < -0.5
+        assert (df[df['risk_score'] > 70]['pest_pressure'] == 'High').mean() == pytest.approx(0.7, abs=0.05)
+        sensitive = df[df['risk_score'] > 60]['crop_stage'].isin(['Flowering', 'Fruiting']).mean()
+        assert sensitive == pytest.approx(0.8, abs=0.05)
+
+    def test_chunks_are_deterministic(self):
+        """Test a chunk depends only on the seed and its index"""
+        generator = AgriculturalDataGenerator(n_samples=2500, seed=3, chunk_size=1000)
+
+        assert generator.n_chunks == 3
+        assert len(generator.generate_chunk(2)) == 500
+        pd.testing.assert_frame_equal(generator.generate_chunk(1), generator.generate_chunk(1))
+        assert generator.generate_chunk(1)['cell_id'].iloc[0] == 'cell-01000'
+        assert not np.array_equal(generator.generate_chunk(0)['risk_score'], generator.generate_chunk(1)['risk_score'])
+
+        whole = generator.generate()
+        pd.testing.assert_frame_equal(whole.iloc[1000:2000].reset_index(drop=True), generator.generate_chunk(1))
+
+        with pytest.raises(IndexError):
+            generator.generate_chunk(3)
+
+    def test_parallel_partitions_match_serial(self, tmp_path):
+        """Test partitions built in worker processes equal those built in order"""
+        generator = AgriculturalDataGenerator(n_samples=2500, seed=3, chunk_size=1000)
+
+        generator.write_partitions(tmp_path / 'serial', workers=1)
+        generator.write_partitions(tmp_path / 'parallel', workers=2)
+
+        serial, parallel = partition_files(tmp_path / 'serial'), partition_files(tmp_path / 'parallel')
+        assert [p.name for p in serial] == ['part-00000.csv', 'part-00001.csv', 'part-00002.csv']
+        assert [p.read_bytes() for p in serial] == [p.read_bytes() for p in parallel]
+
+        df = read_partitions(tmp_path / 'parallel')
+        assert len(df) == 2500
+        assert df['cell_id'].is_unique
+        assert len(read_partitions(tmp_path / 'parallel', max_rows=1500)) == 1500
+
+    def test_trainer_loads_partitions(self, tmp_path):
+        """Test the trainer reads a partitioned dataset"""
+        AgriculturalDataGenerator(n_samples=1200, seed=3, chunk_size=500).write_partitions(tmp_path, file_format='csv.gz', workers=1)
+
+        trainer = ModelTrainer(data_path=str(tmp_path))
+        df = trainer.load_data(max_rows=800)
+        X, y = trainer.prepare_features(df)
+
+        assert len(X) == 800
+        assert 'crop_type_encoded' in X.columns
+
+    def test_native_categoricals_round_trip(self, generated_data, tmp_path):
+        """Test categories are native LightGBM features coded alike in training and prediction"""
+        csv_path = tmp_path / 'training_data.csv'
+        generated_data.to_csv(csv_path, index=False)
+        trainer = ModelTrainer(data_path=str(csv_path))
+        X, y = trainer.prepare_features(trainer.load_data())
+        trainer.train(X, y, cv_folds=2)
+
+        assert (X.dtypes == np.float32).all()
+        assert trainer.categorical_features == [f'{f}_encoded' for f in CATEGORICAL_FEATURES]
+        assert trainer.label_encoders['pest_pressure'] == ['High', 'Low', 'Medium']
+        # Categorical features list their category codes rather than a value range
+        assert {0, 1, 2, 3, 4} <= set(trainer.model.dump_model()['feature_infos']['crop_type_encoded']['values'])
+
+        model_path = tmp_path / 'risk_model.pkl'
+        joblib.dump({
+            'model': trainer.model,
+            'feature_names': trainer.feature_names,
+            'categorical_features': trainer.categorical_features,
+            'label_encoders': trainer.label_encoders,
+        }, model_path)
+        model = RiskPredictionModel(str(model_path))
+
+        # Cells carry the raw categories, as the training data does
+        rows = X.head(200).drop(columns=trainer.categorical_features)
+        raw = generated_data.loc[rows.index, CATEGORICAL_FEATURES]
+        cells = [{'id': str(i), 'features': features} for i, features in enumerate(rows.join(raw).to_dict('records'))]
+        predicted = [p['risk_score'] for p in model.predict_batch(cells)]
+        expected = np.clip(trainer.model.predict(X.head(200), num_iteration=trainer.model.best_iteration), 0, 100)
+        assert predicted == [int(round(score)) for score in expected]
+
+        codes = model._encode_categories([
+            {'features': {'crop_type': 'Tea'}}, {'features': {'crop_type': 'Cassava'}}, {'features': {}},
+        ])
+        assert codes['crop_type_encoded'][0] == 2
+        assert np.isnan(codes['crop_type_encoded'][1:]).all()
@@ -0,0 +1,184 @@
+"""
+Test Analysis Result Cache
+Validates request hashing, SQLite caching with TTL/size limits and
+replayable progress channels
+"""
+
+import pytest
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.analysis_cache import (
+    AnalysisResultCache,
+    ProgressChannel,
+    canonical_request_key,
+)
+
+
+def make_request(**overrides):
+    """Build an AnalysisRequest-shaped dict"""
+    request = {
+        'location': {
+            'type': 'custom',
+            'polygon': [
+                {'lat': -0.40, 'lng': 36.90},
+                {'lat': -0.40, 'lng': 37.00},
+                {'lat': -0.50, 'lng': 37.00},
+            ],
+        },
+        'parameters': {
+            'dateRange': {'start': '2024-01-01', 'end': '2024-03-01'},
+            'cropType': 'Maize',
+            'riskFactors': ['Drought', 'Pests'],
+        },
+        'advanced': {
+            'displayThreshold': 40,
+            'gridGranularity': 1,
+            'enabledLayers': [],
+            'temporalFocus': [],
+        },
+    }
+    for section, values in overrides.items():
+        request[section] = {**request[section], **values}
+    return request
+
+
+class TestCanonicalRequestKey:
+    """Test suite for request hashing"""
+
+    def test_identical_requests_match(self):
+        """Test identical requests produce the same key"""
+        assert canonical_request_key(make_request()) == canonical_request_key(make_request())
+
+    def test_display_options_ignored(self):
+        """Test options that do not change the analysis are ignored"""
+        base = canonical_request_key(make_request())
+        other = canonical_request_key(make_request(advanced={'displayThreshold': 70, 'enabledLayers': ['ndvi']}))
+        assert base == other
+
+    def test_risk_factor_order_ignored(self):
+        """Test risk factor ordering does not change the key"""
+        base = canonical_request_key(make_request())
+        other = canonical_request_key(make_request(parameters={'riskFactors': ['Pests', 'Drought']}))
+        assert base == other
+
+    def test_float_noise_ignored(self):
+        """Test sub-centimetre coordinate noise does not change the key"""
+        request = make_request()
+        request['location']['polygon'][0]['lat'] += 1e-9
+        assert canonical_request_key(request) == canonical_request_key(make_request())
+
+    def test_granularity_changes_key(self):
+        """Test grid granularity is part of the key"""
+        base = canonical_request_key(make_request())
+        other = canonical_request_key(make_request(advanced={'gridGranularity': 2}))
+        assert base != other
+
+    def test_crop_changes_key(self):
+        """Test crop type is part of the key"""
+        base = canonical_request_key(make_request())
+        other = canonical_request_key(make_request(parameters={'cropType': 'Coffee'}))
+        assert base != other
+
+
+class TestAnalysisResultCache:
+    """Test suite for the SQLite result cache"""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Create cache in a temporary directory"""
+        return AnalysisResultCache(db_path=str(tmp_path / 'cache.sqlite3'))
+
+    def test_round_trip(self, cache):
+        """Test stored results are returned intact"""
+        result = {'summary': {'totalCells': 3}, 'geoJSON': {'type': 'FeatureCollection', 'features': []}}
+        cache.put('key-1', result)
+
+        assert cache.get('key-1') == result
+        assert cache.stats()['hits'] == 1
+
+    def test_missing_key(self, cache):
+        """Test unknown keys miss"""
+        assert cache.get('unknown') is None
+        assert cache.stats()['misses'] == 1
+
+    def test_ttl_expiry(self, tmp_path):
+        """Test entries older than the TTL are dropped"""
+        cache = AnalysisResultCache(db_path=str(tmp_path / 'cache.sqlite3'), ttl_seconds=-1)
+        cache.put('key-1', {'value': 1})
+
+        assert cache.get('key-1') is None
+
+    def test_max_entries_evicts_least_recently_used(self, tmp_path):
+        """Test the entry limit evicts the least recently used entry"""
+        cache = AnalysisResultCache(db_path=str(tmp_path / 'cache.sqlite3'), max_entries=2)
+        cache.put('a', {'value': 'a'})
+        cache.put('b', {'value': 'b'})
+        cache.get('a')
+        cache.put('c', {'value': 'c'})
+
+        assert cache.get('a') is not None
+        assert cache.get('b') is None
+        assert cache.get('c') is not None
+
+    def test_persistence(self, tmp_path):
+        """Test entries survive reopening the database"""
+        db_path = str(tmp_path / 'cache.sqlite3')
+        AnalysisResultCache(db_path=db_path).put('key-1', {'value': 1})
+
+        assert AnalysisResultCache(db_path=db_path).get('key-1') == {'value': 1}
+
+    def test_lookup_by_analysis_id(self, tmp_path):
+        """Test results are found by the analyses that computed or were served them"""
+        db_path = str(tmp_path / 'cache.sqlite3')
+        cache = AnalysisResultCache(db_path=db_path)
+        cache.put('key-1', {'value': 1}, analysis_id='job-1')
+        cache.link('job-2', 'key-1')
+
+        reopened = AnalysisResultCache(db_path=db_path)
+        assert reopened.get_by_analysis_id('job-1') == {'value': 1}
+        assert reopened.get_by_analysis_id('job-2') == {'value': 1}
+        assert reopened.get_by_analysis_id('job-3') is None
+
+    def test_replaced_result_drops_analysis_ids(self, cache):
+        """Test a result stored again for the same key is not served to earlier analyses"""
+        cache.put('key-1', {'value': 1}, analysis_id='job-1')
+        cache.put('key-1', {'value': 2}, analysis_id='job-2')
+        cache.invalidate('key-1')
+        cache.put('key-1', {'value': 3})
+
+        assert cache.get_by_analysis_id('job-1') is None
+        assert cache.get_by_analysis_id('job-2') is None
+
+
+class TestProgressChannel:
+    """Test suite for replayable progress channels"""
+
+    def test_late_subscriber_replays_events(self):
+        """Test a late subscriber receives earlier events"""
+        async def scenario():
+            channel = ProgressChannel()
+            await channel.publish({'step': 'a'})
+            await channel.publish({'step': 'b'})
+            await channel.close()
+            return [event async for event in channel.subscribe()]
+
+        events = asyncio.run(scenario())
+        assert [e['step'] for e in events] == ['a', 'b']
+
+    def test_events_are_numbered(self):
+        """Test events carry sequential seq numbers for resuming"""
+        async def scenario():
+            channel = ProgressChannel()
+            for step in ['a', 'b', 'c']:
+                await channel.publish({'step': step})
+            await channel.close()
+            return [event async for event in channel.subscribe(after=1)]
+
+        events = asyncio.run(scenario())
+        assert [e['seq'] for e in events] == [1, 2]
+        assert [e['step'] for e in events] == ['b', 'c']
@@ -0,0 +1,355 @@
+"""
+Test Benchmark Suite
+Validates the synthetic polygons, the deterministic service fakes, stage
+measurement, the comparison of results across runs, the WebSocket load
+generator's workload and reporting, and the per-stage memory profile
+"""
+
+import asyncio
+import base64
+import numpy as np
+import pytest
+import re
+import sys
+import time
+import tracemalloc
+import zlib
+from pathlib import Path
+
+# Add repository root to path (the benchmarks use backend.* modules)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.benchmarks.fakes import FakeGEESatellite, FakeNominatim, installed_fakes, polygon_area_km2
+from backend.benchmarks.load import loop_lag_between, parse_metrics, sustained_concurrency, synthetic_request
+from backend.benchmarks.memory import profile_stage
+from backend.benchmarks.polygons import synthetic_polygon
+from backend.benchmarks.runner import compare, measure, run_case, stand_in_risk_model
+from backend.main import AnalysisRequest
+from backend.services.grid_encoding import encode_grid
+
+
+@pytest.fixture(scope='module')
+def risk_model():
+    return stand_in_risk_model()
+
+
+def pdf_text(pdf: bytes) -> bytes:
+    """Decoded page content of a ReportLab PDF (ASCII85 + Flate streams)"""
+    streams = re.findall(rb'/Filter \[ /ASCII85Decode /FlateDecode \].*?stream\r?\n(.*?)endstream', pdf, re.S)
+    return b''.join(zlib.decompress(base64.a85decode(stream.strip()[:-2])) for stream in streams)
+
+
+class TestFakes:
+    """Test suite for polygons and service fakes"""
+
+    @pytest.mark.parametrize('area_km2', [1, 250, 5000])
+    def test_polygon_area(self, area_km2):
+        """Test synthetic polygons have the requested area"""
+        polygon = synthetic_polygon(area_km2)
+        assert polygon_area_km2(polygon) == pytest.approx(area_km2, rel=1e-3)
+        assert synthetic_polygon(area_km2) == polygon  # deterministic
+
+    def test_fake_gee_is_deterministic(self):
+        """Test the fake GEE samples the same NDVI for the same cells"""
+        gee = FakeGEESatellite()
+        cells = gee.create_grid_cells(synthetic_polygon(50), 1)
+
+        first = gee.extract_features_for_cells(cells, '2024-01-01', '2024-03-31')
+        second = gee.extract_features_for_cells(cells, '2024-01-01', '2024-03-31')
+
+        assert [c['features']['ndvi'] for c in first] == [c['features']['ndvi'] for c in second]
+        assert all(0.1 <= c['features']['ndvi'] <= 0.9 for c in first)
+        assert gee.calculate_polygon_area_km2(synthetic_polygon(50)) == pytest.approx(50, rel=1e-3)
+
+    def test_fake_gee_ndvi_is_spatially_correlated(self):
+        """Test neighbouring cells get similar NDVI, unlike cells far apart"""
+        gee = FakeGEESatellite()
+        cells = gee.extract_features_for_cells(gee.create_grid_cells(synthetic_polygon(2000), 1), '2024-01-01', '2024-03-31')
+        ndvi = {(c['row'], c['col']): c['features']['ndvi'] for c in cells}
+
+        def mean_difference(d_row, d_col):
+            pairs = [(v, ndvi[r + d_row, c + d_col]) for (r, c), v in ndvi.items() if (r + d_row, c + d_col) in ndvi]
+            return np.mean([abs(a - b) for a, b in pairs])
+
+        assert mean_difference(0, 1) < 0.5 * mean_difference(0, 20)
+
+    def test_fake_nominatim(self):
+        """Test reverse geocoding returns a Kenyan county"""
+        location = FakeNominatim().reverse("-0.45, 36.95", language='en')
+        assert location.raw['address']['country'] == 'Kenya'
+
+
+class TestRunner:
+    """Test suite for measurement and results"""
+
+    def test_measure(self):
+        """Test timings and peak memory are reported for a stage"""
+        result, measurement = measure(lambda: [0] * 100_000, repeat=2)
+
+        assert len(result) == 100_000
+        assert measurement['seconds']['min'] <= measurement['seconds']['median'] <= measurement['seconds']['max']
+        assert measurement['peakMemoryBytes'] >= 800_000
+
+    def test_run_case(self, risk_model):
+        """Test each selected stage is measured on the previous stage's output"""
+        stages = ('grid', 'feature_engineering', 'predict_batch', 'serialization')
+        case = run_case(100, 2, risk_model, stages=stages, repeat=1)
+
+        assert case['cells'] > 0
+        assert list(case['stages']) == list(stages)
+        assert case['stages']['serialization']['gzipBytes'] < case['stages']['serialization']['jsonBytes']
+        assert case['stages']['predict_batch']['model']['predict_seconds'] >= 0
+
+    def test_compare(self):
+        """Test stages are compared by median time and peak memory"""
+        def results(seconds, memory):
+            stage = {'seconds': {'median': seconds}, 'peakMemoryBytes': memory}
+            return {'cases': [{'areaKm2': 100, 'granularityKm': 1, 'stages': {'grid': stage, 'pdf': {'skipped': 'n/a'}}}]}
+
+        rows = compare(results(0.2, 1000), results(0.1, 1500))
+
+        assert len(rows) == 1
+        assert rows[0]['stage'] == 'grid'
+        assert rows[0]['timeRatio'] == pytest.approx(0.5)
+        assert rows[0]['memoryRatio'] == pytest.approx(1.5)
+
+
+def lag_metrics(buckets, total, stalls):
+    """/metrics text for the loop lag histogram and stall counter"""
+    lines = [f'agrisentry_event_loop_lag_seconds_bucket{{le="{le}"}} {count}' for le, count in buckets]
+    lines += [
+        f'agrisentry_event_loop_lag_seconds_count {buckets[-1][1]}',
+        f'agrisentry_event_loop_lag_seconds_sum {total}',
+        f'agrisentry_event_loop_stalls_total{{cause="blocking_call"}} {stalls}',
+    ]
+    return parse_metrics('\n'.join(lines))
+
+
+class TestCachedSearch:
+    """Test suite for search results served to degraded analyses"""
+
+    def test_second_analysis_hits_cache_after_gemini(self, monkeypatch):
+        """Test a timed-out search gets the area's earlier results although Gemini described it"""
+        import backend.main as main
+
+        # No stage estimates: Gemini always runs and the live search gets the whole budget
+        for name in ('GEMINI_SECONDS', 'PERPLEXITY_SECONDS', 'MODELING_SECONDS'):
+            monkeypatch.setattr(main, name, 0)
+        monkeypatch.setattr(main, 'estimate_extraction_seconds', lambda cell_count: 0)
+        # Gemini words its description of the same area differently each time
+        descriptions = iter(['Maize plots on terraced slopes.', 'Terraced maize smallholdings.'])
+        monkeypatch.setattr(main, '_describe_area_with_gemini', lambda *args: next(descriptions))
+        request = AnalysisRequest(**synthetic_request(0))
+
+        def analyze(budget_seconds):
+            events = []
+
+            async def emit(event):
+                events.append(event)
+
+            request.advanced.latencyBudgetSeconds = budget_seconds
+            result = asyncio.run(main.run_analysis_pipeline(request, emit))
+            return next(e['data'] for e in events if e['type'] == 'search_results'), result['metadata']
+
+        with installed_fakes():
+            live, _ = analyze(600)
+            main.get_perplexity_instance().latency_seconds = 1.0
+            cached, metadata = analyze(0.3)
+
+        assert 'Maize plots on terraced slopes.' in live['query']  # searched with Gemini's description
+        assert cached == {**live, 'cached': True}
+        assert [d['detail'] for d in metadata['degradations'] if d['detail'].startswith('live search')] == \
+               ["live search timed out; cached results served"]
+
+
+class TestCachedAnalysis:
+    """Test suite for analyses served from the result cache"""
+
+    def test_cache_hit_marks_performance(self, tmp_path, monkeypatch):
+        """Test a cached result's performance block is marked as the earlier analysis's"""
+        import backend.main as main
+        import backend.services.analysis_cache as analysis_cache
+        import backend.services.job_queue as job_queue
+
+        monkeypatch.setattr(analysis_cache, '_cache_instance', analysis_cache.AnalysisResultCache(db_path=str(tmp_path / 'cache.sqlite3')))
+        monkeypatch.setattr(job_queue, '_job_manager_instance', None)
+        request = AnalysisRequest(**synthetic_request(1))
+        request.advanced.latencyBudgetSeconds = 600  # no UI pacing pauses
+
+        async def scenario():
+            fresh = await main.submit_analysis(request)
+            events = [event async for event in fresh.subscribe()]
+            cached = await main.submit_analysis(request)
+            return events[-1], [event async for event in cached.subscribe()][-1]
+
+        with installed_fakes():
+            fresh, cached = asyncio.run(scenario())
+
+        performance = fresh['data']['metadata']['performance']
+        assert performance['cached'] is False and performance['cells'] > 0
+        assert cached['data']['metadata']['performance'] == {**performance, 'cached': True}
+        assert cached['data']['summary'] == fresh['data']['summary']
+
+    def test_tiles_outlive_retained_job(self, tmp_path, monkeypatch):
+        """Test a forgotten job's grid and tiles are served from the analysis cache"""
+        import backend.main as main
+        import backend.services.analysis_cache as analysis_cache
+        import backend.services.job_queue as job_queue
+        from backend.services.vector_tiles import get_tile_cache
+
+        monkeypatch.setattr(analysis_cache, '_cache_instance', analysis_cache.AnalysisResultCache(db_path=str(tmp_path / 'cache.sqlite3')))
+        monkeypatch.setattr(job_queue, '_job_manager_instance', None)
+        request = AnalysisRequest(**synthetic_request(3))
+        request.advanced.latencyBudgetSeconds = 600  # no UI pacing pauses
+
+        async def scenario():
+            fresh = await main.submit_analysis(request)
+            [event async for event in fresh.subscribe()]
+            cached = await main.submit_analysis(request)
+            grid = fresh.result['grid']
+            tile = await main.get_analysis_tile(fresh.id, 0, 0, 0)
+
+            # A restarted server no longer knows either job
+            monkeypatch.setattr(job_queue, '_job_manager_instance', None)
+            get_tile_cache().discard(fresh.id)
+            return (
+                grid, tile.body,
+                await main.get_analysis_tile(fresh.id, 0, 0, 0),
+                await main.get_analysis_job_grid(cached.id)
+            )
+
+        with installed_fakes():
+            grid, tile, restored_tile, restored_grid = asyncio.run(scenario())
+
+        assert restored_tile.body == tile
+        assert restored_grid.body == encode_grid(grid)
+
+    def test_report_risk_map_outlives_retained_job(self, tmp_path, monkeypatch):
+        """Test PNG tiles and the PDF risk map of a forgotten job come from the analysis cache, and a missing map is noted"""
+        import backend.main as main
+        import backend.services.analysis_cache as analysis_cache
+        import backend.services.job_queue as job_queue
+        from backend.services.raster_tiles import get_raster_tile_cache
+
+        monkeypatch.setattr(analysis_cache, '_cache_instance', analysis_cache.AnalysisResultCache(db_path=str(tmp_path / 'cache.sqlite3')))
+        monkeypatch.setattr(job_queue, '_job_manager_instance', None)
+        request = AnalysisRequest(**synthetic_request(4))
+        request.advanced.latencyBudgetSeconds = 600  # no UI pacing pauses
+
+        async def report(analysis_id):
+            response = await main.generate_pdf(main.PDFRequest(
+                farmName='Farm', lat=-0.4, lon=36.9, areaKm2=1, cropType='Maize', risk_score=50,
+                policy_type='Standard', max_coverage=1000, deductible=100, premium=50,
+                coverage_period='12 Months', factors=[], recommended_actions=[], analysisId=analysis_id
+            ))
+            return pdf_text(b''.join([chunk async for chunk in response.body_iterator]))
+
+        async def scenario():
+            job = await main.submit_analysis(request)
+            [event async for event in job.subscribe()]
+
+            monkeypatch.setattr(job_queue, '_job_manager_instance', None)
+            get_raster_tile_cache().discard(job.id)
+            tile = await main.get_analysis_raster_tile(job.id, 0, 0, 0)
+            return tile.body, await report(job.id), await report('unknown')
+
+        with installed_fakes():
+            tile, found, missing = asyncio.run(scenario())
+
+        assert tile.startswith(b'\x89PNG')
+        assert b'Field Risk Map' in found and b'could not be rendered' not in found
+        assert b'Field Risk Map' in missing and b'could not be rendered' in missing
+
+    def test_rejected_submission_keeps_armed_profile(self, tmp_path, monkeypatch):
+        """Test a queue-full submission leaves the armed profile for the next admitted analysis"""
+        import backend.main as main
+        import backend.services.analysis_cache as analysis_cache
+        import backend.services.job_queue as job_queue
+        import backend.services.profiling as profiling
+
+        monkeypatch.setattr(analysis_cache, '_cache_instance', analysis_cache.AnalysisResultCache(db_path=str(tmp_path / 'cache.sqlite3')))
+        monkeypatch.setattr(profiling, '_profiler_instance', profiling.Profiler())
+        profiling.get_profiler().arm(count=1)
+        request = AnalysisRequest(**synthetic_request(2))
+        request.advanced.latencyBudgetSeconds = 600  # no UI pacing pauses
+
+        async def scenario():
+            monkeypatch.setattr(job_queue, '_job_manager_instance', job_queue.AnalysisJobManager(max_queued=0))
+            with pytest.raises(job_queue.QueueFullError):
+                await main.submit_analysis(request)
+            assert profiling.get_profiler().status()['armed']['remaining'] == 1
+
+            monkeypatch.setattr(job_queue, '_job_manager_instance', None)
+            job = await main.submit_analysis(request)
+            return [event async for event in job.subscribe()][-1]
+
+        with installed_fakes():
+            final = asyncio.run(scenario())
+
+        assert final['type'] == 'complete'
+        status = profiling.get_profiler().status()
+        assert status['armed'] is None and len(status['profiles']) == 1
+
+
+class TestLoadGenerator:
+    """Test suite for the WebSocket load generator"""
+
+    def test_synthetic_requests(self):
+        """Test replayed requests are valid, reproducible and distinct"""
+        requests = [synthetic_request(i, seed=1) for i in range(20)]
+
+        for request in requests:
+            AnalysisRequest(**request)
+        assert synthetic_request(3, seed=1) == requests[3]
+        assert len({str(r['location']['polygon']) for r in requests}) == 20
+        assert {r['advanced']['gridGranularity'] for r in requests} <= {1, 2, 5}
+
+    def test_loop_lag_between_scrapes(self):
+        """Test loop lag is reported for the samples taken during a step"""
+        before = lag_metrics([('0.001', 100), ('0.01', 100), ('0.5', 100), ('+Inf', 100)], 0.05, 0)
+        after = lag_metrics([('0.001', 150), ('0.01', 197), ('0.5', 200), ('+Inf', 200)], 1.05, 2)
+
+        lag = loop_lag_between(before, after)
+
+        assert lag['samples'] == 100
+        assert lag['meanSeconds'] == pytest.approx(0.01)
+        assert lag['p50Seconds'] == 0.001
+        assert lag['p99Seconds'] == 0.5
+        assert lag['stalls'] == {'blocking_call': 2}
+
+    def test_sustained_concurrency(self):
+        """Test the sustained level is the last one within the limits"""
+        def step(concurrency, error_rate, ttc_p99):
+            return {'concurrency': concurrency, 'errorRate': error_rate, 'ttcSeconds': {'p99': ttc_p99}}
+
+        steps = [step(10, 0, 5), step(50, 0.005, 20), step(100, 0.2, 60), step(200, 0, 10)]
+
+        assert sustained_concurrency(steps) == 50
+        assert sustained_concurrency(steps, ttc_p99_seconds=10) == 10
+        assert sustained_concurrency([step(10, 0.5, 5)]) is None
+
+
+class TestMemoryProfile:
+    """Test suite for the per-stage memory profile"""
+
+    def test_peak_and_retained(self):
+        """Test a stage's transient allocations count towards its peak only"""
+        def stage():
+            scratch = bytearray(8 * 2 ** 20)  # freed when the stage returns
+            kept = [bytes(1024) for _ in range(1024)]
+            time.sleep(0.05)  # long enough for the peak watcher to see it
+            del scratch
+            return kept
+
+        tracemalloc.start()
+        try:
+            kept, profile = profile_stage(stage, top=3)
+        finally:
+            tracemalloc.stop()
+
+        assert len(kept) == 1024
+        assert profile['peakBytes'] >= 8 * 2 ** 20
+        assert 2 ** 20 <= profile['retainedBytes'] < 2 * 2 ** 20
+        assert __file__ in profile['topRetained'][0]['site'][0]
+        assert profile['topAtPeak'][0]['sizeBytes'] >= 8 * 2 ** 20
+        assert profile['peakCapturedBytes'] >= 0.9 * profile['peakBytes']
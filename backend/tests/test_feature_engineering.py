@@ -0,0 +1,113 @@
+"""
+Test Shared Feature Engineering
+Validates the vectorized derived features, their serialized form and that
+training, extraction and serving compute the same values
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import joblib
+import lightgbm as lgb
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.risk_model import RiskPredictionModel
+from services.feature_engineering import (
+    AGRICULTURAL_FEATURES,
+    EXTRACTOR_FEATURES,
+    TRANSFORM_VERSION,
+    FeatureTransform,
+)
+from services.feature_extractor import FeatureExtractor
+
+
+BASE_FEATURES = ['ndvi', 'soil_moisture', 'dist_to_water', 'pest_reports_5km', 'days_since_last_report', 'humidity', 'temperature']
+
+
+@pytest.fixture
+def base_data():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'ndvi': rng.uniform(0.1, 0.9, 500),
+        'soil_moisture': rng.uniform(0, 1, 500),
+        'dist_to_water': rng.uniform(0, 10000, 500),
+        'pest_reports_5km': rng.integers(0, 10, 500),
+        'days_since_last_report': rng.integers(0, 365, 500),
+        'humidity': rng.uniform(20, 100, 500),
+        'temperature': rng.uniform(10, 40, 500),
+    })
+
+
+class TestFeatureTransform:
+    """Test suite for the shared feature transform"""
+
+    def test_agricultural_features(self, base_data):
+        """Test derived features are computed column-wise and appended in order"""
+        df = FeatureTransform().transform(base_data)
+
+        assert list(df.columns) == BASE_FEATURES + list(AGRICULTURAL_FEATURES)
+        assert 'fungal_risk_index' not in base_data  # input left unchanged
+        row = base_data.iloc[3]
+        assert df['fungal_risk_index'].iloc[3] == pytest.approx(row['humidity'] * row['temperature'] / 100)
+        assert df['pest_pressure_history'].iloc[3] == pytest.approx(row['pest_reports_5km'] / (row['days_since_last_report'] + 1))
+
+    def test_serialized_form(self):
+        """Test a transform round-trips as plain data and rejects what it can't compute"""
+        transform = FeatureTransform(['crop_health_score', 'is_weekend'])
+
+        assert transform.to_dict() == {'version': TRANSFORM_VERSION, 'features': ['crop_health_score', 'is_weekend']}
+        assert FeatureTransform.from_dict(transform.to_dict()).features == transform.features
+        assert transform.inputs == ['ndvi', 'soil_moisture', 'day_of_week']
+        with pytest.raises(ValueError):
+            FeatureTransform(['moon_phase'])
+        with pytest.raises(ValueError):
+            FeatureTransform.from_dict({'version': TRANSFORM_VERSION + 1, 'features': []})
+
+    def test_extractor_uses_transform(self):
+        """Test FeatureExtractor's derived features come from the shared transform"""
+        cells = [
+            {'id': 'cell-0', 'features': {'dist_to_boundary': 400.0, 'dist_to_water': 950.0, 'dist_to_road': 1800.0,
+                                          'dist_to_settlement': 5000.0, 'ndvi': 0.7, 'season': 'dry', 'day_of_week': 6}},
+            {'id': 'cell-1', 'features': {'dist_to_boundary': 0.0, 'dist_to_water': 50.0, 'dist_to_road': 0.0,
+                                          'dist_to_settlement': 100.0, 'ndvi': 0.3, 'season': 'wet', 'day_of_week': 2}},
+        ]
+
+        features = [c['features'] for c in FeatureExtractor()._calculate_derived_features(cells)]
+
+        assert [f['boundary_risk'] for f in features] == [1 / 500, 1 / 100]
+        assert [f['isolation_score'] for f in features] == [6800 / 2000, 100 / 2000]
+        assert [(f['dense_vegetation'], f['dry_season'], f['is_weekend']) for f in features] == [(1, 1, 1), (0, 0, 0)]
+        assert all(type(f['dense_vegetation']) is int for f in features)  # JSON-serializable
+        assert set(EXTRACTOR_FEATURES) <= set(features[0])
+
+    def test_serving_computes_derived_features(self, base_data, tmp_path):
+        """Test the model computes its derived features the way training did"""
+        X = FeatureTransform().transform(base_data).astype(np.float32)
+        y = 100 * X['pest_pressure_history'] / X['pest_pressure_history'].max()
+        booster = lgb.train({'objective': 'regression', 'verbose': -1, 'seed': 0}, lgb.Dataset(X, label=y), num_boost_round=20)
+        model_path = tmp_path / 'risk_model.pkl'
+        joblib.dump({
+            'model': booster,
+            'feature_names': list(X.columns),
+            'label_encoders': {},
+            'feature_transform': FeatureTransform().to_dict(),
+        }, model_path)
+        model = RiskPredictionModel(str(model_path))
+
+        # Cells carry the base features only
+        cells = [{'id': str(i), 'features': features} for i, features in enumerate(base_data.head(50).to_dict('records'))]
+        df, missing = model._feature_matrix(cells)
+
+        pd.testing.assert_frame_equal(df, X.head(50))
+        assert missing == [0] * 50
+        predicted = [p['risk_score'] for p in model.predict_batch(cells)]
+        assert predicted == [int(round(s)) for s in np.clip(booster.predict(X.head(50)), 0, 100)]
+
+        df, missing = model._feature_matrix([{'id': 'x', 'features': {'humidity': 'n/a', 'temperature': '30'}}])
+        assert missing == [6]
+        assert df['humidity'].iloc[0] == 60.0
+        assert df['fungal_risk_index'].iloc[0] == pytest.approx(60.0 * 30 / 100)
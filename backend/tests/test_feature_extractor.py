@@ -4,6 +4,8 @@ Validates feature extraction from geographic coordinates for model input
 """
 
 import pytest
+import contextlib
+import io
 import sys
 from pathlib import Path
 from datetime import datetime
@@ -569,6 +571,45 @@ class TestFeatureExtractor:
             assert 'dist_to_boundary' in cell['features']
 
 
+
+class TestModelInputs:
+    """Test suite for model inputs derived from the model artifact"""
+    
+    def test_columns_match_model_artifact(self, tmp_path):
+        """Test formatted cells carry exactly the artifact's inputs and build its feature matrix"""
+        from data.synthetic_data_generator import AgriculturalDataGenerator
+        from models.risk_model import RiskPredictionModel
+        from services.feature_engineering import required_inputs
+        from services.model_trainer import ModelTrainer
+        
+        df = AgriculturalDataGenerator(n_samples=1000, seed=46).generate()
+        trainer = ModelTrainer(models_dir=str(tmp_path))
+        with contextlib.redirect_stdout(io.StringIO()):
+            X, y = trainer.prepare_features(df)
+            trainer.train(X, y, cv_folds=2)
+            model_path, _ = trainer.save_model()
+        model = RiskPredictionModel(str(model_path))
+        
+        extractor = FeatureExtractor.for_model(model)
+        cells = [
+            {'id': f'cell_{i}', 'center': {'lat': row['lat'], 'lng': row['lng']}, 'features': row}
+            for i, row in enumerate(df.dropna().head(20).to_dict('records'))
+        ]
+        del cells[0]['features']['soil_moisture']  # not extracted for this cell
+        model_inputs = extractor.format_for_model_input(cells)
+        
+        assert extractor.feature_names == model.feature_names
+        assert extractor.model_inputs == required_inputs(model.feature_names, model.feature_transform)
+        assert all(list(m['features']) == extractor.model_inputs for m in model_inputs)
+        assert model_inputs[0]['features']['soil_moisture'] is None
+        
+        # The model builds its full feature matrix from them, as from the raw cells
+        matrix, missing = model._feature_matrix(model_inputs)
+        assert list(matrix.columns) == model.feature_names
+        assert missing[0] == 1 and missing[1:] == [0] * 19
+        assert matrix.equals(model._feature_matrix(cells)[0])
+
+
 if __name__ == "__main__":
     # Run tests with verbose output
     pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,122 @@
+"""
+Test Risk Grid Encoding
+Validates the columnar risk grid, its binary frame round trip and the
+GeoJSON compatibility view
+"""
+
+import pytest
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.grid_encoding import (
+    GRID_MAGIC,
+    build_geojson,
+    build_risk_grid,
+    decode_grid,
+    encode_grid,
+    result_view,
+)
+from utils.gee_satellite import GEESatellite
+
+
+class TestRiskGridEncoding:
+    """Test suite for the risk grid encoding"""
+
+    @pytest.fixture
+    def gee(self):
+        return GEESatellite.__new__(GEESatellite)  # no authentication needed
+
+    @pytest.fixture
+    def polygon(self):
+        # Triangle so some bounding-box cells fall outside the polygon
+        return [
+            {'lat': -0.50, 'lng': 36.90},
+            {'lat': -0.50, 'lng': 37.10},
+            {'lat': -0.30, 'lng': 36.90},
+        ]
+
+    @pytest.fixture
+    def grid_and_cells(self, gee, polygon, score_cells):
+        spec = gee.grid_spec(polygon, 1)
+        cells = score_cells(gee.create_grid_cells(polygon, 1))
+        return build_risk_grid(spec, cells), cells
+
+    def test_cells_carry_grid_position(self, gee, polygon):
+        """Test cell bounds follow from the grid spec and row/col"""
+        spec = gee.grid_spec(polygon, 1)
+        cells = gee.create_grid_cells(polygon, 1)
+        rows, cols = spec['shape']
+
+        assert 0 < len(cells) < rows * cols
+        for cell in cells:
+            sw = cell['bounds']['southWest']
+            assert 0 <= cell['row'] < rows and 0 <= cell['col'] < cols
+            assert sw['lat'] == spec['origin']['lat'] + cell['row'] * spec['step']['lat']
+            assert sw['lng'] == spec['origin']['lng'] + cell['col'] * spec['step']['lng']
+
+    def test_binary_round_trip(self, grid_and_cells):
+        """Test decoding an encoded frame restores the grid"""
+        grid, _ = grid_and_cells
+        payload = encode_grid(grid)
+        decoded = decode_grid(payload)
+
+        assert payload[:4] == GRID_MAGIC
+        assert decoded['origin'] == grid['origin']
+        assert decoded['step'] == grid['step']
+        assert decoded['shape'] == grid['shape']
+        assert decoded['factorNames'] == grid['factorNames']
+        for column in ('cellIndex', 'riskScore', 'riskLevel', 'factorMask'):
+            assert decoded[column].tolist() == grid[column]
+
+    def test_geojson_view_matches_cells(self, grid_and_cells):
+        """Test the GeoJSON view reproduces the per-cell feature format"""
+        grid, cells = grid_and_cells
+        features = build_geojson(grid)['features']
+
+        assert len(features) == len(cells)
+        for feature, cell in zip(features, cells):
+            sw, ne = cell['bounds']['southWest'], cell['bounds']['northEast']
+            assert feature['id'] == cell['id']
+            assert feature['properties']['riskScore'] == cell['risk_score']
+            assert feature['properties']['riskLevel'] == cell['risk_level']
+            # Factors come back in factorNames order
+            assert sorted(feature['properties']['factors']) == sorted(cell['risk_factors'])
+            ring = feature['geometry']['coordinates'][0]
+            assert ring[0] == [sw['lng'], sw['lat']]
+            assert ring[2] == pytest.approx([ne['lng'], ne['lat']])
+
+    def test_geojson_view_from_decoded_frame(self, grid_and_cells):
+        """Test the GeoJSON view is the same whether built before or after encoding"""
+        grid, _ = grid_and_cells
+        assert build_geojson(decode_grid(encode_grid(grid))) == build_geojson(grid)
+
+    def test_frame_much_smaller_than_geojson(self, gee, score_cells):
+        """Test the binary frame is an order of magnitude smaller than GeoJSON"""
+        polygon = [
+            {'lat': -1.0, 'lng': 36.5}, {'lat': -1.0, 'lng': 37.5},
+            {'lat': 0.0, 'lng': 37.5}, {'lat': 0.0, 'lng': 36.5},
+        ]
+        grid = build_risk_grid(gee.grid_spec(polygon, 2), score_cells(gee.create_grid_cells(polygon, 2)))
+
+        geojson_bytes = len(json.dumps(build_geojson(grid)).encode('utf-8'))
+        assert len(encode_grid(grid)) * 10 < geojson_bytes
+
+    def test_result_view(self, grid_and_cells):
+        """Test JSON results carry either the GeoJSON or the grid, never both"""
+        grid, _ = grid_and_cells
+        result = {'geoJSON': build_geojson(grid), 'grid': grid, 'summary': {'totalCells': 3}}
+
+        assert result_view(result) == {'geoJSON': result['geoJSON'], 'summary': result['summary']}
+        assert result_view(result, 'grid') == {'grid': grid, 'summary': result['summary']}
+        assert set(result) == {'geoJSON', 'grid', 'summary'}  # the stored result keeps both
+        with pytest.raises(ValueError):
+            result_view(result, 'binary')
+
+    def test_rejects_foreign_payload(self):
+        """Test decoding something that is not a grid frame fails clearly"""
+        with pytest.raises(ValueError):
+            decode_grid(b'{"type": "FeatureCollection"}' + b'\x00' * 64)
@@ -0,0 +1,191 @@
+"""
+Test Hyperparameter Search
+Validates the Hyperband brackets, successive halving of configurations,
+the inference-cost metric, the accuracy/latency frontier and that the
+chosen parameters feed back into training
+"""
+
+import pytest
+import contextlib
+import io
+import json
+import lightgbm as lgb
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import services.hyperparameter_search as hyperparameter_search
+from data.synthetic_data_generator import AgriculturalDataGenerator
+from services.hyperparameter_search import (
+    SEARCH_SPACE,
+    HyperparameterSearch,
+    hyperband_brackets,
+    inference_cost,
+    pareto_frontier,
+    sample_configs,
+    select_trial,
+    trial_params,
+)
+from services.model_trainer import TRAINING_PARAMS, ModelTrainer
+
+
+@pytest.fixture(scope='module')
+def search_data():
+    """Agricultural data and a trainer to prepare its features"""
+    df = AgriculturalDataGenerator(n_samples=3000, seed=21).generate()
+    trainer = ModelTrainer()
+    return trainer, df
+
+
+def run_search(search_data, **kwargs):
+    trainer, df = search_data
+    with contextlib.redirect_stdout(io.StringIO()):
+        search = HyperparameterSearch.from_trainer(trainer, df, **{'min_rounds': 10, 'max_rounds': 90, **kwargs})
+        return search.run()
+
+
+class TestSearchSpace:
+    """Test suite for configurations and brackets"""
+
+    def test_sample_configs(self):
+        """Test sampled values stay in range with the parameter's type"""
+        configs = sample_configs(200, np.random.default_rng(0))
+
+        assert len(configs) == 200
+        for name, (scale, low, high) in SEARCH_SPACE.items():
+            values = [c[name] for c in configs]
+            assert all(low <= v <= high for v in values), name
+            assert all(type(v) is (int if scale == 'int_log' else float) for v in values), name
+        # Log scale: as many learning rates below 0.055 (the geometric midpoint) as above
+        assert 70 < sum(c['learning_rate'] < np.sqrt(0.01 * 0.3) for c in configs) < 130
+
+    def test_brackets(self):
+        """Test every bracket ends at max_rounds, starting lower with more configurations"""
+        assert hyperband_brackets(30, 1000, 3) == [(27, 37), (12, 111), (6, 333), (4, 1000)]
+        assert hyperband_brackets(10, 90, 3) == [(9, 10), (5, 30), (3, 90)]
+        assert hyperband_brackets(100, 100, 3) == [(1, 100)]
+
+    def test_invalid_settings(self, search_data):
+        """Test settings that can't form brackets are rejected"""
+        with pytest.raises(ValueError):
+            run_search(search_data, workers=1, min_rounds=200)
+        with pytest.raises(ValueError):
+            run_search(search_data, workers=1, eta=1)
+
+
+class TestFrontier:
+    """Test suite for choosing on RMSE and inference cost"""
+
+    def test_pareto_frontier(self):
+        """Test dominated trials are left out and the budget picks the most accurate affordable one"""
+        trials = [
+            {'id': 'a', 'rmse': 9.0, 'inference_cost': 100},
+            {'id': 'b', 'rmse': 6.0, 'inference_cost': 400},
+            {'id': 'c', 'rmse': 7.0, 'inference_cost': 500},  # dominated by b
+            {'id': 'd', 'rmse': 5.0, 'inference_cost': 2000},
+            {'id': 'e', 'rmse': 9.5, 'inference_cost': 100},  # dominated by a
+        ]
+
+        frontier = pareto_frontier(trials)
+
+        assert [t['id'] for t in frontier] == ['a', 'b', 'd']
+        assert select_trial(frontier)['id'] == 'd'
+        assert select_trial(frontier, max_cost=1000)['id'] == 'b'
+        with pytest.raises(ValueError):
+            select_trial(frontier, max_cost=50)
+
+
+class TestHyperparameterSearch:
+    """Test suite for successive halving over real trials"""
+
+    def test_successive_halving(self, search_data):
+        """Test each rung keeps the best third with three times the rounds"""
+        results = run_search(search_data, workers=1)
+        trials = results['trials']
+
+        assert results['settings']['brackets'] == [(9, 10), (5, 30), (3, 90)]
+        assert len({t['config'] for t in trials}) == 17
+        first = [t for t in trials if t['bracket'] == 0]
+        for rung, rounds in enumerate([10, 30, 90]):
+            evaluated = [t for t in first if t['rung'] == rung]
+            assert {t['rounds'] for t in evaluated} == {rounds}
+            if rung:
+                # Survivors were the best of the previous rung and kept training from their trees
+                previous = sorted((t for t in first if t['rung'] == rung - 1), key=lambda t: t['rmse'])
+                assert {t['config'] for t in evaluated} <= {t['config'] for t in previous[:len(previous) // 3]}
+                assert all(t['best_iteration'] > rounds // 3 for t in evaluated if not t['stopped_early'])
+        assert [len([t for t in first if t['rung'] == r]) for r in range(3)] == [9, 3, 1]
+        assert all('model' not in t for t in trials)
+        json.dumps(results)
+
+        frontier = results['frontier']
+        assert frontier == pareto_frontier(trials)
+        assert all(
+            not (other['rmse'] < t['rmse'] and other['inference_cost'] <= t['inference_cost'])
+            for t in frontier for other in trials
+        )
+
+    def test_promoted_model_truncated(self, search_data):
+        """Test a trial hands on its booster truncated to the best iteration"""
+        trainer, df = search_data
+        with contextlib.redirect_stdout(io.StringIO()):
+            search = HyperparameterSearch.from_trainer(trainer, df, min_rounds=10, max_rounds=90, workers=1)
+        hyperparameter_search._init_worker(search.data)
+        try:
+            # A high learning rate stops early, with trees after the best iteration
+            trial = hyperparameter_search._run_trial(
+                {'config': 0, 'bracket': 0, 'rung': 0, 'rounds': 500, 'params': {'learning_rate': 0.3}}
+            )
+        finally:
+            hyperparameter_search._init_worker(None)
+
+        assert trial['stopped_early']
+        model = lgb.Booster(model_str=trial['model'])
+        assert model.current_iteration() == trial['best_iteration']
+        assert inference_cost(model) == trial['inference_cost']
+
+    def test_process_pool_matches_serial(self, search_data):
+        """Test trials in worker processes give the serial search's results"""
+        serial = run_search(search_data, workers=1)
+        parallel = run_search(search_data, workers=2, threads_per_trial=1)
+
+        assert parallel['settings']['workers'] == 2
+        key = lambda t: (t['config'], t['rung'])
+        assert [(key(t), t['rmse'], t['inference_cost']) for t in sorted(serial['trials'], key=key)] == \
+               [(key(t), t['rmse'], t['inference_cost']) for t in sorted(parallel['trials'], key=key)]
+
+    def test_chosen_params_train_model(self, search_data):
+        """Test the chosen configuration trains a model within its trees and cost"""
+        trainer, df = search_data
+        chosen = select_trial(run_search(search_data, workers=1)['frontier'])
+        params = trial_params(chosen)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            X, y = trainer.prepare_features(df)
+            results = trainer.train(X, y, cv_folds=2, params=params)
+
+        model = results['model']
+        assert results['metadata']['params'] == {**TRAINING_PARAMS, **params}
+        assert model.num_trees() <= chosen['best_iteration']
+        assert inference_cost(model, model.best_iteration or None) <= chosen['params']['num_leaves'] * chosen['best_iteration']
+
+    def test_cli(self, tmp_path):
+        """Test main writes the results and parameters model_trainer.py --params hashes"""
+        data_path = tmp_path / 'training_data.csv'
+        AgriculturalDataGenerator(n_samples=2000, seed=22).generate().to_csv(data_path, index=False)
+        output, params_out = tmp_path / 'search.json', tmp_path / 'params.json'
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            hyperparameter_search.main([
+                '--data', str(data_path), '--min-rounds', '10', '--max-rounds', '30', '--workers', '1',
+                '--output', str(output), '--params-out', str(params_out), '--max-cost', '5000',
+            ])
+
+        results = json.loads(output.read_text())
+        params = json.loads(params_out.read_text())
+        assert params == trial_params(select_trial(results['frontier'], 5000))
+        trainer = ModelTrainer(data_path=str(data_path))
+        assert trainer.training_hash(params=params) != trainer.training_hash()
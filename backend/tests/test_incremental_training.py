@@ -0,0 +1,136 @@
+"""
+Test Incremental Training
+Validates continued training of a saved model on newly labeled rows with a
+bounded replay of the original training data
+"""
+
+import pytest
+import contextlib
+import io
+import json
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import services.model_trainer as model_trainer
+from data.synthetic_data_generator import AgriculturalDataGenerator
+from models.risk_model import RiskPredictionModel
+from services.model_trainer import ModelTrainer
+
+
+@pytest.fixture(scope='module')
+def trained(tmp_path_factory):
+    """Training data and a model saved from it"""
+    tmp_path = tmp_path_factory.mktemp('incremental')
+    data_path = tmp_path / 'training_data.csv'
+    AgriculturalDataGenerator(n_samples=4000, seed=11).generate().to_csv(data_path, index=False)
+
+    trainer = ModelTrainer(data_path=str(data_path), models_dir=str(tmp_path / 'trained'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        X, y = trainer.prepare_features(trainer.load_data())
+        trainer.train(X, y, cv_folds=2)
+        trainer.save_model(training_hash='abc123')
+    return data_path, tmp_path / 'trained'
+
+
+@pytest.fixture
+def new_rows():
+    """Newly labeled rows where one crop has become riskier"""
+    df = AgriculturalDataGenerator(n_samples=1500, seed=12).generate()
+    df['risk_score'] = np.clip(df['risk_score'] + 15 * (df['crop_type'] == 'Tea'), 0, 100)
+    return df
+
+
+class TestIncrementalTraining:
+    """Test suite for ModelTrainer.update"""
+
+    def test_update_adds_trees(self, trained, new_rows):
+        """Test the update continues the saved booster and records what it did"""
+        data_path, models_dir = trained
+        trainer = ModelTrainer(data_path=str(data_path), models_dir=str(models_dir))
+        trainer.load_model()
+        base_trees = trainer.model.best_iteration
+        feature_names = list(trainer.feature_names)
+
+        results = trainer.update(new_rows, replay_rows=1000, num_boost_round=40)
+
+        record = results['update']
+        assert record['new_samples'] == 1500 and record['replay_samples'] == 1000
+        assert 0 < record['trees_added'] <= 40
+        assert trainer.model.best_iteration == base_trees + record['trees_added']
+        assert results['after_metrics']['rmse'] < results['before_metrics']['rmse']
+        assert trainer.feature_names == feature_names
+        assert trainer.metadata['base_training_hash'] == 'abc123'
+        assert 'training_hash' not in trainer.metadata
+        assert trainer.metadata['updates'] == [record]
+
+    def test_holdout_drawn_from_new_rows(self, trained, new_rows, monkeypatch):
+        """Test replayed rows are only trained on, never held out"""
+        data_path, models_dir = trained
+        trainer = ModelTrainer(data_path=str(data_path), models_dir=str(models_dir))
+        trainer.load_model()
+        splits, split = [], model_trainer.train_test_split
+
+        def train_test_split(rows, **kwargs):
+            splits.append(rows)
+            return split(rows, **kwargs)
+
+        monkeypatch.setattr(model_trainer, 'train_test_split', train_test_split)
+        with contextlib.redirect_stdout(io.StringIO()):
+            trainer.update(new_rows, replay_rows=1000, num_boost_round=5)
+
+        assert [list(rows) for rows in splits] == [list(range(len(new_rows)))]
+
+    def test_no_improvement_keeps_model(self, trained, new_rows):
+        """Test an update whose trees don't lower the holdout RMSE leaves the model unchanged"""
+        data_path, models_dir = trained
+        trainer = ModelTrainer(data_path=str(data_path), models_dir=str(models_dir))
+        trainer.load_model()
+        model, metadata = trainer.model, dict(trainer.metadata)
+        with contextlib.redirect_stdout(io.StringIO()):
+            X, _ = trainer.prepare_features(new_rows, fit=False)
+            # Labels the current model already predicts exactly
+            new_rows = new_rows.assign(risk_score=model.predict(X, num_iteration=model.best_iteration))
+            results = trainer.update(new_rows, replay_rows=1000, num_boost_round=20)
+
+        record = results['update']
+        assert record['trees_added'] == 0
+        assert record['holdout_rmse_candidate'] >= record['holdout_rmse_before'] == record['holdout_rmse_after']
+        assert results['after_metrics'] == results['before_metrics']
+        assert trainer.model is model
+        assert trainer.metadata == {**metadata, 'updates': [record]}
+
+    def test_unseen_categories_keep_codes(self, trained, new_rows):
+        """Test new rows are coded with the saved model's categories"""
+        data_path, models_dir = trained
+        trainer = ModelTrainer(data_path=str(data_path), models_dir=str(models_dir))
+        trainer.load_model()
+        categories = dict(trainer.label_encoders)
+        new_rows = new_rows[new_rows['crop_type'].isin(['Tea', 'Wheat'])].copy()
+        new_rows.loc[new_rows.index[:10], 'crop_type'] = 'Cassava'
+
+        X, _ = trainer.prepare_features(new_rows, fit=False)
+
+        assert trainer.label_encoders == categories
+        assert X['crop_type_encoded'].iloc[:10].isna().all()
+        assert set(X['crop_type_encoded'].iloc[10:]) == {categories['crop_type'].index('Tea'), categories['crop_type'].index('Wheat')}
+
+    def test_cli_update(self, trained, new_rows, tmp_path, monkeypatch):
+        """Test --update saves a continued model the serving model loads"""
+        data_path, models_dir = trained
+        monkeypatch.setattr(model_trainer, 'MODELS_DIR', models_dir)
+        new_path = tmp_path / 'verified.csv'
+        new_rows.to_csv(new_path, index=False)
+        original = json.loads((models_dir / 'risk_model_v1_metadata.json').read_text())
+        (models_dir / 'risk_model_v2.pkl').write_bytes((models_dir / 'risk_model_v1.pkl').read_bytes())
+        (models_dir / 'risk_model_v2_metadata.json').write_text(json.dumps(original))
+
+        model_trainer.main(['--data', str(data_path), '--output', 'risk_model_v2.pkl', '--update', str(new_path), '--replay-rows', '500', '--rounds', '10'])
+
+        model = RiskPredictionModel(str(models_dir / 'risk_model_v2.pkl'))
+        assert model.model.best_iteration > original['best_iteration']
+        assert len(model.metadata['updates']) == 1
+        assert model.predict_batch([{'id': 'cell-0', 'features': {'crop_type': 'Tea'}}])[0]['risk_score'] >= 0
@@ -0,0 +1,328 @@
+"""
+Test Analysis Job Queue
+Validates background job execution, deduplication, bounded concurrency
+and resumable progress streams
+"""
+
+import pytest
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add repository root to path (job queue imports backend.* modules)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.services.job_queue import (
+    AnalysisJobManager,
+    QueueFullError,
+    CANCELLED,
+    COMPLETED,
+    FAILED,
+)
+
+
+async def collect(job, after=0):
+    """Collect all event steps from a job"""
+    return [event['step'] async for event in job.subscribe(after=after)]
+
+
+def make_runner(steps, result=None, delay=0.0, log=None):
+    """Build a runner emitting the given steps"""
+    async def runner(emit, cancel_token):
+        if log is not None:
+            log.append('start')
+        for step in steps:
+            await emit({'type': 'status', 'step': step})
+            await asyncio.sleep(delay)
+        if log is not None:
+            log.append('end')
+        return result
+    return runner
+
+
+class TestAnalysisJobManager:
+    """Test suite for the analysis job manager"""
+
+    def test_job_completes_with_result(self):
+        """Test a submitted job runs and records its result"""
+        async def scenario():
+            manager = AnalysisJobManager(max_workers=1)
+            job = manager.submit('key', make_runner(['a', 'complete'], result={'ok': True}))
+            steps = await collect(job)
+            return job, steps
+
+        job, steps = asyncio.run(scenario())
+        assert steps == ['a', 'complete']
+        assert job.status == COMPLETED
+        assert job.result == {'ok': True}
+        assert job.to_dict(include_result=True)['result'] == {'ok': True}
+
+    def test_runner_without_result_fails(self):
+        """Test a runner reporting failure marks the job failed"""
+        async def scenario():
+            manager = AnalysisJobManager(max_workers=1)
+            job = manager.submit('key', make_runner(['error'], result=None))
+            await collect(job)
+            return job
+
+        assert asyncio.run(scenario()).status == FAILED
+
+    def test_crashing_runner_emits_error(self):
+        """Test an unexpected exception becomes an error event"""
+        async def runner(emit, cancel_token):
+            raise RuntimeError('boom')
+
+        async def scenario():
+            manager = AnalysisJobManager(max_workers=1)
+            job = manager.submit('key', runner)
+            return job, await collect(job)
+
+        job, steps = asyncio.run(scenario())
+        assert job.status == FAILED
+        assert job.error == 'boom'
+        assert steps == ['error']
+
+    def test_identical_requests_share_job(self):
+        """Test concurrent submissions with the same key share one job"""
+        log = []
+
+        async def scenario():
+            manager = AnalysisJobManager(max_workers=2)
+            runner = make_runner(['a', 'b'], result={}, delay=0.01, log=log)
+            first = manager.submit('key', runner)
+            second = manager.submit('key', runner)
+            assert first is second
+            return await asyncio.gather(collect(first), collect(second))
+
+        first_steps, second_steps = asyncio.run(scenario())
+        assert log == ['start', 'end']
+        assert first_steps == second_steps == ['a', 'b']
+
+    def test_finished_key_starts_new_job(self):
+        """Test a key resubmitted after completion runs again"""
+        async def scenario():
+            manager = AnalysisJobManager(max_workers=1)
+            first = manager.submit('key', make_runner(['a'], result={}))
+            await collect(first)
+            second = manager.submit('key', make_runner(['a'], result={}))
+            await collect(second)
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        assert first.id != second.id
+
+    def test_worker_pool_bounds_concurrency(self):
+        """Test no more than max_workers jobs run at once"""
+        running = []
+        peak = []
+
+        def make_tracked_runner():
+            async def runner(emit, cancel_token):
+                running.append(1)
+                peak.append(len(running))
+                await asyncio.sleep(0.01)
+                running.pop()
+                return {}
+            return runner
+
+        async def scenario():
+            manager = AnalysisJobManager(max_workers=2)
+            jobs = [manager.submit(f'key-{i}', make_tracked_runner()) for i in range(6)]
+            await asyncio.gather(*(collect(job) for job in jobs))
+
+        asyncio.run(scenario())
+        assert max(peak) == 2
+
+    def test_queue_limit(self):
+        """Test submissions beyond the queue limit are rejected"""
+        async def scenario():
+            manager = AnalysisJobManager(max_workers=1, max_queued=1)
+            manager.submit('a', make_runner(['a'], result={}, delay=0.05))
+            await asyncio.sleep(0)  # let the worker pick up the first job
+            manager.submit('b', make_runner(['b'], result={}))
+            with pytest.raises(QueueFullError):
+                manager.submit('c', make_runner(['c'], result={}))
+
+        asyncio.run(scenario())
+
+    def test_resume_after_disconnect(self):
+        """Test a reconnecting client resumes from its last seen event"""
+        async def scenario():
+            manager = AnalysisJobManager(max_workers=1)
+            job = manager.submit('key', make_runner(['a', 'b', 'c'], result={}, delay=0.01))
+
+            seen = 0
+            async for event in job.subscribe():
+                seen = event['seq'] + 1
+                break  # client drops after the first event
+
+            resumed = await collect(manager.get(job.id), after=seen)
+            return resumed
+
+        assert asyncio.run(scenario()) == ['b', 'c']
+
+    def test_add_completed(self):
+        """Test cache hits are registered as finished jobs"""
+        async def scenario():
+            manager = AnalysisJobManager()
+            job = await manager.add_completed('key', {'type': 'complete', 'step': 'complete'}, {'cached': True})
+            return job, await collect(manager.get(job.id))
+
+        job, steps = asyncio.run(scenario())
+        assert job.status == COMPLETED
+        assert steps == ['complete']
+
+    def test_repeated_cache_hits_share_job(self):
+        """Test cache hits for the same key reuse one retained job"""
+        async def scenario():
+            manager = AnalysisJobManager()
+            first = await manager.add_completed('key', {'type': 'complete', 'step': 'complete'}, {'cached': True})
+            second = await manager.add_completed('key', {'type': 'complete', 'step': 'complete'}, {'cached': True})
+            other = await manager.add_completed('other', {'type': 'complete', 'step': 'complete'}, {'cached': True})
+            return manager, first, second, other
+
+        manager, first, second, other = asyncio.run(scenario())
+        assert second is first
+        assert other is not first
+        assert manager.stats()['retained'] == 2
+
+    def test_max_retained(self):
+        """Test the oldest finished jobs are forgotten beyond max_retained"""
+        async def scenario():
+            manager = AnalysisJobManager(max_retained=3)
+            jobs = []
+            for i in range(5):
+                jobs.append(await manager.add_completed(f'key-{i}', {'type': 'complete', 'step': 'complete'}, {}))
+                jobs[-1].finished_at = time.time() - 5 + i  # distinct finishing order
+            return manager, jobs
+
+        manager, jobs = asyncio.run(scenario())
+        assert manager.stats()['retained'] == 3
+        assert [manager.get(job.id) for job in jobs] == [None, None] + jobs[2:]
+
+    def test_forget_listeners(self):
+        """Test listeners are told which jobs are no longer retained"""
+        forgotten = []
+
+        async def scenario():
+            manager = AnalysisJobManager(max_retained=1)
+            manager.on_forget(forgotten.append)
+            first = await manager.add_completed('key-1', {'type': 'complete', 'step': 'complete'}, {})
+            first.finished_at -= 1
+            await manager.add_completed('key-2', {'type': 'complete', 'step': 'complete'}, {})
+            manager.stats()
+            return first
+
+        first = asyncio.run(scenario())
+        assert forgotten == [first.id]
+
+
+class TestJobCancellation:
+    """Test suite for cancelling jobs"""
+
+    def test_cancel_running_job(self):
+        """Test cancelling a running job stops it and emits a cancelled event"""
+        seen_tokens = []
+
+        async def runner(emit, cancel_token):
+            seen_tokens.append(cancel_token)
+            await emit({'type': 'status', 'step': 'a'})
+            await asyncio.sleep(10)
+            return {}
+
+        async def scenario():
+            manager = AnalysisJobManager(max_workers=1)
+            job = manager.submit('key', runner)
+            await asyncio.sleep(0.01)
+            manager.cancel(job.id, 'stop')
+            return job, await collect(job)
+
+        job, steps = asyncio.run(scenario())
+        assert job.status == CANCELLED
+        assert job.error == 'stop'
+        assert steps == ['a', 'cancelled']
+        assert seen_tokens[0].cancelled
+
+    def test_cancel_queued_job_frees_slot(self):
+        """Test a cancelled queued job never runs and the queue keeps moving"""
+        log = []
+
+        async def scenario():
+            manager = AnalysisJobManager(max_workers=1)
+            first = manager.submit('a', make_runner(['a'], result={}, delay=0.02, log=log))
+            queued = manager.submit('b', make_runner(['b'], result={}, log=log))
+            manager.cancel(queued.id)
+            third = manager.submit('c', make_runner(['c'], result={}))
+            await asyncio.gather(collect(first), collect(third))
+            return queued, await collect(queued), third
+
+        queued, steps, third = asyncio.run(scenario())
+        assert queued.status == CANCELLED
+        assert steps == ['cancelled']
+        assert log == ['start', 'end']
+        assert third.status == COMPLETED
+
+    def test_blocking_work_stops_on_cancel(self):
+        """Test a worker thread checking the token stops within a chunk"""
+        processed = []
+
+        async def runner(emit, cancel_token):
+            def blocking_loop():
+                for index in range(1000):
+                    cancel_token.raise_if_cancelled()
+                    processed.append(index)
+                    time.sleep(0.01)
+            await asyncio.to_thread(blocking_loop)
+            return {}
+
+        async def scenario():
+            manager = AnalysisJobManager(max_workers=1)
+            job = manager.submit('key', runner)
+            await asyncio.sleep(0.05)
+            manager.cancel(job.id)
+            await collect(job)
+            count = len(processed)
+            await asyncio.sleep(0.1)
+            return job, count
+
+        job, count = asyncio.run(scenario())
+        assert job.status == CANCELLED
+        assert len(processed) <= count + 1
+        assert len(processed) < 1000
+
+    def test_abandon_waits_for_last_subscriber(self):
+        """Test an abandoned job keeps running while another client watches"""
+        async def scenario():
+            manager = AnalysisJobManager(max_workers=1)
+            job = manager.submit('key', make_runner(['a', 'b'], result={}, delay=0.02))
+            manager.attach(job)
+            manager.attach(job)
+            manager.detach(job, abandoned=True)
+            still_running = not job.finished
+            manager.detach(job, abandoned=True)
+            await collect(job)
+            return still_running, job
+
+        still_running, job = asyncio.run(scenario())
+        assert still_running
+        assert job.status == CANCELLED
+
+    def test_dropped_client_can_resume_within_grace(self):
+        """Test an unclean disconnect only cancels after the grace period"""
+        async def scenario():
+            manager = AnalysisJobManager(max_workers=1)
+            resumed = manager.submit('resumed', make_runner(['a', 'b'], result={}, delay=0.05))
+            dropped = manager.submit('dropped', make_runner(['a', 'b'], result={}, delay=0.05))
+
+            for job in (resumed, dropped):
+                manager.attach(job)
+                manager.detach(job, grace_seconds=0.02)
+            manager.attach(resumed)  # client reconnects in time
+
+            await asyncio.gather(collect(resumed), collect(dropped))
+            return resumed, dropped
+
+        resumed, dropped = asyncio.run(scenario())
+        assert resumed.status == COMPLETED
+        assert dropped.status == CANCELLED
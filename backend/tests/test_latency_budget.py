@@ -0,0 +1,123 @@
+"""
+Test Analysis Latency Budget
+Validates remaining-time tracking, grid coarsening and degradation
+reporting for latency-budgeted analyses
+"""
+
+import pytest
+import math
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.latency_budget import (
+    COARSEN_GRID,
+    MAX_COARSENING_FACTOR,
+    SKIP_GEMINI,
+    LatencyBudget,
+)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLatencyBudget:
+    """Test suite for the latency budget"""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    def test_unlimited_budget(self, clock):
+        """Test analyses without a budget never degrade"""
+        budget = LatencyBudget(None, clock=clock)
+
+        assert budget.remaining() == math.inf
+        assert budget.fits(1e9)
+        assert budget.deadline() is None
+        assert budget.plan_grid(5000, 1) == 1
+        assert not budget.degraded
+
+    def test_remaining_time(self, clock):
+        """Test remaining time decreases with the clock"""
+        budget = LatencyBudget(30, clock=clock)
+        clock.now += 12
+
+        assert budget.remaining() == pytest.approx(18)
+        assert budget.fits(18)
+        assert not budget.fits(19)
+        assert budget.deadline(reserve_seconds=2) == pytest.approx(100 + 30 - 2)
+
+    def test_generous_budget_keeps_grid(self, clock):
+        """Test the requested grid is kept when extraction fits"""
+        budget = LatencyBudget(600, clock=clock)
+
+        assert budget.plan_grid(100, 1) == 1
+        assert not budget.degraded
+
+    def test_tight_budget_coarsens_grid(self, clock):
+        """Test the grid is coarsened before anything else degrades"""
+        budget = LatencyBudget(40, clock=clock)
+
+        size = budget.plan_grid(100, 1)
+
+        assert size == 2
+        assert [d['step'] for d in budget.degradations] == [COARSEN_GRID]
+
+    def test_coarsening_is_capped(self, clock):
+        """Test coarsening stops at the maximum factor"""
+        budget = LatencyBudget(1, clock=clock)
+
+        assert budget.plan_grid(5000, 1) == MAX_COARSENING_FACTOR
+
+    def test_metadata_reports_degradations(self, clock):
+        """Test metadata lists degradations in the order applied"""
+        budget = LatencyBudget(10, clock=clock)
+        budget.plan_grid(1000, 1)
+        clock.now += 3
+        budget.degrade(SKIP_GEMINI, 'Gemini enrichment skipped')
+
+        metadata = budget.metadata()
+        assert metadata['degraded'] is True
+        assert metadata['latencyBudgetSeconds'] == 10
+        assert metadata['elapsedSeconds'] == pytest.approx(3)
+        assert [d['step'] for d in metadata['degradations']] == [COARSEN_GRID, SKIP_GEMINI]
+        assert metadata['degradations'][1]['atSeconds'] == pytest.approx(3)
+
+    def test_degradation_logged_as_warning(self, clock, monkeypatch):
+        """Test degradations are logged as warnings tagged with their step"""
+        import services.latency_budget as latency_budget
+        logged = []
+        monkeypatch.setattr(latency_budget, 'log', lambda message, **fields: logged.append(fields))
+        budget = LatencyBudget(10, clock=clock)
+        budget.degrade(SKIP_GEMINI, 'Gemini enrichment skipped')
+
+        assert logged == [{'level': 'warning', 'step': SKIP_GEMINI}]
+
+
+class TestDefaultNdviFallback:
+    """Test suite for the NDVI deadline in GEESatellite"""
+
+    def test_expired_deadline_skips_gee(self):
+        """Test cells get default NDVI without any GEE calls once the deadline passed"""
+        from utils.gee_satellite import DEFAULT_NDVI, GEESatellite
+
+        gee = GEESatellite.__new__(GEESatellite)  # no authentication needed
+        cells = [{'id': 'cell_0_0', 'center': {'lat': -0.4, 'lng': 36.9}}]
+
+        results = gee.extract_features_for_cells(
+            cells, '2024-01-01', '2024-03-01', deadline=time.monotonic() - 1
+        )
+
+        assert results[0]['features']['ndvi'] == DEFAULT_NDVI
+        assert results[0]['features']['ndvi_source'] == 'default'
@@ -0,0 +1,145 @@
+"""
+Test Event Loop Monitor
+Validates loop lag measurement, stall warnings carrying the blocking
+coroutine's stack, thread-pool sampling and per-service worker counts
+"""
+
+import pytest
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add repository root to path (the monitor uses backend.* modules)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.services.loop_monitor import LoopMonitor
+from backend.services.metrics import AnalysisMetrics
+
+
+@pytest.fixture
+def monitor():
+    return LoopMonitor(AnalysisMetrics(), interval=0.01, stall_threshold=0.1)
+
+
+def blocking_handler():
+    """Stand-in for a synchronous client call inside an async handler"""
+    time.sleep(0.4)
+
+
+class TestLoopLag:
+    """Test suite for lag and stall detection"""
+
+    def test_stall_logged_with_stack(self, monitor, capsys):
+        """Test a blocked loop is reported once, with the blocking call's stack"""
+        async def main():
+            monitor.start()
+            await asyncio.sleep(0.05)
+            blocking_handler()
+            await asyncio.sleep(0.05)
+            await monitor.stop()
+
+        asyncio.run(main())
+
+        assert monitor.stalls.value(cause='blocking_call') == 1
+        assert monitor.last_stall['cause'] == 'blocking_call'
+        assert monitor.last_stall['blockedSeconds'] >= 0.1
+        assert 'blocking_handler' in monitor.last_stall['stack']
+        assert 'WARNING: Event loop blocked' in capsys.readouterr().out
+        lag = monitor.lag_seconds.snapshot()
+        assert lag['count'] > 0 and lag['sum'] >= 0.3
+
+    def test_idle_loop_has_no_stalls(self, monitor):
+        """Test a responsive loop records lag without stalls"""
+        async def main():
+            monitor.start()
+            await asyncio.sleep(0.2)
+            await monitor.stop()
+
+        asyncio.run(main())
+
+        assert monitor.stalls._series == {}
+        assert monitor.lag_seconds.snapshot()['count'] > 5
+
+    def test_stop_does_not_block_loop(self, monitor, monkeypatch):
+        """Test stopping waits for a watchdog mid-report without blocking the loop"""
+        monkeypatch.setattr(monitor, '_report_stall', lambda blocked: time.sleep(0.3))
+
+        async def main():
+            monitor.start()
+            await asyncio.sleep(0.05)
+            time.sleep(0.15)  # stall: the watchdog starts its (slow) report
+            await asyncio.sleep(0.02)
+            watchdog = monitor._watchdog
+            gaps = []
+
+            async def ticker():
+                while True:
+                    before = time.monotonic()
+                    await asyncio.sleep(0.01)
+                    gaps.append(time.monotonic() - before)
+
+            ticks = asyncio.create_task(ticker())
+            await monitor.stop()
+            ticks.cancel()
+            return watchdog, gaps
+
+        watchdog, gaps = asyncio.run(main())
+
+        assert not watchdog.is_alive()
+        assert len(gaps) > 5 and max(gaps) < 0.1
+
+
+class TestThreadPool:
+    """Test suite for thread-pool saturation"""
+
+    def test_queued_and_active_per_service(self, monitor):
+        """Test offloaded calls count as queued until a worker runs them"""
+        release = threading.Event()
+
+        async def main():
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=1))
+            monitor.start()
+            calls = [asyncio.create_task(monitor.offload('gee', release.wait)) for _ in range(2)]
+            calls.append(asyncio.create_task(monitor.offload('gemini', release.wait)))
+            await asyncio.sleep(0.1)
+            seen = {
+                'gee': (monitor.executor_active.value(service='gee'), monitor.executor_queued.value(service='gee')),
+                'gemini': (monitor.executor_active.value(service='gemini'), monitor.executor_queued.value(service='gemini')),
+                'pool': (monitor.pool_queue_depth.value(), monitor.pool_max_workers.value()),
+            }
+            release.set()
+            await asyncio.gather(*calls)
+            await monitor.stop()
+            return seen
+
+        seen = asyncio.run(main())
+
+        assert seen['gee'] == (1, 1)
+        assert seen['gemini'] == (0, 1)
+        assert seen['pool'] == (2, 1)
+        for service in ('gee', 'gemini'):
+            assert monitor.executor_active.value(service=service) == 0
+            assert monitor.executor_queued.value(service=service) == 0
+
+    def test_cancelled_call_leaves_queue(self, monitor):
+        """Test a call cancelled while waiting for a worker is no longer counted"""
+        release = threading.Event()
+
+        async def main():
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=1))
+            running = asyncio.create_task(monitor.offload('gee', release.wait))
+            waiting = asyncio.create_task(monitor.offload('perplexity', release.wait))
+            await asyncio.sleep(0.05)
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+            release.set()
+            await running
+
+        asyncio.run(main())
+
+        assert monitor.executor_queued.value(service='perplexity') == 0
+        assert monitor.executor_active.value(service='perplexity') == 0
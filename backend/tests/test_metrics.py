@@ -0,0 +1,156 @@
+"""
+Test Analysis Metrics
+Validates the Prometheus text exposition of counters, gauges and histograms,
+stage timing, cache hit ratios, per-analysis stats and GEE round-trip counting
+"""
+
+import pytest
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.metrics import AnalysisMetrics, MetricsRegistry, count_cache_hit, track_analysis_stats
+from utils import gee_satellite
+
+
+def sample_lines(text):
+    """Exposition lines without HELP/TYPE comments"""
+    return [line for line in text.splitlines() if not line.startswith('#')]
+
+
+class TestMetricsRegistry:
+    """Test suite for metric types and exposition format"""
+
+    def test_counter_and_gauge(self):
+        """Test counters render with _total and gauges default to zero"""
+        registry = MetricsRegistry()
+        counter = registry.counter('jobs', 'Jobs run', ['outcome'])
+        registry.gauge('in_flight', 'Running jobs')
+        counter.inc(outcome='completed')
+        counter.inc(2, outcome='completed')
+
+        text = registry.render()
+
+        assert '# TYPE jobs counter' in text
+        assert 'jobs_total{outcome="completed"} 3' in sample_lines(text)
+        assert 'in_flight 0' in sample_lines(text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test bucket counts accumulate and +Inf equals the observation count"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram('latency_seconds', 'Latency', ['stage'], buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 5.0):
+            histogram.observe(value, stage='grid')
+
+        lines = sample_lines(registry.render())
+
+        assert 'latency_seconds_bucket{stage="grid",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{stage="grid",le="1"} 3' in lines
+        assert 'latency_seconds_bucket{stage="grid",le="+Inf"} 4' in lines
+        assert 'latency_seconds_count{stage="grid"} 4' in lines
+        assert 'latency_seconds_sum{stage="grid"} 6.25' in lines
+
+    def test_label_values_escaped(self):
+        """Test quotes, backslashes and newlines in label values are escaped"""
+        registry = MetricsRegistry()
+        registry.counter('errors', 'Errors', ['message']).inc(message='bad "input"\\\n')
+        assert 'errors_total{message="bad \\"input\\"\\\\\\n"} 1' in registry.render()
+
+    def test_wrong_labels_rejected(self):
+        """Test observations must supply exactly the declared labels"""
+        registry = MetricsRegistry()
+        counter = registry.counter('jobs', 'Jobs run', ['outcome'])
+        with pytest.raises(ValueError):
+            counter.inc(status='completed')
+        with pytest.raises(ValueError):
+            registry.counter('jobs', 'Duplicate')
+
+
+class TestAnalysisMetrics:
+    """Test suite for pipeline metrics"""
+
+    def test_stage_recorded_when_it_raises(self):
+        """Test a failing stage still records its duration"""
+        metrics = AnalysisMetrics()
+        with pytest.raises(RuntimeError):
+            with metrics.stage('geocode'):
+                raise RuntimeError('timeout')
+        with metrics.stage('geocode'):
+            pass
+
+        assert metrics.stage_seconds.snapshot(stage='geocode')['count'] == 2
+
+    def test_inference_per_cell(self):
+        """Test inference time is divided by the number of cells"""
+        metrics = AnalysisMetrics()
+        metrics.observe_inference(0.5, 1000)
+        metrics.observe_inference(0.5, 0)  # empty grids are ignored
+
+        assert metrics.inference_seconds_per_cell.snapshot() == {'sum': 0.0005, 'count': 1}
+
+    def test_cache_hit_ratio(self, capsys):
+        """Test cache stats are read at render time, warning about unreadable ones"""
+        metrics = AnalysisMetrics()
+        stats = {'hits': 3, 'misses': 1}
+        metrics.track_cache('tiles', lambda: stats)
+        metrics.track_cache('broken', lambda: 1 / 0)
+
+        stats['hits'] = 9
+        lines = sample_lines(metrics.render())
+
+        assert 'agrisentry_cache_hits_total{cache="tiles"} 9' in lines
+        assert 'agrisentry_cache_hit_ratio{cache="tiles"} 0.9' in lines
+        assert not any('broken' in line for line in lines)
+        assert 'WARNING: Could not read broken cache stats' in capsys.readouterr().out
+
+
+class TestAnalysisStats:
+    """Test suite for per-analysis stats in the response metadata"""
+
+    def test_stats_are_per_analysis(self):
+        """Test stage timings and cache hits accrue to the analysis that ran them"""
+        metrics = AnalysisMetrics()
+
+        async def analysis(cache_hits):
+            stats = track_analysis_stats()
+            with metrics.stage('prediction'):
+                await asyncio.sleep(0.01)
+            for _ in range(cache_hits):
+                await asyncio.to_thread(count_cache_hit)
+            return stats
+
+        async def main():
+            return await asyncio.gather(analysis(0), analysis(2))
+
+        first, second = asyncio.run(main())
+
+        assert first['cacheHits'] == 0 and second['cacheHits'] == 2
+        assert first['stageSeconds']['prediction'] >= 0.01
+        assert metrics.stage_seconds.snapshot(stage='prediction')['count'] == 2
+
+
+class TestGEERoundTrips:
+    """Test suite for per-analysis GEE round-trip counting"""
+
+    def test_counts_follow_worker_threads(self):
+        """Test requests made in asyncio.to_thread workers count towards their analysis"""
+        async def analysis(requests):
+            tally = gee_satellite.track_round_trips()
+            for _ in range(requests):
+                await asyncio.to_thread(gee_satellite._count_round_trips)
+            return tally[0]
+
+        async def main():
+            return await asyncio.gather(analysis(2), analysis(5))
+
+        assert asyncio.run(main()) == [2, 5]
+
+    def test_untracked_requests_ignored(self):
+        """Test counting outside a tracked analysis is a no-op"""
+        async def untracked():
+            gee_satellite._count_round_trips()
+
+        asyncio.run(untracked())
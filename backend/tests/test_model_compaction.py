@@ -0,0 +1,165 @@
+"""
+Test Model Compaction
+Validates truncation to the best iteration, pruning of low-gain features,
+the native LightGBM text format and serving the compact model
+"""
+
+import pytest
+import contextlib
+import io
+import json
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import services.model_compaction as model_compaction
+from data.synthetic_data_generator import AgriculturalDataGenerator
+from models.risk_model import RiskPredictionModel
+from services.feature_engineering import FeatureTransform
+from services.model_compaction import compact_model, low_gain_features, required_inputs, truncate_to_best_iteration
+from services.model_trainer import ModelTrainer
+
+
+@pytest.fixture(scope='module')
+def training_data():
+    return AgriculturalDataGenerator(n_samples=4000, seed=31).generate()
+
+
+@pytest.fixture
+def trained(training_data, tmp_path):
+    """Trainer with a freshly trained model, and its prepared features"""
+    trainer = ModelTrainer(models_dir=str(tmp_path))
+    with contextlib.redirect_stdout(io.StringIO()):
+        X, y = trainer.prepare_features(training_data)
+        trainer.train(X, y, cv_folds=2)
+    return trainer, X, y
+
+
+class TestCompactionSteps:
+    """Test suite for truncation, gain pruning and required inputs"""
+
+    def test_truncate_to_best_iteration(self, trained):
+        """Test the truncated booster predicts what the served model does"""
+        trainer, X, y = trained
+        # A booster kept for training (as update() keeps it) holds the trees after its best iteration
+        model = lgb.train(
+            {'objective': 'regression', 'verbose': -1, 'seed': 0, 'learning_rate': 0.5},
+            lgb.Dataset(X.iloc[:3000], label=y.iloc[:3000]),
+            num_boost_round=300,
+            valid_sets=[lgb.Dataset(X.iloc[3000:], label=y.iloc[3000:])],
+            keep_training_booster=True,
+            callbacks=[lgb.early_stopping(stopping_rounds=10, verbose=False)]
+        )
+        assert model.num_trees() > model.best_iteration
+
+        truncated = truncate_to_best_iteration(model)
+
+        assert truncated.num_trees() == model.best_iteration
+        np.testing.assert_array_equal(truncated.predict(X.head(200)), model.predict(X.head(200), num_iteration=model.best_iteration))
+
+    def test_low_gain_features(self):
+        """Test features below the gain share are dropped, never the top one"""
+        rng = np.random.default_rng(0)
+        X = pd.DataFrame({'signal': rng.uniform(0, 1, 2000), 'weak': rng.uniform(0, 1, 2000), 'noise': rng.uniform(0, 1, 2000)})
+        y = 10 * X['signal'] + 3 * X['weak']
+        booster = lgb.train({'objective': 'regression', 'verbose': -1, 'seed': 0}, lgb.Dataset(X, label=y), num_boost_round=50)
+
+        assert low_gain_features(booster, 0.01) == ['noise']
+        assert low_gain_features(booster, 0) == []
+        assert low_gain_features(booster, 1.0) == ['weak', 'noise']
+
+    def test_required_inputs(self):
+        """Test cell inputs map categories to their raw names and include derived features' inputs"""
+        transform = FeatureTransform(['fungal_risk_index'])
+        features = ['ndvi', 'crop_type_encoded', 'fungal_risk_index']
+
+        assert required_inputs(features, transform) == ['ndvi', 'crop_type', 'humidity', 'temperature']
+        assert required_inputs(['ndvi']) == ['ndvi']
+
+
+class TestCompactModel:
+    """Test suite for compact_model and the native format"""
+
+    def test_truncate_only(self, trained):
+        """Test a zero threshold keeps every feature and the model's predictions"""
+        trainer, X, y = trained
+        best_iteration = trainer.model.best_iteration
+        features = list(trainer.feature_names)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = compact_model(trainer, X, y, gain_threshold=0, repeats=1)
+
+        assert report['dropped_features'] == []
+        assert trainer.feature_names == features
+        assert report['trees_after'] == trainer.model.num_trees() == best_iteration <= report['trees_before']
+        assert report['rmse_delta'] == pytest.approx(0)
+        assert report['predict_seconds_after'] > 0
+        assert trainer.metadata['compaction'] == report
+
+    def test_prune_and_serve_native(self, trained, training_data, tmp_path):
+        """Test pruned features are gone from training and serving, and the text model serves them"""
+        trainer, X, y = trained
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = compact_model(trainer, X, y, gain_threshold=0.01, cv_folds=2, repeats=1)
+            model_path, metadata_path = trainer.save_model('risk_model_compact.txt')
+
+        dropped = report['dropped_features']
+        assert dropped and report['features_after'] == report['features_before'] - len(dropped)
+        assert not set(dropped) & set(trainer.feature_names)
+        assert set(trainer.feature_transform.features) <= set(trainer.feature_names)
+        assert len(report['inputs_after']) < len(report['inputs_before'])
+        assert abs(report['rmse_delta']) < 1.5
+        json.dumps(report)
+
+        # LightGBM text format, with the preprocessing in the metadata
+        assert model_path.read_text().startswith('tree\n')
+        metadata = json.loads(metadata_path.read_text())
+        assert metadata['features'] == trainer.feature_names
+        assert metadata['num_trees'] == trainer.model.num_trees()
+
+        # Cells carrying only the compact model's inputs have nothing missing
+        model = RiskPredictionModel(str(model_path))
+        cells = [
+            {'id': str(i), 'features': {k: v for k, v in row.items() if k in report['inputs_after']}}
+            for i, row in enumerate(training_data.dropna().head(50).to_dict('records'))
+        ]
+        df, missing = model._feature_matrix(cells)
+        assert list(df.columns) == trainer.feature_names
+        assert missing == [0] * 50
+        expected = np.clip(trainer.model.predict(df), 0, 100)
+        assert [p['risk_score'] for p in model.predict_batch(cells)] == [int(round(s)) for s in expected]
+
+        # The trainer loads it back, e.g. to update() it
+        reloaded = ModelTrainer(models_dir=str(tmp_path))
+        with contextlib.redirect_stdout(io.StringIO()):
+            reloaded.load_model('risk_model_compact.txt')
+        assert reloaded.feature_names == trainer.feature_names
+        assert reloaded.label_encoders == trainer.label_encoders
+        assert reloaded.model.num_trees() == trainer.model.num_trees()
+
+    def test_cli(self, training_data, tmp_path, monkeypatch):
+        """Test main compacts a saved pickle into a text model the serving model loads"""
+        data_path = tmp_path / 'training_data.csv'
+        training_data.to_csv(data_path, index=False)
+        models_dir = tmp_path / 'trained'
+        # The trainer module model_compaction uses (backend.services.* once the repo root is on sys.path)
+        monkeypatch.setattr(sys.modules[model_compaction.ModelTrainer.__module__], 'MODELS_DIR', models_dir)
+        trainer = model_compaction.ModelTrainer(data_path=str(data_path))
+        with contextlib.redirect_stdout(io.StringIO()):
+            X, y = trainer.prepare_features(trainer.load_data())
+            trainer.train(X, y, cv_folds=2)
+            trainer.save_model()
+
+            model_compaction.main(['--data', str(data_path), '--gain-threshold', '0', '--cv-folds', '2'])
+
+        metadata = json.loads((models_dir / 'risk_model_v1_compact_metadata.json').read_text())
+        assert metadata['compaction']['trees_after'] == trainer.model.best_iteration
+        model = RiskPredictionModel(str(models_dir / 'risk_model_v1_compact.txt'))
+        assert model.model.num_trees() == trainer.model.best_iteration
+        assert model.predict_batch([{'id': 'cell-0', 'features': {'crop_type': 'Tea'}}])[0]['risk_score'] >= 0
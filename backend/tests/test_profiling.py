@@ -0,0 +1,131 @@
+"""
+Test On-Demand Profiling
+Validates arming by count and filter, cProfile and sampling collection
+for profiled requests only, and the pstats / collapsed-stack outputs
+"""
+
+import pytest
+import asyncio
+import marshal
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.profiling import CPROFILE, SAMPLING, Profiler, profiled_call, profiled_section
+
+
+def point_in_polygon_hotspot(seconds=0.0):
+    """Stand-in for a pure-Python hotspot"""
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while True:
+        total += sum(i * i for i in range(200))
+        if time.perf_counter() >= deadline:
+            return total
+
+
+def run_profiled(profiler, request_id, settings, work):
+    """Run work in a worker thread inside a profiled request, like the pipeline"""
+    async def analysis():
+        with profiler.profile(request_id, settings):
+            return await asyncio.to_thread(profiled_call, *work)
+    return asyncio.run(analysis())
+
+
+class TestArming:
+    """Test suite for selecting analyses to profile"""
+
+    def test_count_is_used_up(self):
+        """Test arming for N analyses profiles exactly N"""
+        profiler = Profiler()
+        profiler.arm(count=2)
+
+        claims = [profiler.claim(clientId='a') for _ in range(3)]
+
+        assert claims[0] == claims[1] == {'mode': CPROFILE, 'sampleInterval': 0.005}
+        assert claims[2] is None
+        assert profiler.status()['armed'] is None
+
+    def test_filters(self):
+        """Test only matching analyses are claimed"""
+        profiler = Profiler()
+        profiler.arm(count=None, filters={'cropType': 'Maize', 'minAreaKm2': 100}, mode=SAMPLING)
+
+        assert profiler.claim(cropType='Tea', areaKm2=500) is None
+        assert profiler.claim(cropType='Maize', areaKm2=50) is None
+        assert profiler.claim(cropType='Maize', areaKm2=500)['mode'] == SAMPLING
+        assert profiler.claim(cropType='Maize', areaKm2=500) is not None  # armed until disarmed
+
+        profiler.disarm()
+        assert profiler.claim(cropType='Maize', areaKm2=500) is None
+
+    @pytest.mark.parametrize('kwargs', [
+        {'mode': 'perf'},
+        {'filters': {'region': 'Rift'}},
+        {'count': 0},
+        {'count': None},
+    ])
+    def test_invalid_arming(self, kwargs):
+        """Test unknown modes/filters and open-ended unfiltered arming are rejected"""
+        with pytest.raises(ValueError):
+            Profiler().arm(**kwargs)
+
+
+class TestCollection:
+    """Test suite for profile collection"""
+
+    def test_cprofile_pstats(self):
+        """Test worker-thread calls of a profiled request appear in its pstats"""
+        profiler = Profiler()
+        run_profiled(profiler, 'req-1', {'mode': CPROFILE, 'sampleInterval': 0.005}, (point_in_polygon_hotspot,))
+
+        profile = profiler.get('req-1')
+        stats = marshal.loads(profile.to_pstats())
+
+        assert profile.calls == 1 and profile.finished_at is not None
+        assert any(func == 'point_in_polygon_hotspot' for _, _, func in stats)
+
+    def test_sampling_collapsed_stacks(self):
+        """Test sampled stacks are written root first with their counts"""
+        profiler = Profiler()
+        run_profiled(profiler, 'req-1', {'mode': SAMPLING, 'sampleInterval': 0.001}, (point_in_polygon_hotspot, 0.2))
+
+        lines = profiler.get('req-1').to_collapsed().splitlines()
+
+        assert lines
+        assert any('test_profiling.py:point_in_polygon_hotspot' in line for line in lines)
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            assert int(count) > 0
+            assert stack.split(';')[0].startswith('threading.py')
+
+    def test_unprofiled_requests_untouched(self):
+        """Test calls outside a profiled request run normally and record nothing"""
+        profiler = Profiler()
+        assert profiled_call(point_in_polygon_hotspot) > 0
+        run_profiled(profiler, 'req-1', None, (point_in_polygon_hotspot,))
+
+        assert profiler.get('req-1') is None
+
+    def test_nested_sections_profiled_once(self):
+        """Test a section inside a profiled call does not start a second profiler"""
+        profiler = Profiler()
+
+        def nested():
+            with profiled_section():
+                return point_in_polygon_hotspot()
+
+        run_profiled(profiler, 'req-1', {'mode': CPROFILE, 'sampleInterval': 0.005}, (nested,))
+        assert profiler.get('req-1').calls == 1
+
+    def test_oldest_profiles_evicted(self):
+        """Test only the most recent profiles are kept"""
+        profiler = Profiler(max_profiles=2)
+        for request_id in ('a', 'b', 'c'):
+            run_profiled(profiler, request_id, {'mode': CPROFILE, 'sampleInterval': 0.005}, (point_in_polygon_hotspot,))
+
+        assert profiler.get('a') is None
+        assert [p['requestId'] for p in profiler.status()['profiles']] == ['b', 'c']
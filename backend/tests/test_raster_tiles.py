@@ -0,0 +1,130 @@
+"""
+Test Risk Grid Raster Tiles
+Validates colour mapping, PNG encoding, block aggregation and rendering of
+map tiles and overview images
+"""
+
+import pytest
+import math
+import struct
+import sys
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+# Add repository root to path (raster tiles import backend.* modules)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.services.raster_tiles import (
+    COLOR_LUT,
+    FILL_ALPHA,
+    colorize,
+    encode_png,
+    render_grid_image,
+    render_raster_tile,
+    score_raster,
+)
+from backend.services.vector_tiles import TILE_PIXELS
+
+
+def decode_png(payload):
+    """Decode an unfiltered 8-bit RGBA PNG written by encode_png"""
+    assert payload[:8] == b'\x89PNG\r\n\x1a\n'
+    pos, chunks = 8, {}
+    while pos < len(payload):
+        length, = struct.unpack_from('>I', payload, pos)
+        kind = payload[pos + 4:pos + 8]
+        data = payload[pos + 8:pos + 8 + length]
+        crc, = struct.unpack_from('>I', payload, pos + 8 + length)
+        assert crc == zlib.crc32(kind + data)
+        chunks[kind] = data
+        pos += 12 + length
+
+    width, height, depth, color_type = struct.unpack_from('>IIBB', chunks[b'IHDR'])
+    assert (depth, color_type) == (8, 6)
+    rows = np.frombuffer(zlib.decompress(chunks[b'IDAT']), dtype=np.uint8).reshape(height, width * 4 + 1)
+    assert not rows[:, 0].any()
+    return rows[:, 1:].reshape(height, width, 4)
+
+
+def make_grid(scores_by_position, rows, cols, origin=(-0.5, 36.9), step=0.01):
+    """Risk grid with the given {(row, col): score} cells"""
+    positions = sorted(scores_by_position)
+    return {
+        'origin': {'lat': origin[0], 'lng': origin[1]},
+        'step': {'lat': step, 'lng': step},
+        'shape': [rows, cols],
+        'levels': ['Low', 'Medium', 'High'],
+        'factorNames': [],
+        'cellIndex': [r * cols + c for r, c in positions],
+        'riskScore': [scores_by_position[p] for p in positions],
+        'riskLevel': [0] * len(positions),
+        'factorMask': [0] * len(positions),
+    }
+
+
+def tile_for(lat, lng, z):
+    n = 2 ** z
+    return int((lng + 180.0) / 360.0 * n), int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+
+
+class TestRasterRendering:
+    """Test suite for NumPy raster rendering"""
+
+    def test_colorize_bands_and_transparency(self):
+        """Test scores map to their risk band and missing/below-threshold cells are transparent"""
+        rgba = colorize(np.array([10, 45, 65, 95, np.nan, 30], dtype=np.float32), threshold=20)
+
+        assert rgba[0, 3] == 0  # below threshold
+        assert rgba[4, 3] == 0  # no data
+        assert rgba[5].tolist() == COLOR_LUT[30].tolist()
+        assert [tuple(rgba[i, :3]) for i in (1, 2, 3)] == [(0xF7, 0xE9, 0x67), (0xFF, 0xB3, 0x47), (0xFF, 0x6B, 0x6B)]
+        assert rgba[3, 3] == FILL_ALPHA
+
+    def test_png_round_trip(self):
+        """Test encoded PNGs decode to the original pixels"""
+        rgba = np.random.default_rng(0).integers(0, 256, size=(7, 5, 4), dtype=np.uint8)
+        assert np.array_equal(decode_png(encode_png(rgba)), rgba)
+
+    def test_score_raster_block_means(self):
+        """Test aggregated blocks hold the mean of their cells and NaN when empty"""
+        grid = make_grid({(0, 0): 20, (0, 1): 40, (1, 1): 60, (3, 3): 90}, rows=4, cols=4)
+
+        full = score_raster(grid)
+        blocks = score_raster(grid, factor=2)
+
+        assert full.shape == (4, 4)
+        assert full[1, 1] == 60 and np.isnan(full[2, 2])
+        assert blocks.shape == (2, 2)
+        assert blocks[0, 0] == pytest.approx(40)
+        assert blocks[1, 1] == 90
+        assert np.isnan(blocks[0, 1])
+
+    def test_map_tile(self):
+        """Test a tile over the grid is coloured where cells exist and transparent elsewhere"""
+        grid = make_grid({(r, c): 90 for r in range(10) for c in range(10)}, rows=10, cols=10)
+        x, y = tile_for(-0.45, 36.95, 12)
+
+        pixels = decode_png(render_raster_tile(grid, 12, x, y))
+
+        assert pixels.shape == (TILE_PIXELS, TILE_PIXELS, 4)
+        assert (pixels[..., 3] > 0).any()
+        assert (pixels[..., 3] == 0).any()  # the 0.1° grid does not cover the whole tile
+
+    def test_map_tile_threshold(self):
+        """Test cells below the threshold are left out of the tile"""
+        grid = make_grid({(r, c): 30 for r in range(10) for c in range(10)}, rows=10, cols=10)
+        x, y = tile_for(-0.45, 36.95, 12)
+
+        assert not decode_png(render_raster_tile(grid, 12, x, y, threshold=50))[..., 3].any()
+
+    def test_overview_is_north_up_and_opaque(self):
+        """Test the overview image puts the northernmost row at the top"""
+        grid = make_grid({(0, 0): 10, (1, 0): 95}, rows=2, cols=1)
+
+        pixels = decode_png(render_grid_image(grid, max_pixels=100))
+
+        assert pixels.shape[:2] == (100, 50)
+        assert tuple(pixels[0, 0]) == (0xFF, 0x6B, 0x6B, 255)
+        assert tuple(pixels[-1, 0]) == (0x7B, 0xC6, 0x7E, 255)
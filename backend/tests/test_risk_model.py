@@ -111,7 +111,7 @@ class TestRiskPredictionModel:
         assert 'risk_level' in prediction
         assert 'confidence' in prediction
         assert 'risk_factors' in prediction
-        assert 'model_metadata' in prediction
+        assert 'model_metadata' not in prediction  # reported once per batch
     
     def test_risk_score_range(self, model, sample_cell_with_features):
         """Test risk scores are in valid range [0, 100]"""
@@ -171,17 +171,20 @@ class TestRiskPredictionModel:
         assert 95 <= total_contribution <= 105
     
     def test_model_metadata(self, model, sample_cell_with_features):
-        """Test model metadata is included in predictions"""
-        cells = [sample_cell_with_features]
-        
-        predictions = model.predict_batch(cells)
+        """Test batch metadata reports the model and measured timings once"""
+        cells = [sample_cell_with_features] * 5
         
-        metadata = predictions[0]['model_metadata']
+        predictions, metadata = model.predict_batch_with_metadata(cells)
         
-        assert 'version' in metadata
+        assert len(predictions) == 5
+        assert 'model_version' in metadata
         assert 'model_type' in metadata
-        assert 'features_used' in metadata
-        assert 'prediction_time' in metadata
+        assert metadata['features_used'] == len(model.feature_names)
+        assert metadata['cells'] == 5
+        for timing in ('prepare_features_seconds', 'predict_seconds', 'explain_seconds'):
+            assert metadata[timing] >= 0
+        assert metadata['processing_time_seconds'] > 0
+        assert metadata['cells_per_second'] > 0
     
     def test_low_ndvi_high_risk(self, model):
         """Test sparse vegetation (low NDVI) correlates with higher risk"""
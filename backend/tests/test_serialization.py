@@ -0,0 +1,121 @@
+"""
+Test Fast JSON Serialization
+Validates orjson encoding of NumPy values, the response class, the WebSocket
+sender and gzip negotiation for large responses
+"""
+
+import asyncio
+import gzip
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.testclient import TestClient
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.serialization import (
+    COMPRESSION_MINIMUM_BYTES,
+    FastJSONResponse,
+    dumps,
+    loads,
+    send_ws_json,
+)
+
+
+class FakeWebSocket:
+    """Records text frames sent to it"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, data):
+        self.sent.append(data)
+
+
+class TestSerialization:
+    """Test suite for orjson-backed serialization"""
+
+    def test_numpy_scalars_and_arrays(self):
+        """Test NumPy values serialize like their Python equivalents"""
+        value = {
+            'score': np.float32(72.5),
+            'count': np.int64(3),
+            'flag': np.bool_(True),
+            'scores': np.array([1.5, 2.5], dtype=np.float64),
+            'matrix': np.arange(4, dtype=np.int32).reshape(2, 2),
+        }
+        assert loads(dumps(value)) == {
+            'score': 72.5, 'count': 3, 'flag': True,
+            'scores': [1.5, 2.5], 'matrix': [[0, 1], [2, 3]],
+        }
+
+    def test_non_contiguous_array_and_fallback_types(self):
+        """Test sliced arrays, tuples, sets and dates fall back cleanly"""
+        value = {
+            'column': np.arange(6).reshape(3, 2)[:, 1],
+            'pair': (1, 2),
+            'tags': {'drought'},
+            'day': date(2024, 3, 1),
+        }
+        assert loads(dumps(value)) == {'column': [1, 3, 5], 'pair': [1, 2], 'tags': ['drought'], 'day': '2024-03-01'}
+
+    def test_matches_standard_json(self):
+        """Test output parses to the same value as json.dumps output"""
+        value = {'cells': [{'id': f'cell-{i}', 'riskScore': i * 0.5, 'factors': ['a']} for i in range(50)], 1: 'x'}
+        assert loads(dumps(value)) == json.loads(json.dumps(value))
+
+    def test_unsupported_type_raises(self):
+        """Test unknown objects raise TypeError"""
+        with pytest.raises(TypeError):
+            dumps({'value': object()})
+
+    def test_response_render(self):
+        """Test the response class renders NumPy content"""
+        response = FastJSONResponse({'score': np.float64(0.25)})
+        assert response.body == b'{"score":0.25}'
+        assert response.media_type == 'application/json'
+
+    def test_send_ws_json(self):
+        """Test WebSocket messages are sent as JSON text frames"""
+        websocket = FakeWebSocket()
+        asyncio.run(send_ws_json(websocket, {'type': 'progress', 'progressPercent': np.int16(40)}))
+        assert websocket.sent == ['{"type":"progress","progressPercent":40}']
+
+
+class TestCompression:
+    """Test suite for negotiated gzip compression"""
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI(default_response_class=FastJSONResponse)
+        app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MINIMUM_BYTES)
+
+        @app.get('/small')
+        async def small():
+            return {'ok': True}
+
+        @app.get('/large')
+        async def large():
+            return FastJSONResponse({'scores': np.linspace(0, 100, 5000)})
+
+        return TestClient(app)
+
+    def test_large_response_compressed(self, client):
+        """Test large responses are gzipped when the client accepts it"""
+        response = client.get('/large', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['content-encoding'] == 'gzip'
+        assert len(response.json()['scores']) == 5000
+
+    def test_small_or_unnegotiated_response_not_compressed(self, client):
+        """Test small responses and clients without gzip get plain JSON"""
+        assert 'content-encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+        response = client.get('/large', headers={'Accept-Encoding': 'identity'})
+        assert 'content-encoding' not in response.headers
+        assert len(response.content) > COMPRESSION_MINIMUM_BYTES
@@ -0,0 +1,115 @@
+"""
+Test Spatial Field Generator
+Validates the Gaussian random fields' autocorrelation, the value ranges and
+coupling of the generated layers, determinism and sampling at grid cells
+"""
+
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data.spatial_field_generator import LAYERS, SpatialFieldGenerator, gaussian_random_field, spec_from_cells
+
+
+def grid(rows, cols, cell_size_km=1.0, origin=(-0.5, 36.5)):
+    """grid_spec() of a rows x cols grid near the equator"""
+    return {
+        'origin': {'lat': origin[0], 'lng': origin[1]},
+        'step': {'lat': cell_size_km / 111.0, 'lng': cell_size_km / 111.0},
+        'shape': [rows, cols],
+    }
+
+
+def neighbour_correlation(raster):
+    """Correlation between horizontally adjacent cells"""
+    return np.corrcoef(raster[:, 1:].ravel(), raster[:, :-1].ravel())[0, 1]
+
+
+class TestGaussianRandomField:
+    """Test suite for FFT Gaussian random fields"""
+
+    def test_standardized_and_correlated(self):
+        """Test the field is standardized and its correlation length holds"""
+        field = gaussian_random_field((200, 300), 10, np.random.default_rng(0))
+
+        assert field.shape == (200, 300)
+        assert field.mean() == pytest.approx(0, abs=1e-9)
+        assert field.std() == pytest.approx(1)
+        # Covariance exp(-d² / 2ℓ²): ~0.995 one cell apart, ~0.61 at ℓ
+        assert neighbour_correlation(field) > 0.98
+        at_length = np.corrcoef(field[:, 10:].ravel(), field[:, :-10].ravel())[0, 1]
+        assert at_length == pytest.approx(np.exp(-0.5), abs=0.15)
+
+    def test_no_wraparound_and_white_noise(self):
+        """Test opposite edges are independent and zero length gives white noise"""
+        field = gaussian_random_field((100, 100), 10, np.random.default_rng(1))
+        assert abs(np.corrcoef(field[:, 0], field[:, -1])[0, 1]) < 0.5
+
+        noise = gaussian_random_field((100, 100), 0, np.random.default_rng(1))
+        assert abs(neighbour_correlation(noise)) < 0.05
+
+
+class TestSpatialFieldGenerator:
+    """Test suite for the environmental rasters"""
+
+    @pytest.mark.parametrize('shape', [(1, 1), (1, 40), (37, 53)])
+    def test_layers_and_ranges(self, shape):
+        """Test every layer covers the grid within the training data's ranges"""
+        rasters = SpatialFieldGenerator(seed=3).generate(grid(*shape))
+
+        assert set(rasters) == set(LAYERS)
+        assert all(r.shape == shape for r in rasters.values())
+        assert ((rasters['ndvi'] >= 0.1) & (rasters['ndvi'] <= 0.9)).all()
+        assert ((rasters['soil_moisture'] >= 0) & (rasters['soil_moisture'] <= 1)).all()
+        assert ((rasters['elevation'] >= 500) & (rasters['elevation'] <= 3000)).all()
+        assert ((rasters['slope'] >= 0) & (rasters['slope'] <= 45)).all()
+        assert ((rasters['humidity'] >= 20) & (rasters['humidity'] <= 100)).all()
+        assert ((rasters['temperature'] >= 10) & (rasters['temperature'] <= 40)).all()
+
+    def test_spatial_structure_and_coupling(self):
+        """Test layers are smooth across cells and related to each other"""
+        rasters = SpatialFieldGenerator(seed=3).generate(grid(120, 120))
+
+        for name in LAYERS:
+            # Slope is a derivative of elevation, so rougher than the fields themselves
+            assert neighbour_correlation(rasters[name]) > (0.3 if name == 'slope' else 0.7), name
+        assert np.corrcoef(rasters['ndvi'].ravel(), rasters['soil_moisture'].ravel())[0, 1] > 0.5
+        assert np.corrcoef(rasters['temperature'].ravel(), rasters['elevation'].ravel())[0, 1] < -0.5
+
+    def test_deterministic(self):
+        """Test fields depend on the seed and the grid's location"""
+        spec = grid(30, 30)
+
+        first = SpatialFieldGenerator(seed=3).generate(spec)
+        assert np.array_equal(first['ndvi'], SpatialFieldGenerator(seed=3).generate(spec)['ndvi'])
+        assert not np.array_equal(first['ndvi'], SpatialFieldGenerator(seed=4).generate(spec)['ndvi'])
+        elsewhere = SpatialFieldGenerator(seed=3).generate(grid(30, 30, origin=(0.5, 36.5)))
+        assert not np.array_equal(first['ndvi'], elsewhere['ndvi'])
+
+    def test_sample_cells(self):
+        """Test cells are sampled at their row and column of the recovered grid"""
+        spec = grid(4, 5)
+        lat_step, lng_step = spec['step']['lat'], spec['step']['lng']
+        cells = []
+        for row, col in [(1, 2), (3, 4), (2, 1)]:
+            lat, lng = spec['origin']['lat'] + row * lat_step, spec['origin']['lng'] + col * lng_step
+            cells.append({
+                'id': f'cell-{len(cells)}', 'row': row, 'col': col,
+                'center': {'lat': lat + lat_step / 2, 'lng': lng + lng_step / 2},
+                'bounds': {'southWest': {'lat': lat, 'lng': lng}, 'northEast': {'lat': lat + lat_step, 'lng': lng + lng_step}},
+            })
+
+        recovered = spec_from_cells(cells)
+        assert recovered['shape'] == [4, 5]
+        assert recovered['origin']['lat'] == pytest.approx(spec['origin']['lat'])
+        assert recovered['origin']['lng'] == pytest.approx(spec['origin']['lng'])
+
+        generator = SpatialFieldGenerator(seed=3)
+        rasters = generator.generate(recovered)
+        values = generator.sample_cells(cells)
+        assert [v['ndvi'] for v in values] == [rasters['ndvi'][c['row'], c['col']] for c in cells]
+        assert generator.sample_cells([]) == []
@@ -0,0 +1,125 @@
+"""
+Test Request Tracing
+Validates span nesting and propagation, the per-request ring buffer,
+JSON-lines export and critical path reconstruction
+"""
+
+import pytest
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Add repository root to path (tracing is shared by backend.* modules)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.utils import tracing
+from backend.utils.tracing import Tracer, critical_path, log, span, trace
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    """Fresh tracer installed as the singleton"""
+    instance = Tracer(max_traces=2, max_spans_per_trace=3)
+    monkeypatch.setattr(tracing, '_tracer_instance', instance)
+    return instance
+
+
+def make_span(span_id, parent_id, name, start, duration_ms):
+    return {'spanId': span_id, 'parentId': parent_id, 'name': name, 'start': start, 'durationMs': duration_ms}
+
+
+class TestSpans:
+    """Test suite for span recording"""
+
+    def test_nested_spans_and_events(self, tracer):
+        """Test spans record their parent and log lines attach to the current span"""
+        with trace('req-1', 'analysis'):
+            with span('geocode', provider='nominatim') as attributes:
+                log("Geocoded location", level='success', place='Nakuru')
+                attributes['cached'] = False
+
+        spans = {s['name']: s for s in tracer.get_trace('req-1')['spans']}
+        assert spans['analysis']['parentId'] is None
+        assert spans['geocode']['parentId'] == spans['analysis']['spanId']
+        assert spans['geocode']['attributes'] == {'provider': 'nominatim', 'cached': False}
+        assert spans['geocode']['events'][0]['place'] == 'Nakuru'
+
+    def test_spans_follow_worker_threads(self, tracer):
+        """Test spans opened in asyncio.to_thread workers belong to the calling request"""
+        def blocking_call():
+            with span('gee.sample_ndvi'):
+                pass
+
+        async def analysis(request_id):
+            with trace(request_id, 'analysis'):
+                with span('gee_extraction'):
+                    await asyncio.to_thread(blocking_call)
+
+        async def main():
+            await asyncio.gather(analysis('a'), analysis('b'))
+
+        asyncio.run(main())
+        for request_id in ('a', 'b'):
+            spans = {s['name']: s for s in tracer.get_trace(request_id)['spans']}
+            assert spans['gee.sample_ndvi']['parentId'] == spans['gee_extraction']['spanId']
+
+    def test_error_status(self, tracer):
+        """Test a span records the exception that escaped it"""
+        with pytest.raises(ValueError):
+            with trace('req-1', 'analysis'):
+                raise ValueError('bad polygon')
+
+        root, = tracer.get_trace('req-1')['spans']
+        assert root['status'] == 'error'
+        assert root['error'] == 'ValueError: bad polygon'
+
+    def test_untraced_code_records_nothing(self, tracer, capsys):
+        """Test spans outside a trace are no-ops and log still prints"""
+        with span('gee.area'):
+            log("Area computed", level='warning')
+
+        assert tracer._traces == {}
+        assert capsys.readouterr().out == "WARNING: Area computed\n"
+
+
+class TestTracer:
+    """Test suite for trace storage"""
+
+    def test_bounded_storage(self, tracer):
+        """Test old requests are evicted and extra spans counted as dropped"""
+        for request_id in ('a', 'b', 'c'):
+            with trace(request_id, 'analysis'):
+                for _ in range(4):
+                    with span('gee.sample_ndvi'):
+                        pass
+
+        assert tracer.get_trace('a') is None
+        assert tracer.get_trace('c')['spanCount'] == 3
+        assert tracer.get_trace('c')['dropped'] == 2
+
+    def test_json_lines_export(self, tmp_path, monkeypatch):
+        """Test finished spans are appended to the trace file"""
+        path = tmp_path / 'trace.jsonl'
+        monkeypatch.setattr(tracing, '_tracer_instance', Tracer(path=str(path)))
+
+        with trace('req-1', 'analysis'):
+            with span('grid'):
+                pass
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [line['name'] for line in lines] == ['grid', 'analysis']
+        assert all(line['requestId'] == 'req-1' for line in lines)
+
+    def test_critical_path(self):
+        """Test the path follows sequential stages and skips shorter parallel work"""
+        spans = [
+            make_span('1', None, 'analysis', 0.0, 10000),
+            make_span('2', '1', 'geocode', 0.0, 1000),
+            make_span('3', '1', 'gemini', 1.0, 6000),
+            make_span('4', '1', 'perplexity', 1.5, 2000),  # overlaps gemini
+            make_span('5', '3', 'gee.download', 1.0, 4000),
+            make_span('6', '1', 'prediction', 7.0, 3000),
+        ]
+
+        assert [s['name'] for s in critical_path(spans)] == ['analysis', 'geocode', 'gemini', 'gee.download', 'prediction']
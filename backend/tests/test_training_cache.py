@@ -0,0 +1,132 @@
+"""
+Test Trained-Model Cache
+Validates the training hash over data, feature pipeline and parameters, and
+that the training pipeline reuses a model trained with the same hash
+"""
+
+import pytest
+import functools
+import json
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import services.model_trainer as model_trainer
+from data.synthetic_data_generator import AgriculturalDataGenerator
+from services.model_trainer import ModelTrainer
+
+
+@pytest.fixture
+def training_csv(tmp_path):
+    path = tmp_path / 'training_data.csv'
+    AgriculturalDataGenerator(n_samples=2000, seed=5).generate().to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def trainings(monkeypatch):
+    """One entry per ModelTrainer.train call"""
+    calls = []
+    train = ModelTrainer.train
+
+    @functools.wraps(train)
+    def counted_train(self, *args, **kwargs):
+        calls.append(1)
+        return train(self, *args, **kwargs)
+    monkeypatch.setattr(ModelTrainer, 'train', counted_train)
+    return calls
+
+
+class TestTrainingHash:
+    """Test suite for the training hash"""
+
+    def test_hash_tracks_inputs(self, training_csv, tmp_path, monkeypatch):
+        """Test the hash changes with the data, parameters or options, not the path"""
+        trainer = ModelTrainer(data_path=str(training_csv))
+        baseline = trainer.training_hash()
+
+        copy = tmp_path / 'copy.csv'
+        copy.write_bytes(training_csv.read_bytes())
+        assert ModelTrainer(data_path=str(copy)).training_hash() == baseline
+        assert trainer.training_hash(cv_folds=5) == baseline  # the default
+
+        assert trainer.training_hash(cv_folds=3) != baseline
+        assert trainer.training_hash(max_rows=100) != baseline
+        monkeypatch.setitem(model_trainer.TRAINING_PARAMS, 'num_leaves', 63)
+        assert trainer.training_hash() != baseline
+        monkeypatch.undo()
+
+        with open(copy, 'a') as f:
+            f.write(f.name)
+        assert ModelTrainer(data_path=str(copy)).training_hash() != baseline
+
+    def test_partitioned_data(self, tmp_path):
+        """Test every partition file is part of the hash"""
+        AgriculturalDataGenerator(n_samples=1000, seed=5, chunk_size=400).write_partitions(tmp_path / 'parts', workers=1)
+        trainer = ModelTrainer(data_path=str(tmp_path / 'parts'))
+        baseline = trainer.training_hash()
+
+        last = sorted((tmp_path / 'parts').glob('part-*'))[-1]
+        last.write_bytes(last.read_bytes()[:-10])
+        assert trainer.training_hash() != baseline
+
+
+class TestTrainingCache:
+    """Test suite for reusing trained models"""
+
+    def test_main_skips_retraining(self, training_csv, tmp_path, monkeypatch, trainings):
+        """Test a second run with the same inputs reuses the saved model"""
+        models_dir = tmp_path / 'trained'
+        monkeypatch.setattr(model_trainer, 'MODELS_DIR', models_dir)
+
+        model_trainer.main(['--data', str(training_csv)])
+        metadata = json.loads((models_dir / 'risk_model_v1_metadata.json').read_text())
+        assert metadata['training_hash'] == ModelTrainer(data_path=str(training_csv)).training_hash(
+            test_size=0.15, val_size=0.15, cv_folds=5
+        )
+        assert len(trainings) == 1
+
+        model_trainer.main(['--data', str(training_csv)])
+        assert len(trainings) == 1
+
+        # A match under another name is copied rather than retrained
+        model_trainer.main(['--data', str(training_csv), '--output', 'risk_model_v2.pkl'])
+        assert len(trainings) == 1
+        assert (models_dir / 'risk_model_v2.pkl').read_bytes() == (models_dir / 'risk_model_v1.pkl').read_bytes()
+        assert json.loads((models_dir / 'risk_model_v2_metadata.json').read_text())['training_hash'] == metadata['training_hash']
+
+        model_trainer.main(['--data', str(training_csv), '--force'])
+        assert len(trainings) == 2
+
+    def test_native_format(self, training_csv, tmp_path, monkeypatch, trainings):
+        """Test a .txt output reuses a text model with the same hash, never a pickle"""
+        models_dir = tmp_path / 'trained'
+        monkeypatch.setattr(model_trainer, 'MODELS_DIR', models_dir)
+
+        model_trainer.main(['--data', str(training_csv), '--output', 'risk_model_v1.txt'])
+        model_trainer.main(['--data', str(training_csv), '--output', 'risk_model_v1.txt'])
+        assert len(trainings) == 1
+
+        model_trainer.main(['--data', str(training_csv), '--output', 'risk_model_v2.txt'])
+        assert len(trainings) == 1
+        assert (models_dir / 'risk_model_v2.txt').read_bytes() == (models_dir / 'risk_model_v1.txt').read_bytes()
+        assert (models_dir / 'risk_model_v2_metadata.json').read_bytes() == (models_dir / 'risk_model_v1_metadata.json').read_bytes()
+
+        # The text model is not copied under a .pkl name
+        model_trainer.main(['--data', str(training_csv), '--output', 'risk_model_v3.pkl'])
+        assert len(trainings) == 2
+        ModelTrainer(models_dir=str(models_dir)).load_model('risk_model_v3.pkl')
+
+    def test_no_match(self, training_csv, tmp_path):
+        """Test models with another hash, or without a model file, are not reused"""
+        models_dir = tmp_path / 'trained'
+        models_dir.mkdir()
+        (models_dir / 'risk_model_v1_metadata.json').write_text(json.dumps({'training_hash': 'abc'}))
+        (models_dir / 'orphan_metadata.json').write_text(json.dumps({'training_hash': 'def'}))
+        (models_dir / 'broken_metadata.json').write_text('{')
+        trainer = ModelTrainer(data_path=str(training_csv), models_dir=str(models_dir))
+
+        assert trainer.find_trained_model('def') is None
+        assert trainer.find_trained_model(trainer.training_hash()) is None
@@ -0,0 +1,207 @@
+"""
+Test Risk Grid Vector Tiles
+Validates MVT encoding of risk grids, low-zoom aggregation and the tile cache
+"""
+
+import pytest
+import math
+import struct
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.grid_encoding import build_risk_grid
+from services.vector_tiles import TILE_BUFFER, TILE_EXTENT, TileCache, render_tile
+from utils.gee_satellite import GEESatellite
+
+
+def read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        result |= (byte & 0x7F) << shift
+        pos += 1
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def read_fields(data):
+    """Minimal protobuf reader: list of (field number, value)"""
+    fields, pos = [], 0
+    while pos < len(data):
+        tag, pos = read_varint(data, pos)
+        number, wire_type = tag >> 3, tag & 0x7
+        if wire_type == 0:
+            value, pos = read_varint(data, pos)
+        elif wire_type == 1:
+            value, pos = struct.unpack_from('<d', data, pos)[0], pos + 8
+        elif wire_type == 2:
+            length, pos = read_varint(data, pos)
+            value, pos = data[pos:pos + length], pos + length
+        else:
+            raise ValueError(f"Unexpected wire type {wire_type}")
+        fields.append((number, value))
+    return fields
+
+
+def read_packed(data):
+    values, pos = [], 0
+    while pos < len(data):
+        value, pos = read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def decode_tile(tile):
+    """Decode the 'risk' layer into (layer fields, features)"""
+    layers = [value for number, value in read_fields(tile) if number == 3]
+    assert len(layers) == 1
+    fields = read_fields(layers[0])
+    keys = [value.decode() for number, value in fields if number == 3]
+    values = []
+    for number, value in fields:
+        if number == 4:
+            (kind, decoded), = read_fields(value)
+            values.append(decoded.decode() if kind == 1 else decoded)
+
+    features = []
+    for number, value in fields:
+        if number != 2:
+            continue
+        feature = dict(read_fields(value))
+        tags = read_packed(feature[2])
+        geometry = read_packed(feature[4])
+        features.append({
+            'id': feature.get(1),
+            'type': feature[3],
+            'properties': {keys[tags[i]]: values[tags[i + 1]] for i in range(0, len(tags), 2)},
+            'ring': ring_points(geometry),
+        })
+    return dict((n, v) for n, v in fields if n in (1, 5, 15)), features
+
+
+def ring_points(geometry):
+    """Points of a single-ring polygon geometry"""
+    x = y = 0
+    points, pos = [], 0
+    while pos < len(geometry):
+        command, count = geometry[pos] & 0x7, geometry[pos] >> 3
+        pos += 1
+        if command == 7:
+            continue
+        for _ in range(count):
+            x += unzigzag(geometry[pos])
+            y += unzigzag(geometry[pos + 1])
+            points.append((x, y))
+            pos += 2
+    return points
+
+
+def tile_for(lat, lng, z):
+    n = 2 ** z
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return x, y
+
+
+class TestVectorTiles:
+    """Test suite for vector tile rendering"""
+
+    @pytest.fixture
+    def grid(self, score_cells):
+        gee = GEESatellite.__new__(GEESatellite)  # no authentication needed
+        polygon = [
+            {'lat': -0.50, 'lng': 36.90}, {'lat': -0.50, 'lng': 37.10},
+            {'lat': -0.30, 'lng': 37.10}, {'lat': -0.30, 'lng': 36.90},
+        ]
+        return build_risk_grid(gee.grid_spec(polygon, 1), score_cells(gee.create_grid_cells(polygon, 1)))
+
+    def test_full_resolution_tile(self, grid):
+        """Test cells at high zoom keep their scores and clockwise rectangle rings"""
+        x, y = tile_for(-0.4, 37.0, 14)
+        layer, features = decode_tile(render_tile(grid, 14, x, y))
+
+        assert layer[1] == b'risk'
+        assert layer[5] == TILE_EXTENT
+        assert layer[15] == 2
+        assert 0 < len(features) < len(grid['cellIndex'])
+
+        scores = dict(zip(grid['cellIndex'], grid['riskScore']))
+        for feature in features:
+            assert feature['type'] == 3
+            assert feature['properties']['riskScore'] == scores[feature['id']]
+            assert 'cellCount' not in feature['properties']
+
+            ring = feature['ring']
+            assert len(ring) == 4
+            area = sum(a[0] * b[1] - b[0] * a[1] for a, b in zip(ring, ring[1:] + ring[:1]))
+            assert area > 0  # exterior ring, clockwise in tile coordinates
+            assert all(-TILE_BUFFER <= px <= TILE_EXTENT + TILE_BUFFER for point in ring for px in point)
+
+    def test_low_zoom_aggregates_cells(self, grid):
+        """Test cells are merged into blocks covering every cell at low zoom"""
+        x, y = tile_for(-0.4, 37.0, 6)
+        _, features = decode_tile(render_tile(grid, 6, x, y))
+
+        assert len(features) < len(grid['cellIndex'])
+        assert sum(f['properties']['cellCount'] for f in features) == len(grid['cellIndex'])
+        for feature in features:
+            assert feature['properties']['maxRiskScore'] >= feature['properties']['riskScore']
+
+    def test_tile_outside_grid_is_empty(self, grid):
+        """Test tiles away from the analysis area are empty"""
+        x, y = tile_for(48.85, 2.35, 12)
+        assert render_tile(grid, 12, x, y) == b''
+
+
+class TestTileCache:
+    """Test suite for the tile cache"""
+
+    def test_hits_and_misses(self):
+        """Test lookups are counted as hits or misses"""
+        cache = TileCache()
+        assert cache.get(('a', 1, 0, 0)) is None
+        cache.put(('a', 1, 0, 0), b'tile')
+
+        assert cache.get(('a', 1, 0, 0)) == b'tile'
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    def test_least_recently_used_evicted(self):
+        """Test the least recently used tile is evicted past the entry limit"""
+        cache = TileCache(max_entries=2)
+        cache.put(('a', 1, 0, 0), b'1')
+        cache.put(('a', 1, 0, 1), b'2')
+        cache.get(('a', 1, 0, 0))
+        cache.put(('a', 1, 1, 0), b'3')
+
+        assert cache.get(('a', 1, 0, 1)) is None
+        assert cache.get(('a', 1, 0, 0)) == b'1'
+
+    def test_byte_limit(self):
+        """Test total cached bytes stay within the limit"""
+        cache = TileCache(max_bytes=10)
+        cache.put(('a', 1, 0, 0), b'x' * 6)
+        cache.put(('a', 1, 0, 1), b'y' * 6)
+
+        assert cache.stats()['bytes'] <= 10
+        assert cache.get(('a', 1, 0, 1)) == b'y' * 6
+
+    def test_discard_analysis(self):
+        """Test discarding an analysis drops only its tiles"""
+        cache = TileCache()
+        cache.put(('a', 1, 0, 0), b'1')
+        cache.put(('a', 1, 0, 1, 50), b'22')
+        cache.put(('b', 1, 0, 0), b'333')
+        cache.discard('a')
+
+        assert cache.get(('a', 1, 0, 0)) is None
+        assert cache.get(('b', 1, 0, 0)) == b'333'
+        assert cache.stats()['bytes'] == 3
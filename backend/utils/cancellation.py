@@ -0,0 +1,45 @@
+"""
+Cooperative Cancellation
+Thread-safe cancellation token passed from an analysis job into the
+blocking satellite, feature extraction and external-service calls it runs
+in worker threads
+"""
+
+import threading
+from typing import Optional
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside blocking work once its analysis has been cancelled"""
+
+
+class CancellationToken:
+    """
+    Flag shared between an analysis job and the threads doing its work
+    Long-running loops call raise_if_cancelled() between chunks (cells,
+    GEE round trips, download chunks) so abandoned work stops promptly.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = 'Analysis cancelled'):
+        """Request cancellation (idempotent; the first reason is kept)"""
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def raise_if_cancelled(self):
+        """Raise AnalysisCancelled if cancellation was requested"""
+        if self._event.is_set():
+            raise AnalysisCancelled(self.reason)
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep up to timeout seconds; returns True early if cancelled"""
+        return self._event.wait(timeout)
+
@@ -9,7 +9,54 @@ from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 from datetime import datetime
 import math
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+
+try:
+    from backend.utils.cancellation import CancellationToken
+    from backend.utils.tracing import log, span
+except ImportError:  # imported with backend/ on sys.path (tests, scripts)
+    from utils.cancellation import CancellationToken
+    from utils.tracing import log, span
+
+
+# Satellite image downloads are streamed so cancellation is checked between chunks
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+DOWNLOAD_TIMEOUT_SECONDS = 30
+
+# NDVI used for cells that could not be sampled before the analysis deadline
+DEFAULT_NDVI = 0.5
+
+# Round-trip tally of the current analysis; asyncio.to_thread copies it to worker threads
+_round_trips: ContextVar[Optional[List[int]]] = ContextVar('gee_round_trips', default=None)
+
+
+def track_round_trips() -> List[int]:
+    """
+    Count GEE requests made from the current context from now on
+
+    Returns:
+        One-element list holding the running count
+    """
+    tally = [0]
+    _round_trips.set(tally)
+    return tally
+
+
+def _count_round_trips(count: int = 1):
+    tally = _round_trips.get()
+    if tally is not None:
+        tally[0] += count
+
+
+@contextmanager
+def _round_trip(name: str, count: int = 1, **attributes):
+    """Trace a GEE request and count it towards the current analysis"""
+    _count_round_trips(count)
+    with span(name, **attributes) as attrs:
+        yield attrs
 
 
 class GEESatellite:
@@ -36,26 +83,27 @@ class GEESatellite:
             ee.Initialize(credentials)
             
             self.authenticated = True
-            print(f"✓ GEE authenticated: {service_account}")
+            log(f"GEE authenticated: {service_account}", level='success')
             
         except Exception as e:
-            print(f"✗ GEE authentication failed: {str(e)}")
+            log(f"GEE authentication failed: {str(e)}", level='error')
             raise
     
-    def create_grid_cells(
-        self, 
-        polygon: List[Dict[str, float]], 
+    def grid_spec(
+        self,
+        polygon: List[Dict[str, float]],
         cell_size_km: float = 1.0
-    ) -> List[Dict]:
+    ) -> Dict:
         """
-        Divide polygon into grid cells
+        Regular grid covering the polygon's bounding box
         
         Args:
             polygon: List of {lat, lng} coordinates defining the boundary
             cell_size_km: Size of each grid cell in kilometers
         
         Returns:
-            List of grid cells with center coordinates and bounds
+            Dictionary with origin (south-west corner {lat, lng}), step
+            ({lat, lng} in degrees) and shape ([rows, cols])
         """
         # Get bounding box
         lats = [p['lat'] for p in polygon]
@@ -68,14 +116,44 @@ class GEESatellite:
         lat_step = cell_size_km / 111.0
         lng_step = cell_size_km / (111.0 * math.cos(math.radians((min_lat + max_lat) / 2)))
         
+        return {
+            'origin': {'lat': min_lat, 'lng': min_lng},
+            'step': {'lat': lat_step, 'lng': lng_step},
+            'shape': [
+                max(0, math.ceil((max_lat - min_lat) / lat_step)),
+                max(0, math.ceil((max_lng - min_lng) / lng_step)),
+            ],
+        }
+    
+    def create_grid_cells(
+        self, 
+        polygon: List[Dict[str, float]], 
+        cell_size_km: float = 1.0
+    ) -> List[Dict]:
+        """
+        Divide polygon into grid cells
+        
+        Args:
+            polygon: List of {lat, lng} coordinates defining the boundary
+            cell_size_km: Size of each grid cell in kilometers
+        
+        Returns:
+            List of grid cells with center coordinates, bounds and their
+            row/col in grid_spec()
+        """
+        spec = self.grid_spec(polygon, cell_size_km)
+        min_lat, min_lng = spec['origin']['lat'], spec['origin']['lng']
+        lat_step, lng_step = spec['step']['lat'], spec['step']['lng']
+        rows, cols = spec['shape']
+        
         # Generate grid
         cells = []
         cell_id = 0
         
-        lat = min_lat
-        while lat < max_lat:
-            lng = min_lng
-            while lng < max_lng:
+        for row in range(rows):
+            lat = min_lat + row * lat_step
+            for col in range(cols):
+                lng = min_lng + col * lng_step
                 center_lat = lat + lat_step / 2
                 center_lng = lng + lng_step / 2
                 
@@ -83,6 +161,8 @@ class GEESatellite:
                 if self._point_in_polygon(center_lat, center_lng, polygon):
                     cells.append({
                         'id': f'cell-{cell_id}',
+                        'row': row,
+                        'col': col,
                         'center': {'lat': center_lat, 'lng': center_lng},
                         'bounds': {
                             'southWest': {'lat': lat, 'lng': lng},
@@ -90,9 +170,6 @@ class GEESatellite:
                         }
                     })
                     cell_id += 1
-                
-                lng += lng_step
-            lat += lat_step
         
         return cells
     
@@ -126,7 +203,8 @@ class GEESatellite:
         coords.append(coords[0])  # Close the polygon
         
         ee_polygon = ee.Geometry.Polygon([coords])
-        area_m2 = ee_polygon.area().getInfo()
+        with _round_trip('gee.area'):
+            area_m2 = ee_polygon.area().getInfo()
         area_km2 = area_m2 / 1_000_000
         
         return area_km2
@@ -136,7 +214,9 @@ class GEESatellite:
         cells: List[Dict],
         date_start: str,
         date_end: str,
-        include_features: Optional[List[str]] = None
+        include_features: Optional[List[str]] = None,
+        cancel_token=None,
+        deadline: Optional[float] = None
     ) -> List[Dict]:
         """
         Extract satellite-derived features for each grid cell
@@ -146,13 +226,24 @@ class GEESatellite:
             date_start: Start date in YYYY-MM-DD format
             date_end: End date in YYYY-MM-DD format
             include_features: List of features to extract (default: all)
+            cancel_token: Optional CancellationToken checked between GEE round trips
+            deadline: Optional time.monotonic() value; cells not sampled by then
+                      get DEFAULT_NDVI (features['ndvi_source'] == 'default')
         
         Returns:
             List of cells with extracted features
         """
+        cancel_token = cancel_token or CancellationToken()
         if include_features is None:
             include_features = ['ndvi', 'water_proximity', 'boundary_distance']
         
+        if self._past_deadline(deadline):
+            log("No time left for satellite extraction, using default NDVI", level='warning')
+            return [
+                {**cell, 'features': self._default_features(0, [])}
+                for cell in cells
+            ]
+        
         # Create GEE points for all cells
         points = [
             ee.Geometry.Point([cell['center']['lng'], cell['center']['lat']]) 
@@ -165,11 +256,13 @@ class GEESatellite:
             .filterDate(date_start, date_end) \
             .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 20))
         
-        image_count = collection.size().getInfo()
-        print(f"  Found {image_count} cloud-free Sentinel-2 images")
+        cancel_token.raise_if_cancelled()
+        with _round_trip('gee.image_count'):
+            image_count = collection.size().getInfo()
+        log(f"Found {image_count} cloud-free Sentinel-2 images", images=image_count)
         
         if image_count == 0:
-            print("  WARNING: No images available for date range")
+            log("No images available for date range", level='warning')
             # Return cells with null features
             return [
                 {**cell, 'features': {'ndvi': None, 'image_count': 0}}
@@ -182,9 +275,11 @@ class GEESatellite:
         # Generate thumbnail URLs for the first few images (PARALLELIZED)
         image_urls = []
         try:
-            print(f"  Generating thumbnail URLs from {image_count} images...")
-            image_list = collection.toList(5).getInfo()  # Get up to 5 images
-            print(f"  Retrieved {len(image_list)} images for thumbnails")
+            log(f"Generating thumbnail URLs from {image_count} images...")
+            cancel_token.raise_if_cancelled()
+            with _round_trip('gee.image_list'):
+                image_list = collection.toList(5).getInfo()  # Get up to 5 images
+            log(f"Retrieved {len(image_list)} images for thumbnails")
             
             def generate_thumbnail(img_info):
                 """Helper function to generate a single thumbnail (for parallel execution)"""
@@ -197,8 +292,8 @@ class GEESatellite:
                     'max': 3000,
                     'dimensions': 512,
                 }
-                thumb_url = img.getThumbURL(vis_params)
-                print(f"    Generated thumbnail for {img_id}")
+                with _round_trip('gee.thumbnail', image=img_id):
+                    thumb_url = img.getThumbURL(vis_params)
                 return {
                     'url': thumb_url,
                     'id': img_id,
@@ -207,25 +302,39 @@ class GEESatellite:
             
             # Use ThreadPoolExecutor to generate thumbnails in parallel
             with ThreadPoolExecutor(max_workers=5) as executor:
-                # Submit all thumbnail generation tasks
-                future_to_img = {executor.submit(generate_thumbnail, img_info): img_info for img_info in image_list}
+                # Submit all thumbnail generation tasks (in copies of this context, so they are traced and counted)
+                future_to_img = {
+                    executor.submit(copy_context().run, generate_thumbnail, img_info): img_info
+                    for img_info in image_list
+                }
                 
                 # Collect results as they complete
                 for future in as_completed(future_to_img):
+                    if cancel_token.cancelled:
+                        for pending in future_to_img:
+                            pending.cancel()
+                        break
                     try:
                         result = future.result()
                         image_urls.append(result)
                     except Exception as exc:
                         img_info = future_to_img[future]
-                        print(f"    Failed to generate thumbnail for {img_info['id']}: {exc}")
+                        log(f"Failed to generate thumbnail for {img_info['id']}: {exc}", level='warning')
             
-            print(f"  Total thumbnails generated: {len(image_urls)}")
+            log(f"Total thumbnails generated: {len(image_urls)}")
         except Exception as e:
-            print(f"  Could not generate image thumbnails: {str(e)}")
+            log(f"Could not generate image thumbnails: {str(e)}", level='warning')
         
         # Extract features
         results = []
         for cell in cells:
+            # One GEE round trip per cell: stop here once the analysis is abandoned
+            cancel_token.raise_if_cancelled()
+
+            if self._past_deadline(deadline):
+                results.append({**cell, 'features': self._default_features(image_count, image_urls)})
+                continue
+
             point = ee.Geometry.Point([cell['center']['lng'], cell['center']['lat']])
             features = {
                 'image_count': image_count,
@@ -238,7 +347,8 @@ class GEESatellite:
                     nir = median.select('B8')
                     red = median.select('B4')
                     ndvi = nir.subtract(red).divide(nir.add(red)).rename('NDVI')
-                    ndvi_value = ndvi.sample(point, 30).first().get('NDVI').getInfo()
+                    with _round_trip('gee.sample_ndvi', cell=cell['id']):
+                        ndvi_value = ndvi.sample(point, 30).first().get('NDVI').getInfo()
                     features['ndvi'] = round(ndvi_value, 3) if ndvi_value else None
                 
                 # TODO: Add more features
@@ -249,7 +359,7 @@ class GEESatellite:
                 # - Temperature anomalies
                 
             except Exception as e:
-                print(f"  Error extracting features for {cell['id']}: {str(e)}")
+                log(f"Error extracting features for {cell['id']}: {str(e)}", level='error', cell=cell['id'])
                 features['ndvi'] = None
             
             results.append({
@@ -259,11 +369,14 @@ class GEESatellite:
         
         return results
 
-    def get_satellite_image(self, polygon: List[Dict[str, float]]) -> Optional[bytes]:
+    def get_satellite_image(self, polygon: List[Dict[str, float]], cancel_token=None) -> Optional[bytes]:
         """
         Fetch a static satellite image (RGB) for the given polygon.
         Returns image bytes.
+        The download is streamed in chunks and abandoned if cancel_token is cancelled.
         """
+        cancel_token = cancel_token or CancellationToken()
+        cancel_token.raise_if_cancelled()
         try:
             # Create geometry
             coords = [[p['lng'], p['lat']] for p in polygon]
@@ -293,21 +406,46 @@ class GEESatellite:
             }
             
             # Get URL
-            url = image.getThumbURL(vis_params)
+            with _round_trip('gee.thumbnail', image='composite'):
+                url = image.getThumbURL(vis_params)
             
             # Download image
             import requests
-            response = requests.get(url)
-            if response.status_code == 200:
-                return response.content
-            else:
-                print(f"Failed to download GEE image: {response.status_code}")
-                return None
+            cancel_token.raise_if_cancelled()
+            with _round_trip('gee.download') as attrs, \
+                    requests.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT_SECONDS) as response:
+                attrs['status'] = response.status_code
+                if response.status_code != 200:
+                    log(f"Failed to download GEE image: {response.status_code}", level='error')
+                    return None
+
+                chunks = []
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                    cancel_token.raise_if_cancelled()
+                    chunks.append(chunk)
+                attrs['bytes'] = sum(len(chunk) for chunk in chunks)
+                return b''.join(chunks)
                 
         except Exception as e:
-            print(f"Error fetching GEE image: {e}")
+            if cancel_token.cancelled:
+                raise
+            log(f"Error fetching GEE image: {e}", level='error')
             return None
 
+    @staticmethod
+    def _past_deadline(deadline: Optional[float]) -> bool:
+        return deadline is not None and time.monotonic() >= deadline
+
+    @staticmethod
+    def _default_features(image_count: int, image_urls: List[Dict]) -> Dict:
+        """Features for a cell skipped because the analysis ran out of time"""
+        return {
+            'image_count': image_count,
+            'image_urls': image_urls,
+            'ndvi': DEFAULT_NDVI,
+            'ndvi_source': 'default',
+        }
+
 
 # Singleton instance
 _gee_instance = None
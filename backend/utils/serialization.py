@@ -0,0 +1,63 @@
+"""
+Fast JSON Serialization
+orjson-backed encoding for HTTP responses, WebSocket messages, SSE events
+and cached results, with native NumPy scalar/array support
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+import numpy as np
+import orjson
+from fastapi.responses import JSONResponse
+
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# HTTP responses smaller than this are sent uncompressed
+COMPRESSION_MINIMUM_BYTES = 1024
+GZIP_COMPRESS_LEVEL = 6
+
+
+def _default(value: Any) -> Any:
+    """Fallback for types orjson does not serialize itself"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()  # non-contiguous or unsupported dtype
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if hasattr(value, 'dict'):
+        return value.dict()  # pydantic models
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes"""
+    return orjson.dumps(value, default=_default, option=ORJSON_OPTIONS)
+
+
+def loads(data) -> Any:
+    """Parse JSON from bytes or str"""
+    return orjson.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (NumPy values allowed)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+async def send_ws_json(websocket, data: Any):
+    """
+    Send a JSON text frame (drop-in for websocket.send_json)
+    Frames are deflated by the server when the client negotiated
+    permessage-deflate (uvicorn ws_per_message_deflate).
+    """
+    await websocket.send_text(dumps(data).decode('utf-8'))
@@ -0,0 +1,208 @@
+"""
+Request Tracing
+Lightweight spans propagated through contextvars (and so into
+asyncio.to_thread workers), kept in an in-process ring buffer per request
+and optionally exported as JSON lines (TRACE_FILE)
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_MAX_TRACES = 100
+DEFAULT_MAX_SPANS_PER_TRACE = 2000
+MAX_EVENTS_PER_SPAN = 100
+
+_LEVEL_PREFIXES = {'info': '', 'success': 'SUCCESS: ', 'warning': 'WARNING: ', 'error': 'ERROR: '}
+
+_request_id: ContextVar[Optional[str]] = ContextVar('trace_request_id', default=None)
+_current_span: ContextVar[Optional[Dict[str, Any]]] = ContextVar('trace_current_span', default=None)
+_span_ids = itertools.count(1)
+
+
+class Tracer:
+    """Bounded store of finished spans, grouped by request id"""
+
+    def __init__(
+        self,
+        max_traces: int = DEFAULT_MAX_TRACES,
+        max_spans_per_trace: int = DEFAULT_MAX_SPANS_PER_TRACE,
+        path: Optional[str] = None
+    ):
+        """
+        Args:
+            max_traces: Requests kept; the least recently written is evicted
+            max_spans_per_trace: Spans kept per request; later spans are counted as dropped
+            path: Optional JSON-lines file every finished span is appended to
+        """
+        self.max_traces = max_traces
+        self.max_spans_per_trace = max_spans_per_trace
+        self.path = path
+        self._lock = threading.Lock()
+        self._traces: OrderedDict = OrderedDict()
+        self._file = open(path, 'a', buffering=1, encoding='utf-8') if path else None
+
+    def record(self, span: Dict[str, Any]):
+        """Store a finished span"""
+        line = json.dumps(span, default=str) if self._file else None
+        with self._lock:
+            trace = self._traces.get(span['requestId'])
+            if trace is None:
+                trace = self._traces[span['requestId']] = {'spans': [], 'dropped': 0}
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            else:
+                self._traces.move_to_end(span['requestId'])
+
+            if len(trace['spans']) < self.max_spans_per_trace:
+                trace['spans'].append(span)
+            else:
+                trace['dropped'] += 1
+            if line is not None:
+                self._file.write(line + '\n')
+
+    def get_trace(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Spans recorded for a request
+
+        Returns:
+            Dict with spans (by start time), dropped count and critical path,
+            or None if the request is unknown (or evicted)
+        """
+        with self._lock:
+            trace = self._traces.get(request_id)
+            if trace is None:
+                return None
+            spans = sorted(trace['spans'], key=lambda s: s['start'])
+            dropped = trace['dropped']
+
+        return {
+            'requestId': request_id,
+            'spanCount': len(spans),
+            'dropped': dropped,
+            'criticalPath': critical_path(spans),
+            'spans': spans,
+        }
+
+
+def critical_path(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Spans that determined the request's end time, in order
+    From the longest root span, walks back from each span's end through
+    the children that finished last without overlapping (children running
+    in parallel with a longer sibling are left out), then expands each.
+    """
+    if not spans:
+        return []
+    ids = {s['spanId'] for s in spans}
+    children: Dict[Optional[str], List[Dict]] = {}
+    for s in spans:
+        parent = s['parentId'] if s['parentId'] in ids else None
+        children.setdefault(parent, []).append(s)
+
+    def end(s):
+        return s['start'] + s['durationMs'] / 1000
+
+    def walk(current) -> List[Dict[str, Any]]:
+        chain, cursor = [], end(current)
+        for child in sorted(children.get(current['spanId'], []), key=end, reverse=True):
+            if end(child) <= cursor + 0.001:  # 1 ms slack for rounding
+                chain.append(child)
+                cursor = child['start']
+        path = [{'name': current['name'], 'spanId': current['spanId'], 'durationMs': current['durationMs']}]
+        for child in reversed(chain):
+            path.extend(walk(child))
+        return path
+
+    return walk(max(children[None], key=lambda s: s['durationMs']))
+
+
+def current_request_id() -> Optional[str]:
+    """Request id of the active trace, if any"""
+    return _request_id.get()
+
+
+@contextmanager
+def trace(request_id: str, name: str, **attributes):
+    """Start tracing a request: the enclosed block runs in a root span"""
+    token = _request_id.set(request_id)
+    try:
+        with span(name, **attributes) as root:
+            yield root
+    finally:
+        _request_id.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time the enclosed block as a child of the current span
+    Yields the span's attribute dict so callers can add results. Outside a
+    trace nothing is recorded.
+    """
+    request_id = _request_id.get()
+    if request_id is None:
+        yield {}
+        return
+
+    parent = _current_span.get()
+    record = {
+        'requestId': request_id,
+        'spanId': format(next(_span_ids), 'x'),
+        'parentId': parent['spanId'] if parent else None,
+        'name': name,
+        'start': time.time(),
+        'durationMs': 0.0,
+        'status': 'ok',
+        'thread': threading.current_thread().name,
+        'attributes': attributes,
+        'events': [],
+    }
+    token = _current_span.set(record)
+    started = time.perf_counter()
+    try:
+        yield attributes
+    except BaseException as e:
+        record['status'] = 'error'
+        record['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record['durationMs'] = round((time.perf_counter() - started) * 1000, 3)
+        _current_span.reset(token)
+        get_tracer().record(record)
+
+
+def log(message: str, level: str = 'info', **fields):
+    """
+    Print a log line and attach it to the current span as an event
+
+    Args:
+        message: Human-readable message (without a level prefix)
+        level: 'info', 'success', 'warning' or 'error'
+        fields: Structured values stored with the event
+    """
+    request_id = _request_id.get()
+    prefix = f"[{request_id[:8]}] " if request_id else ''
+    print(f"{prefix}{_LEVEL_PREFIXES.get(level, '')}{message}")
+
+    current = _current_span.get()
+    if current is not None and len(current['events']) < MAX_EVENTS_PER_SPAN:
+        current['events'].append({'time': time.time(), 'level': level, 'message': message, **fields})
+
+
+# Singleton instance
+_tracer_instance = None
+
+def get_tracer() -> Tracer:
+    """Get or create tracer instance"""
+    global _tracer_instance
+    if _tracer_instance is None:
+        _tracer_instance = Tracer(path=os.getenv('TRACE_FILE'))
+    return _tracer_instance
@@ -76,7 +76,8 @@ export function InsuranceDashboard({ result, location, onBack }: InsuranceDashbo
                 coverage_period: metrics.coverage_period || "12 Months",
                 factors: metrics.factors,
                 recommended_actions: metrics.recommended_actions || [],
-                polygon: location?.type === 'custom' ? location.polygon : undefined
+                polygon: location?.type === 'custom' ? location.polygon : undefined,
+                analysisId: result?.analysisId
             };
 
             const blob = await generateInsurancePDF(pdfData);
@@ -10,7 +10,15 @@ import 'leaflet-draw/dist/leaflet.draw.css';
 import { Layers, MapPin as MapPinIcon, Shapes, Trash2 } from 'lucide-react';
 import { Button } from '@/components/UI/Button';
 import { Select } from '@/components/UI/Select';
-import { COLOR_PALETTE, LAYER_LABELS, MAP_CONFIG, PIN_TYPE_OPTIONS } from '@/lib/constants';
+import {
+  COLOR_PALETTE,
+  LAYER_LABELS,
+  MAP_CONFIG,
+  PIN_TYPE_OPTIONS,
+  RISK_RASTER_MIN_CELLS,
+  RISK_TILE_MIN_CELLS,
+} from '@/lib/constants';
+import { analysisRasterTileUrl, analysisTileUrl } from '@/lib/api';
 import type {
   AdvancedOptions,
   AnalysisResult,
@@ -491,6 +499,16 @@ export function MapViewContent(props: MapViewContentProps) {
         {advancedOptions.enabledLayers.includes('riskHeatmap') && (
           <RiskHeatmap
             data={result?.geoJSON ?? null}
+            tileUrl={
+              result?.analysisId && (result.summary?.totalCells ?? 0) > RISK_TILE_MIN_CELLS
+                ? analysisTileUrl(result.analysisId)
+                : null
+            }
+            rasterUrl={
+              result?.analysisId && (result.summary?.totalCells ?? 0) > RISK_RASTER_MIN_CELLS
+                ? analysisRasterTileUrl(result.analysisId, advancedOptions.displayThreshold)
+                : null
+            }
             displayThreshold={advancedOptions.displayThreshold}
             onSelectZone={(properties) => {
               const zoneId = String(properties?.id ?? properties?.gridId ?? '');
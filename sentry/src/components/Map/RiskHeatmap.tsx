@@ -1,10 +1,11 @@
 'use client';
 
-import { useMemo, useCallback } from 'react';
+import { useMemo, useEffect, useRef, useState } from 'react';
 import type { GeoJsonObject } from 'geojson';
-import { GeoJSON } from 'react-leaflet';
+import { GeoJSON, TileLayer, useMap } from 'react-leaflet';
 import type { GeoJsonFeatureCollection } from '@/lib/types';
-import { RISK_LEVEL_COLORS } from '@/lib/constants';
+import { RISK_LEVEL_COLORS, RISK_TILE_MAX_ZOOM } from '@/lib/constants';
+import { decodeRiskTile } from '@/lib/vectorTiles';
 
 export type RiskFeatureProperties = {
   riskScore?: number;
@@ -17,46 +18,166 @@ type RiskFeature = {
 
 interface RiskHeatmapProps {
   data: GeoJsonFeatureCollection | null;
+  /** Vector tile URL template; when set, only tiles in view are loaded instead of `data` */
+  tileUrl?: string | null;
+  /** PNG tile URL template; takes precedence over tileUrl (zones are not clickable) */
+  rasterUrl?: string | null;
   displayThreshold: number;
   onSelectZone?: (feature: RiskFeatureProperties) => void;
 }
 
-export function RiskHeatmap({ data, displayThreshold, onSelectZone }: RiskHeatmapProps) {
+/** Draws the analysis risk grid from the source it was given (no hooks: it only picks a layer) */
+export function RiskHeatmap({ data, tileUrl, rasterUrl, displayThreshold, onSelectZone }: RiskHeatmapProps) {
+  if (rasterUrl) {
+    return <RasterRiskLayer key={rasterUrl} rasterUrl={rasterUrl} />;
+  }
+
+  if (tileUrl) {
+    return <RiskTileLayer tileUrl={tileUrl} displayThreshold={displayThreshold} onSelectZone={onSelectZone} />;
+  }
+
   if (!data) {
     return null;
   }
 
-  const filtered = useMemo(() => {
-    if (!data) return null;
-    return {
+  return <GeoJsonRiskLayer data={data} displayThreshold={displayThreshold} onSelectZone={onSelectZone} />;
+}
+
+interface RasterRiskLayerProps {
+  rasterUrl: string;
+}
+
+/** Risk grid drawn as server-rendered PNG tiles (zones are not clickable) */
+function RasterRiskLayer({ rasterUrl }: RasterRiskLayerProps) {
+  return <TileLayer url={rasterUrl} maxNativeZoom={RISK_TILE_MAX_ZOOM} />;
+}
+
+interface GeoJsonRiskLayerProps {
+  data: GeoJsonFeatureCollection;
+  displayThreshold: number;
+  onSelectZone?: (feature: RiskFeatureProperties) => void;
+}
+
+/** Risk grid drawn from the full GeoJSON result */
+function GeoJsonRiskLayer({ data, displayThreshold, onSelectZone }: GeoJsonRiskLayerProps) {
+  const filtered = useMemo(
+    () => ({
       ...data,
       features: data.features.filter((feature) => {
         const riskScore = getRiskScore(feature);
         return Number.isFinite(riskScore) && riskScore >= displayThreshold;
       }),
+    }),
+    [data, displayThreshold]
+  );
+
+  if (filtered.features.length === 0) {
+    return null;
+  }
+
+  return (
+    <GeoJSON
+      key={`${displayThreshold}-${filtered.features.length}`}
+      data={filtered as unknown as GeoJsonObject}
+      style={riskStyle}
+      eventHandlers={{
+        click: (event) => {
+          const properties = (event.propagatedFrom.feature as RiskFeature | undefined)?.properties;
+          onSelectZone?.(properties ?? {});
+        },
+      }}
+    />
+  );
+}
+
+type TileFeature = ReturnType<typeof decodeRiskTile>[number];
+
+interface RiskTileLayerProps {
+  tileUrl: string;
+  displayThreshold: number;
+  onSelectZone?: (feature: RiskFeatureProperties) => void;
+}
+
+/** Risk grid drawn from vector tiles covering the visible map area */
+function RiskTileLayer({ tileUrl, displayThreshold, onSelectZone }: RiskTileLayerProps) {
+  const map = useMap();
+  const tiles = useRef(new Map<string, TileFeature[]>());
+  const [visible, setVisible] = useState<{ features: TileFeature[]; version: number }>({ features: [], version: 0 });
+
+  useEffect(() => {
+    tiles.current = new Map();
+    const controller = new AbortController();
+    let latestRequest = 0;
+
+    const loadTile = async (z: number, x: number, y: number) => {
+      const key = `${z}/${x}/${y}`;
+      if (tiles.current.has(key)) return;
+      try {
+        const url = tileUrl.replace('{z}', String(z)).replace('{x}', String(x)).replace('{y}', String(y));
+        const response = await fetch(url, { signal: controller.signal });
+        const features = response.ok ? decodeRiskTile(await response.arrayBuffer(), z, x, y) : [];
+        tiles.current.set(key, features);
+      } catch (error) {
+        if (!controller.signal.aborted) {
+          console.error('🔴 [RiskHeatmap] Tile failed:', key, error);
+        }
+      }
     };
-  }, [data, displayThreshold]);
-
-  const styleFunction = useCallback((feature: any) => {
-    const riskScore = getRiskScore(feature);
-    const riskLevel = getRiskLevel(riskScore);
-    return {
-      color: riskOutlineForLevel(riskLevel),
-      weight: 1,
-      fillColor: riskFillForLevel(riskLevel),
-      fillOpacity: 0.55,
+
+    const update = async () => {
+      const request = ++latestRequest;
+      const z = Math.min(Math.max(Math.round(map.getZoom()), 0), RISK_TILE_MAX_ZOOM);
+      const bounds = map.getBounds();
+      const last = 2 ** z - 1;
+      const clamp = (value: number) => Math.min(Math.max(value, 0), last);
+      const minX = clamp(lngToTile(bounds.getWest(), z));
+      const maxX = clamp(lngToTile(bounds.getEast(), z));
+      const minY = clamp(latToTile(bounds.getNorth(), z));
+      const maxY = clamp(latToTile(bounds.getSouth(), z));
+
+      const keys: string[] = [];
+      const loads: Promise<void>[] = [];
+      for (let x = minX; x <= maxX; x += 1) {
+        for (let y = minY; y <= maxY; y += 1) {
+          keys.push(`${z}/${x}/${y}`);
+          loads.push(loadTile(z, x, y));
+        }
+      }
+      await Promise.all(loads);
+
+      // A newer pan/zoom superseded this one
+      if (request !== latestRequest || controller.signal.aborted) return;
+      setVisible((current) => ({
+        features: keys.flatMap((key) => tiles.current.get(key) ?? []),
+        version: current.version + 1,
+      }));
+    };
+
+    update();
+    map.on('moveend', update);
+    return () => {
+      controller.abort();
+      map.off('moveend', update);
     };
-  }, []);
+  }, [map, tileUrl]);
 
-  if (!filtered || filtered.features.length === 0) {
+  const filtered = useMemo(
+    () => ({
+      type: 'FeatureCollection' as const,
+      features: visible.features.filter((feature) => getRiskScore(feature) >= displayThreshold),
+    }),
+    [visible, displayThreshold]
+  );
+
+  if (filtered.features.length === 0) {
     return null;
   }
 
   return (
     <GeoJSON
-      key={`${displayThreshold}-${filtered.features.length}`}
+      key={`${displayThreshold}-${visible.version}`}
       data={filtered as unknown as GeoJsonObject}
-      style={styleFunction}
+      style={riskStyle}
       eventHandlers={{
         click: (event) => {
           const properties = (event.propagatedFrom.feature as RiskFeature | undefined)?.properties;
@@ -67,6 +188,27 @@ export function RiskHeatmap({ data, displayThreshold, onSelectZone }: RiskHeatma
   );
 }
 
+function lngToTile(lng: number, z: number): number {
+  return Math.floor(((lng + 180) / 360) * 2 ** z);
+}
+
+function latToTile(lat: number, z: number): number {
+  const clamped = Math.min(Math.max(lat, -85.0511), 85.0511);
+  const radians = (clamped * Math.PI) / 180;
+  return Math.floor(((1 - Math.asinh(Math.tan(radians)) / Math.PI) / 2) * 2 ** z);
+}
+
+function riskStyle(feature: unknown) {
+  const riskScore = getRiskScore(feature);
+  const riskLevel = getRiskLevel(riskScore);
+  return {
+    color: riskOutlineForLevel(riskLevel),
+    weight: 1,
+    fillColor: riskFillForLevel(riskLevel),
+    fillOpacity: 0.55,
+  };
+}
+
 function getRiskScore(feature: unknown): number {
   if (feature && typeof feature === 'object') {
     const candidate = feature as RiskFeature;
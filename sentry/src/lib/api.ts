@@ -1,8 +1,23 @@
 import { AnalysisRequest, AnalysisResult } from "./types";
+import { decodeRiskGrid, riskGridToGeoJSON } from "./gridEncoding";
 
 const API_BASE_URL = "http://localhost:8000";
-const ANALYZE_ENDPOINT = "/api/analyze";
-const ANALYZE_WS_ENDPOINT = "ws://localhost:8000/api/analyze/ws";
+const WS_BASE_URL = "ws://localhost:8000";
+const ANALYZE_ENDPOINT = `${API_BASE_URL}/api/analyze`;
+// format=binary: the result grid arrives as a compact binary frame after 'complete'
+const ANALYZE_WS_ENDPOINT = `${WS_BASE_URL}/api/analyze/ws?format=binary`;
+const JOB_POLL_INTERVAL_MS = 2000;
+const MAX_RESUME_ATTEMPTS = 3;
+
+export interface AnalysisJobHandle {
+  jobId: string;
+  status: string;
+  statusUrl: string;
+  eventsUrl: string;
+  websocketUrl: string;
+  estimatedCost?: number;
+  estimatedWaitSeconds?: number;
+}
 
 export type ProgressCallback = (progress: {
   type: 'status' | 'progress' | 'complete' | 'error';
@@ -75,11 +90,33 @@ export async function runAnalysis(
     throw new Error(detail ?? "Failed to run analysis");
   }
 
-  const result = (await response.json()) as AnalysisResult;
-  return {
-    ...buildDefaultResult(),
-    ...result,
-  };
+  // The server runs the analysis as a background job; poll until it finishes
+  const handle = (await response.json()) as AnalysisJobHandle;
+  options?.signal?.addEventListener('abort', () => {
+    fetch(`${API_BASE_URL}${handle.statusUrl}`, { method: 'DELETE' }).catch(() => undefined);
+  });
+  while (true) {
+    const statusResponse = await fetch(`${API_BASE_URL}${handle.statusUrl}`, { signal: options?.signal });
+    if (!statusResponse.ok) {
+      const detail = await safeParseError(statusResponse);
+      throw new Error(detail ?? "Failed to fetch analysis status");
+    }
+
+    const job = await statusResponse.json();
+    if (job.status === 'completed') {
+      return {
+        ...buildDefaultResult(),
+        ...(job.result as AnalysisResult),
+        grid: undefined, // JSON columns; the typed grid only comes from the binary frame
+        analysisId: handle.jobId,
+      };
+    }
+    if (job.status === 'failed' || job.status === 'cancelled') {
+      throw new Error(job.error || 'Analysis failed');
+    }
+
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
 }
 
 async function runAnalysisWebSocket(
@@ -88,68 +125,167 @@ async function runAnalysisWebSocket(
   signal?: AbortSignal
 ): Promise<AnalysisResult> {
   return new Promise((resolve, reject) => {
-    const ws = new WebSocket(ANALYZE_WS_ENDPOINT);
+    let ws: WebSocket;
     let result: AnalysisResult | null = null;
+    let jobId: string | null = null;
+    let eventsSeen = 0;
+    let pendingComplete: { seq?: number; data?: Partial<AnalysisResult> } | null = null;
+    let resumeAttempts = 0;
+    let finished = false;
+
+    const finish = (error?: Error) => {
+      if (finished) return;
+      finished = true;
+      if (error) {
+        reject(error);
+      } else if (result) {
+        resolve(result);
+      } else {
+        reject(new Error('Connection closed without result'));
+      }
+    };
 
     // Handle abort signal
     if (signal) {
       signal.addEventListener('abort', () => {
-        ws.close();
-        reject(new Error('Analysis cancelled'));
+        // Tell the server to stop the analysis instead of letting it run to completion
+        if (ws.readyState === WebSocket.OPEN) {
+          ws.send(JSON.stringify({ type: 'cancel' }));
+        }
+        ws.close(1000);
+        finish(new Error('Analysis cancelled'));
       });
     }
 
-    ws.onopen = () => {
-      console.log('🟢 [WebSocket] Connected');
-      ws.send(JSON.stringify(payload));
-    };
+    const connect = (url: string, initialMessage?: string) => {
+      ws = new WebSocket(url);
+      ws.binaryType = 'arraybuffer';
 
-    ws.onmessage = (event) => {
-      try {
-        const data = JSON.parse(event.data);
-        console.log('🔵 [WebSocket] Received:', data.type, data.step, data.message);
-
-        if (data.type === 'complete') {
-          console.log('🎯 [WebSocket] Complete data received:', data.data);
-          console.log('🖼️ [WebSocket] satelliteImages:', data.data?.satelliteImages);
-          result = {
-            ...buildDefaultResult(),
-            ...data.data,
-          };
-          console.log('✅ [WebSocket] Final result:', result);
+      ws.onopen = () => {
+        console.log('🟢 [WebSocket] Connected');
+        if (initialMessage) {
+          ws.send(initialMessage);
         }
+      };
 
-        onProgress(data);
+      ws.onmessage = (event) => {
+        try {
+          // Binary frame: the result grid announced by the preceding 'complete' message
+          if (event.data instanceof ArrayBuffer) {
+            if (!pendingComplete) return;
+            const complete = pendingComplete;
+            pendingComplete = null;
+            const grid = decodeRiskGrid(event.data);
+            result = {
+              ...buildDefaultResult(),
+              ...complete.data,
+              grid,
+              geoJSON: riskGridToGeoJSON(grid),
+              analysisId: jobId ?? undefined,
+            };
+            if (typeof complete.seq === 'number') {
+              eventsSeen = complete.seq + 1;
+            }
+            console.log('✅ [WebSocket] Final result:', result);
+            onProgress({ ...complete, type: 'complete', data: result });
+            ws.close();
+            return;
+          }
 
-        if (data.type === 'error') {
-          ws.close();
-          reject(new Error(data.message || 'Analysis failed'));
-        } else if (data.type === 'complete') {
+          const data = JSON.parse(event.data);
+          console.log('🔵 [WebSocket] Received:', data.type, data.step, data.message);
+
+          // Track the job so a dropped connection can resume where it left off
+          if (data.type === 'job') {
+            jobId = data.jobId;
+            if (data.estimatedWaitSeconds > 0) {
+              onProgress({
+                type: 'status',
+                step: 'queued',
+                message: `Queued - starting in about ${Math.ceil(data.estimatedWaitSeconds)}s...`,
+                progressPercent: 0,
+              });
+            }
+            return;
+          }
+          // Hold the completion until its grid frame arrives (a resume replays both)
+          if (data.type === 'complete' && data.data?.grid?.format === 'srg1') {
+            pendingComplete = data;
+            return;
+          }
+          if (typeof data.seq === 'number') {
+            eventsSeen = data.seq + 1;
+          }
+
+          if (data.type === 'complete') {
+            console.log('🎯 [WebSocket] Complete data received:', data.data);
+            console.log('🖼️ [WebSocket] satelliteImages:', data.data?.satelliteImages);
+            result = {
+              ...buildDefaultResult(),
+              ...data.data,
+              grid: undefined,
+              analysisId: jobId ?? undefined,
+            };
+            console.log('✅ [WebSocket] Final result:', result);
+          }
+
+          onProgress(data);
+
+          if (data.type === 'error' || data.type === 'cancelled') {
+            ws.close();
+            finish(new Error(data.message || 'Analysis failed'));
+          } else if (data.type === 'complete') {
+            ws.close();
+          }
+        } catch (error) {
+          console.error('🔴 [WebSocket] Parse error:', error);
           ws.close();
+          finish(error as Error);
         }
-      } catch (error) {
-        console.error('🔴 [WebSocket] Parse error:', error);
-        ws.close();
-        reject(error);
-      }
-    };
+      };
 
-    ws.onerror = (error) => {
-      console.error('🔴 [WebSocket] Error:', error);
-      reject(new Error('WebSocket connection failed'));
-    };
+      ws.onerror = (error) => {
+        console.error('🔴 [WebSocket] Error:', error);
+      };
 
-    ws.onclose = () => {
-      console.log('🔴 [WebSocket] Closed');
-      if (result) {
-        resolve(result);
-      } else {
-        reject(new Error('Connection closed without result'));
-      }
+      ws.onclose = () => {
+        console.log('🔴 [WebSocket] Closed');
+        if (finished || result) {
+          finish();
+          return;
+        }
+
+        // The analysis keeps running server-side; reattach to its job
+        if (jobId && resumeAttempts < MAX_RESUME_ATTEMPTS && !signal?.aborted) {
+          resumeAttempts += 1;
+          const delay = 1000 * resumeAttempts;
+          console.log(`🟡 [WebSocket] Resuming job ${jobId} in ${delay}ms (attempt ${resumeAttempts})`);
+          setTimeout(() => {
+            if (!finished) {
+              connect(`${WS_BASE_URL}/api/jobs/${jobId}/ws?after=${eventsSeen}&format=binary`);
+            }
+          }, delay);
+          return;
+        }
+
+        finish(jobId ? undefined : new Error('WebSocket connection failed'));
+      };
     };
+
+    connect(ANALYZE_WS_ENDPOINT, JSON.stringify(payload));
   });
 }
 
+/** Vector tile URL template ({z}/{x}/{y}) for a completed analysis's risk grid */
+export function analysisTileUrl(analysisId: string): string {
+  return `${API_BASE_URL}/api/analysis/${analysisId}/tiles/{z}/{x}/{y}.mvt`;
+}
+
+/** PNG heatmap tile URL template; cells scoring below threshold are left transparent */
+export function analysisRasterTileUrl(analysisId: string, threshold = 0): string {
+  return `${API_BASE_URL}/api/analysis/${analysisId}/tiles/{z}/{x}/{y}.png?threshold=${threshold}`;
+}
+
 async function safeParseError(response: Response) {
   try {
     const data = await response.json();
@@ -177,6 +313,8 @@ export interface PDFRequest {
   factors: { name: string; impact: string; value: string }[];
   recommended_actions: string[];
   polygon?: { lat: number; lng: number }[];
+  /** Adds the analysis's risk map figure to the report */
+  analysisId?: string;
 }
 
 export async function generateInsurancePDF(data: PDFRequest): Promise<Blob> {
@@ -171,6 +171,12 @@ export const RISK_LEVEL_COLORS = {
   high: "#FF6B6B",
 };
 
+// Analyses with more cells than this are drawn from vector tiles (visible area only),
+// and above RISK_RASTER_MIN_CELLS from server-rendered PNG tiles
+export const RISK_TILE_MIN_CELLS = 2000;
+export const RISK_RASTER_MIN_CELLS = 20000;
+export const RISK_TILE_MAX_ZOOM = 16;
+
 export const SIDEBAR_WIDTH = 400;
 
 export const COLOR_PALETTE = {
@@ -0,0 +1,83 @@
+import type { GeoJsonFeatureCollection, RiskGrid } from './types';
+
+// Binary risk grid frame ('srg1'), mirrors backend/services/grid_encoding.py
+const GRID_MAGIC = 'SRG1';
+const GRID_FORMAT_VERSION = 1;
+const HEADER_BYTES = 56;
+const RISK_LEVELS = ['Low', 'Medium', 'High'];
+
+export function decodeRiskGrid(buffer: ArrayBuffer): RiskGrid {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(
+    view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3)
+  );
+  if (magic !== GRID_MAGIC) {
+    throw new Error(`Not a risk grid frame (magic ${magic})`);
+  }
+  const version = view.getUint16(4, true);
+  if (version !== GRID_FORMAT_VERSION) {
+    throw new Error(`Unsupported risk grid format version ${version}`);
+  }
+
+  const count = view.getUint32(48, true);
+  const namesLength = view.getUint32(52, true);
+
+  // Typed arrays are 4-byte aligned, so they view the buffer without copying
+  let offset = HEADER_BYTES;
+  const cellIndex = new Uint32Array(buffer, offset, count);
+  offset += 4 * count;
+  const riskScore = new Float32Array(buffer, offset, count);
+  offset += 4 * count;
+  const factorMask = new Uint32Array(buffer, offset, count);
+  offset += 4 * count;
+  const riskLevel = new Uint8Array(buffer, offset, count);
+  offset += count + ((4 - (count % 4)) % 4);
+
+  const names = new TextDecoder().decode(new Uint8Array(buffer, offset, namesLength));
+
+  return {
+    originLat: view.getFloat64(8, true),
+    originLng: view.getFloat64(16, true),
+    latStep: view.getFloat64(24, true),
+    lngStep: view.getFloat64(32, true),
+    rows: view.getUint32(40, true),
+    cols: view.getUint32(44, true),
+    levels: RISK_LEVELS,
+    factorNames: JSON.parse(names) as string[],
+    cellIndex,
+    riskScore,
+    factorMask,
+    riskLevel,
+  };
+}
+
+/** GeoJSON view of a risk grid, in the format of the JSON /api/analyze result */
+export function riskGridToGeoJSON(grid: RiskGrid): GeoJsonFeatureCollection {
+  const features: Array<Record<string, unknown>> = new Array(grid.cellIndex.length);
+
+  for (let i = 0; i < grid.cellIndex.length; i += 1) {
+    const row = Math.floor(grid.cellIndex[i] / grid.cols);
+    const col = grid.cellIndex[i] % grid.cols;
+    const south = grid.originLat + row * grid.latStep;
+    const west = grid.originLng + col * grid.lngStep;
+    const north = south + grid.latStep;
+    const east = west + grid.lngStep;
+    const mask = grid.factorMask[i];
+
+    features[i] = {
+      type: 'Feature',
+      id: `cell-${i}`,
+      geometry: {
+        type: 'Polygon',
+        coordinates: [[[west, south], [east, south], [east, north], [west, north], [west, south]]],
+      },
+      properties: {
+        riskScore: grid.riskScore[i],
+        riskLevel: grid.levels[grid.riskLevel[i]],
+        factors: grid.factorNames.filter((_, bit) => (mask & (1 << bit)) !== 0),
+      },
+    };
+  }
+
+  return { type: 'FeatureCollection', features };
+}
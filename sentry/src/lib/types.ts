@@ -52,6 +52,7 @@ export interface AdvancedOptions {
   gridGranularity: 1 | 2 | 5;
   enabledLayers: LayerKey[];
   temporalFocus: TimeOfDay[];
+  latencyBudgetSeconds?: number; // server degrades stages to finish within this time
 }
 
 export interface RiskFactor {
@@ -109,8 +110,27 @@ export interface GeoJsonFeatureCollection {
   features: Array<Record<string, unknown>>;
 }
 
+/** Columnar risk grid decoded from the binary result frame (see gridEncoding.ts) */
+export interface RiskGrid {
+  originLat: number;
+  originLng: number;
+  latStep: number;
+  lngStep: number;
+  rows: number;
+  cols: number;
+  levels: string[];
+  factorNames: string[];
+  cellIndex: Uint32Array;
+  riskScore: Float32Array;
+  factorMask: Uint32Array;
+  riskLevel: Uint8Array;
+}
+
 export interface AnalysisResult {
   geoJSON: GeoJsonFeatureCollection | null;
+  grid?: RiskGrid;
+  /** Job id of the analysis; serves its vector tiles */
+  analysisId?: string;
   priorities: PriorityZone[];
   summary: AnalysisSummary | null;
   temporal?: Partial<Record<TimeOfDay, GeoJsonFeatureCollection>>;
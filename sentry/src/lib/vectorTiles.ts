@@ -0,0 +1,165 @@
+// Decoder for the risk grid vector tiles served by
+// /api/analysis/{id}/tiles/{z}/{x}/{y}.mvt (see backend/services/vector_tiles.py).
+// Only what those tiles use is supported: one layer of single-ring polygons.
+
+type TileFeature = {
+  type: 'Feature';
+  id?: number;
+  geometry: { type: 'Polygon'; coordinates: number[][][] };
+  properties: Record<string, string | number>;
+};
+
+class ProtoReader {
+  pos = 0;
+  private readonly bytes: Uint8Array;
+
+  constructor(bytes: Uint8Array) {
+    this.bytes = bytes;
+  }
+
+  done(): boolean {
+    return this.pos >= this.bytes.length;
+  }
+
+  varint(): number {
+    let result = 0;
+    let shift = 0;
+    while (true) {
+      const byte = this.bytes[this.pos++];
+      result += (byte & 0x7f) * 2 ** shift;
+      if ((byte & 0x80) === 0) return result;
+      shift += 7;
+    }
+  }
+
+  // Returns [field number, wire type]
+  tag(): [number, number] {
+    const tag = this.varint();
+    return [Math.floor(tag / 8), tag & 0x7];
+  }
+
+  bytesField(): Uint8Array {
+    const length = this.varint();
+    const value = this.bytes.subarray(this.pos, this.pos + length);
+    this.pos += length;
+    return value;
+  }
+
+  double(): number {
+    const view = new DataView(this.bytes.buffer, this.bytes.byteOffset + this.pos, 8);
+    this.pos += 8;
+    return view.getFloat64(0, true);
+  }
+
+  skip(wireType: number) {
+    if (wireType === 0) this.varint();
+    else if (wireType === 1) this.pos += 8;
+    else if (wireType === 2) this.pos += this.varint();
+    else if (wireType === 5) this.pos += 4;
+    else throw new Error(`Unsupported wire type ${wireType}`);
+  }
+}
+
+const textDecoder = new TextDecoder();
+
+function packed(bytes: Uint8Array): number[] {
+  const reader = new ProtoReader(bytes);
+  const values: number[] = [];
+  while (!reader.done()) values.push(reader.varint());
+  return values;
+}
+
+const unzigzag = (value: number) => (value % 2 === 1 ? -(value + 1) / 2 : value / 2);
+
+function readValue(bytes: Uint8Array): string | number {
+  const reader = new ProtoReader(bytes);
+  const [field, wireType] = reader.tag();
+  if (field === 1) return textDecoder.decode(reader.bytesField());
+  if (wireType === 1) return reader.double();
+  return reader.varint();
+}
+
+/** Decode a risk tile into GeoJSON features in longitude/latitude */
+export function decodeRiskTile(buffer: ArrayBuffer, z: number, x: number, y: number): TileFeature[] {
+  const tile = new ProtoReader(new Uint8Array(buffer));
+  const features: TileFeature[] = [];
+
+  while (!tile.done()) {
+    const [field, wireType] = tile.tag();
+    if (field !== 3) {
+      tile.skip(wireType);
+      continue;
+    }
+
+    const layer = new ProtoReader(tile.bytesField());
+    const keys: string[] = [];
+    const values: Array<string | number> = [];
+    const raw: Array<{ id?: number; tags: number[]; geometry: number[] }> = [];
+    let extent = 4096;
+
+    while (!layer.done()) {
+      const [layerField, layerWireType] = layer.tag();
+      if (layerField === 2) {
+        const featureReader = new ProtoReader(layer.bytesField());
+        const feature: { id?: number; tags: number[]; geometry: number[] } = { tags: [], geometry: [] };
+        while (!featureReader.done()) {
+          const [featureField, featureWireType] = featureReader.tag();
+          if (featureField === 1) feature.id = featureReader.varint();
+          else if (featureField === 2) feature.tags = packed(featureReader.bytesField());
+          else if (featureField === 4) feature.geometry = packed(featureReader.bytesField());
+          else featureReader.skip(featureWireType);
+        }
+        raw.push(feature);
+      } else if (layerField === 3) {
+        keys.push(textDecoder.decode(layer.bytesField()));
+      } else if (layerField === 4) {
+        values.push(readValue(layer.bytesField()));
+      } else if (layerField === 5) {
+        extent = layer.varint();
+      } else {
+        layer.skip(layerWireType);
+      }
+    }
+
+    const scale = 2 ** z;
+    const toLngLat = (px: number, py: number) => [
+      ((x + px / extent) / scale) * 360 - 180,
+      (Math.atan(Math.sinh(Math.PI * (1 - (2 * (y + py / extent)) / scale))) * 180) / Math.PI,
+    ];
+
+    for (const feature of raw) {
+      const properties: Record<string, string | number> = {};
+      for (let i = 0; i < feature.tags.length; i += 2) {
+        properties[keys[feature.tags[i]]] = values[feature.tags[i + 1]];
+      }
+
+      const ring: number[][] = [];
+      let cx = 0;
+      let cy = 0;
+      for (let i = 0; i < feature.geometry.length; ) {
+        const command = feature.geometry[i] & 0x7;
+        const count = feature.geometry[i] >> 3;
+        i += 1;
+        if (command === 7) {
+          ring.push(ring[0]);
+          continue;
+        }
+        for (let n = 0; n < count; n += 1) {
+          cx += unzigzag(feature.geometry[i]);
+          cy += unzigzag(feature.geometry[i + 1]);
+          ring.push(toLngLat(cx, cy));
+          i += 2;
+        }
+      }
+
+      features.push({
+        type: 'Feature',
+        id: feature.id,
+        geometry: { type: 'Polygon', coordinates: [ring] },
+        properties,
+      });
+    }
+  }
+
+  return features;
+}